@@ -0,0 +1,76 @@
+# FILE: benchmarks/arrays.py
+"""
+_core.Array against the plain list js.Array() / ruby.Array() used to return.
+
+shift on a list is pop(0), which moves every remaining item, so draining
+an array from the front (a queue) is quadratic, and so is filling one
+with unshift. An Array keeps free room before its items as well as after
+them, so shift moves its start and unshift takes the slot before it: all
+four ends are O(1) amortized.
+
+    python benchmarks/arrays.py
+"""
+from microps import _core
+from microps.bench import best_time
+
+N = 50000
+
+
+def main():
+    values = list(range(N))
+
+    def list_drain():
+        a = list(values)
+        while a:
+            _core.pop(a, 0)
+
+    def array_drain():
+        a = _core.Array(values)
+        while a:
+            _core.pop(a, 0)
+
+    def list_unshift():
+        a = []
+        for v in values:
+            _core.insert(a, 0, v)
+
+    def array_unshift():
+        a = _core.Array()
+        for v in values:
+            _core.insert(a, 0, v)
+
+    def list_queue():
+        a = list(values[:1000])
+        for v in values:
+            _core.append(a, v)
+            _core.pop(a, 0)
+
+    def array_queue():
+        a = _core.Array(values[:1000])
+        for v in values:
+            _core.append(a, v)
+            _core.pop(a, 0)
+
+    def list_push():
+        a = []
+        for v in values:
+            _core.append(a, v)
+
+    def array_push():
+        a = _core.Array()
+        for v in values:
+            _core.append(a, v)
+
+    rows = [
+        (f'shift {N}', list_drain, array_drain),
+        (f'unshift {N}', list_unshift, array_unshift),
+        (f'push+shift {N}, 1000 deep', list_queue, array_queue),
+        (f'push {N}', list_push, array_push),
+    ]
+    print(f"{'':<28} {'list':>10} {'Array':>10}")
+    for label, list_fn, array_fn in rows:
+        print(f"{label:<28} {best_time(list_fn):8.3f}ms {best_time(array_fn):8.3f}ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,80 @@
+# FILE: benchmarks/bitset.py
+"""
+_core.Bitset against a plain Python int used as a bit mask.
+
+Setting one bit of an int builds a new int of the full width, so filling
+a large mask is quadratic; a Bitset changes one word in place. Counting,
+rank and iterating over set bits run over whole words in C.
+
+    python benchmarks/bitset.py
+"""
+import random
+from functools import partial
+
+from microps import _core
+from microps.bench import best_time
+
+NBITS = 1 << 20
+K = 2000            # bits touched per round
+
+
+best_ms = partial(best_time, number=3)
+
+
+def main():
+    rng = random.Random(1)
+    positions = [rng.randrange(NBITS) for _ in range(K)]
+    mask = 0
+    for p in positions:
+        mask |= 1 << p
+    bits = _core.Bitset.from_int(mask, NBITS)
+    other_int = rng.getrandbits(NBITS)
+    other = _core.Bitset.from_int(other_int, NBITS)
+    scratch = bits.copy()
+    below = NBITS // 2
+
+    def int_set():
+        x = 0
+        for p in positions:
+            x |= 1 << p
+
+    def bitset_set():
+        b = _core.Bitset(NBITS)
+        for p in positions:
+            b.set(p)
+
+    def int_iter():
+        x, out = mask, []
+        while x:
+            low = x & -x
+            out.append(low.bit_length() - 1)
+            x ^= low
+
+    def int_select():
+        # position of the middle set bit: peel bits off the low end
+        x = mask
+        for _ in range(K // 2):
+            x &= x - 1
+        return (x & -x).bit_length() - 1
+
+    rows = [
+        (f'set {K} bits', int_set, bitset_set),
+        (f'set {K} bits (bulk)', None, lambda: _core.Bitset(NBITS, positions)),
+        ('test 2000 bits', lambda: [(mask >> p) & 1 for p in positions],
+         lambda: [bits.test(p) for p in positions]),
+        ('popcount', mask.bit_count, bits.count),
+        ('rank(n/2)', lambda: (mask & ((1 << below) - 1)).bit_count(), lambda: bits.rank(below)),
+        ('select(k/2)', int_select, lambda: bits.select(K // 2)),
+        ('and', lambda: mask & other_int, lambda: bits & other),
+        ('xor in place', None, lambda: scratch.__ixor__(other)),
+        ('iterate set bits', int_iter, lambda: list(bits)),
+    ]
+    print(f"{NBITS} bits, {K} of them set")
+    print(f"{'':<22} {'int':>10} {'Bitset':>10}")
+    for label, int_fn, bitset_fn in rows:
+        left = f"{best_ms(int_fn):8.3f}ms" if int_fn else f"{'-':>10}"
+        print(f"{label:<22} {left} {best_ms(bitset_fn):8.3f}ms")
+
+
+if __name__ == '__main__':
+    main()
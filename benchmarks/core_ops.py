@@ -0,0 +1,74 @@
+# FILE: benchmarks/core_ops.py
+"""
+Microbenchmark for every _core micro-op.
+
+Times each op with a small, representative argument set and prints ns/call.
+Save a run with --save and diff two builds with --compare:
+
+    python benchmarks/core_ops.py --save before.json
+    # rebuild
+    python benchmarks/core_ops.py --compare before.json
+"""
+import argparse
+import json
+import sys
+import timeit
+
+from microps import _core
+from microps.bench import CORE_SAMPLES, missing_core_samples
+
+# Sample arguments are shared with the packaged harness (python -m microps.bench).
+SAMPLES = CORE_SAMPLES
+
+
+def run(number, repeat):
+    """Returns {op: best ns/call} for every sampled op exported by _core."""
+    results = {}
+    for name, args in SAMPLES.items():
+        fn = getattr(_core, name, None)
+        if fn is None:
+            continue
+        timer = timeit.Timer(lambda: fn(*args))
+        best = min(timer.repeat(repeat=repeat, number=number))
+        results[name] = best / number * 1e9
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--number', type=int, default=200000)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--save', metavar='FILE', help='write results as JSON')
+    parser.add_argument('--compare', metavar='FILE', help='compare against a saved JSON run')
+    opts = parser.parse_args(argv)
+
+    missing = missing_core_samples()
+    if missing:
+        print(f"WARNING: no sample arguments for: {', '.join(missing)}", file=sys.stderr)
+
+    results = run(opts.number, opts.repeat)
+    baseline = {}
+    if opts.compare:
+        with open(opts.compare) as f:
+            baseline = json.load(f)
+
+    for name, ns in results.items():
+        line = f"{name:<18} {ns:8.1f} ns"
+        if name in baseline:
+            line += f"   (was {baseline[name]:8.1f} ns, {baseline[name] / ns:5.2f}x)"
+        print(line)
+
+    if baseline:
+        common = [n for n in results if n in baseline]
+        total_before = sum(baseline[n] for n in common)
+        total_after = sum(results[n] for n in common)
+        print(f"\n{len(common)} ops: {total_before:.0f} ns -> {total_after:.0f} ns total "
+              f"({total_before / total_after:.2f}x)")
+
+    if opts.save:
+        with open(opts.save, 'w') as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+
+
+if __name__ == '__main__':
+    main()
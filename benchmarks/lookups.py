@@ -0,0 +1,48 @@
+# FILE: benchmarks/lookups.py
+"""
+Repeated indexOf / includes / array_search on one large array.
+
+js.Array() and php.array() return a _core.Array / PHPArray. The first
+search of one scans it; from the second one on, find, contains and
+search answer from a hash index the array keeps, until the array
+changes. A plain list is always scanned.
+
+    python benchmarks/lookups.py
+"""
+from functools import partial
+
+from microps import js, php, _core
+from microps.bench import best_time
+
+N = 100000
+
+
+best_us = partial(best_time, number=200, repeat=5, unit='us')
+
+
+def main():
+    arr = js.Array(*range(N))
+    parr = php.array(*range(N))
+    plain = list(range(N))
+    needle = N - 1
+    rows = [
+        ('linear scan (list.index)', lambda: plain.index(needle)),
+        ('JS indexOf', lambda: arr.indexOf(needle)),
+        ('JS includes', lambda: arr.includes(needle)),
+        ('PHP array_search', lambda: parr.array_search(needle)),
+        ('PHP in_array (absent)', lambda: parr.in_array(-1)),
+        ('_core.find', lambda: _core.find(arr._val, needle)),
+    ]
+    print(f"{N} elements, needle at the end")
+    for label, fn in rows:
+        print(f"{label:<28} {best_us(fn):10.2f} us")
+
+    def mutate_then_find():
+        _core.append(arr._val, 0)
+        _core.pop(arr._val, len(arr._val) - 1)
+        return arr.indexOf(needle)
+    print(f"{'append+pop, then indexOf':<28} {best_us(mutate_then_find, number=20):10.2f} us  (each change drops the index)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+# FILE: benchmarks/lua_tables.py
+"""
+_core.LuaTable against the dict a Lua table used to be.
+
+A dict has no O(1) "key after k": a next(t, k) built on it rebuilds an
+iterator and walks up to k on every call, so a next-loop is quadratic.
+LuaTable.next resumes where the previous step stopped. The border #t is
+the length of the array part instead of a probe for t[n+1] = nil, and
+table.insert / remove at the end are list appends and pops.
+
+    python benchmarks/lua_tables.py
+"""
+from functools import partial
+
+from microps import _core
+from microps.bench import best_time
+
+N = 2000
+
+
+best_ms = partial(best_time, number=3)
+
+
+def dict_next(d, key):
+    it = iter(d.items())
+    if key is not None:
+        for k, _ in it:
+            if k == key:
+                break
+    return next(it, None)
+
+
+def dict_border(d):
+    n = 0
+    while d.get(n + 1) is not None:
+        n += 1
+    return n
+
+
+def main():
+    items = {i: i for i in range(1, N + 1)}
+    items.update((f"k{i}", i) for i in range(N))
+    d = dict(items)
+    t = _core.LuaTable(items)
+
+    def walk(step, tbl):
+        k = None
+        while (r := step(tbl, k)) is not None:
+            k = r[0]
+
+    def dict_fill():
+        x = {}
+        for i in range(N):
+            x[dict_border(x) + 1] = i
+
+    def table_fill():
+        x = _core.LuaTable()
+        for i in range(N):
+            x.insert(i)
+
+    rows = [
+        (f'next() loop, {2 * N} keys', lambda: walk(dict_next, d),
+         lambda: walk(_core.LuaTable.next, t)),
+        ('pairs()', lambda: list(d.items()), lambda: list(t.pairs())),
+        ('#t', lambda: dict_border(d), lambda: len(t)),
+        (f'insert {N} at #t+1', dict_fill, table_fill),
+    ]
+    print(f"{'':<24} {'dict':>10} {'LuaTable':>10}")
+    for label, dict_fn, table_fn in rows:
+        print(f"{label:<24} {best_ms(dict_fn):8.3f}ms {best_ms(table_fn):8.3f}ms")
+
+
+if __name__ == '__main__':
+    main()
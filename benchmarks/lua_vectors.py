@@ -0,0 +1,67 @@
+# FILE: benchmarks/lua_vectors.py
+"""
+Vector math on Lua tables that share one metatable.
+
+Builds a 2D vector "class" with lua.setmetatable (__add, __eq, __index) and
+times the operators, plus raw metamethod resolution through the per-operator
+MMCache against the uncached _core.get_mm.
+
+    python benchmarks/lua_vectors.py
+"""
+from functools import partial
+
+from microps import lua, _core
+from microps.wrappers.lua import _MM
+from microps.bench import best_time
+
+VecMT = lua.Table()
+
+
+def vec(x, y):
+    t = lua.Table()
+    t['x'] = x
+    t['y'] = y
+    lua.setmetatable(t, VecMT)
+    return t
+
+
+VecMT['__add'] = lambda a, b: vec(a['x'] + b['x'], a['y'] + b['y'])
+VecMT['__eq'] = lambda a, b: a['x'] == b['x'] and a['y'] == b['y']
+VecMT['__index'] = lambda t, k: 0
+
+
+best_ns = partial(best_time, number=50000, repeat=5, unit='ns')
+
+
+def main():
+    a, b = vec(1, 2), vec(3, 4)
+    raw = a._val
+
+    def chain():
+        acc = a
+        for _ in range(100):
+            acc = acc + b
+        return acc
+
+    assert unwrap_xy(chain()) == (301, 402)
+    rows = [
+        ('resolve __add (get_mm)', lambda: _core.get_mm(raw, '__add')),
+        ('resolve __add (MMCache)', lambda: _MM['__add'](raw)),
+        ('a + b', lambda: a + b),
+        ('a == b', lambda: a == b),
+        ("a['z'] via __index", lambda: a['z']),
+        ('100-step add chain / step', lambda: chain()),
+    ]
+    for label, fn in rows:
+        ns = best_ns(fn, number=500 if label.startswith('100') else 50000)
+        if label.startswith('100'):
+            ns /= 100
+        print(f"{label:<28} {ns:9.1f} ns")
+
+
+def unwrap_xy(v):
+    return (_core.unwrap(v['x']), _core.unwrap(v['y']))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,45 @@
+# FILE: benchmarks/method_dispatch.py
+"""
+Method-access latency for every entry of every engine's method table.
+
+Times `getattr(value, name)` (attribute resolution only, no call) for each
+method name in table order. With table dispatch the first and the last name
+should cost the same; with an if-chain the cost grew with the position.
+
+    python benchmarks/method_dispatch.py
+"""
+import statistics
+import timeit
+
+from microps import js, php, py, ruby, c, JSValue, PHPValue, PyValue, RubyValue, CValue
+from microps.wrappers.js import JS_METHODS
+from microps.wrappers.php import PHP_METHODS
+from microps.wrappers.py import PY_METHODS
+from microps.wrappers.ruby import RUBY_METHODS
+from microps.wrappers.c import C_METHODS
+
+CASES = [
+    ('JSValue', JSValue("text", js), JS_METHODS),
+    ('PHPValue', PHPValue("text", php), PHP_METHODS),
+    ('PyValue', PyValue("text", py), PY_METHODS),
+    ('RubyValue', RubyValue("text", ruby), RUBY_METHODS),
+    ('CValue', CValue(7, c), C_METHODS),
+]
+
+
+def access_ns(value, name, number=200000, repeat=5):
+    timer = timeit.Timer(lambda: getattr(value, name))
+    return min(timer.repeat(repeat=repeat, number=number)) / number * 1e9
+
+
+def main():
+    print(f"{'class':<10} {'methods':>7} {'first':>8} {'last':>8} {'min':>8} {'max':>8} {'median':>8}  (ns/access)")
+    for label, value, table in CASES:
+        names = list(table)
+        timings = [access_ns(value, n) for n in names]
+        print(f"{label:<10} {len(names):>7} {timings[0]:8.1f} {timings[-1]:8.1f} "
+              f"{min(timings):8.1f} {max(timings):8.1f} {statistics.median(timings):8.1f}")
+
+
+if __name__ == '__main__':
+    main()
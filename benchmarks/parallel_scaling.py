@@ -0,0 +1,47 @@
+# FILE: benchmarks/parallel_scaling.py
+"""
+Scaling of microps.parallel.pmap from 1 worker to every core.
+
+Maps a CPU-bound module-level function (so it pickles) over N items and
+prints wall time and speedup against the serial _core.map_func run.
+
+    python benchmarks/parallel_scaling.py [N] [max_workers]
+"""
+import os
+import sys
+import time
+
+from microps import _core, parallel
+
+
+def collatz_steps(n):
+    steps = 0
+    n += 1
+    while n != 1:
+        n = n // 2 if n % 2 == 0 else 3 * n + 1
+        steps += 1
+    return steps
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+
+def main(n, max_workers):
+    items = list(range(n))
+    expected, serial = timed(lambda: _core.map_func(collatz_steps, items))
+    print(f"{n} items, {'threads' if parallel.free_threading() else 'processes'}")
+    print(f"{'serial':<10} {serial * 1e3:9.1f} ms")
+    for workers in range(1, max_workers + 1):
+        parallel.pmap(collatz_steps, items[:workers * 8], chunksize=1, workers=workers)  # warm the pool
+        result, elapsed = timed(lambda: parallel.pmap(collatz_steps, items, workers=workers))
+        assert result == expected
+        print(f"{workers:>2} worker{'s' if workers > 1 else ' '} {elapsed * 1e3:9.1f} ms  x{serial / elapsed:5.2f}")
+    parallel.shutdown()
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 200_000,
+         int(sys.argv[2]) if len(sys.argv) > 2 else (os.cpu_count() or 1))
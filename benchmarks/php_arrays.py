@@ -0,0 +1,67 @@
+# FILE: benchmarks/php_arrays.py
+"""
+_core.PHPArray against the plain list php.array() used to return.
+
+array_shift and array_unshift on a list move every element, so draining
+or filling an array from the front is quadratic. A packed PHPArray keeps
+free room at both ends and renumbers its keys by moving its start, so
+both are O(1). Key lookups are a slot read on packed arrays and one dict
+probe on keyed ones.
+
+    python benchmarks/php_arrays.py
+"""
+from microps import _core
+from microps.bench import best_time
+
+N = 50000
+
+
+def main():
+    values = list(range(N))
+    keyed = _core.PHPArray({f"k{i}": i for i in range(N)})
+    probes = [f"k{i}" for i in range(0, N, 7)]
+
+    def list_drain():
+        a = list(values)
+        while a:
+            a.pop(0)
+
+    def array_drain():
+        a = _core.PHPArray(values)
+        while len(a):
+            a.shift()
+
+    def list_unshift():
+        a = []
+        for v in values:
+            a.insert(0, v)
+
+    def array_unshift():
+        a = _core.PHPArray()
+        for v in values:
+            a.unshift(v)
+
+    def list_push():
+        a = []
+        for v in values:
+            _core.append(a, v)
+
+    def array_push():
+        a = _core.PHPArray()
+        for v in values:
+            _core.append(a, v)
+
+    rows = [
+        (f'shift {N}', list_drain, array_drain),
+        (f'unshift {N}', list_unshift, array_unshift),
+        (f'push {N}', list_push, array_push),
+        (f'key_exists x{len(probes)}', None, lambda: [keyed.key_exists(k) for k in probes]),
+    ]
+    print(f"{'':<22} {'list':>10} {'PHPArray':>10}")
+    for label, list_fn, array_fn in rows:
+        left = f"{best_time(list_fn):8.3f}ms" if list_fn else f"{'-':>10}"
+        print(f"{label:<22} {left} {best_time(array_fn):8.3f}ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,48 @@
+# FILE: benchmarks/pipeline.py
+"""
+Fused map | filter | reduce pipeline against the same three stages run one
+after another (each materializing a list) and against builtins.
+
+    python benchmarks/pipeline.py [N]
+"""
+import functools
+import sys
+import time
+import tracemalloc
+
+from microps import _core
+from microps.pipeline import map as pmap, filter as pfilter, reduce as preduce
+
+inc = (1).__add__
+odd = (1).__and__
+
+
+def fused(data):
+    return data | pmap(inc) | pfilter(odd) | preduce(_core.add, 0)
+
+
+def staged(data):
+    return _core.reduce_func(_core.add, _core.filter_func(odd, _core.map_func(inc, data)), 0)
+
+
+def builtin(data):
+    return functools.reduce(_core.add, filter(odd, map(inc, data)), 0)
+
+
+def main(n):
+    data = list(range(n))
+    expected = fused(data)
+    for label, fn in (('fused pipeline', fused), ('staged _core ops', staged), ('builtins', builtin)):
+        start = time.perf_counter()
+        assert fn(data) == expected
+        elapsed = time.perf_counter() - start
+        # Separate run for memory: tracing every allocation skews the timing
+        tracemalloc.start()
+        fn(data)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        print(f"{label:<18} {elapsed * 1e3:9.1f} ms  peak {peak / 1e6:8.1f} MB")
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000)
@@ -0,0 +1,41 @@
+# FILE: benchmarks/raw_callbacks.py
+"""
+map/filter callbacks with and without value wrapping.
+
+A plain lambda gets every element wrapped in a *Value and its result
+unwrapped; builtins, _core ops and raw()-marked callables receive the raw
+objects and run straight through _core.map_func / filter_func.
+
+    python benchmarks/raw_callbacks.py
+"""
+from functools import partial
+
+from microps import php, py, raw, PHPValue
+from microps.bench import best_time
+
+N = 10000
+
+
+best_us = partial(best_time, number=20, repeat=5, unit='us')
+
+
+def main():
+    arr = PHPValue(list(range(N)), php)
+    double, double_raw = (lambda x: x * 2), raw(lambda x: x * 2)
+    odd, odd_raw = (lambda x: x % 2), raw(lambda x: x % 2)
+    rows = [
+        ('array_map(lambda)', lambda: arr.array_map(double)),
+        ('array_map(raw lambda)', lambda: arr.array_map(double_raw)),
+        ('array_map(abs)', lambda: arr.array_map(abs)),
+        ('array_filter(lambda)', lambda: arr.array_filter(odd)),
+        ('array_filter(raw lambda)', lambda: arr.array_filter(odd_raw)),
+        ('py.map(lambda) drained', lambda: py.list(py.map(double, arr._val))),
+        ('py.map(raw lambda) drained', lambda: py.list(py.map(double_raw, arr._val))),
+    ]
+    print(f"{N} elements")
+    for label, fn in rows:
+        print(f"{label:<28} {best_us(fn):10.1f} us")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,57 @@
+# FILE: benchmarks/string_building.py
+"""
+Building a string piece by piece, and trimming it.
+
+s = s + piece copies the whole string on every step (O(n^2) overall);
+s += piece on a JS string (and .. in Lua) extends a _core.StrBuilder, so
+each step is O(1) and the text is joined once when it is read.
+
+    python benchmarks/string_building.py
+"""
+from functools import partial
+
+from microps import js, lua, unwrap, _core
+from microps.bench import best_time
+
+PIECES = (1000, 10000, 50000)
+PIECE = "0123456789"
+
+
+best_ms = partial(best_time, number=3)
+
+
+def plus(n):
+    s = js.String("")
+    for _ in range(n):
+        s = s + PIECE
+    return unwrap(s)
+
+
+def plus_eq(n):
+    s = js.String("")
+    for _ in range(n):
+        s += PIECE
+    return unwrap(s)
+
+
+def lua_concat(n):
+    s = lua.String("")
+    for _ in range(n):
+        s = s.__concat__(PIECE)
+    return unwrap(s)
+
+
+def main():
+    print(f"{'pieces':>8} {'s = s + x':>12} {'s += x':>12} {'lua ..':>12}")
+    for n in PIECES:
+        print(f"{n:>8} {best_ms(lambda: plus(n)):10.1f}ms {best_ms(lambda: plus_eq(n)):10.1f}ms "
+              f"{best_ms(lambda: lua_concat(n)):10.1f}ms")
+
+    text = "  " + "word " * 100000 + "  "
+    old = lambda: _core.str_replace(_core.str_replace(text, " ", ""), "\t", "")
+    print(f"\ntrim of {len(text)} chars: str_replace x2 {best_ms(old):.2f}ms, "
+          f"str_strip {best_ms(lambda: _core.str_strip(text)):.2f}ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,31 +1,78 @@
 # FILE: microps/__init__.py
+import functools
+import inspect
 from . import _core
 
-def unwrap(x):
-    """Deep unwrap to get raw Python/C objects."""
-    while hasattr(x, '__dict__') and '_val' in x.__dict__:
-        x = x.__dict__['_val']
-    return x
+# Deep unwrap to get raw Python/C objects (one C type check per layer)
+unwrap = _core.unwrap
+
+class scope_context:
+    """Private variables for the current thread or asyncio task.
+
+        with scope_context():           # or: async with scope_context():
+            js.user = request.user      # seen only by this thread / task
+
+    Inside the block, writes such as js.x = 1 or shared.y = 2 go to an overlay
+    that only the current context sees, and reads check that overlay before the
+    shared engine and global scopes. Entering is O(1): nothing is copied, a
+    nested block layers over the enclosing one and writes stay in the
+    innermost layer. Decorating a function (sync or async) runs every call in
+    a fresh context. Tasks started inside a block share its overlay, so give
+    each concurrent handler its own scope_context().
+    """
+    __slots__ = ('_tokens',)
+
+    def __init__(self):
+        self._tokens = []
+
+    def __enter__(self):
+        self._tokens.append(_core.overlay_push())
+        return self
+
+    def __exit__(self, *exc):
+        _core.overlay_pop(self._tokens.pop())
+        return False
+
+    async def __aenter__(self):
+        return self.__enter__()
+
+    async def __aexit__(self, *exc):
+        return self.__exit__(*exc)
+
+    def __call__(self, fn):
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def run_async(*args, **kwargs):
+                async with scope_context():
+                    return await fn(*args, **kwargs)
+            return run_async
+
+        @functools.wraps(fn)
+        def run(*args, **kwargs):
+            with scope_context():
+                return fn(*args, **kwargs)
+        return run
 
 class SharedBridge:
     """Bridge to the global polyglot scope."""
     def __init__(self, engine=None, value_class=None):
         self.__dict__['_engine'] = engine
         self.__dict__['_value_class'] = value_class
+        self.__dict__['_vars'] = _core.scope("global")
 
     def __getattr__(self, n):
-        v = _core.get_var("global", n)
+        v = self._vars.get(n)
         if self._value_class and v is not None:
             return self._value_class(v, self._engine)
         return v
     
     def __setattr__(self, n, v):
-        _core.set_var("global", n, unwrap(v))
+        self._vars.set(n, unwrap(v))
 
 shared = SharedBridge()
 
 # Import wrapper utilities before language wrappers
-from .wrappers.wrapper import BaseValue, get_mm, create_decorator, lie_lookup
+from .wrappers.wrapper import BaseValue, get_mm, create_decorator, lie_lookup, raw
 
 # Late imports to prevent circular dependency issues
 from .wrappers.ruby import ruby, RubyValue, RubyEngine
@@ -40,6 +87,7 @@ __all__ = [
     '_core', 
     'unwrap', 
     'shared',
+    'scope_context',
     
     # Language engines
     'js', 'lua', 'ruby', 'php', 'py', 'c',
@@ -51,5 +99,5 @@ __all__ = [
     'JSEngine', 'LuaEngine', 'RubyEngine', 'PHPEngine', 'PyEngine', 'CEngine',
     
     # Wrapper utilities (for creating new language wrappers)
-    'BaseValue', 'get_mm', 'create_decorator', 'lie_lookup'
+    'BaseValue', 'get_mm', 'create_decorator', 'lie_lookup', 'raw'
 ]
@@ -1,38 +1,57 @@
 // FILE: microps/_core.c
 #include <Python.h>
 #include "microops.h"
-static PyObject* _scopes = NULL;
-
-// Scope management
-static PyObject* set_var(PyObject* self, PyObject* args) {
-    const char *s_n, *k; PyObject *v;
-    if (!PyArg_ParseTuple(args, "ssO", &s_n, &k, &v)) return NULL;
-    PyObject* s = PyDict_GetItemString(_scopes, s_n);
-    if (!s) { s = PyDict_New(); PyDict_SetItemString(_scopes, s_n, s); }
-    PyDict_SetItemString(s, k, v); Py_RETURN_NONE;
-}
+#include "native.h"
 
-static PyObject* get_var(PyObject* self, PyObject* args) {
-    const char *s_n, *k; if (!PyArg_ParseTuple(args, "ss", &s_n, &k)) return NULL;
-    PyObject* s = PyDict_GetItemString(_scopes, s_n);
-    PyObject* v = s ? PyDict_GetItemString(s, k) : NULL;
-    if (!v) { PyObject* g = PyDict_GetItemString(_scopes, "global"); v = g ? PyDict_GetItemString(g, k) : NULL; }
-    if (v) { Py_INCREF(v); return v; } Py_RETURN_NONE;
+// Argument checking for METH_FASTCALL entry points
+static inline int check_nargs(const char* name, Py_ssize_t nargs, Py_ssize_t expected) {
+    if (nargs == expected) return 1;
+    PyErr_Format(PyExc_TypeError, "%s() takes exactly %zd argument%s (%zd given)",
+                 name, expected, expected == 1 ? "" : "s", nargs);
+    return 0;
 }
 
-static PyObject* haunted_get(PyObject* self, PyObject* args) {
-    const char *s_n, *k; if (!PyArg_ParseTuple(args, "ss", &s_n, &k)) return NULL;
-    PyObject* s = PyDict_GetItemString(_scopes, s_n);
-    if (!s) { s = PyDict_New(); PyDict_SetItemString(_scopes, s_n, s); }
-    PyObject* v = micro_inc_get(s, PyUnicode_FromString(k));
-    return v;
+// Several micro-ops report failure by leaving an exception set while still
+// returning a value; turn that into a proper NULL return.
+static inline PyObject* check_result(PyObject* r) {
+    if (r && PyErr_Occurred()) { Py_DECREF(r); return NULL; }
+    return r;
 }
 
-// Wrapper macros for cleaner code
-#define WRAP_0(name) static PyObject* py_##name(PyObject* s, PyObject* a) { return micro_##name(); }
-#define WRAP_1(name) static PyObject* py_##name(PyObject* s, PyObject* a) { PyObject *x; PyArg_ParseTuple(a, "O", &x); return micro_##name(x); }
-#define WRAP_2(name) static PyObject* py_##name(PyObject* s, PyObject* a) { PyObject *x, *y; PyArg_ParseTuple(a, "OO", &x, &y); return micro_##name(x, y); }
-#define WRAP_3(name) static PyObject* py_##name(PyObject* s, PyObject* a) { PyObject *x, *y, *z; PyArg_ParseTuple(a, "OOO", &x, &y, &z); return micro_##name(x, y, z); }
+// Per-op profiling (native/profile.c). When profiling is off the only cost
+// is the profile_enabled test; each trampoline keeps its own counters.
+#if defined(__GNUC__) || defined(__clang__)
+#define PROFILING() __builtin_expect(profile_enabled, 0)
+#else
+#define PROFILING() profile_enabled
+#endif
+#define PROFILED(name, call) \
+    if (PROFILING()) { \
+        static OpStats stats = {#name}; \
+        uint64_t t0 = profile_now(); \
+        PyObject* r = check_result(call); \
+        profile_record(&stats, t0); \
+        return r; \
+    } \
+    return check_result(call);
+
+// Wrapper macros for cleaner code.
+// Unary ops are METH_O, nullary ops METH_NOARGS, everything else METH_FASTCALL.
+#define WRAP_0(name) static PyObject* py_##name(PyObject* s, PyObject* unused) { \
+    PROFILED(name, micro_##name()) }
+#define WRAP_1(name) static PyObject* py_##name(PyObject* s, PyObject* x) { \
+    PROFILED(name, micro_##name(x)) }
+#define WRAP_2(name) static PyObject* py_##name(PyObject* s, PyObject* const* a, Py_ssize_t n) { \
+    if (!check_nargs(#name, n, 2)) { return NULL; } \
+    PROFILED(name, micro_##name(a[0], a[1])) }
+#define WRAP_3(name) static PyObject* py_##name(PyObject* s, PyObject* const* a, Py_ssize_t n) { \
+    if (!check_nargs(#name, n, 3)) { return NULL; } \
+    PROFILED(name, micro_##name(a[0], a[1], a[2])) }
+
+// Method table helpers
+#define FAST(name, fn) {name, (PyCFunction)(void(*)(void))fn, METH_FASTCALL, NULL}
+#define ONE(name, fn) {name, fn, METH_O, NULL}
+#define NONE(name, fn) {name, fn, METH_NOARGS, NULL}
 
 // Arithmetic
 WRAP_2(add) WRAP_2(sub) WRAP_2(mul) WRAP_2(div) WRAP_2(mod) WRAP_2(pow) WRAP_2(floor_div)
@@ -77,6 +96,9 @@ WRAP_1(str_strip) WRAP_1(str_lstrip) WRAP_1(str_rstrip)
 WRAP_1(str_capitalize) WRAP_1(str_title) WRAP_1(str_swapcase)
 WRAP_2(str_repeat) WRAP_3(str_pad_left) WRAP_3(str_pad_right) WRAP_3(str_center)
 
+// Memory operations
+WRAP_3(memset) WRAP_3(memcpy) WRAP_3(memmove)
+
 // Dictionary operations
 WRAP_2(dict_merge) WRAP_2(dict_update) WRAP_3(dict_pop)
 WRAP_3(dict_setdefault) WRAP_1(dict_items)
@@ -88,139 +110,164 @@ WRAP_2(map_func) WRAP_2(filter_func) WRAP_3(reduce_func)
 WRAP_1(hash_val) WRAP_1(id_val) WRAP_2(is_identical)
 
 static PyMethodDef Methods[] = {
-    // Scope management
-    {"set_var", set_var, METH_VARARGS, NULL}, 
-    {"get_var", get_var, METH_VARARGS, NULL},
-    {"haunted_get", haunted_get, METH_VARARGS, NULL},
-    
     // Arithmetic
-    {"add", py_add, METH_VARARGS, NULL}, 
-    {"sub", py_sub, METH_VARARGS, NULL},
-    {"mul", py_mul, METH_VARARGS, NULL}, 
-    {"div", py_div, METH_VARARGS, NULL},
-    {"mod", py_mod, METH_VARARGS, NULL}, 
-    {"pow", py_pow, METH_VARARGS, NULL},
-    {"floor_div", py_floor_div, METH_VARARGS, NULL},
-    {"neg", py_neg, METH_VARARGS, NULL},
-    {"abs", py_abs, METH_VARARGS, NULL},
-    {"divmod", py_divmod, METH_VARARGS, NULL},
-    {"min", py_min, METH_VARARGS, NULL},
-    {"max", py_max, METH_VARARGS, NULL},
-    {"clamp", py_clamp, METH_VARARGS, NULL},
-    {"sign", py_sign, METH_VARARGS, NULL},
+    FAST("add", py_add), 
+    FAST("sub", py_sub),
+    FAST("mul", py_mul), 
+    FAST("div", py_div),
+    FAST("mod", py_mod), 
+    FAST("pow", py_pow),
+    FAST("floor_div", py_floor_div),
+    ONE("neg", py_neg),
+    ONE("abs", py_abs),
+    FAST("divmod", py_divmod),
+    FAST("min", py_min),
+    FAST("max", py_max),
+    FAST("clamp", py_clamp),
+    ONE("sign", py_sign),
     
     // Comparison
-    {"eq", py_eq, METH_VARARGS, NULL},
-    {"ne", py_ne, METH_VARARGS, NULL},
-    {"lt", py_lt, METH_VARARGS, NULL},
-    {"le", py_le, METH_VARARGS, NULL},
-    {"gt", py_gt, METH_VARARGS, NULL},
-    {"ge", py_ge, METH_VARARGS, NULL},
+    FAST("eq", py_eq),
+    FAST("ne", py_ne),
+    FAST("lt", py_lt),
+    FAST("le", py_le),
+    FAST("gt", py_gt),
+    FAST("ge", py_ge),
     
     // Bitwise
-    {"bit_and", py_bit_and, METH_VARARGS, NULL},
-    {"bit_or", py_bit_or, METH_VARARGS, NULL},
-    {"bit_xor", py_bit_xor, METH_VARARGS, NULL},
-    {"bit_not", py_bit_not, METH_VARARGS, NULL},
-    {"lshift", py_lshift, METH_VARARGS, NULL},
-    {"rshift", py_rshift, METH_VARARGS, NULL},
-    {"rotl", py_rotl, METH_VARARGS, NULL},
-    {"rotr", py_rotr, METH_VARARGS, NULL},
-    {"popcount", py_popcount, METH_VARARGS, NULL},
+    FAST("bit_and", py_bit_and),
+    FAST("bit_or", py_bit_or),
+    FAST("bit_xor", py_bit_xor),
+    ONE("bit_not", py_bit_not),
+    FAST("lshift", py_lshift),
+    FAST("rshift", py_rshift),
+    FAST("rotl", py_rotl),
+    FAST("rotr", py_rotr),
+    ONE("popcount", py_popcount),
     
     // Logical
-    {"not_op", py_not, METH_VARARGS, NULL},
-    {"truthy", py_truthy, METH_VARARGS, NULL},
+    ONE("not_op", py_not),
+    ONE("truthy", py_truthy),
     
     // Type conversions
-    {"to_int", py_to_int, METH_VARARGS, NULL},
-    {"to_float", py_to_float, METH_VARARGS, NULL}, 
-    {"to_str", py_to_str, METH_VARARGS, NULL},
-    {"to_bool", py_to_bool, METH_VARARGS, NULL},
+    ONE("to_int", py_to_int),
+    ONE("to_float", py_to_float), 
+    ONE("to_str", py_to_str),
+    ONE("to_bool", py_to_bool),
     
     // Type info & checking
-    {"len", py_len, METH_VARARGS, NULL}, 
-    {"type", py_type, METH_VARARGS, NULL},
-    {"is_int", py_is_int, METH_VARARGS, NULL},
-    {"is_float", py_is_float, METH_VARARGS, NULL},
-    {"is_str", py_is_str, METH_VARARGS, NULL},
-    {"is_list", py_is_list, METH_VARARGS, NULL},
-    {"is_dict", py_is_dict, METH_VARARGS, NULL},
-    {"is_tuple", py_is_tuple, METH_VARARGS, NULL},
-    {"is_bool", py_is_bool, METH_VARARGS, NULL},
-    {"is_none", py_is_none, METH_VARARGS, NULL},
-    {"is_callable", py_is_callable, METH_VARARGS, NULL},
+    ONE("len", py_len), 
+    ONE("type", py_type),
+    ONE("is_int", py_is_int),
+    ONE("is_float", py_is_float),
+    ONE("is_str", py_is_str),
+    ONE("is_list", py_is_list),
+    ONE("is_dict", py_is_dict),
+    ONE("is_tuple", py_is_tuple),
+    ONE("is_bool", py_is_bool),
+    ONE("is_none", py_is_none),
+    ONE("is_callable", py_is_callable),
     
     // Object operations
-    {"obj_new", py_obj_new, METH_NOARGS, NULL}, 
-    {"obj_get", py_obj_get, METH_VARARGS, NULL},
-    {"obj_set", py_obj_set, METH_VARARGS, NULL}, 
-    {"del_op", py_del_op, METH_VARARGS, NULL},
-    {"inc_get", py_inc_get, METH_VARARGS, NULL},
-    {"keys", py_keys, METH_VARARGS, NULL},
-    {"values", py_values, METH_VARARGS, NULL},
+    NONE("obj_new", py_obj_new), 
+    FAST("obj_get", py_obj_get),
+    FAST("obj_set", py_obj_set), 
+    FAST("del_op", py_del_op),
+    FAST("inc_get", py_inc_get),
+    ONE("keys", py_keys),
+    ONE("values", py_values),
     
     // List operations
-    {"list_new", py_list_new, METH_NOARGS, NULL},
-    {"append", py_append, METH_VARARGS, NULL},
-    {"pop", py_pop, METH_VARARGS, NULL},
-    {"reverse", py_reverse, METH_VARARGS, NULL},
-    {"insert", py_insert, METH_VARARGS, NULL},
-    {"extend", py_extend, METH_VARARGS, NULL},
-    {"clear", py_clear, METH_VARARGS, NULL},
+    NONE("list_new", py_list_new),
+    FAST("append", py_append),
+    FAST("pop", py_pop),
+    ONE("reverse", py_reverse),
+    FAST("insert", py_insert),
+    FAST("extend", py_extend),
+    ONE("clear", py_clear),
     
     // Sequence operations
-    {"contains", py_contains, METH_VARARGS, NULL},
-    {"slice", py_slice, METH_VARARGS, NULL},
-    {"concat", py_concat, METH_VARARGS, NULL},
-    {"find", py_find, METH_VARARGS, NULL},
-    {"rfind", py_rfind, METH_VARARGS, NULL},
-    {"swap", py_swap, METH_VARARGS, NULL},
-    {"count", py_count, METH_VARARGS, NULL},
-    {"is_sorted", py_is_sorted, METH_VARARGS, NULL},
+    FAST("contains", py_contains),
+    FAST("slice", py_slice),
+    FAST("concat", py_concat),
+    FAST("find", py_find),
+    FAST("rfind", py_rfind),
+    FAST("swap", py_swap),
+    FAST("count", py_count),
+    ONE("is_sorted", py_is_sorted),
     
     // String operations
-    {"str_upper", py_str_upper, METH_VARARGS, NULL},
-    {"str_lower", py_str_lower, METH_VARARGS, NULL},
-    {"str_split", py_str_split, METH_VARARGS, NULL},
-    {"str_join", py_str_join, METH_VARARGS, NULL},
-    {"str_replace", py_str_replace, METH_VARARGS, NULL},
-    {"str_startswith", py_str_startswith, METH_VARARGS, NULL},
-    {"str_endswith", py_str_endswith, METH_VARARGS, NULL},
-    {"str_contains", py_str_contains, METH_VARARGS, NULL},
-    {"str_count", py_str_count, METH_VARARGS, NULL},
-    {"str_find", py_str_find, METH_VARARGS, NULL},
-    {"str_rfind", py_str_rfind, METH_VARARGS, NULL},
-    {"str_strip", py_str_strip, METH_VARARGS, NULL},
-    {"str_lstrip", py_str_lstrip, METH_VARARGS, NULL},
-    {"str_rstrip", py_str_rstrip, METH_VARARGS, NULL},
-    {"str_capitalize", py_str_capitalize, METH_VARARGS, NULL},
-    {"str_title", py_str_title, METH_VARARGS, NULL},
-    {"str_swapcase", py_str_swapcase, METH_VARARGS, NULL},
-    {"str_repeat", py_str_repeat, METH_VARARGS, NULL},
-    {"str_pad_left", py_str_pad_left, METH_VARARGS, NULL},
-    {"str_pad_right", py_str_pad_right, METH_VARARGS, NULL},
-    {"str_center", py_str_center, METH_VARARGS, NULL},
+    ONE("str_upper", py_str_upper),
+    ONE("str_lower", py_str_lower),
+    FAST("str_split", py_str_split),
+    FAST("str_join", py_str_join),
+    FAST("str_replace", py_str_replace),
+    FAST("str_startswith", py_str_startswith),
+    FAST("str_endswith", py_str_endswith),
+    FAST("str_contains", py_str_contains),
+    FAST("str_count", py_str_count),
+    FAST("str_find", py_str_find),
+    FAST("str_rfind", py_str_rfind),
+    ONE("str_strip", py_str_strip),
+    ONE("str_lstrip", py_str_lstrip),
+    ONE("str_rstrip", py_str_rstrip),
+    ONE("str_capitalize", py_str_capitalize),
+    ONE("str_title", py_str_title),
+    ONE("str_swapcase", py_str_swapcase),
+    FAST("str_repeat", py_str_repeat),
+    FAST("str_pad_left", py_str_pad_left),
+    FAST("str_pad_right", py_str_pad_right),
+    FAST("str_center", py_str_center),
+    
+    // Memory operations
+    FAST("memset", py_memset),
+    FAST("memcpy", py_memcpy),
+    FAST("memmove", py_memmove),
     
     // Dictionary operations
-    {"dict_merge", py_dict_merge, METH_VARARGS, NULL},
-    {"dict_update", py_dict_update, METH_VARARGS, NULL},
-    {"dict_pop", py_dict_pop, METH_VARARGS, NULL},
-    {"dict_setdefault", py_dict_setdefault, METH_VARARGS, NULL},
-    {"dict_items", py_dict_items, METH_VARARGS, NULL},
+    FAST("dict_merge", py_dict_merge),
+    FAST("dict_update", py_dict_update),
+    FAST("dict_pop", py_dict_pop),
+    FAST("dict_setdefault", py_dict_setdefault),
+    ONE("dict_items", py_dict_items),
     
     // Functional operations
-    {"map_func", py_map_func, METH_VARARGS, NULL},
-    {"filter_func", py_filter_func, METH_VARARGS, NULL},
-    {"reduce_func", py_reduce_func, METH_VARARGS, NULL},
+    FAST("map_func", py_map_func),
+    FAST("filter_func", py_filter_func),
+    FAST("reduce_func", py_reduce_func),
     
     // Hash & Identity
-    {"hash_val", py_hash_val, METH_VARARGS, NULL},
-    {"id_val", py_id_val, METH_VARARGS, NULL},
-    {"is_identical", py_is_identical, METH_VARARGS, NULL},
+    ONE("hash_val", py_hash_val),
+    ONE("id_val", py_id_val),
+    FAST("is_identical", py_is_identical),
     
     {NULL, NULL, 0, NULL}
 };
 
-static struct PyModuleDef module = { PyModuleDef_HEAD_INIT, "_core", NULL, -1, Methods };
-PyMODINIT_FUNC PyInit__core(void) { _scopes = PyDict_New(); Py_INCREF(_scopes); return PyModule_Create(&module); }
\ No newline at end of file
+// Multi-phase init so the module can declare that it does not need the GIL.
+// Runtime state lives in statics shared by every import of the module,
+// so subinterpreters with their own GIL are not supported.
+static int core_exec(PyObject* m) {
+    if (scope_init(m) < 0 || value_init(m) < 0 || metatables_init(m) < 0 ||
+        bulk_init(m) < 0 || pointer_init(m) < 0 || profile_init(m) < 0 ||
+        iterators_init(m) < 0 || pipeline_init(m) < 0 || snapshot_init(m) < 0 ||
+        strbuilder_init(m) < 0 || bitset_init(m) < 0 ||
+        luatable_init(m) < 0 || phparray_init(m) < 0 || array_init(m) < 0) return -1;
+    return 0;
+}
+
+static PyModuleDef_Slot core_slots[] = {
+    {Py_mod_exec, core_exec},
+#if PY_VERSION_HEX >= 0x030C0000
+    {Py_mod_multiple_interpreters, Py_MOD_MULTIPLE_INTERPRETERS_NOT_SUPPORTED},
+#endif
+#ifdef Py_mod_gil
+    {Py_mod_gil, Py_MOD_GIL_NOT_USED},
+#endif
+    {0, NULL}
+};
+
+static struct PyModuleDef module = { PyModuleDef_HEAD_INIT, "_core", NULL, 0, Methods, core_slots };
+PyMODINIT_FUNC PyInit__core(void) {
+    return PyModuleDef_Init(&module);
+}
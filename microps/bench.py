@@ -0,0 +1,352 @@
+# FILE: microps/bench.py
+"""
+Benchmark harness for microps.
+
+    python -m microps.bench                       # every level
+    python -m microps.bench --level core --filter str_
+    python -m microps.bench --save baseline.json
+    # upgrade / rebuild
+    python -m microps.bench --compare baseline.json
+
+Three levels are measured:
+
+    core        every _core op, called directly
+    wrappers    each *Value class: operator overloads, table methods,
+                the __getattr__ fallback and __getitem__
+    decorated   calls into functions built by create_decorator
+
+Each case reports:
+
+    ns/op       best-of-repeat wall time per call
+    allocs/op   memory blocks still held per call when every result is
+                kept alive (sys.getallocatedblocks delta), i.e. the objects
+                each call produces
+    peak B      tracemalloc peak above the starting point while running
+                the calls back to back, i.e. the transient working memory
+
+With --compare, cases whose ns/op or allocs/op grew by more than
+--threshold are listed as regressions and the exit status is 1.
+"""
+import argparse
+import gc
+import json
+import sys
+import timeit
+import tracemalloc
+from array import array
+
+from . import _core, js, lua, ruby, php, py, c
+from . import JSValue, LuaValue, RubyValue, PHPValue, PyValue, CValue
+
+# One argument tuple per _core op. Mutating ops get arguments that stay
+# valid across repeated calls (e.g. pop on an empty list is a no-op). Ops
+# that only work in pairs get a zero-arg callable running the pair instead.
+CORE_SAMPLES = {
+    # Scope management
+    'set_var': ("bench", "x", 1),
+    'get_var': ("bench", "x"),
+    'haunted_get': ("bench", "ghost_x"), 'scope': ("bench",),
+    'overlay': (),
+    'overlay_push': lambda: _core.overlay_pop(_core.overlay_push()),
+    'overlay_pop': lambda: _core.overlay_pop(_core.overlay_push()),
+    'snapshot': (),
+    'restore': lambda: _core.restore(_core.snapshot()),
+
+    # Values & metatables
+    'unwrap': (3,), 'get_mm': ([], '__add'), 'getmetatable': ([],),
+    'setmetatable': ([], None), 'has_metatables': (),
+
+    # Arithmetic
+    'add': (3, 4), 'sub': (3, 4), 'mul': (3, 4), 'div': (3, 4),
+    'mod': (7, 4), 'pow': (3, 4), 'floor_div': (7, 4),
+    'neg': (3,), 'abs': (-3,), 'divmod': (7, 4),
+    'min': (3, 4), 'max': (3, 4), 'clamp': (5, 0, 3), 'sign': (-3,),
+
+    # Comparison
+    'eq': (3, 4), 'ne': (3, 4), 'lt': (3, 4),
+    'le': (3, 4), 'gt': (3, 4), 'ge': (3, 4),
+
+    # Bitwise
+    'bit_and': (12, 10), 'bit_or': (12, 10), 'bit_xor': (12, 10), 'bit_not': (12,),
+    'lshift': (1, 4), 'rshift': (16, 2), 'rotl': (1, 4), 'rotr': (16, 2), 'popcount': (255,),
+
+    # Logical
+    'not_op': (0,), 'truthy': (1,),
+
+    # Type conversions
+    'to_int': (3.5,), 'to_float': (3,), 'to_str': (3,), 'to_bool': (3,),
+
+    # Type info & checking
+    'len': ([1, 2, 3],), 'type': (3,),
+    'is_int': (3,), 'is_float': (3,), 'is_str': (3,), 'is_list': (3,),
+    'is_dict': (3,), 'is_tuple': (3,), 'is_bool': (3,), 'is_none': (3,), 'is_callable': (3,),
+
+    # Object operations
+    'obj_new': (), 'obj_get': ({'a': 1}, 'a'), 'obj_set': ({}, 'a', 1),
+    'del_op': ({}, 'a'), 'inc_get': ({}, 'n'),
+    'keys': ({'a': 1},), 'values': ({'a': 1},),
+
+    # List operations
+    'list_new': (), 'append': ((), 1), 'pop': ([], 0), 'reverse': ([1, 2, 3],),
+    'insert': ((), 0, 1), 'extend': ((), ()), 'clear': ([],),
+
+    # Sequence operations
+    'contains': ([1, 2, 3], 2), 'slice': ([1, 2, 3], 0, 2), 'concat': ([1], [2]),
+    'find': ([1, 2, 3], 3), 'rfind': ([1, 2, 3], 1), 'swap': ([1, 2], 0, 1),
+    'count': ([1, 2, 1], 1), 'is_sorted': ([1, 2, 3],),
+
+    # String operations
+    'str_upper': ("abc",), 'str_lower': ("ABC",), 'str_split': ("a b", " "),
+    'str_join': (",", ["a", "b"]), 'str_replace': ("abc", "b", "x"),
+    'str_startswith': ("abc", "a"), 'str_endswith': ("abc", "c"), 'str_contains': ("abc", "b"),
+    'str_count': ("abcb", "b"), 'str_find': ("abc", "c"), 'str_rfind': ("abc", "a"),
+    'str_strip': (" a ",), 'str_lstrip': (" a ",), 'str_rstrip': (" a ",),
+    'str_capitalize': ("abc",), 'str_title': ("a b",), 'str_swapcase': ("aB",),
+    'str_repeat': ("ab", 3), 'str_pad_left': ("a", 4, " "),
+    'str_pad_right': ("a", 4, " "), 'str_center': ("a", 4, " "),
+
+    # Memory operations
+    'memset': (bytearray(64), 0, 64), 'memcpy': (bytearray(64), bytes(64), 64),
+    'memmove': (bytearray(64), bytes(64), 64),
+
+    # Dictionary operations
+    'dict_merge': ({'a': 1}, {'b': 2}), 'dict_update': ({}, {'b': 2}),
+    'dict_pop': ({}, 'a', None), 'dict_setdefault': ({'a': 1}, 'a', 0), 'dict_items': ({'a': 1},),
+
+    # Functional operations
+    'map_func': (abs, (1, -2)), 'filter_func': (abs, (0, 1)), 'reduce_func': (max, (1, 2), 0),
+    'pipeline_run': ((1, -2, 3), ((0, abs), (1, bool), (2, max, 0))),
+
+    # Bulk operations
+    'add_many': ([1, 2, 3], [4, 5, 6]), 'sub_many': ([1, 2, 3], 1),
+    'mul_many': (array('d', [1.0, 2.0, 3.0]), 2.0), 'eq_many': ([1, 2, 3], [1, 0, 3]),
+    'reduce_add': (array('q', [1, 2, 3]),),
+
+    # Hash & Identity
+    'hash_val': ("abc",), 'id_val': (3,), 'is_identical': (3, 3),
+}
+
+
+UNITS = {'s': 1, 'ms': 1e3, 'us': 1e6, 'ns': 1e9}
+
+
+def best_time(fn, number=1, repeat=3, unit='ms'):
+    """Best-of-repeat time per call of fn, in `unit` ('s', 'ms', 'us', 'ns').
+
+    Shared by the scripts in benchmarks/.
+    """
+    return min(timeit.repeat(fn, number=number, repeat=repeat)) / number * UNITS[unit]
+
+
+def core_cases():
+    """{name: zero-arg callable} for every sampled op exported by _core."""
+    cases = {}
+    for name, args in CORE_SAMPLES.items():
+        fn = getattr(_core, name, None)
+        if fn is not None:
+            cases[name] = args if callable(args) else (lambda fn=fn, args=args: fn(*args))
+    return cases
+
+
+def missing_core_samples():
+    """Exported _core functions that have no entry in CORE_SAMPLES.
+
+    The profile* controls are left out: timing them would reset or toggle
+    the counters of whoever is profiling the benchmark.
+    """
+    return sorted(n for n in dir(_core) if not n.startswith(('_', 'profile')) and n not in CORE_SAMPLES
+                  and not isinstance(getattr(_core, n), type))
+
+
+# (label, value class, engine, text, method name, method args) per engine.
+# Lua has no method table, so its method case is skipped.
+WRAPPER_SPECS = [
+    ('JSValue', JSValue, js, "hello", 'toUpperCase', ()),
+    ('LuaValue', LuaValue, lua, "hello", None, ()),
+    ('RubyValue', RubyValue, ruby, "hello", 'upcase', ()),
+    ('PHPValue', PHPValue, php, "hello", 'strtoupper', ()),
+    ('PyValue', PyValue, py, "hello", 'upper', ()),
+    ('CValue', CValue, c, "hello", 'str_len', ()),
+]
+
+
+def wrapper_cases():
+    """{name: zero-arg callable} exercising each *Value class."""
+    cases = {}
+    for label, cls, engine, text, method, margs in WRAPPER_SPECS:
+        num = cls(3, engine)
+        s = cls(text, engine)
+        d = cls({'k': 1}, engine)
+        cases.update({
+            f'{label}(...)': lambda cls=cls, engine=engine: cls(3, engine),
+            f'{label}.__add__': lambda num=num: num + 2,
+            f'{label}.__sub__': lambda num=num: num - 2,
+            f'{label}.__mul__': lambda num=num: num * 2,
+            f'{label}.__eq__': lambda num=num: num == 2,
+            f'{label}.__bool__': lambda s=s: bool(s),
+            f'{label}.__getitem__': lambda d=d: d['k'],
+        })
+        if '__getattr__' in cls.__dict__:
+            cases[f'{label}.__getattr__'] = lambda d=d: d.k
+        if method:
+            cases[f'{label}.{method}()'] = lambda s=s, method=method, margs=margs: getattr(s, method)(*margs)
+    return cases
+
+
+def _call_noop():
+    return None
+
+
+def _call_args(a, b):
+    return a
+
+
+def _call_scope_read():
+    return bench_value  # noqa: F821 - resolved by the engine scope
+
+
+def decorated_cases():
+    """{name: zero-arg callable} calling create_decorator-built functions."""
+    cases = {}
+    for engine in (js, lua, ruby, php, py, c):
+        name = engine._scope
+        engine._vars.set('bench_value', 5)
+        noop = engine.decorator(_call_noop)
+        args = engine.decorator(_call_args)
+        read = engine.decorator(_call_scope_read)
+        cases[f'{name}: call()'] = noop
+        cases[f'{name}: call(a, b)'] = lambda args=args: args(1, 2)
+        cases[f'{name}: scope read'] = read
+    return cases
+
+
+LEVELS = {
+    'core': core_cases,
+    'wrappers': wrapper_cases,
+    'decorated': decorated_cases,
+}
+
+
+def measure(fn, number, repeat, mem_number):
+    """Returns {'ns': ..., 'allocs': ..., 'peak': ...} for one case."""
+    ns = best_time(fn, number, repeat, 'ns')
+
+    # Retained blocks: keep every result alive, count what is left over.
+    keep = [None] * mem_number
+    fn()
+    gc.collect()
+    gc.disable()
+    try:
+        before = sys.getallocatedblocks()
+        for i in range(mem_number):
+            keep[i] = fn()
+        allocs = (sys.getallocatedblocks() - before) / mem_number
+    finally:
+        gc.enable()
+    del keep
+
+    # Transient peak: run back to back, results dropped immediately.
+    gc.collect()
+    tracemalloc.start()
+    try:
+        start, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        for _ in range(mem_number):
+            fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {'ns': ns, 'allocs': max(allocs, 0.0), 'peak': max(peak - start, 0)}
+
+
+def run(levels, name_filter=None, number=20000, repeat=5, mem_number=1000):
+    """Returns {level: {case: metrics}} for the selected levels.
+
+    A case that raises is reported on stderr and left out of the results.
+    """
+    results = {}
+    for level in levels:
+        results[level] = {}
+        for name, fn in LEVELS[level]().items():
+            if name_filter and name_filter not in name:
+                continue
+            try:
+                results[level][name] = measure(fn, number, repeat, mem_number)
+            except Exception as e:
+                print(f"ERROR: {level}/{name}: {type(e).__name__}: {e}", file=sys.stderr)
+    return results
+
+
+def compare(results, baseline, threshold):
+    """Lists (level, case, metric, before, after) that regressed past threshold."""
+    regressions = []
+    for level, cases in results.items():
+        for name, m in cases.items():
+            before = baseline.get(level, {}).get(name)
+            if not before:
+                continue
+            if m['ns'] > before['ns'] * (1 + threshold):
+                regressions.append((level, name, 'ns/op', before['ns'], m['ns']))
+            # Allow half a block of noise before flagging allocation growth
+            if m['allocs'] > before['allocs'] * (1 + threshold) + 0.5:
+                regressions.append((level, name, 'allocs/op', before['allocs'], m['allocs']))
+    return regressions
+
+
+def report(results, baseline):
+    for level, cases in results.items():
+        print(f"\n== {level} ({len(cases)} cases) ==")
+        print(f"{'case':<28} {'ns/op':>9} {'allocs/op':>10} {'peak B':>8}")
+        for name, m in cases.items():
+            line = f"{name:<28} {m['ns']:9.1f} {m['allocs']:10.2f} {m['peak']:8d}"
+            before = baseline.get(level, {}).get(name)
+            if before:
+                line += f"   (was {before['ns']:9.1f} ns, {before['ns'] / m['ns']:5.2f}x)"
+            print(line)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m microps.bench', description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--level', action='append', choices=sorted(LEVELS),
+                        help='level to run (repeatable; default: all)')
+    parser.add_argument('--filter', metavar='TEXT', help='only cases whose name contains TEXT')
+    parser.add_argument('--number', type=int, default=20000, help='calls per timing repeat')
+    parser.add_argument('--repeat', type=int, default=5, help='timing repeats (best is kept)')
+    parser.add_argument('--mem-number', type=int, default=1000, help='calls per memory measurement')
+    parser.add_argument('--save', metavar='FILE', help='write results as JSON')
+    parser.add_argument('--compare', metavar='FILE', help='compare against a saved JSON run')
+    parser.add_argument('--threshold', type=float, default=0.10,
+                        help='relative growth counted as a regression (default: 0.10)')
+    opts = parser.parse_args(argv)
+
+    levels = opts.level or list(LEVELS)
+    if 'core' in levels:
+        missing = missing_core_samples()
+        if missing:
+            print(f"WARNING: no sample arguments for: {', '.join(missing)}", file=sys.stderr)
+
+    results = run(levels, opts.filter, opts.number, opts.repeat, opts.mem_number)
+
+    baseline = {}
+    if opts.compare:
+        with open(opts.compare) as f:
+            baseline = json.load(f)
+    report(results, baseline)
+
+    if opts.save:
+        with open(opts.save, 'w') as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+
+    if baseline:
+        regressions = compare(results, baseline, opts.threshold)
+        print(f"\n{len(regressions)} regression(s) over {opts.threshold:.0%}")
+        for level, name, metric, before, after in regressions:
+            print(f"  {level}/{name}: {metric} {before:.2f} -> {after:.2f}")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
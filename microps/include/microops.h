@@ -87,6 +87,8 @@ PyObject* micro_clear(PyObject* container);
 // ==================== SEQUENCE OPERATIONS ====================
 PyObject* micro_contains(PyObject* container, PyObject* item);
 PyObject* micro_slice(PyObject* seq, PyObject* start, PyObject* end);
+// seq[start:end] - a zero-copy memoryview for buffer objects, a copy otherwise
+PyObject* micro_slice_range(PyObject* seq, Py_ssize_t start, Py_ssize_t end);
 PyObject* micro_concat(PyObject* a, PyObject* b);
 PyObject* micro_find(PyObject* seq, PyObject* item);
 PyObject* micro_rfind(PyObject* seq, PyObject* item);
@@ -111,6 +113,20 @@ PyObject* micro_str_rfind(PyObject* s, PyObject* substring);
 PyObject* micro_str_strip(PyObject* s);
 PyObject* micro_str_lstrip(PyObject* s);
 PyObject* micro_str_rstrip(PyObject* s);
+// Shared by the three strip ops: drops leading and/or trailing whitespace
+// (str.isspace) in one scan and one allocation. Non-str input is str()'d.
+static inline PyObject* micro_strip_ends(PyObject* s, int left, int right) {
+    PyObject* str = PyUnicode_Check(s) ? (Py_INCREF(s), s) : PyObject_Str(s);
+    if (!str) return NULL;
+    int kind = PyUnicode_KIND(str);
+    const void* data = PyUnicode_DATA(str);
+    Py_ssize_t start = 0, end = PyUnicode_GET_LENGTH(str);
+    while (left && start < end && Py_UNICODE_ISSPACE(PyUnicode_READ(kind, data, start))) start++;
+    while (right && end > start && Py_UNICODE_ISSPACE(PyUnicode_READ(kind, data, end - 1))) end--;
+    PyObject* result = PyUnicode_Substring(str, start, end);
+    Py_DECREF(str);
+    return result;
+}
 PyObject* micro_str_capitalize(PyObject* s);
 PyObject* micro_str_title(PyObject* s);
 PyObject* micro_str_swapcase(PyObject* s);
@@ -119,6 +135,12 @@ PyObject* micro_str_pad_left(PyObject* s, PyObject* width, PyObject* fill);
 PyObject* micro_str_pad_right(PyObject* s, PyObject* width, PyObject* fill);
 PyObject* micro_str_center(PyObject* s, PyObject* width, PyObject* fill);
 
+// ==================== MEMORY OPERATIONS ====================
+// Byte-wise on buffer-protocol objects, item-wise on other sequences.
+PyObject* micro_memset(PyObject* ptr, PyObject* val, PyObject* n);
+PyObject* micro_memcpy(PyObject* dest, PyObject* src, PyObject* n);
+PyObject* micro_memmove(PyObject* dest, PyObject* src, PyObject* n);
+
 // ==================== DICTIONARY OPERATIONS ====================
 PyObject* micro_dict_merge(PyObject* dict1, PyObject* dict2);
 PyObject* micro_dict_update(PyObject* dict, PyObject* other);
@@ -0,0 +1,280 @@
+// FILE: microps/include/native.h
+#ifndef MICROPS_NATIVE_H
+#define MICROPS_NATIVE_H
+#include <Python.h>
+
+// Native runtime objects that back the language wrappers. Unlike the
+// micro-ops (one stateless function per file), each file under
+// microps/native/ owns a type or a piece of shared runtime state and
+// registers itself on the _core module through its *_init function.
+
+// ==================== THREADING ====================
+// _core declares Py_MOD_GIL_NOT_USED, so shared state must stay consistent
+// without the GIL. Read-modify-write sequences run inside per-object
+// critical sections (3.13+; a no-op on builds that have a GIL) and dict
+// reads take strong references, since on free-threaded builds another
+// thread may replace the value while it is in use. Before 3.13 the GIL
+// alone provides both guarantees.
+#if PY_VERSION_HEX >= 0x030D0000
+#define MP_BEGIN_CRITICAL(op) Py_BEGIN_CRITICAL_SECTION(op)
+#define MP_END_CRITICAL() Py_END_CRITICAL_SECTION()
+#define MP_BEGIN_CRITICAL2(a, b) Py_BEGIN_CRITICAL_SECTION2(a, b)
+#define MP_END_CRITICAL2() Py_END_CRITICAL_SECTION2()
+#else
+#define MP_BEGIN_CRITICAL(op) {
+#define MP_END_CRITICAL() }
+#define MP_BEGIN_CRITICAL2(a, b) {
+#define MP_END_CRITICAL2() }
+#endif
+
+// Nonzero when the caller holds the only reference to op.
+static inline int mp_unique(PyObject* op) {
+#if PY_VERSION_HEX >= 0x030E0000
+    return PyUnstable_Object_IsUniquelyReferenced(op);
+#else
+    return Py_REFCNT(op) == 1;
+#endif
+}
+
+// New reference to d[key]; NULL when missing (no exception) or on error.
+static inline PyObject* mp_dict_get_ref(PyObject* d, PyObject* key) {
+#if PY_VERSION_HEX >= 0x030D0000
+    PyObject* v;
+    return PyDict_GetItemRef(d, key, &v) < 0 ? NULL : v;
+#else
+    PyObject* v = PyDict_GetItemWithError(d, key);
+    Py_XINCREF(v);
+    return v;
+#endif
+}
+
+// ==================== SCOPES ====================
+typedef struct ScopeObject {
+    PyObject_HEAD
+    PyObject* name;                 // scope name ("js", "global", ...)
+    PyObject* vars;                 // dict of interned name -> value
+    PyObject* builtins;             // engine builtins dict, or NULL
+    struct ScopeObject* parent;     // next scope in the chain, or NULL
+} ScopeObject;
+
+extern PyTypeObject Scope_Type;
+
+// Returns a borrowed reference to the scope called `name`, creating it on
+// first use. Every scope except "global" chains to the global scope.
+// Scopes are never removed, so the reference stays valid.
+ScopeObject* scope_for(PyObject* name);
+// New dict of scope name -> copy of that scope's variables.
+PyObject* scopes_save(void);
+// Sets every scope's variables back to the copy in `saved` (a scopes_save
+// result); scopes created since then are emptied.
+int scopes_load(PyObject* saved);
+int scope_init(PyObject* module);
+
+// ==================== VALUES ====================
+typedef struct {
+    PyObject_HEAD
+    PyObject* val;                  // raw wrapped object
+    PyObject* engine;               // owning engine
+} ValueObject;
+
+extern PyTypeObject Value_Type;
+#define Value_Check(op) PyObject_TypeCheck(op, &Value_Type)
+
+// Strips every Value layer; a StrBuilder comes back as its joined str.
+// Returns a borrowed reference.
+PyObject* value_unwrap(PyObject* x);
+int value_init(PyObject* module);
+
+// ==================== METATABLES ====================
+// Nonzero while at least one object has a metatable. Callers on hot
+// numeric paths check this before doing any registry lookup.
+int metatables_active(void);
+// New reference to obj's metatable, or NULL (no exception) if none.
+PyObject* metatable_get(PyObject* obj);
+// Invalidates cached metamethods after a write of `key` into a LuaTable
+// that may be a metatable. key=NULL means "any key" (bulk updates).
+void metatables_touch(PyObject* key);
+// Copy of the registry, and the reverse; entries whose object has died
+// since the copy are skipped on load.
+PyObject* metatables_save(void);
+int metatables_load(PyObject* saved);
+int metatables_init(PyObject* module);
+
+// ==================== POINTERS ====================
+typedef struct {
+    PyObject_HEAD
+    PyObject* base;                 // sequence or buffer pointed into
+    Py_ssize_t offset;              // position inside base, in items
+} PointerObject;
+
+extern PyTypeObject Pointer_Type;
+#define Pointer_Check(op) PyObject_TypeCheck(op, &Pointer_Type)
+
+// New Pointer(base, offset); base is unwrapped and pointer bases collapse.
+PyObject* pointer_new(PyObject* base, Py_ssize_t offset);
+int pointer_init(PyObject* module);
+
+// ==================== BULK OPS ====================
+// add_many / sub_many / mul_many / eq_many / reduce_add over sequences and
+// typed buffers.
+int bulk_init(PyObject* module);
+
+// ==================== ITERATORS ====================
+// Lazy imap / ifilter / izip / take / chain types.
+int iterators_init(PyObject* module);
+
+// ==================== LOOKUP INDEXES ====================
+// An item -> first position map a container builds on its second search,
+// embedded in Array and PHPArray. The owner calls index_clear from every
+// path that changes it, inside its critical section.
+typedef struct {
+    PyObject* map;                  // built map, or NULL
+    uint64_t gen;                   // bumped by every clear
+    int hits;                       // searches since the last clear
+    int unhashable;                 // an item is unhashable: always scan
+} LookupIndex;
+
+// New list of the owner's items; *keys gets a new list of the position
+// each maps to, or NULL for 0, 1, 2, ...
+typedef PyObject* (*index_items_fn)(PyObject* owner, PyObject** keys);
+
+#define INDEX_SCAN (-3)
+// 1 with a new reference to item's position in *pos, 0 when absent, -1 on
+// error, or INDEX_SCAN when no index applies and the caller should scan.
+int index_lookup(PyObject* owner, LookupIndex* ix, Py_ssize_t len, PyObject* item,
+                 index_items_fn items_fn, PyObject** pos);
+void index_clear(LookupIndex* ix);
+
+// ==================== STRING BUILDER ====================
+extern PyTypeObject StrBuilder_Type;
+#define StrBuilder_Check(op) Py_IS_TYPE(op, &StrBuilder_Type)
+
+// The builder's text, joined on first use and cached. Borrowed reference
+// owned by the builder; NULL with an exception set on failure.
+PyObject* strbuilder_str(PyObject* b);
+// a + b where either side is a builder and the other a str or builder:
+// a new builder, or NotImplemented for any other operand.
+PyObject* strbuilder_concat(PyObject* a, PyObject* b);
+int strbuilder_init(PyObject* module);
+
+// ==================== BITSETS ====================
+// Single-word helpers, also used by the popcount micro-op. GCC and Clang
+// emit the popcnt instruction where the target has one.
+static inline int mp_popcount64(uint64_t x) {
+#if defined(__GNUC__) || defined(__clang__)
+    return __builtin_popcountll(x);
+#else
+    x = x - ((x >> 1) & 0x5555555555555555ULL);
+    x = (x & 0x3333333333333333ULL) + ((x >> 2) & 0x3333333333333333ULL);
+    x = (x + (x >> 4)) & 0x0F0F0F0F0F0F0F0FULL;
+    return (int)((x * 0x0101010101010101ULL) >> 56);
+#endif
+}
+
+// Index of the lowest set bit; x must be nonzero.
+static inline int mp_ctz64(uint64_t x) {
+#if defined(__GNUC__) || defined(__clang__)
+    return __builtin_ctzll(x);
+#else
+    int n = 0;
+    while (!(x & 1)) { x >>= 1; n++; }
+    return n;
+#endif
+}
+
+extern PyTypeObject Bitset_Type;
+#define Bitset_Check(op) PyObject_TypeCheck(op, &Bitset_Type)
+
+// Number of set bits in a Bitset.
+Py_ssize_t bitset_count(PyObject* b);
+int bitset_init(PyObject* module);
+
+// ==================== LUA TABLES ====================
+extern PyTypeObject LuaTable_Type;
+#define LuaTable_Check(op) PyObject_TypeCheck(op, &LuaTable_Type)
+
+// New reference to t[key], or NULL (no exception) when key is absent.
+PyObject* luatable_get_ref(PyObject* t, PyObject* key);
+// Makes dst share src's entries until either is changed (copy-on-write),
+// in O(1); dst's own entries are dropped.
+int luatable_share(PyObject* dst, PyObject* src);
+int luatable_init(PyObject* module);
+
+// ==================== PHP ARRAYS ====================
+extern PyTypeObject PHPArray_Type;
+#define PHPArray_Check(op) PyObject_TypeCheck(op, &PHPArray_Type)
+
+// array_push: value gets the next free int key.
+int phparray_push(PyObject* a, PyObject* value);
+// Removes and returns the entry at position i (negative counts from the
+// end): array_pop for the last, array_shift for the first. None when out
+// of range.
+PyObject* phparray_pop_at(PyObject* a, Py_ssize_t i);
+// Inserts value before position i: array_unshift at 0.
+int phparray_insert_at(PyObject* a, Py_ssize_t i, PyObject* value);
+// Copy-on-write, as luatable_share; the internal pointer is copied too.
+int phparray_share(PyObject* dst, PyObject* src);
+int phparray_init(PyObject* module);
+
+// ==================== ARRAYS ====================
+// The list behind JS / Ruby arrays, with free room before the items as
+// well as after them, so shift / unshift are O(1) amortized like push /
+// pop. ob_size is the length, as in a list.
+typedef struct {
+    PyObject_VAR_HEAD
+    PyObject** buf;                 // items live in buf[head, head + ob_size)
+    Py_ssize_t cap;                 // slots allocated in buf
+    Py_ssize_t head;
+    LookupIndex index;
+    PyObject* cow;                  // holder of a buffer shared by array_share
+    PyObject* weakreflist;
+} ArrayObject;
+
+extern PyTypeObject Array_Type;
+#define Array_Check(op) PyObject_TypeCheck(op, &Array_Type)
+#define Array_CheckExact(op) Py_IS_TYPE(op, &Array_Type)
+// Borrowed pointer to the first item, for reading only (the buffer may
+// be shared); valid until the array changes.
+#define ARRAY_ITEMS(op) (((ArrayObject*)(op))->buf + ((ArrayObject*)(op))->head)
+
+int array_push(PyObject* a, PyObject* value);
+// Removes and returns item i (negative counts from the end); None when
+// out of range. O(1) at either end.
+PyObject* array_pop_at(PyObject* a, Py_ssize_t i);
+// Inserts value before item i, clamped like list.insert.
+int array_insert_at(PyObject* a, Py_ssize_t i, PyObject* value);
+int array_extend(PyObject* a, PyObject* iterable);
+int array_reverse(PyObject* a);
+// Position of item (>= 0), -1 when absent, -2 on error.
+Py_ssize_t array_find(PyObject* a, PyObject* item);
+// Copy-on-write, as luatable_share.
+int array_share(PyObject* dst, PyObject* src);
+int array_init(PyObject* module);
+
+// ==================== PIPELINES ====================
+// pipeline_run(source, stages): fused single-pass map / filter / reduce.
+int pipeline_init(PyObject* module);
+
+// ==================== SNAPSHOTS ====================
+// snapshot() / restore(snap): checkpoint of every scope and the metatable
+// registry.
+int snapshot_init(PyObject* module);
+
+// ==================== PROFILING ====================
+// Per-op counters for the WRAP_* trampolines. Each trampoline owns one
+// static OpStats; it is linked into the snapshot list on its first call.
+typedef struct OpStats {
+    const char* name;
+    uint64_t calls;
+    uint64_t ns;
+    int registered;
+    struct OpStats* next;
+} OpStats;
+
+extern int profile_enabled;
+uint64_t profile_now(void);
+// Records one call that started at `start` (a profile_now() reading).
+void profile_record(OpStats* st, uint64_t start);
+int profile_init(PyObject* module);
+
+#endif
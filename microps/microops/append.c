@@ -1,7 +1,12 @@
 #include "microops.h"
+#include "native.h"
 PyObject* micro_append(PyObject* list, PyObject* item) { 
     if (PyList_Check(list)) {
         PyList_Append(list, item);
+    } else if (Array_Check(list)) {
+        if (array_push(list, item) < 0) return NULL;
+    } else if (PHPArray_Check(list)) {
+        if (phparray_push(list, item) < 0) return NULL;
     }
     Py_RETURN_NONE;
 }
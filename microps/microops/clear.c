@@ -1,7 +1,10 @@
 #include "microops.h"
+#include "native.h"
 PyObject* micro_clear(PyObject* container) {
     if (PyList_Check(container)) {
         PyList_SetSlice(container, 0, PyList_Size(container), NULL);
+    } else if (Array_Check(container)) {
+        if (PySequence_DelSlice(container, 0, PY_SSIZE_T_MAX) < 0) return NULL;
     } else if (PyDict_Check(container)) {
         PyDict_Clear(container);
     }
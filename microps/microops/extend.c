@@ -1,4 +1,5 @@
 #include "microops.h"
+#include "native.h"
 PyObject* micro_extend(PyObject* list, PyObject* iterable) {
     if (PyList_Check(list)) {
         PyObject* iter = PyObject_GetIter(iterable);
@@ -9,6 +10,8 @@ PyObject* micro_extend(PyObject* list, PyObject* iterable) {
             Py_DECREF(item);
         }
         Py_DECREF(iter);
+    } else if (Array_Check(list)) {
+        if (array_extend(list, iterable) < 0) return NULL;
     }
     Py_RETURN_NONE;
 }
@@ -1,23 +1,29 @@
 #include "microops.h"
 PyObject* micro_filter_func(PyObject* func, PyObject* iterable) {
-    PyObject* result = PyList_New(0);
     PyObject* iter = PyObject_GetIter(iterable);
     if (!iter) return NULL;
+    PyObject* result = PyList_New(0);
+    if (!result) {
+        Py_DECREF(iter);
+        return NULL;
+    }
     PyObject* item;
     while ((item = PyIter_Next(iter))) {
-        PyObject* keep = PyObject_CallFunctionObjArgs(func, item, NULL);
-        if (!keep) {
+        PyObject* keep = PyObject_CallOneArg(func, item);
+        int truth = keep ? PyObject_IsTrue(keep) : -1;
+        Py_XDECREF(keep);
+        if (truth < 0 || (truth && PyList_Append(result, item) < 0)) {
             Py_DECREF(item);
             Py_DECREF(iter);
             Py_DECREF(result);
             return NULL;
         }
-        if (PyObject_IsTrue(keep)) {
-            PyList_Append(result, item);
-        }
-        Py_DECREF(keep);
         Py_DECREF(item);
     }
     Py_DECREF(iter);
+    if (PyErr_Occurred()) {
+        Py_DECREF(result);
+        return NULL;
+    }
     return result;
 }
@@ -1,8 +1,16 @@
 #include "microops.h"
+#include "native.h"
 PyObject* micro_find(PyObject* seq, PyObject* item) {
+    // An Array searched repeatedly answers from its hash index
+    if (Array_Check(seq)) {
+        Py_ssize_t found = array_find(seq, item);
+        return found == -2 ? NULL : PyLong_FromSsize_t(found);
+    }
     Py_ssize_t size = PySequence_Size(seq);
+    if (size < 0) return NULL;
     for (Py_ssize_t i = 0; i < size; i++) {
         PyObject* elem = PySequence_GetItem(seq, i);
+        if (!elem) return NULL;
         int cmp = PyObject_RichCompareBool(elem, item, Py_EQ);
         Py_DECREF(elem);
         if (cmp == 1) return PyLong_FromSsize_t(i);
@@ -1,8 +1,15 @@
 #include "microops.h"
+#include "native.h"
 PyObject* micro_insert(PyObject* list, PyObject* index, PyObject* item) {
     if (PyList_Check(list)) {
         Py_ssize_t idx = PyLong_AsSsize_t(index);
         PyList_Insert(list, idx, item);
+    } else if (Array_Check(list)) {
+        Py_ssize_t idx = PyNumber_AsSsize_t(value_unwrap(index), PyExc_IndexError);
+        if ((idx == -1 && PyErr_Occurred()) || array_insert_at(list, idx, item) < 0) return NULL;
+    } else if (PHPArray_Check(list)) {
+        Py_ssize_t idx = PyNumber_AsSsize_t(value_unwrap(index), PyExc_IndexError);
+        if ((idx == -1 && PyErr_Occurred()) || phparray_insert_at(list, idx, item) < 0) return NULL;
     }
     Py_RETURN_NONE;
 }
@@ -1,4 +1,5 @@
 #include "microops.h"
+#include "native.h"
 PyObject* micro_is_list(PyObject* a) {
-    return PyBool_FromLong(PyList_Check(a));
+    return PyBool_FromLong(PyList_Check(a) || Array_Check(a));
 }
@@ -1,2 +1,3 @@
 #include "microops.h"
-PyObject* micro_keys(PyObject* a) { return PyDict_Keys(a); }
+#include "native.h"
+PyObject* micro_keys(PyObject* a) { return LuaTable_Check(a) || PHPArray_Check(a) ? PyMapping_Keys(a) : PyDict_Keys(a); }
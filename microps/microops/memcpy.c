@@ -0,0 +1,3 @@
+#include "microops.h"
+// memcpy(dest, src, n): same as memmove - overlap costs nothing to handle.
+PyObject* micro_memcpy(PyObject* dest, PyObject* src, PyObject* n) { return micro_memmove(dest, src, n); }
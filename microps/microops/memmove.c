@@ -0,0 +1,37 @@
+#include "microops.h"
+#include <string.h>
+// memmove(dest, src, n): n bytes between buffers (overlap-safe), or the
+// first n items between plain sequences. Returns dest.
+PyObject* micro_memmove(PyObject* dest, PyObject* src, PyObject* n) {
+    Py_ssize_t size = PyLong_AsSsize_t(n);
+    if (size == -1 && PyErr_Occurred()) return NULL;
+    if (size < 0) { PyErr_SetString(PyExc_ValueError, "memmove: negative size"); return NULL; }
+
+    if (PyObject_CheckBuffer(dest) && PyObject_CheckBuffer(src)) {
+        Py_buffer d, s;
+        if (PyObject_GetBuffer(dest, &d, PyBUF_WRITABLE | PyBUF_C_CONTIGUOUS) < 0) return NULL;
+        if (PyObject_GetBuffer(src, &s, PyBUF_C_CONTIGUOUS) < 0) { PyBuffer_Release(&d); return NULL; }
+        int ok = size <= d.len && size <= s.len;
+        if (ok) memmove(d.buf, s.buf, (size_t)size);
+        else PyErr_Format(PyExc_IndexError, "memmove: %zd bytes out of range", size);
+        PyBuffer_Release(&s);
+        PyBuffer_Release(&d);
+        if (!ok) return NULL;
+        Py_INCREF(dest);
+        return dest;
+    }
+
+    Py_ssize_t dlen = PySequence_Size(dest), slen = PySequence_Size(src);
+    if (dlen < 0 || slen < 0) return NULL;
+    if (size > dlen || size > slen) {
+        PyErr_Format(PyExc_IndexError, "memmove: %zd items out of range", size);
+        return NULL;
+    }
+    PyObject* chunk = PySequence_GetSlice(src, 0, size);
+    if (!chunk) return NULL;
+    int err = PySequence_SetSlice(dest, 0, size, chunk);
+    Py_DECREF(chunk);
+    if (err < 0) return NULL;
+    Py_INCREF(dest);
+    return dest;
+}
@@ -0,0 +1,35 @@
+#include "microops.h"
+#include <string.h>
+// memset(ptr, val, n): sets n bytes of a buffer to (val & 0xFF), or the
+// first n items of a plain sequence to val. Returns ptr.
+PyObject* micro_memset(PyObject* ptr, PyObject* val, PyObject* n) {
+    Py_ssize_t size = PyLong_AsSsize_t(n);
+    if (size == -1 && PyErr_Occurred()) return NULL;
+    if (size < 0) { PyErr_SetString(PyExc_ValueError, "memset: negative size"); return NULL; }
+
+    if (PyObject_CheckBuffer(ptr)) {
+        long byte = PyLong_AsLong(val);
+        if (byte == -1 && PyErr_Occurred()) return NULL;
+        Py_buffer b;
+        if (PyObject_GetBuffer(ptr, &b, PyBUF_WRITABLE | PyBUF_C_CONTIGUOUS) < 0) return NULL;
+        int ok = size <= b.len;
+        if (ok) memset(b.buf, (int)(byte & 0xFF), (size_t)size);
+        else PyErr_Format(PyExc_IndexError, "memset: %zd bytes out of range", size);
+        PyBuffer_Release(&b);
+        if (!ok) return NULL;
+        Py_INCREF(ptr);
+        return ptr;
+    }
+
+    Py_ssize_t len = PySequence_Size(ptr);
+    if (len < 0) return NULL;
+    if (size > len) {
+        PyErr_Format(PyExc_IndexError, "memset: %zd items out of range", size);
+        return NULL;
+    }
+    for (Py_ssize_t i = 0; i < size; i++) {
+        if (PySequence_SetItem(ptr, i, val) < 0) return NULL;
+    }
+    Py_INCREF(ptr);
+    return ptr;
+}
@@ -1,14 +1,30 @@
 #include "microops.h"
+#include "native.h"
 PyObject* micro_pop(PyObject* list, PyObject* index) { 
     if (PyList_Check(list)) {
-        Py_ssize_t idx = PyLong_AsSsize_t(index);
-        if (idx < 0 || idx >= PyList_Size(list)) {
+        // Negative indices count from the end (-1 is JS / Ruby pop)
+        Py_ssize_t idx = PyNumber_AsSsize_t(value_unwrap(index), PyExc_IndexError);
+        if (idx == -1 && PyErr_Occurred()) return NULL;
+        if (idx < 0) idx += PyList_GET_SIZE(list);
+        if (idx < 0 || idx >= PyList_GET_SIZE(list)) {
             Py_RETURN_NONE;
         }
-        PyObject* item = PyList_GetItem(list, idx);
+        PyObject* item = PyList_GET_ITEM(list, idx);
         Py_INCREF(item);
         PySequence_DelItem(list, idx);
         return item;
     }
+    if (Array_Check(list)) {
+        // O(1) at either end: 0 is shift, -1 pop
+        Py_ssize_t idx = PyNumber_AsSsize_t(value_unwrap(index), PyExc_IndexError);
+        if (idx == -1 && PyErr_Occurred()) return NULL;
+        return array_pop_at(list, idx);
+    }
+    if (PHPArray_Check(list)) {
+        // -1 is array_pop, 0 array_shift (O(1) on packed arrays)
+        Py_ssize_t idx = PyNumber_AsSsize_t(value_unwrap(index), PyExc_IndexError);
+        if (idx == -1 && PyErr_Occurred()) return NULL;
+        return phparray_pop_at(list, idx);
+    }
     Py_RETURN_NONE;
 }
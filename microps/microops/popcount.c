@@ -1,10 +1,16 @@
 #include "microops.h"
+#include "native.h"
+// Set bits of |a| (like int.bit_count), or of a whole Bitset
 PyObject* micro_popcount(PyObject* a) {
-    unsigned long val = PyLong_AsUnsignedLong(a);
-    int count = 0;
-    while (val) {
-        count += val & 1;
-        val >>= 1;
+    if (Bitset_Check(a)) return PyLong_FromSsize_t(bitset_count(a));
+    if (!PyLong_Check(a)) {
+        PyErr_Format(PyExc_TypeError, "popcount() needs an int, not %.100s", Py_TYPE(a)->tp_name);
+        return NULL;
     }
-    return PyLong_FromLong(count);
+    int overflow;
+    long long val = PyLong_AsLongLongAndOverflow(a, &overflow);
+    if (val == -1 && PyErr_Occurred()) return NULL;
+    if (overflow) return PyObject_CallMethod(a, "bit_count", NULL);
+    unsigned long long mag = val < 0 ? 0ULL - (unsigned long long)val : (unsigned long long)val;
+    return PyLong_FromLong(mp_popcount64(mag));
 }
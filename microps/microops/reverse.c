@@ -1,7 +1,10 @@
 #include "microops.h"
+#include "native.h"
 PyObject* micro_reverse(PyObject* list) { 
     if (PyList_Check(list)) {
         PyList_Reverse(list);
+    } else if (Array_Check(list) && array_reverse(list) < 0) {
+        return NULL;
     }
     Py_RETURN_NONE;
 }
@@ -1,9 +1,53 @@
 #include "microops.h"
+// Rotates within a 64-bit word; an int that needs more bits rotates within
+// the smallest multiple of 64 bits that holds it. Negative ints are taken
+// as two's complement of that width, the result is always non-negative.
+static PyObject* rotl_wide(PyObject* a, long long shift) {
+    PyObject* nbits = PyObject_CallMethod(a, "bit_length", NULL);
+    if (!nbits) return NULL;
+    long long width = PyLong_AsLongLong(nbits);
+    Py_DECREF(nbits);
+    if (width == -1 && PyErr_Occurred()) return NULL;
+    width = (width + (Py_SIZE(a) < 0) + 63) / 64 * 64;
+    long long s = ((shift % width) + width) % width;
+
+    PyObject *one = NULL, *w = NULL, *mask = NULL, *v = NULL, *sh = NULL, *back = NULL;
+    PyObject *hi = NULL, *lo = NULL, *both = NULL, *result = NULL;
+    if (!(one = PyLong_FromLong(1)) || !(w = PyLong_FromLongLong(width))) goto done;
+    // mask = (1 << width) - 1; v = a & mask
+    if (!(both = PyNumber_Lshift(one, w)) || !(mask = PyNumber_Subtract(both, one))) goto done;
+    Py_CLEAR(both);
+    if (!(v = PyNumber_And(a, mask))) goto done;
+    if (!(sh = PyLong_FromLongLong(s)) || !(back = PyLong_FromLongLong(width - s))) goto done;
+    // ((v << s) | (v >> (width - s))) & mask
+    if (!(hi = PyNumber_Lshift(v, sh)) || !(lo = PyNumber_Rshift(v, back))) goto done;
+    if (!(both = PyNumber_Or(hi, lo))) goto done;
+    result = PyNumber_And(both, mask);
+done:
+    Py_XDECREF(one); Py_XDECREF(w); Py_XDECREF(mask); Py_XDECREF(v);
+    Py_XDECREF(sh); Py_XDECREF(back); Py_XDECREF(hi); Py_XDECREF(lo); Py_XDECREF(both);
+    return result;
+}
+
 PyObject* micro_rotl(PyObject* a, PyObject* b) {
-    long val = PyLong_AsLong(a);
-    long shift = PyLong_AsLong(b);
-    long bits = sizeof(long) * 8;
-    shift = shift % bits;
-    long result = (val << shift) | (val >> (bits - shift));
-    return PyLong_FromLong(result);
+    if (!PyLong_Check(a)) {
+        PyErr_Format(PyExc_TypeError, "rotl() needs an int, not %.100s", Py_TYPE(a)->tp_name);
+        return NULL;
+    }
+    long long shift = PyLong_AsLongLong(b);
+    if (shift == -1 && PyErr_Occurred()) return NULL;
+    int overflow;
+    long long sv = PyLong_AsLongLongAndOverflow(a, &overflow);
+    if (sv == -1 && PyErr_Occurred()) return NULL;
+    unsigned long long val = (unsigned long long)sv;
+    if (overflow) {
+        val = overflow > 0 ? PyLong_AsUnsignedLongLong(a) : (unsigned long long)-1;
+        if (overflow < 0 || (val == (unsigned long long)-1 && PyErr_Occurred())) {
+            PyErr_Clear();
+            return rotl_wide(a, shift);
+        }
+    }
+    unsigned s = (unsigned)(((shift % 64) + 64) % 64);
+    if (s) val = (val << s) | (val >> (64 - s));
+    return PyLong_FromUnsignedLongLong(val);
 }
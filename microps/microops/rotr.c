@@ -1,9 +1,9 @@
 #include "microops.h"
+// rotr(a, n) is rotl(a, -n), with the same widths
 PyObject* micro_rotr(PyObject* a, PyObject* b) {
-    long val = PyLong_AsLong(a);
-    long shift = PyLong_AsLong(b);
-    long bits = sizeof(long) * 8;
-    shift = shift % bits;
-    long result = (val >> shift) | (val << (bits - shift));
-    return PyLong_FromLong(result);
+    PyObject* left = PyNumber_Negative(b);
+    if (!left) return NULL;
+    PyObject* result = micro_rotl(a, left);
+    Py_DECREF(left);
+    return result;
 }
@@ -1,6 +1,19 @@
 #include "microops.h"
+PyObject* micro_slice_range(PyObject* seq, Py_ssize_t start, Py_ssize_t end) {
+    // Bytes-like objects: slice a memoryview so large buffers are not copied
+    if (PyObject_CheckBuffer(seq) && !PyMemoryView_Check(seq)) {
+        PyObject* view = PyMemoryView_FromObject(seq);
+        if (!view) return NULL;
+        PyObject* r = PySequence_GetSlice(view, start, end);
+        Py_DECREF(view);
+        return r;
+    }
+    return PySequence_GetSlice(seq, start, end);
+}
+
 PyObject* micro_slice(PyObject* seq, PyObject* start, PyObject* end) { 
     Py_ssize_t s = PyLong_AsSsize_t(start);
     Py_ssize_t e = PyLong_AsSsize_t(end);
-    return PySequence_GetSlice(seq, s, e);
+    if ((s == -1 || e == -1) && PyErr_Occurred()) return NULL;
+    return micro_slice_range(seq, s, e);
 }
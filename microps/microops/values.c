@@ -1,7 +1,11 @@
 #include "microops.h"
+#include "native.h"
 PyObject* micro_values(PyObject* dict) { 
     if (PyDict_Check(dict)) {
         return PyDict_Values(dict);
     }
+    if (LuaTable_Check(dict) || PHPArray_Check(dict)) {
+        return PyMapping_Values(dict);
+    }
     Py_RETURN_NONE;
 }
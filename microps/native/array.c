@@ -0,0 +1,805 @@
+// FILE: microps/native/array.c
+#include "native.h"
+#include <stddef.h>
+
+// Array: the list behind JS and Ruby arrays.
+//
+// Items live in buf[head, head + len) with free room kept on both sides,
+// so push / pop at the end and shift / unshift at the front are all O(1)
+// amortized: a shift just moves head and an unshift takes the slot before
+// it. Inserting or deleting in the middle moves whichever side of the
+// position is shorter. The items stay contiguous, so indexing is one slot
+// read and a slice one copy. Otherwise it behaves like a list: negative
+// indices, slices with steps, slice assignment, sort / reverse in place.
+//
+// len is ob_size, so Py_SIZE works on it as on a list. The lookup index
+// (index.c) lives in the array: every change goes through the *_locked
+// helpers below or calls index_clear itself, so it is never stale.
+//
+// array_share (snapshot.c) lets arrays share one buffer: it moves into a
+// hidden holder Array that each sharer points `cow` at. The same change
+// paths call arr_own first, which gives the array a buffer of its own.
+
+#define ARR_MIN_CAP 8
+
+// ---- Storage ----
+
+// Moves the items to a new buffer with `front` free slots before them and
+// `back` after.
+static int arr_relocate(ArrayObject* a, Py_ssize_t front, Py_ssize_t back) {
+    Py_ssize_t n = Py_SIZE(a);
+    if (front + n + back < ARR_MIN_CAP) back = ARR_MIN_CAP - front - n;
+    Py_ssize_t cap = front + n + back;
+    PyObject** buf = cap <= PY_SSIZE_T_MAX / (Py_ssize_t)sizeof(PyObject*)
+                     ? PyMem_Malloc(cap * sizeof(PyObject*)) : NULL;
+    if (!buf) {
+        PyErr_NoMemory();
+        return -1;
+    }
+    if (n) memcpy(buf + front, a->buf + a->head, n * sizeof(PyObject*));
+    PyMem_Free(a->buf);
+    a->buf = buf;
+    a->head = front;
+    a->cap = cap;
+    return 0;
+}
+
+// Room for n more items after the last. Front room left by shifts is
+// given back when it is more than the items themselves (queue use).
+static int arr_reserve_back(ArrayObject* a, Py_ssize_t n) {
+    Py_ssize_t len = Py_SIZE(a);
+    if (a->head + len + n <= a->cap) return 0;
+    return arr_relocate(a, a->head > len ? 0 : a->head, len + n);
+}
+
+// Room for n more items before the first
+static int arr_reserve_front(ArrayObject* a, Py_ssize_t n) {
+    if (a->head >= n) return 0;
+    Py_ssize_t len = Py_SIZE(a);
+    return arr_relocate(a, n + (len > ARR_MIN_CAP ? len : ARR_MIN_CAP), a->cap - a->head - len);
+}
+
+// Releases a buffer detached from an array: drops the items and frees it,
+// or only lets go of the holder when it was shared.
+static void arr_release(PyObject** buf, Py_ssize_t head, Py_ssize_t n, PyObject* cow) {
+    if (cow) {
+        Py_DECREF(cow);
+        return;
+    }
+    for (Py_ssize_t i = 0; i < n; i++) Py_DECREF(buf[head + i]);
+    PyMem_Free(buf);
+}
+
+// Before a shared array changes: copies the items out of the shared
+// buffer, or takes the buffer back when no other array uses it any more.
+static int arr_own(ArrayObject* a) {
+    ArrayObject* holder = (ArrayObject*)a->cow;
+    if (!holder) return 0;
+    if (mp_unique((PyObject*)holder)) {
+        holder->buf = NULL;
+        holder->cap = holder->head = 0;
+        Py_SET_SIZE(holder, 0);
+    } else {
+        PyObject** buf = a->cap ? PyMem_Malloc(a->cap * sizeof(PyObject*)) : NULL;
+        if (a->cap && !buf) {
+            PyErr_NoMemory();
+            return -1;
+        }
+        for (Py_ssize_t i = a->head; i < a->head + Py_SIZE(a); i++) {
+            buf[i] = a->buf[i];
+            Py_INCREF(buf[i]);
+        }
+        a->buf = buf;
+    }
+    a->cow = NULL;
+    Py_DECREF(holder);
+    return 0;
+}
+
+static int arr_push_locked(ArrayObject* a, PyObject* value) {
+    if (arr_own(a) < 0 || arr_reserve_back(a, 1) < 0) return -1;
+    index_clear(&a->index);
+    Py_INCREF(value);
+    a->buf[a->head + Py_SIZE(a)] = value;
+    Py_SET_SIZE(a, Py_SIZE(a) + 1);
+    return 0;
+}
+
+// Inserts value before item i (0 <= i <= len)
+static int arr_insert_locked(ArrayObject* a, Py_ssize_t i, PyObject* value) {
+    if (arr_own(a) < 0) return -1;
+    Py_ssize_t len = Py_SIZE(a);
+    index_clear(&a->index);
+    if (i < len - i) {
+        if (arr_reserve_front(a, 1) < 0) return -1;
+        memmove(a->buf + a->head - 1, a->buf + a->head, i * sizeof(PyObject*));
+        a->head--;
+    } else {
+        if (arr_reserve_back(a, 1) < 0) return -1;
+        PyObject** items = a->buf + a->head;
+        memmove(items + i + 1, items + i, (len - i) * sizeof(PyObject*));
+    }
+    Py_INCREF(value);
+    a->buf[a->head + i] = value;
+    Py_SET_SIZE(a, len + 1);
+    return 0;
+}
+
+// Removes item i (0 <= i < len) and hands its reference to the caller
+static PyObject* arr_take_locked(ArrayObject* a, Py_ssize_t i) {
+    if (arr_own(a) < 0) return NULL;
+    Py_ssize_t len = Py_SIZE(a);
+    PyObject** items = a->buf + a->head;
+    PyObject* v = items[i];
+    index_clear(&a->index);
+    if (i < len - 1 - i) {
+        memmove(items + 1, items, i * sizeof(PyObject*));
+        a->head++;
+    } else {
+        memmove(items + i, items + i + 1, (len - 1 - i) * sizeof(PyObject*));
+    }
+    Py_SET_SIZE(a, len - 1);
+    return v;
+}
+
+// Replaces items [lo, hi) by the n items of src, moving whichever side of
+// the gap is shorter. The replaced items are handed back in *old (a new
+// list), to be released once the critical section is left.
+static int arr_replace_locked(ArrayObject* a, Py_ssize_t lo, Py_ssize_t hi,
+                              PyObject* const* src, Py_ssize_t n, PyObject** old) {
+    if (arr_own(a) < 0) return -1;
+    Py_ssize_t len = Py_SIZE(a), k = hi - lo, d = n - k;
+    int front = lo < len - hi;
+    if (d > 0 && (front ? arr_reserve_front(a, d) : arr_reserve_back(a, d)) < 0) return -1;
+    PyObject* out = PyList_New(k);
+    if (!out) return -1;
+    index_clear(&a->index);
+    PyObject** items = a->buf + a->head;
+    for (Py_ssize_t i = 0; i < k; i++) PyList_SET_ITEM(out, i, items[lo + i]);
+    if (d && front) {
+        memmove(items - d, items, lo * sizeof(PyObject*));
+        a->head -= d;
+    } else if (d) {
+        memmove(items + hi + d, items + hi, (len - hi) * sizeof(PyObject*));
+    }
+    Py_SET_SIZE(a, len + d);
+    items = a->buf + a->head;
+    for (Py_ssize_t i = 0; i < n; i++) {
+        Py_INCREF(src[i]);
+        items[lo + i] = src[i];
+    }
+    *old = out;
+    return 0;
+}
+
+// Replaces every item by the items of src (a list or tuple)
+static int arr_assign(ArrayObject* a, PyObject* src) {
+    PyObject* old = NULL;
+    int err;
+    MP_BEGIN_CRITICAL(a);
+    err = arr_replace_locked(a, 0, Py_SIZE(a), PySequence_Fast_ITEMS(src), PySequence_Fast_GET_SIZE(src), &old);
+    MP_END_CRITICAL();
+    Py_XDECREF(old);
+    return err;
+}
+
+// New list of the items
+static PyObject* arr_to_list(ArrayObject* a) {
+    PyObject* r;
+    MP_BEGIN_CRITICAL(a);
+    r = PyList_New(Py_SIZE(a));
+    for (Py_ssize_t i = 0; r && i < Py_SIZE(a); i++) {
+        PyObject* v = a->buf[a->head + i];
+        Py_INCREF(v);
+        PyList_SET_ITEM(r, i, v);
+    }
+    MP_END_CRITICAL();
+    return r;
+}
+
+// New reference to item i, or NULL (no exception) when out of range
+static PyObject* arr_item_ref(ArrayObject* a, Py_ssize_t i) {
+    PyObject* v = NULL;
+    MP_BEGIN_CRITICAL(a);
+    if (i >= 0 && i < Py_SIZE(a)) {
+        v = a->buf[a->head + i];
+        Py_INCREF(v);
+    }
+    MP_END_CRITICAL();
+    return v;
+}
+
+static PyObject* arr_index_items(PyObject* a, PyObject** keys) {
+    *keys = NULL;
+    return arr_to_list((ArrayObject*)a);
+}
+
+// Position of the first item equal to value, -1 when absent, -2 on error.
+// An array searched repeatedly answers from its hash index.
+static Py_ssize_t arr_find(ArrayObject* a, PyObject* value) {
+    PyObject* pos = NULL;
+    int r = index_lookup((PyObject*)a, &a->index, Py_SIZE(a), value, arr_index_items, &pos);
+    if (r != INDEX_SCAN) {
+        Py_ssize_t i = r > 0 ? PyLong_AsSsize_t(pos) : r == 0 ? -1 : -2;
+        Py_XDECREF(pos);
+        return i;
+    }
+    PyObject* v;
+    for (Py_ssize_t i = 0; (v = arr_item_ref(a, i)); i++) {
+        int eq = PyObject_RichCompareBool(v, value, Py_EQ);
+        Py_DECREF(v);
+        if (eq) return eq < 0 ? -2 : i;
+    }
+    return -1;
+}
+
+// ---- Entry points for the micro-ops ----
+
+int array_push(PyObject* a, PyObject* value) {
+    int err;
+    MP_BEGIN_CRITICAL(a);
+    err = arr_push_locked((ArrayObject*)a, value);
+    MP_END_CRITICAL();
+    return err;
+}
+
+PyObject* array_pop_at(PyObject* a, Py_ssize_t i) {
+    PyObject* v = NULL;
+    MP_BEGIN_CRITICAL(a);
+    if (i < 0) i += Py_SIZE(a);
+    if (i >= 0 && i < Py_SIZE(a)) v = arr_take_locked((ArrayObject*)a, i);
+    MP_END_CRITICAL();
+    if (!v && !PyErr_Occurred()) Py_RETURN_NONE;
+    return v;
+}
+
+int array_insert_at(PyObject* a, Py_ssize_t i, PyObject* value) {
+    int err;
+    MP_BEGIN_CRITICAL(a);
+    Py_ssize_t len = Py_SIZE(a);
+    if (i < 0) i = i + len < 0 ? 0 : i + len;
+    if (i > len) i = len;
+    err = arr_insert_locked((ArrayObject*)a, i, value);
+    MP_END_CRITICAL();
+    return err;
+}
+
+int array_extend(PyObject* a, PyObject* iterable) {
+    // A copy first: the iterable may be a itself, or run code that
+    // changes a while it is read
+    PyObject* src = PySequence_Fast(iterable, "Array.extend() argument must be iterable");
+    if (!src) return -1;
+    PyObject* old = NULL;
+    int err;
+    MP_BEGIN_CRITICAL(a);
+    Py_ssize_t len = Py_SIZE(a);
+    err = arr_replace_locked((ArrayObject*)a, len, len, PySequence_Fast_ITEMS(src),
+                             PySequence_Fast_GET_SIZE(src), &old);
+    MP_END_CRITICAL();
+    Py_XDECREF(old);
+    Py_DECREF(src);
+    return err;
+}
+
+Py_ssize_t array_find(PyObject* a, PyObject* item) {
+    return arr_find((ArrayObject*)a, item);
+}
+
+int array_reverse(PyObject* a) {
+    int err;
+    MP_BEGIN_CRITICAL(a);
+    err = arr_own((ArrayObject*)a);
+    if (!err) {
+        index_clear(&((ArrayObject*)a)->index);
+        PyObject** items = ARRAY_ITEMS(a);
+        for (Py_ssize_t i = 0, j = Py_SIZE(a) - 1; i < j; i++, j--) {
+            PyObject* t = items[i];
+            items[i] = items[j];
+            items[j] = t;
+        }
+    }
+    MP_END_CRITICAL();
+    return err;
+}
+
+int array_share(PyObject* dst, PyObject* src) {
+    ArrayObject *d = (ArrayObject*)dst, *s = (ArrayObject*)src;
+    ArrayObject* holder = (ArrayObject*)Array_Type.tp_alloc(&Array_Type, 0);
+    if (!holder) return -1;
+    PyObject **buf, *cow;
+    Py_ssize_t head, n;
+    MP_BEGIN_CRITICAL2(dst, src);
+    if (!s->cow) {
+        // First share: src's buffer moves to the holder, src points at it
+        holder->buf = s->buf;
+        holder->cap = s->cap;
+        holder->head = s->head;
+        Py_SET_SIZE(holder, Py_SIZE(s));
+        s->cow = (PyObject*)holder;
+        holder = NULL;
+    }
+    buf = d->buf;
+    head = d->head;
+    n = Py_SIZE(d);
+    cow = d->cow;
+    index_clear(&d->index);
+    Py_INCREF(s->cow);
+    d->cow = s->cow;
+    d->buf = s->buf;
+    d->cap = s->cap;
+    d->head = s->head;
+    Py_SET_SIZE(d, Py_SIZE(s));
+    MP_END_CRITICAL2();
+    Py_XDECREF(holder);
+    arr_release(buf, head, n, cow);
+    return 0;
+}
+
+// ---- Construction and lifetime ----
+
+static PyObject* Array_new(PyTypeObject* type, PyObject* args, PyObject* kwds) {
+    static char* kwlist[] = {"iterable", NULL};
+    PyObject* init = NULL;
+    if (!PyArg_ParseTupleAndKeywords(args, kwds, "|O:Array", kwlist, &init)) return NULL;
+    PyObject* a = type->tp_alloc(type, 0);
+    if (a && init && array_extend(a, init) < 0) Py_CLEAR(a);
+    return a;
+}
+
+static ArrayObject* arr_new_empty(void) {
+    return (ArrayObject*)Array_Type.tp_alloc(&Array_Type, 0);
+}
+
+// New Array of a[start:stop:step] (as given to a slice)
+static PyObject* arr_slice(ArrayObject* a, Py_ssize_t start, Py_ssize_t stop, Py_ssize_t step) {
+    ArrayObject* r = arr_new_empty();
+    if (!r) return NULL;
+    int err = 0;
+    MP_BEGIN_CRITICAL(a);
+    Py_ssize_t n = PySlice_AdjustIndices(Py_SIZE(a), &start, &stop, step);
+    if (n > 0 && arr_relocate(r, 0, n) < 0) {
+        err = -1;
+    } else {
+        for (Py_ssize_t i = 0; i < n; i++) {
+            PyObject* v = a->buf[a->head + start + i * step];
+            Py_INCREF(v);
+            r->buf[i] = v;
+        }
+        Py_SET_SIZE(r, n);
+    }
+    MP_END_CRITICAL();
+    if (err) Py_CLEAR(r);
+    return (PyObject*)r;
+}
+
+static int Array_traverse(ArrayObject* a, visitproc visit, void* arg) {
+    Py_VISIT(a->cow);               // a shared buffer's items are the holder's
+    for (Py_ssize_t i = 0; !a->cow && i < Py_SIZE(a); i++) Py_VISIT(a->buf[a->head + i]);
+    Py_VISIT(a->index.map);
+    return 0;
+}
+
+// Empties the array rather than freeing it, so it stays usable if a
+// finalizer reaches it during collection.
+static int Array_clear(ArrayObject* a) {
+    PyObject **buf = a->buf, *cow = a->cow;
+    Py_ssize_t head = a->head, n = Py_SIZE(a);
+    index_clear(&a->index);
+    a->buf = NULL;
+    a->cow = NULL;
+    a->cap = a->head = 0;
+    Py_SET_SIZE(a, 0);
+    arr_release(buf, head, n, cow);
+    return 0;
+}
+
+static void Array_dealloc(ArrayObject* a) {
+    PyObject_GC_UnTrack(a);
+    if (a->weakreflist) PyObject_ClearWeakRefs((PyObject*)a);
+    Array_clear(a);
+    Py_TYPE(a)->tp_free((PyObject*)a);
+}
+
+// ---- Sequence protocol ----
+
+static Py_ssize_t Array_length(ArrayObject* a) { return Py_SIZE(a); }
+
+static PyObject* Array_item(ArrayObject* a, Py_ssize_t i) {
+    PyObject* v = arr_item_ref(a, i);
+    if (!v) PyErr_SetString(PyExc_IndexError, "Array index out of range");
+    return v;
+}
+
+static int Array_contains(ArrayObject* a, PyObject* value) {
+    Py_ssize_t i = arr_find(a, value);
+    return i == -2 ? -1 : i >= 0;
+}
+
+// a + iterable -> new Array
+static PyObject* Array_concat(ArrayObject* a, PyObject* other) {
+    PyObject* r = (PyObject*)arr_new_empty();
+    if (r && (array_extend(r, (PyObject*)a) < 0 || array_extend(r, other) < 0)) Py_CLEAR(r);
+    return r;
+}
+
+static PyObject* Array_inplace_concat(ArrayObject* a, PyObject* other) {
+    if (array_extend((PyObject*)a, other) < 0) return NULL;
+    Py_INCREF(a);
+    return (PyObject*)a;
+}
+
+static PyObject* Array_subscript(ArrayObject* a, PyObject* key) {
+    if (PyIndex_Check(key)) {
+        Py_ssize_t i = PyNumber_AsSsize_t(key, PyExc_IndexError);
+        if (i == -1 && PyErr_Occurred()) return NULL;
+        return Array_item(a, i < 0 ? i + Py_SIZE(a) : i);
+    }
+    if (PySlice_Check(key)) {
+        Py_ssize_t start, stop, step;
+        if (PySlice_Unpack(key, &start, &stop, &step) < 0) return NULL;
+        return arr_slice(a, start, stop, step);
+    }
+    PyErr_Format(PyExc_TypeError, "Array indices must be integers or slices, not %.200s",
+                 Py_TYPE(key)->tp_name);
+    return NULL;
+}
+
+// a[i] = v / del a[i]
+static int arr_ass_item(ArrayObject* a, Py_ssize_t i, PyObject* value) {
+    PyObject* old = NULL;
+    MP_BEGIN_CRITICAL(a);
+    if (i < 0) i += Py_SIZE(a);
+    if (i >= 0 && i < Py_SIZE(a)) {
+        if (!value) {
+            old = arr_take_locked(a, i);
+        } else if (arr_own(a) == 0) {
+            index_clear(&a->index);
+            old = a->buf[a->head + i];
+            Py_INCREF(value);
+            a->buf[a->head + i] = value;
+        }
+    }
+    MP_END_CRITICAL();
+    if (!old) {
+        if (!PyErr_Occurred()) PyErr_SetString(PyExc_IndexError, "Array assignment index out of range");
+        return -1;
+    }
+    Py_DECREF(old);
+    return 0;
+}
+
+// a[start:stop:step] = values / del a[start:stop:step]. A plain slice may
+// change the length; an extended one must be given as many values as it
+// selects.
+static int arr_ass_slice(ArrayObject* a, PyObject* key, PyObject* value) {
+    Py_ssize_t start, stop, step;
+    if (PySlice_Unpack(key, &start, &stop, &step) < 0) return -1;
+    PyObject* src = NULL;
+    if (value && !(src = PySequence_Fast(value, "can only assign an iterable"))) return -1;
+    PyObject* old = NULL;
+    int err = 0;
+    MP_BEGIN_CRITICAL(a);
+    Py_ssize_t len = Py_SIZE(a);
+    Py_ssize_t n = PySlice_AdjustIndices(len, &start, &stop, step);
+    if (step == 1) {
+        err = arr_replace_locked(a, start, stop < start ? start : stop,
+                                 src ? PySequence_Fast_ITEMS(src) : NULL,
+                                 src ? PySequence_Fast_GET_SIZE(src) : 0, &old);
+    } else if (src && PySequence_Fast_GET_SIZE(src) != n) {
+        PyErr_Format(PyExc_ValueError, "attempt to assign sequence of size %zd to extended slice of size %zd",
+                     PySequence_Fast_GET_SIZE(src), n);
+        err = -1;
+    } else if (arr_own(a) == 0 && (old = PyList_New(n))) {
+        PyObject** items = a->buf + a->head;
+        index_clear(&a->index);
+        if (src) {
+            for (Py_ssize_t i = 0; i < n; i++) {
+                PyObject* v = PySequence_Fast_GET_ITEM(src, i);
+                Py_INCREF(v);
+                PyList_SET_ITEM(old, i, items[start + i * step]);
+                items[start + i * step] = v;
+            }
+        } else {
+            // Deleting: walk up from the lowest selected item, keeping the rest
+            if (step < 0) {
+                start += (n - 1) * step;
+                step = -step;
+            }
+            Py_ssize_t w = 0, taken = 0;
+            for (Py_ssize_t r = 0; r < len; r++) {
+                if (taken < n && r == start + taken * step) PyList_SET_ITEM(old, taken++, items[r]);
+                else items[w++] = items[r];
+            }
+            Py_SET_SIZE(a, w);
+        }
+    } else {
+        err = -1;
+    }
+    MP_END_CRITICAL();
+    Py_XDECREF(src);
+    Py_XDECREF(old);
+    return err;
+}
+
+static int Array_ass_subscript(ArrayObject* a, PyObject* key, PyObject* value) {
+    if (PyIndex_Check(key)) {
+        Py_ssize_t i = PyNumber_AsSsize_t(key, PyExc_IndexError);
+        if (i == -1 && PyErr_Occurred()) return -1;
+        return arr_ass_item(a, i, value);
+    }
+    if (PySlice_Check(key)) return arr_ass_slice(a, key, value);
+    PyErr_Format(PyExc_TypeError, "Array indices must be integers or slices, not %.200s",
+                 Py_TYPE(key)->tp_name);
+    return -1;
+}
+
+// ---- Iteration ----
+
+typedef struct {
+    PyObject_HEAD
+    ArrayObject* array;
+    Py_ssize_t i;                   // next position
+} ArrayIterObject;
+
+static void ArrayIter_dealloc(ArrayIterObject* it) {
+    PyObject_GC_UnTrack(it);
+    Py_XDECREF(it->array);
+    PyObject_GC_Del(it);
+}
+
+static int ArrayIter_traverse(ArrayIterObject* it, visitproc visit, void* arg) {
+    Py_VISIT(it->array);
+    return 0;
+}
+
+static PyObject* ArrayIter_next(ArrayIterObject* it) {
+    if (!it->array) return NULL;
+    PyObject* v = arr_item_ref(it->array, it->i);
+    if (!v) {
+        Py_CLEAR(it->array);
+        return NULL;
+    }
+    it->i++;
+    return v;
+}
+
+static PyTypeObject ArrayIter_Type = {
+    PyVarObject_HEAD_INIT(NULL, 0)
+    .tp_name = "microps._core.ArrayIterator",
+    .tp_basicsize = sizeof(ArrayIterObject),
+    .tp_flags = Py_TPFLAGS_DEFAULT | Py_TPFLAGS_HAVE_GC,
+    .tp_dealloc = (destructor)ArrayIter_dealloc,
+    .tp_traverse = (traverseproc)ArrayIter_traverse,
+    .tp_iter = PyObject_SelfIter,
+    .tp_iternext = (iternextfunc)ArrayIter_next,
+};
+
+static PyObject* Array_iter(ArrayObject* a) {
+    ArrayIterObject* it = PyObject_GC_New(ArrayIterObject, &ArrayIter_Type);
+    if (!it) return NULL;
+    Py_INCREF(a);
+    it->array = a;
+    it->i = 0;
+    PyObject_GC_Track(it);
+    return (PyObject*)it;
+}
+
+// ---- Methods ----
+
+static PyObject* Array_append(ArrayObject* a, PyObject* value) {
+    if (array_push((PyObject*)a, value) < 0) return NULL;
+    Py_RETURN_NONE;
+}
+
+static PyObject* Array_extend_m(ArrayObject* a, PyObject* iterable) {
+    if (array_extend((PyObject*)a, iterable) < 0) return NULL;
+    Py_RETURN_NONE;
+}
+
+static PyObject* Array_insert(ArrayObject* a, PyObject* const* args, Py_ssize_t nargs) {
+    if (nargs != 2) {
+        PyErr_Format(PyExc_TypeError, "insert() takes exactly 2 arguments (%zd given)", nargs);
+        return NULL;
+    }
+    Py_ssize_t i = PyNumber_AsSsize_t(args[0], PyExc_OverflowError);
+    if ((i == -1 && PyErr_Occurred()) || array_insert_at((PyObject*)a, i, args[1]) < 0) return NULL;
+    Py_RETURN_NONE;
+}
+
+// Removes item i; IndexError when the array is empty or i out of range
+static PyObject* arr_pop(ArrayObject* a, Py_ssize_t i, const char* name) {
+    PyObject* v = NULL;
+    MP_BEGIN_CRITICAL(a);
+    if (i < 0) i += Py_SIZE(a);
+    if (i >= 0 && i < Py_SIZE(a)) v = arr_take_locked(a, i);
+    MP_END_CRITICAL();
+    if (!v) {
+        if (PyErr_Occurred()) return NULL;
+        PyErr_Format(PyExc_IndexError, Py_SIZE(a) ? "%s index out of range" : "%s from empty Array", name);
+        return NULL;
+    }
+    return v;
+}
+
+static PyObject* Array_pop(ArrayObject* a, PyObject* const* args, Py_ssize_t nargs) {
+    if (nargs > 1) {
+        PyErr_Format(PyExc_TypeError, "pop() takes at most 1 argument (%zd given)", nargs);
+        return NULL;
+    }
+    Py_ssize_t i = nargs ? PyNumber_AsSsize_t(args[0], PyExc_IndexError) : -1;
+    if (i == -1 && PyErr_Occurred()) return NULL;
+    return arr_pop(a, i, "pop");
+}
+
+static PyObject* Array_shift(ArrayObject* a, PyObject* unused) { return arr_pop(a, 0, "shift"); }
+
+// unshift(*values) -> new length; the values keep their order at the front
+static PyObject* Array_unshift(ArrayObject* a, PyObject* const* args, Py_ssize_t nargs) {
+    PyObject* old = NULL;
+    int err;
+    MP_BEGIN_CRITICAL(a);
+    err = arr_replace_locked(a, 0, 0, args, nargs, &old);
+    MP_END_CRITICAL();
+    Py_XDECREF(old);
+    return err < 0 ? NULL : PyLong_FromSsize_t(Py_SIZE(a));
+}
+
+static PyObject* Array_index(ArrayObject* a, PyObject* value) {
+    Py_ssize_t i = arr_find(a, value);
+    if (i == -1) PyErr_Format(PyExc_ValueError, "%R is not in Array", value);
+    return i < 0 ? NULL : PyLong_FromSsize_t(i);
+}
+
+static PyObject* Array_count(ArrayObject* a, PyObject* value) {
+    Py_ssize_t n = 0;
+    PyObject* v;
+    for (Py_ssize_t i = 0; (v = arr_item_ref(a, i)); i++) {
+        int eq = PyObject_RichCompareBool(v, value, Py_EQ);
+        Py_DECREF(v);
+        if (eq < 0) return NULL;
+        n += eq;
+    }
+    return PyLong_FromSsize_t(n);
+}
+
+static PyObject* Array_remove(ArrayObject* a, PyObject* value) {
+    Py_ssize_t i = arr_find(a, value);
+    if (i == -1) PyErr_Format(PyExc_ValueError, "%R is not in Array", value);
+    if (i < 0) return NULL;
+    PyObject* v = arr_pop(a, i, "remove");
+    if (!v) return NULL;
+    Py_DECREF(v);
+    Py_RETURN_NONE;
+}
+
+static PyObject* Array_reverse(ArrayObject* a, PyObject* unused) {
+    if (array_reverse((PyObject*)a) < 0) return NULL;
+    Py_RETURN_NONE;
+}
+
+// sort(*, key=None, reverse=False): list.sort on a copy, written back
+static PyObject* Array_sort(ArrayObject* a, PyObject* args, PyObject* kwds) {
+    if (PyTuple_GET_SIZE(args)) {
+        PyErr_SetString(PyExc_TypeError, "sort() takes keyword arguments only");
+        return NULL;
+    }
+    PyObject* items = arr_to_list(a);
+    PyObject* sort = items ? PyObject_GetAttrString(items, "sort") : NULL;
+    PyObject* r = sort ? PyObject_Call(sort, args, kwds) : NULL;
+    Py_XDECREF(sort);
+    if (r && arr_assign(a, items) < 0) Py_CLEAR(r);
+    Py_XDECREF(items);
+    return r;
+}
+
+static PyObject* Array_copy(ArrayObject* a, PyObject* unused) {
+    return arr_slice(a, 0, PY_SSIZE_T_MAX, 1);
+}
+
+static PyObject* Array_clear_m(ArrayObject* a, PyObject* unused) {
+    PyObject* old = NULL;
+    int err;
+    MP_BEGIN_CRITICAL(a);
+    err = arr_replace_locked(a, 0, Py_SIZE(a), NULL, 0, &old);
+    MP_END_CRITICAL();
+    Py_XDECREF(old);
+    if (err < 0) return NULL;
+    Py_RETURN_NONE;
+}
+
+// ---- Comparison and repr ----
+
+// Compared with another Array or a list item by item, as lists compare
+static PyObject* Array_richcompare(ArrayObject* a, PyObject* other, int op) {
+    if (!Array_Check(other) && !PyList_Check(other)) Py_RETURN_NOTIMPLEMENTED;
+    PyObject* left = arr_to_list(a);
+    PyObject* right = !left ? NULL : Array_Check(other) ? arr_to_list((ArrayObject*)other)
+                                                        : (Py_INCREF(other), other);
+    PyObject* r = right ? PyObject_RichCompare(left, right, op) : NULL;
+    Py_XDECREF(left);
+    Py_XDECREF(right);
+    return r;
+}
+
+// Array([...]) for repr(); str() reads like a list, as the engines print it
+static PyObject* arr_format(ArrayObject* a, int as_repr) {
+    int rec = Py_ReprEnter((PyObject*)a);
+    if (rec != 0) return rec > 0 ? PyUnicode_FromString(as_repr ? "Array([...])" : "[...]") : NULL;
+    PyObject* items = arr_to_list(a);
+    PyObject* r = !items ? NULL : as_repr ? PyUnicode_FromFormat("Array(%R)", items) : PyObject_Repr(items);
+    Py_XDECREF(items);
+    Py_ReprLeave((PyObject*)a);
+    return r;
+}
+
+static PyObject* Array_repr(ArrayObject* a) { return arr_format(a, 1); }
+static PyObject* Array_str(ArrayObject* a) { return arr_format(a, 0); }
+
+static PySequenceMethods Array_as_sequence = {
+    .sq_length = (lenfunc)Array_length,
+    .sq_concat = (binaryfunc)Array_concat,
+    .sq_item = (ssizeargfunc)Array_item,
+    .sq_contains = (objobjproc)Array_contains,
+    .sq_inplace_concat = (binaryfunc)Array_inplace_concat,
+};
+
+static PyMappingMethods Array_as_mapping = {
+    .mp_length = (lenfunc)Array_length,
+    .mp_subscript = (binaryfunc)Array_subscript,
+    .mp_ass_subscript = (objobjargproc)Array_ass_subscript,
+};
+
+static PyMethodDef Array_methods[] = {
+    {"append", (PyCFunction)Array_append, METH_O, "append(value): add value at the end."},
+    {"push", (PyCFunction)Array_append, METH_O, "push(value): same as append()."},
+    {"extend", (PyCFunction)Array_extend_m, METH_O, "extend(iterable): append every item."},
+    {"insert", (PyCFunction)(void(*)(void))Array_insert, METH_FASTCALL,
+     "insert(index, value): insert before index; O(1) at either end."},
+    {"pop", (PyCFunction)(void(*)(void))Array_pop, METH_FASTCALL,
+     "pop(index=-1): remove and return an item; O(1) at either end."},
+    {"shift", (PyCFunction)Array_shift, METH_NOARGS, "shift(): remove and return the first item, O(1)."},
+    {"unshift", (PyCFunction)(void(*)(void))Array_unshift, METH_FASTCALL,
+     "unshift(*values) -> length: add values at the front, in order, O(1) per value."},
+    {"index", (PyCFunction)Array_index, METH_O, "index(value): position of the first equal item."},
+    {"count", (PyCFunction)Array_count, METH_O, "count(value): number of equal items."},
+    {"remove", (PyCFunction)Array_remove, METH_O, "remove(value): delete the first equal item."},
+    {"reverse", (PyCFunction)Array_reverse, METH_NOARGS, "reverse(): reverse in place."},
+    {"sort", (PyCFunction)(void(*)(void))Array_sort, METH_VARARGS | METH_KEYWORDS,
+     "sort(*, key=None, reverse=False): sort in place."},
+    {"copy", (PyCFunction)Array_copy, METH_NOARGS, "copy(): shallow copy."},
+    {"clear", (PyCFunction)Array_clear_m, METH_NOARGS, "clear(): remove every item."},
+    {NULL, NULL, 0, NULL}
+};
+
+PyTypeObject Array_Type = {
+    PyVarObject_HEAD_INIT(NULL, 0)
+    .tp_name = "microps._core.Array",
+    .tp_basicsize = sizeof(ArrayObject),
+    .tp_flags = Py_TPFLAGS_DEFAULT | Py_TPFLAGS_BASETYPE | Py_TPFLAGS_HAVE_GC,
+    .tp_doc = "Array(iterable=())\n\nList-like array for JS / Ruby with free room at both ends: "
+              "push, pop, shift and unshift are O(1) amortized. Supports indexing, slicing and "
+              "slice assignment like a list.",
+    .tp_new = Array_new,
+    .tp_dealloc = (destructor)Array_dealloc,
+    .tp_traverse = (traverseproc)Array_traverse,
+    .tp_clear = (inquiry)Array_clear,
+    .tp_repr = (reprfunc)Array_repr,
+    .tp_str = (reprfunc)Array_str,
+    .tp_iter = (getiterfunc)Array_iter,
+    .tp_richcompare = (richcmpfunc)Array_richcompare,
+    .tp_hash = PyObject_HashNotImplemented,
+    .tp_weaklistoffset = offsetof(ArrayObject, weakreflist),
+    .tp_as_sequence = &Array_as_sequence,
+    .tp_as_mapping = &Array_as_mapping,
+    .tp_methods = Array_methods,
+};
+
+int array_init(PyObject* module) {
+    if (PyType_Ready(&ArrayIter_Type) < 0 || PyType_Ready(&Array_Type) < 0) return -1;
+    Py_INCREF(&Array_Type);
+    if (PyModule_AddObject(module, "Array", (PyObject*)&Array_Type) < 0) {
+        Py_DECREF(&Array_Type);
+        return -1;
+    }
+    return 0;
+}
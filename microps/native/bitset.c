@@ -0,0 +1,527 @@
+// FILE: microps/native/bitset.c
+#include "native.h"
+
+// Bitset: a fixed number of bits packed into 64-bit words.
+//
+// Python ints work as bit masks, but every `x |= 1 << i` copies the whole
+// int, which is O(n) per bit on masks with millions of bits. A Bitset
+// changes one word in place; counting, rank and select run over whole
+// words with the popcnt instruction, and &, |, ^ and - (and-not) are
+// word-wise loops the compiler vectorizes. Bits past nbits in the last
+// word are always kept clear, so whole-word counts stay exact.
+typedef struct {
+    PyObject_HEAD
+    Py_ssize_t nbits;
+    Py_ssize_t nwords;
+    uint64_t* words;
+} BitsetObject;
+
+#define WORDS_FOR(nbits) (((nbits) + 63) / 64)
+
+static inline uint64_t tail_mask(BitsetObject* b) {
+    return b->nbits % 64 ? (((uint64_t)1 << (b->nbits % 64)) - 1) : ~(uint64_t)0;
+}
+
+// Whole-array popcount. On x86 the portable builtin compiles to a table
+// lookup unless the target has popcnt, so a popcnt build is picked at
+// init when the CPU supports it.
+static Py_ssize_t count_words_portable(const uint64_t* w, Py_ssize_t n) {
+    Py_ssize_t total = 0;
+    for (Py_ssize_t i = 0; i < n; i++) total += mp_popcount64(w[i]);
+    return total;
+}
+
+#if (defined(__GNUC__) || defined(__clang__)) && (defined(__x86_64__) || defined(__i386__))
+#define BITSET_POPCNT_DISPATCH
+__attribute__((target("popcnt")))
+static Py_ssize_t count_words_popcnt(const uint64_t* w, Py_ssize_t n) {
+    Py_ssize_t total = 0;
+    for (Py_ssize_t i = 0; i < n; i++) total += __builtin_popcountll(w[i]);
+    return total;
+}
+#endif
+
+static Py_ssize_t (*count_words)(const uint64_t*, Py_ssize_t) = count_words_portable;
+
+Py_ssize_t bitset_count(PyObject* b) {
+    BitsetObject* self = (BitsetObject*)b;
+    return count_words(self->words, self->nwords);
+}
+
+static BitsetObject* bitset_alloc(PyTypeObject* type, Py_ssize_t nbits) {
+    if (nbits < 0) {
+        PyErr_SetString(PyExc_ValueError, "Bitset size cannot be negative");
+        return NULL;
+    }
+    BitsetObject* self = (BitsetObject*)type->tp_alloc(type, 0);
+    if (!self) return NULL;
+    self->nbits = nbits;
+    self->nwords = WORDS_FOR(nbits);
+    self->words = PyMem_Calloc(self->nwords ? self->nwords : 1, sizeof(uint64_t));
+    if (!self->words) {
+        Py_DECREF(self);
+        PyErr_NoMemory();
+        return NULL;
+    }
+    return self;
+}
+
+static void Bitset_dealloc(BitsetObject* self) {
+    PyMem_Free(self->words);
+    Py_TYPE(self)->tp_free((PyObject*)self);
+}
+
+// Bit position from a Python index; negative positions count from the end.
+static int bit_index(BitsetObject* self, PyObject* arg, Py_ssize_t* out) {
+    Py_ssize_t i = PyNumber_AsSsize_t(arg, PyExc_IndexError);
+    if (i == -1 && PyErr_Occurred()) return -1;
+    if (i < 0) i += self->nbits;
+    if (i < 0 || i >= self->nbits) {
+        PyErr_SetString(PyExc_IndexError, "bit index out of range");
+        return -1;
+    }
+    *out = i;
+    return 0;
+}
+
+static inline void bit_assign(BitsetObject* self, Py_ssize_t i, int on) {
+    uint64_t m = (uint64_t)1 << (i % 64);
+    if (on) self->words[i / 64] |= m;
+    else self->words[i / 64] &= ~m;
+}
+
+static int bitset_update(BitsetObject* self, PyObject* positions) {
+    PyObject* it = PyObject_GetIter(positions);
+    if (!it) return -1;
+    PyObject* item;
+    int err = 0;
+    while (!err && (item = PyIter_Next(it))) {
+        Py_ssize_t i;
+        err = bit_index(self, item, &i);
+        Py_DECREF(item);
+        if (!err) {
+            MP_BEGIN_CRITICAL(self);
+            bit_assign(self, i, 1);
+            MP_END_CRITICAL();
+        }
+    }
+    Py_DECREF(it);
+    return err || PyErr_Occurred() ? -1 : 0;
+}
+
+static PyObject* Bitset_new(PyTypeObject* type, PyObject* args, PyObject* kwds) {
+    static char* kwlist[] = {"nbits", "positions", NULL};
+    Py_ssize_t nbits;
+    PyObject* positions = NULL;
+    if (!PyArg_ParseTupleAndKeywords(args, kwds, "n|O:Bitset", kwlist, &nbits, &positions)) return NULL;
+    BitsetObject* self = bitset_alloc(type, nbits);
+    if (self && positions && bitset_update(self, positions) < 0) Py_CLEAR(self);
+    return (PyObject*)self;
+}
+
+// set / clear / flip share one shape: one bit when given a position,
+// every bit when called without one.
+typedef enum { BIT_SET, BIT_CLEAR, BIT_FLIP } BitOp;
+
+static PyObject* bitset_modify(BitsetObject* self, PyObject* const* args, Py_ssize_t nargs,
+                               const char* name, BitOp op) {
+    if (nargs > 1) {
+        PyErr_Format(PyExc_TypeError, "%s() takes at most 1 argument (%zd given)", name, nargs);
+        return NULL;
+    }
+    Py_ssize_t i = -1;
+    if (nargs && args[0] != Py_None && bit_index(self, args[0], &i) < 0) return NULL;
+    MP_BEGIN_CRITICAL(self);
+    if (i >= 0) {
+        uint64_t m = (uint64_t)1 << (i % 64);
+        uint64_t* w = &self->words[i / 64];
+        *w = op == BIT_SET ? (*w | m) : op == BIT_CLEAR ? (*w & ~m) : (*w ^ m);
+    } else if (self->nwords) {
+        for (Py_ssize_t k = 0; k < self->nwords; k++) {
+            self->words[k] = op == BIT_SET ? ~(uint64_t)0 : op == BIT_CLEAR ? 0 : ~self->words[k];
+        }
+        self->words[self->nwords - 1] &= tail_mask(self);
+    }
+    MP_END_CRITICAL();
+    Py_RETURN_NONE;
+}
+
+static PyObject* Bitset_set(BitsetObject* self, PyObject* const* args, Py_ssize_t nargs) {
+    return bitset_modify(self, args, nargs, "set", BIT_SET);
+}
+
+static PyObject* Bitset_clear(BitsetObject* self, PyObject* const* args, Py_ssize_t nargs) {
+    return bitset_modify(self, args, nargs, "clear", BIT_CLEAR);
+}
+
+static PyObject* Bitset_flip(BitsetObject* self, PyObject* const* args, Py_ssize_t nargs) {
+    return bitset_modify(self, args, nargs, "flip", BIT_FLIP);
+}
+
+static PyObject* Bitset_test(BitsetObject* self, PyObject* arg) {
+    Py_ssize_t i;
+    if (bit_index(self, arg, &i) < 0) return NULL;
+    return PyBool_FromLong((self->words[i / 64] >> (i % 64)) & 1);
+}
+
+static PyObject* Bitset_update_method(BitsetObject* self, PyObject* positions) {
+    if (bitset_update(self, positions) < 0) return NULL;
+    Py_RETURN_NONE;
+}
+
+static PyObject* Bitset_count(BitsetObject* self, PyObject* unused) {
+    return PyLong_FromSsize_t(bitset_count((PyObject*)self));
+}
+
+// rank(i): set bits below position i
+static PyObject* Bitset_rank(BitsetObject* self, PyObject* arg) {
+    Py_ssize_t i = PyNumber_AsSsize_t(arg, PyExc_IndexError);
+    if (i == -1 && PyErr_Occurred()) return NULL;
+    if (i < 0 || i > self->nbits) {
+        PyErr_SetString(PyExc_IndexError, "rank position out of range");
+        return NULL;
+    }
+    Py_ssize_t r = count_words(self->words, i / 64);
+    if (i % 64) r += mp_popcount64(self->words[i / 64] & (((uint64_t)1 << (i % 64)) - 1));
+    return PyLong_FromSsize_t(r);
+}
+
+// select(k): position of the k-th set bit, counting from 0
+static PyObject* Bitset_select(BitsetObject* self, PyObject* arg) {
+    Py_ssize_t k = PyNumber_AsSsize_t(arg, PyExc_IndexError);
+    if (k == -1 && PyErr_Occurred()) return NULL;
+    for (Py_ssize_t w = 0; k >= 0 && w < self->nwords; w++) {
+        uint64_t word = self->words[w];
+        int c = mp_popcount64(word);
+        if (k < c) {
+            for (; k; k--) word &= word - 1;      // drop the k lowest set bits
+            return PyLong_FromSsize_t(w * 64 + mp_ctz64(word));
+        }
+        k -= c;
+    }
+    PyErr_SetString(PyExc_IndexError, "select index out of range");
+    return NULL;
+}
+
+static PyObject* Bitset_copy(BitsetObject* self, PyObject* unused) {
+    BitsetObject* r = bitset_alloc(Py_TYPE(self), self->nbits);
+    if (r) memcpy(r->words, self->words, self->nwords * sizeof(uint64_t));
+    return (PyObject*)r;
+}
+
+static PyObject* Bitset_to_int(BitsetObject* self, PyObject* unused) {
+    PyObject* bytes = PyBytes_FromStringAndSize(NULL, self->nwords * 8);
+    if (!bytes) return NULL;
+    unsigned char* out = (unsigned char*)PyBytes_AS_STRING(bytes);
+    for (Py_ssize_t w = 0; w < self->nwords; w++) {
+        for (int k = 0; k < 8; k++) *out++ = (unsigned char)(self->words[w] >> (8 * k));
+    }
+    PyObject* r = PyObject_CallMethod((PyObject*)&PyLong_Type, "from_bytes", "Os", bytes, "little");
+    Py_DECREF(bytes);
+    return r;
+}
+
+// from_int(x, nbits=None): the bits of a non-negative int; nbits defaults
+// to x.bit_length()
+static PyObject* Bitset_from_int(PyTypeObject* type, PyObject* args, PyObject* kwds) {
+    static char* kwlist[] = {"x", "nbits", NULL};
+    PyObject *x, *nbits_obj = Py_None;
+    if (!PyArg_ParseTupleAndKeywords(args, kwds, "O!|O:from_int", kwlist, &PyLong_Type, &x, &nbits_obj))
+        return NULL;
+    if (Py_SIZE(x) < 0) {
+        PyErr_SetString(PyExc_ValueError, "from_int() needs a non-negative int");
+        return NULL;
+    }
+    PyObject* len_obj = PyObject_CallMethod(x, "bit_length", NULL);
+    if (!len_obj) return NULL;
+    Py_ssize_t used = PyLong_AsSsize_t(len_obj);
+    Py_DECREF(len_obj);
+    if (used == -1 && PyErr_Occurred()) return NULL;
+    Py_ssize_t nbits = used;
+    if (nbits_obj != Py_None) {
+        nbits = PyNumber_AsSsize_t(nbits_obj, PyExc_OverflowError);
+        if (nbits == -1 && PyErr_Occurred()) return NULL;
+        if (used > nbits) {
+            PyErr_Format(PyExc_ValueError, "int needs %zd bits, Bitset has %zd", used, nbits);
+            return NULL;
+        }
+    }
+    BitsetObject* self = bitset_alloc(type, nbits);
+    if (!self) return NULL;
+    PyObject* bytes = PyObject_CallMethod(x, "to_bytes", "ns", self->nwords * 8, "little");
+    if (!bytes) {
+        Py_DECREF(self);
+        return NULL;
+    }
+    const unsigned char* in = (const unsigned char*)PyBytes_AS_STRING(bytes);
+    for (Py_ssize_t w = 0; w < self->nwords; w++) {
+        uint64_t word = 0;
+        for (int k = 0; k < 8; k++) word |= (uint64_t)*in++ << (8 * k);
+        self->words[w] = word;
+    }
+    Py_DECREF(bytes);
+    return (PyObject*)self;
+}
+
+// ---- Bulk operations ----
+
+typedef enum { BULK_AND, BULK_OR, BULK_XOR, BULK_ANDNOT } BulkOp;
+
+static void bulk_apply(uint64_t* dst, const uint64_t* a, const uint64_t* b, Py_ssize_t n, BulkOp op) {
+    switch (op) {
+    case BULK_AND:    for (Py_ssize_t i = 0; i < n; i++) dst[i] = a[i] & b[i]; break;
+    case BULK_OR:     for (Py_ssize_t i = 0; i < n; i++) dst[i] = a[i] | b[i]; break;
+    case BULK_XOR:    for (Py_ssize_t i = 0; i < n; i++) dst[i] = a[i] ^ b[i]; break;
+    case BULK_ANDNOT: for (Py_ssize_t i = 0; i < n; i++) dst[i] = a[i] & ~b[i]; break;
+    }
+}
+
+// 1 when both operands are Bitsets of one size, 0 for NotImplemented,
+// -1 (ValueError) on a size mismatch
+static int bulk_operands(PyObject* a, PyObject* b) {
+    if (!Bitset_Check(a) || !Bitset_Check(b)) return 0;
+    Py_ssize_t na = ((BitsetObject*)a)->nbits, nb = ((BitsetObject*)b)->nbits;
+    if (na == nb) return 1;
+    PyErr_Format(PyExc_ValueError, "Bitset sizes differ (%zd and %zd bits)", na, nb);
+    return -1;
+}
+
+static PyObject* bulk_new(PyObject* a, PyObject* b, BulkOp op) {
+    int ok = bulk_operands(a, b);
+    if (ok < 0) return NULL;
+    if (!ok) Py_RETURN_NOTIMPLEMENTED;
+    BitsetObject *x = (BitsetObject*)a, *y = (BitsetObject*)b;
+    BitsetObject* r = bitset_alloc(Py_TYPE(x), x->nbits);
+    if (r) bulk_apply(r->words, x->words, y->words, x->nwords, op);
+    return (PyObject*)r;
+}
+
+static PyObject* bulk_inplace(PyObject* a, PyObject* b, BulkOp op) {
+    int ok = bulk_operands(a, b);
+    if (ok < 0) return NULL;
+    if (!ok) Py_RETURN_NOTIMPLEMENTED;
+    BitsetObject *x = (BitsetObject*)a, *y = (BitsetObject*)b;
+    MP_BEGIN_CRITICAL(x);
+    bulk_apply(x->words, x->words, y->words, x->nwords, op);
+    MP_END_CRITICAL();
+    Py_INCREF(a);
+    return a;
+}
+
+static PyObject* Bitset_and(PyObject* a, PyObject* b) { return bulk_new(a, b, BULK_AND); }
+static PyObject* Bitset_or(PyObject* a, PyObject* b) { return bulk_new(a, b, BULK_OR); }
+static PyObject* Bitset_xor(PyObject* a, PyObject* b) { return bulk_new(a, b, BULK_XOR); }
+static PyObject* Bitset_andnot(PyObject* a, PyObject* b) { return bulk_new(a, b, BULK_ANDNOT); }
+static PyObject* Bitset_iand(PyObject* a, PyObject* b) { return bulk_inplace(a, b, BULK_AND); }
+static PyObject* Bitset_ior(PyObject* a, PyObject* b) { return bulk_inplace(a, b, BULK_OR); }
+static PyObject* Bitset_ixor(PyObject* a, PyObject* b) { return bulk_inplace(a, b, BULK_XOR); }
+static PyObject* Bitset_iandnot(PyObject* a, PyObject* b) { return bulk_inplace(a, b, BULK_ANDNOT); }
+
+// andnot(other) as a method, raising for a non-Bitset instead of
+// returning NotImplemented
+static PyObject* Bitset_andnot_method(PyObject* self, PyObject* other) {
+    if (!Bitset_Check(other)) {
+        PyErr_Format(PyExc_TypeError, "andnot() needs a Bitset, not %.100s", Py_TYPE(other)->tp_name);
+        return NULL;
+    }
+    return Bitset_andnot(self, other);
+}
+
+static PyObject* Bitset_invert(BitsetObject* self) {
+    BitsetObject* r = bitset_alloc(Py_TYPE(self), self->nbits);
+    if (!r) return NULL;
+    for (Py_ssize_t i = 0; i < self->nwords; i++) r->words[i] = ~self->words[i];
+    if (r->nwords) r->words[r->nwords - 1] &= tail_mask(r);
+    return (PyObject*)r;
+}
+
+static int Bitset_bool(BitsetObject* self) {
+    for (Py_ssize_t i = 0; i < self->nwords; i++) {
+        if (self->words[i]) return 1;
+    }
+    return 0;
+}
+
+static PyObject* Bitset_richcompare(PyObject* a, PyObject* b, int op) {
+    if ((op != Py_EQ && op != Py_NE) || !Bitset_Check(a) || !Bitset_Check(b)) Py_RETURN_NOTIMPLEMENTED;
+    BitsetObject *x = (BitsetObject*)a, *y = (BitsetObject*)b;
+    int same = x->nbits == y->nbits &&
+               memcmp(x->words, y->words, x->nwords * sizeof(uint64_t)) == 0;
+    return PyBool_FromLong(op == Py_EQ ? same : !same);
+}
+
+static PyObject* Bitset_repr(BitsetObject* self) {
+    return PyUnicode_FromFormat("<Bitset: %zd bits, %zd set>", self->nbits, bitset_count((PyObject*)self));
+}
+
+// ---- Item access: b[i] is bit i, `i in b` tests it ----
+
+static PyObject* Bitset_getitem(BitsetObject* self, PyObject* key) {
+    return Bitset_test(self, key);
+}
+
+static int Bitset_setitem(BitsetObject* self, PyObject* key, PyObject* value) {
+    Py_ssize_t i;
+    if (bit_index(self, key, &i) < 0) return -1;
+    int on = value ? PyObject_IsTrue(value) : 0;       // del b[i] clears the bit
+    if (on < 0) return -1;
+    MP_BEGIN_CRITICAL(self);
+    bit_assign(self, i, on);
+    MP_END_CRITICAL();
+    return 0;
+}
+
+static int Bitset_contains(BitsetObject* self, PyObject* key) {
+    if (!PyLong_Check(key)) return 0;
+    Py_ssize_t i = PyLong_AsSsize_t(key);
+    if (i == -1 && PyErr_Occurred()) {
+        if (!PyErr_ExceptionMatches(PyExc_OverflowError)) return -1;
+        PyErr_Clear();
+        return 0;
+    }
+    return i >= 0 && i < self->nbits && ((self->words[i / 64] >> (i % 64)) & 1);
+}
+
+// ---- Iteration over set bits ----
+
+typedef struct {
+    PyObject_HEAD
+    BitsetObject* bits;
+    Py_ssize_t word;                // index of `cur` in bits->words
+    uint64_t cur;                   // bits of that word not yet yielded
+} BitsetIterObject;
+
+static void BitsetIter_dealloc(BitsetIterObject* self) {
+    PyObject_GC_UnTrack(self);
+    Py_XDECREF(self->bits);
+    PyObject_GC_Del(self);
+}
+
+static int BitsetIter_traverse(BitsetIterObject* self, visitproc visit, void* arg) {
+    Py_VISIT(self->bits);
+    return 0;
+}
+
+static PyObject* BitsetIter_next(BitsetIterObject* self) {
+    BitsetObject* b = self->bits;
+    if (!b) return NULL;
+    while (!self->cur) {
+        if (++self->word >= b->nwords) {
+            Py_CLEAR(self->bits);
+            return NULL;
+        }
+        self->cur = b->words[self->word];
+    }
+    int bit = mp_ctz64(self->cur);
+    self->cur &= self->cur - 1;
+    return PyLong_FromSsize_t(self->word * 64 + bit);
+}
+
+static PyTypeObject BitsetIter_Type = {
+    PyVarObject_HEAD_INIT(NULL, 0)
+    .tp_name = "microps._core.BitsetIterator",
+    .tp_basicsize = sizeof(BitsetIterObject),
+    .tp_flags = Py_TPFLAGS_DEFAULT | Py_TPFLAGS_HAVE_GC,
+    .tp_dealloc = (destructor)BitsetIter_dealloc,
+    .tp_traverse = (traverseproc)BitsetIter_traverse,
+    .tp_iter = PyObject_SelfIter,
+    .tp_iternext = (iternextfunc)BitsetIter_next,
+};
+
+static PyObject* Bitset_iter(BitsetObject* self) {
+    BitsetIterObject* it = PyObject_GC_New(BitsetIterObject, &BitsetIter_Type);
+    if (!it) return NULL;
+    Py_INCREF(self);
+    it->bits = self;
+    it->word = 0;
+    it->cur = self->nwords ? self->words[0] : 0;
+    PyObject_GC_Track(it);
+    return (PyObject*)it;
+}
+
+static PyObject* Bitset_get_nbits(BitsetObject* self, void* closure) {
+    return PyLong_FromSsize_t(self->nbits);
+}
+
+static PyGetSetDef Bitset_getset[] = {
+    {"nbits", (getter)Bitset_get_nbits, NULL, "Number of bits.", NULL},
+    {NULL}
+};
+
+static PyNumberMethods Bitset_as_number = {
+    .nb_bool = (inquiry)Bitset_bool,
+    .nb_invert = (unaryfunc)Bitset_invert,
+    .nb_and = Bitset_and,
+    .nb_or = Bitset_or,
+    .nb_xor = Bitset_xor,
+    .nb_subtract = Bitset_andnot,
+    .nb_inplace_and = Bitset_iand,
+    .nb_inplace_or = Bitset_ior,
+    .nb_inplace_xor = Bitset_ixor,
+    .nb_inplace_subtract = Bitset_iandnot,
+};
+
+static PyMappingMethods Bitset_as_mapping = {
+    .mp_subscript = (binaryfunc)Bitset_getitem,
+    .mp_ass_subscript = (objobjargproc)Bitset_setitem,
+};
+
+static PySequenceMethods Bitset_as_sequence = {
+    .sq_contains = (objobjproc)Bitset_contains,
+};
+
+static PyMethodDef Bitset_methods[] = {
+    {"set", (PyCFunction)(void(*)(void))Bitset_set, METH_FASTCALL,
+     "set(i=None): turn bit i on, or every bit when i is omitted."},
+    {"clear", (PyCFunction)(void(*)(void))Bitset_clear, METH_FASTCALL,
+     "clear(i=None): turn bit i off, or every bit when i is omitted."},
+    {"flip", (PyCFunction)(void(*)(void))Bitset_flip, METH_FASTCALL,
+     "flip(i=None): invert bit i, or every bit when i is omitted."},
+    {"test", (PyCFunction)Bitset_test, METH_O, "test(i): True if bit i is on."},
+    {"update", (PyCFunction)Bitset_update_method, METH_O, "update(positions): turn on every bit listed."},
+    {"count", (PyCFunction)Bitset_count, METH_NOARGS, "count(): number of bits that are on."},
+    {"rank", (PyCFunction)Bitset_rank, METH_O, "rank(i): number of bits on below position i."},
+    {"select", (PyCFunction)Bitset_select, METH_O,
+     "select(k): position of the k-th bit that is on (from 0)."},
+    {"andnot", (PyCFunction)Bitset_andnot_method, METH_O,
+     "andnot(other): new Bitset of the bits on here and off in other (same as self - other)."},
+    {"copy", (PyCFunction)Bitset_copy, METH_NOARGS, "copy(): independent Bitset with the same bits."},
+    {"to_int", (PyCFunction)Bitset_to_int, METH_NOARGS, "to_int(): the bits as a non-negative int, bit i = 2**i."},
+    {"from_int", (PyCFunction)(void(*)(void))Bitset_from_int, METH_VARARGS | METH_KEYWORDS | METH_CLASS,
+     "from_int(x, nbits=None): Bitset holding the bits of the non-negative int x."},
+    {NULL, NULL, 0, NULL}
+};
+
+PyTypeObject Bitset_Type = {
+    PyVarObject_HEAD_INIT(NULL, 0)
+    .tp_name = "microps._core.Bitset",
+    .tp_basicsize = sizeof(BitsetObject),
+    .tp_flags = Py_TPFLAGS_DEFAULT | Py_TPFLAGS_BASETYPE,
+    .tp_doc = "Bitset(nbits, positions=())\n\nFixed-size set of bits packed into 64-bit words. Iterating "
+              "yields the positions that are on; &, |, ^ and - (and-not) combine Bitsets of one size.",
+    .tp_new = Bitset_new,
+    .tp_dealloc = (destructor)Bitset_dealloc,
+    .tp_repr = (reprfunc)Bitset_repr,
+    .tp_hash = PyObject_HashNotImplemented,
+    .tp_richcompare = Bitset_richcompare,
+    .tp_iter = (getiterfunc)Bitset_iter,
+    .tp_as_number = &Bitset_as_number,
+    .tp_as_mapping = &Bitset_as_mapping,
+    .tp_as_sequence = &Bitset_as_sequence,
+    .tp_methods = Bitset_methods,
+    .tp_getset = Bitset_getset,
+};
+
+int bitset_init(PyObject* module) {
+#ifdef BITSET_POPCNT_DISPATCH
+    __builtin_cpu_init();
+    if (__builtin_cpu_supports("popcnt")) count_words = count_words_popcnt;
+#endif
+    if (PyType_Ready(&BitsetIter_Type) < 0 || PyType_Ready(&Bitset_Type) < 0) return -1;
+    Py_INCREF(&Bitset_Type);
+    if (PyModule_AddObject(module, "Bitset", (PyObject*)&Bitset_Type) < 0) {
+        Py_DECREF(&Bitset_Type);
+        return -1;
+    }
+    return 0;
+}
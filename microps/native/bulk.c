@@ -0,0 +1,394 @@
+// FILE: microps/native/bulk.c
+#include "native.h"
+#include <limits.h>
+#include <string.h>
+
+// Bulk micro-ops: one call applies add / sub / mul / eq across whole
+// sequences instead of one Python-level call per element.
+//
+// Typed 1-D buffers (array.array, memoryview, numpy arrays, ...) of doubles,
+// floats and signed ints run in plain C loops and return an array.array of
+// the same type code (eq_many returns a list of bools). Everything else -
+// lists, tuples, mixed type codes, Python objects - goes through the same
+// PyNumber_* / PyObject_RichCompare calls as the single-value micro-ops and
+// returns a list. A number on either side is broadcast across the other.
+
+typedef enum { BULK_ADD, BULK_SUB, BULK_MUL, BULK_EQ } bulk_op;
+
+static PyObject* array_type = NULL;    // array.array
+
+// --- Overflow-checked long long arithmetic ---
+#if defined(__GNUC__) || defined(__clang__)
+#define add_ovf(x, y, r) __builtin_add_overflow(x, y, r)
+#define sub_ovf(x, y, r) __builtin_sub_overflow(x, y, r)
+#define mul_ovf(x, y, r) __builtin_mul_overflow(x, y, r)
+#else
+static int add_ovf(long long x, long long y, long long* r) {
+    if ((y > 0 && x > LLONG_MAX - y) || (y < 0 && x < LLONG_MIN - y)) return 1;
+    *r = x + y; return 0;
+}
+static int sub_ovf(long long x, long long y, long long* r) {
+    if ((y < 0 && x > LLONG_MAX + y) || (y > 0 && x < LLONG_MIN + y)) return 1;
+    *r = x - y; return 0;
+}
+static int mul_ovf(long long x, long long y, long long* r) {
+    if (x && y && (x == -1 ? y == LLONG_MIN : y == -1 ? x == LLONG_MIN
+                   : (x > 0) == (y > 0) ? x > LLONG_MAX / y : x < LLONG_MIN / y)) return 1;
+    *r = x * y; return 0;
+}
+#endif
+
+// A number is broadcast; anything else that looks like a sequence is not.
+static int bulk_is_scalar(PyObject* x) {
+    if (PyUnicode_Check(x)) return 1;
+    return !PySequence_Check(x) && !PyObject_CheckBuffer(x);
+}
+
+// Fills `view` and returns its type code when x is a contiguous 1-D buffer
+// of d / f / q / l / i; otherwise returns 0 with no view held.
+static char typed_view(PyObject* x, Py_buffer* view) {
+    if (!PyObject_CheckBuffer(x)) return 0;
+    if (PyObject_GetBuffer(x, view, PyBUF_FORMAT | PyBUF_C_CONTIGUOUS) < 0) {
+        PyErr_Clear();
+        return 0;
+    }
+    const char* f = view->format ? view->format : "B";
+    if (*f == '@') f++;
+    char kind = 0;
+    if (view->ndim == 1 && f[0] && !f[1]) {
+        switch (f[0]) {
+            case 'd': case 'f': case 'q': case 'l': case 'i': kind = f[0];
+        }
+    }
+    if (!kind) PyBuffer_Release(view);
+    return kind;
+}
+
+static int kind_is_float(char kind) { return kind == 'd' || kind == 'f'; }
+
+// Range of the integer type codes, for checking results before storing.
+static void int_range(char kind, long long* lo, long long* hi) {
+    switch (kind) {
+        case 'i': *lo = INT_MIN;   *hi = INT_MAX;   break;
+        case 'l': *lo = LONG_MIN;  *hi = LONG_MAX;  break;
+        default:  *lo = LLONG_MIN; *hi = LLONG_MAX; break;
+    }
+}
+
+// Stores scalar x as one element of `kind` in `slot`. Returns 0 when it
+// does not fit exactly (the caller falls back to the generic path).
+static int scalar_as(char kind, PyObject* x, void* slot) {
+    if (kind_is_float(kind)) {
+        if (!PyFloat_CheckExact(x) && !PyLong_CheckExact(x)) return 0;
+        double d = PyFloat_AsDouble(x);
+        if (d == -1.0 && PyErr_Occurred()) { PyErr_Clear(); return 0; }
+        if (kind == 'd') *(double*)slot = d;
+        else *(float*)slot = (float)d;
+        return 1;
+    }
+    if (!PyLong_CheckExact(x)) return 0;
+    int overflow;
+    long long v = PyLong_AsLongLongAndOverflow(x, &overflow);
+    if (overflow || (v == -1 && PyErr_Occurred())) { PyErr_Clear(); return 0; }
+    long long lo, hi;
+    int_range(kind, &lo, &hi);
+    if (v < lo || v > hi) return 0;
+    switch (kind) {
+        case 'i': *(int*)slot = (int)v; break;
+        case 'l': *(long*)slot = (long)v; break;
+        default:  *(long long*)slot = v; break;
+    }
+    return 1;
+}
+
+// One-element array.array('<kind>', [0]) per type code, repeated to size.
+static PyObject* array_templates[5] = {NULL};
+static const char array_kinds[] = "dfqli";
+
+// New array.array(kind) of n zeroed elements, exported writable into `out`.
+static PyObject* new_array(char kind, Py_ssize_t n, Py_buffer* out) {
+    int slot = (int)(strchr(array_kinds, kind) - array_kinds);
+    if (!array_templates[slot]) {
+        array_templates[slot] = PyObject_CallFunction(array_type, "C[i]", kind, 0);
+        if (!array_templates[slot]) return NULL;
+    }
+    PyObject* arr = PySequence_Repeat(array_templates[slot], n);
+    if (!arr) return NULL;
+    if (PyObject_GetBuffer(arr, out, PyBUF_WRITABLE) < 0) { Py_DECREF(arr); return NULL; }
+    return arr;
+}
+
+#define FLOAT_LOOP(T) \
+    for (Py_ssize_t i = 0; i < n; i++) { \
+        T x = *(const T*)(pa + i * sa), y = *(const T*)(pb + i * sb); \
+        ((T*)dst)[i] = op == BULK_ADD ? x + y : op == BULK_SUB ? x - y : x * y; \
+    }
+
+#define INT_LOOP(T) \
+    for (Py_ssize_t i = 0; i < n; i++) { \
+        long long x = *(const T*)(pa + i * sa), y = *(const T*)(pb + i * sb), r; \
+        int ovf = op == BULK_ADD ? add_ovf(x, y, &r) : op == BULK_SUB ? sub_ovf(x, y, &r) : mul_ovf(x, y, &r); \
+        if (ovf || r < lo || r > hi) goto overflow; \
+        ((T*)dst)[i] = (T)r; \
+    }
+
+#define EQ_LOOP(T) \
+    for (Py_ssize_t i = 0; i < n; i++) { \
+        T x = *(const T*)(pa + i * sa), y = *(const T*)(pb + i * sb); \
+        PyObject* r = x == y ? Py_True : Py_False; \
+        Py_INCREF(r); \
+        PyList_SET_ITEM(res, i, r); \
+    }
+
+#define DISPATCH(LOOP) \
+    switch (kind) { \
+        case 'd': LOOP(double); break; \
+        case 'f': LOOP(float); break; \
+        case 'q': LOOP(long long); break; \
+        case 'l': LOOP(long); break; \
+        default:  LOOP(int); break; \
+    }
+
+// Runs `op` over two typed operands; a scalar operand has stride 0.
+static PyObject* bulk_typed(bulk_op op, char kind, Py_ssize_t n,
+                            const char* pa, Py_ssize_t sa, const char* pb, Py_ssize_t sb) {
+    PyObject* res;
+    if (op == BULK_EQ) {
+        res = PyList_New(n);
+        if (!res) return NULL;
+        DISPATCH(EQ_LOOP)
+        return res;
+    }
+    Py_buffer out;
+    res = new_array(kind, n, &out);
+    if (!res) return NULL;
+    char* dst = out.buf;
+    if (kind_is_float(kind)) {
+        if (kind == 'd') { FLOAT_LOOP(double) } else { FLOAT_LOOP(float) }
+    } else {
+        long long lo, hi;
+        int_range(kind, &lo, &hi);
+        switch (kind) {
+            case 'q': INT_LOOP(long long); break;
+            case 'l': INT_LOOP(long); break;
+            default:  INT_LOOP(int); break;
+        }
+    }
+    PyBuffer_Release(&out);
+    return res;
+
+overflow:
+    PyBuffer_Release(&out);
+    Py_DECREF(res);
+    PyErr_Format(PyExc_OverflowError, "result does not fit array type '%c'", kind);
+    return NULL;
+}
+
+static PyObject* bulk_generic(bulk_op op, const char* name, PyObject* a, PyObject* b, int a_scalar, int b_scalar) {
+    // Operands are copied into tuples: an element's __add__ / __eq__ may
+    // change the list it came from while the loop still reads it.
+    PyObject *fa = NULL, *fb = NULL, *res = NULL;
+    if (!a_scalar && !(fa = PySequence_Tuple(a))) return NULL;
+    if (!b_scalar && !(fb = PySequence_Tuple(b))) goto done;
+    Py_ssize_t n = fa ? PyTuple_GET_SIZE(fa) : PyTuple_GET_SIZE(fb);
+    if (fa && fb && PyTuple_GET_SIZE(fb) != n) {
+        PyErr_Format(PyExc_ValueError, "%s() operands have different lengths (%zd and %zd)",
+                     name, n, PyTuple_GET_SIZE(fb));
+        goto done;
+    }
+    res = PyList_New(n);
+    if (!res) goto done;
+    for (Py_ssize_t i = 0; i < n; i++) {
+        PyObject* x = fa ? PyTuple_GET_ITEM(fa, i) : a;
+        PyObject* y = fb ? PyTuple_GET_ITEM(fb, i) : b;
+        PyObject* r;
+        switch (op) {
+            case BULK_ADD: r = PyNumber_Add(x, y); break;
+            case BULK_SUB: r = PyNumber_Subtract(x, y); break;
+            case BULK_MUL: r = PyNumber_Multiply(x, y); break;
+            default:       r = PyObject_RichCompare(x, y, Py_EQ); break;
+        }
+        if (!r) { Py_CLEAR(res); goto done; }
+        PyList_SET_ITEM(res, i, r);
+    }
+done:
+    Py_XDECREF(fa);
+    Py_XDECREF(fb);
+    return res;
+}
+
+static PyObject* bulk_binary(bulk_op op, const char* name, PyObject* const* args, Py_ssize_t nargs) {
+    if (nargs != 2) {
+        PyErr_Format(PyExc_TypeError, "%s() takes exactly 2 arguments (%zd given)", name, nargs);
+        return NULL;
+    }
+    PyObject* a = value_unwrap(args[0]);
+    PyObject* b = value_unwrap(args[1]);
+    int a_scalar = bulk_is_scalar(a), b_scalar = bulk_is_scalar(b);
+    if (a_scalar && b_scalar) {
+        PyErr_Format(PyExc_TypeError, "%s() needs at least one sequence operand", name);
+        return NULL;
+    }
+
+    Py_buffer va, vb;
+    char ka = a_scalar ? 0 : typed_view(a, &va);
+    char kb = b_scalar ? 0 : typed_view(b, &vb);
+    PyObject* res = NULL;
+    int typed = 0;
+    if (ka && kb) {
+        if (ka == kb) {
+            Py_ssize_t na = va.len / va.itemsize, nb = vb.len / vb.itemsize;
+            if (na != nb) {
+                PyErr_Format(PyExc_ValueError, "%s() operands have different lengths (%zd and %zd)", name, na, nb);
+                typed = -1;
+            } else {
+                res = bulk_typed(op, ka, na, va.buf, va.itemsize, vb.buf, vb.itemsize);
+                typed = 1;
+            }
+        }
+    } else if (ka && b_scalar) {
+        long long slot;
+        if (scalar_as(ka, b, &slot)) {
+            res = bulk_typed(op, ka, va.len / va.itemsize, va.buf, va.itemsize, (const char*)&slot, 0);
+            typed = 1;
+        }
+    } else if (kb && a_scalar) {
+        long long slot;
+        if (scalar_as(kb, a, &slot)) {
+            res = bulk_typed(op, kb, vb.len / vb.itemsize, (const char*)&slot, 0, vb.buf, vb.itemsize);
+            typed = 1;
+        }
+    }
+    if (ka) PyBuffer_Release(&va);
+    if (kb) PyBuffer_Release(&vb);
+    if (typed) return res;
+    return bulk_generic(op, name, a, b, a_scalar, b_scalar);
+}
+
+static PyObject* py_add_many(PyObject* self, PyObject* const* args, Py_ssize_t nargs) {
+    return bulk_binary(BULK_ADD, "add_many", args, nargs);
+}
+
+static PyObject* py_sub_many(PyObject* self, PyObject* const* args, Py_ssize_t nargs) {
+    return bulk_binary(BULK_SUB, "sub_many", args, nargs);
+}
+
+static PyObject* py_mul_many(PyObject* self, PyObject* const* args, Py_ssize_t nargs) {
+    return bulk_binary(BULK_MUL, "mul_many", args, nargs);
+}
+
+static PyObject* py_eq_many(PyObject* self, PyObject* const* args, Py_ssize_t nargs) {
+    return bulk_binary(BULK_EQ, "eq_many", args, nargs);
+}
+
+// Generic sum: acc + item for every item, like sum(seq, start).
+static PyObject* reduce_generic(PyObject* seq, PyObject* acc) {
+    PyObject* iter = PyObject_GetIter(seq);
+    if (!iter) return NULL;
+    Py_INCREF(acc);
+    PyObject* item;
+    while ((item = PyIter_Next(iter))) {
+        Py_SETREF(acc, PyNumber_Add(acc, item));
+        Py_DECREF(item);
+        if (!acc) break;
+    }
+    Py_DECREF(iter);
+    if (acc && PyErr_Occurred()) Py_CLEAR(acc);
+    return acc;
+}
+
+#define SUM_FLOAT(T) for (Py_ssize_t i = 0; i < n; i++) d += ((const T*)v.buf)[i];
+#define SUM_INT(T) \
+    for (; i < n; i++) { \
+        long long t; \
+        if (add_ovf(acc, (long long)((const T*)v.buf)[i], &t)) break; \
+        acc = t; \
+    }
+
+// reduce_add(seq, start=0) -> start + seq[0] + seq[1] + ...
+static PyObject* py_reduce_add(PyObject* self, PyObject* const* args, Py_ssize_t nargs) {
+    if (nargs < 1 || nargs > 2) {
+        PyErr_Format(PyExc_TypeError, "reduce_add() takes 1 or 2 arguments (%zd given)", nargs);
+        return NULL;
+    }
+    PyObject* seq = value_unwrap(args[0]);
+    PyObject* start = nargs == 2 ? value_unwrap(args[1]) : NULL;
+
+    Py_buffer v;
+    char kind = typed_view(seq, &v);
+    if (!kind) {
+        if (start) return reduce_generic(seq, start);
+        PyObject* zero = PyLong_FromLong(0);
+        if (!zero) return NULL;
+        PyObject* r = reduce_generic(seq, zero);
+        Py_DECREF(zero);
+        return r;
+    }
+
+    Py_ssize_t n = v.len / v.itemsize;
+    PyObject* res = NULL;
+    if (n == 0) {
+        // Like sum(): an empty sequence gives back start unchanged
+        PyBuffer_Release(&v);
+        if (start) { Py_INCREF(start); return start; }
+        return PyLong_FromLong(0);
+    }
+    if (kind_is_float(kind)) {
+        double d = 0.0;
+        if (start && !scalar_as('d', start, &d)) {
+            PyBuffer_Release(&v);
+            return reduce_generic(seq, start);
+        }
+        if (kind == 'd') { SUM_FLOAT(double) } else { SUM_FLOAT(float) }
+        res = PyFloat_FromDouble(d);
+    } else {
+        long long acc = 0;
+        if (start && !scalar_as('q', start, &acc)) {
+            PyBuffer_Release(&v);
+            return reduce_generic(seq, start);
+        }
+        Py_ssize_t i = 0;
+        switch (kind) {
+            case 'q': SUM_INT(long long); break;
+            case 'l': SUM_INT(long); break;
+            default:  SUM_INT(int); break;
+        }
+        res = PyLong_FromLongLong(acc);
+        // Overflowed long long: finish the remaining items with Python ints
+        for (; res && i < n; i++) {
+            long long x = kind == 'q' ? ((const long long*)v.buf)[i]
+                        : kind == 'l' ? ((const long*)v.buf)[i] : ((const int*)v.buf)[i];
+            PyObject* item = PyLong_FromLongLong(x);
+            if (!item) { Py_CLEAR(res); break; }
+            Py_SETREF(res, PyNumber_Add(res, item));
+            Py_DECREF(item);
+        }
+    }
+    PyBuffer_Release(&v);
+    return res;
+}
+
+static PyMethodDef bulk_functions[] = {
+    {"add_many", (PyCFunction)(void(*)(void))py_add_many, METH_FASTCALL,
+     "add_many(a, b): element-wise a + b over two sequences, or a sequence and a number."},
+    {"sub_many", (PyCFunction)(void(*)(void))py_sub_many, METH_FASTCALL,
+     "sub_many(a, b): element-wise a - b over two sequences, or a sequence and a number."},
+    {"mul_many", (PyCFunction)(void(*)(void))py_mul_many, METH_FASTCALL,
+     "mul_many(a, b): element-wise a * b over two sequences, or a sequence and a number."},
+    {"eq_many", (PyCFunction)(void(*)(void))py_eq_many, METH_FASTCALL,
+     "eq_many(a, b): list of element-wise a == b results."},
+    {"reduce_add", (PyCFunction)(void(*)(void))py_reduce_add, METH_FASTCALL,
+     "reduce_add(seq, start=0): sum of seq, summed in C for typed buffers."},
+    {NULL, NULL, 0, NULL}
+};
+
+int bulk_init(PyObject* module) {
+    if (!array_type) {
+        PyObject* array_mod = PyImport_ImportModule("array");
+        if (!array_mod) return -1;
+        array_type = PyObject_GetAttrString(array_mod, "array");
+        Py_DECREF(array_mod);
+        if (!array_type) return -1;
+    }
+    return PyModule_AddFunctions(module, bulk_functions);
+}
@@ -0,0 +1,91 @@
+// FILE: microps/native/index.c
+#include "native.h"
+
+// Hash indexes for repeated find / contains / search.
+//
+// An index is an item -> first position dict that a container builds
+// lazily on its INDEX_BUILD_AFTER-th search, so later lookups cost one
+// hash probe instead of a scan. Only the engine containers (Array,
+// PHPArray) carry one, inside the object itself: every change to them
+// goes through their own C code, which calls index_clear, so a built map
+// is never stale and dies with its container. Plain lists and tuples can
+// be changed behind _core's back and are always scanned.
+#define INDEX_MIN_LEN 16
+#define INDEX_BUILD_AFTER 2
+
+// New item -> position dict over the owner's items, or NULL. An
+// unhashable item leaves *unhashable set and no exception.
+static PyObject* index_build(PyObject* owner, index_items_fn items_fn, int* unhashable) {
+    PyObject* keys = NULL;
+    PyObject* items = items_fn(owner, &keys);
+    if (!items) return NULL;
+    PyObject* map = PyDict_New();
+    for (Py_ssize_t i = 0; map && i < PyList_GET_SIZE(items); i++) {
+        PyObject* pos = keys ? (Py_INCREF(PyList_GET_ITEM(keys, i)), PyList_GET_ITEM(keys, i))
+                             : PyLong_FromSsize_t(i);
+        if (!pos || !PyDict_SetDefault(map, PyList_GET_ITEM(items, i), pos)) Py_CLEAR(map);
+        Py_XDECREF(pos);
+    }
+    Py_DECREF(items);
+    Py_XDECREF(keys);
+    if (!map && PyErr_ExceptionMatches(PyExc_TypeError)) {
+        PyErr_Clear();
+        *unhashable = 1;
+    }
+    return map;
+}
+
+int index_lookup(PyObject* owner, LookupIndex* ix, Py_ssize_t len, PyObject* item,
+                 index_items_fn items_fn, PyObject** pos) {
+    if (len < INDEX_MIN_LEN) return INDEX_SCAN;
+    PyObject* map;
+    int build = 0;
+    uint64_t gen;
+    MP_BEGIN_CRITICAL(owner);
+    map = ix->map;
+    Py_XINCREF(map);
+    if (!map && !ix->unhashable && ++ix->hits >= INDEX_BUILD_AFTER) {
+        build = 1;
+        ix->hits = 0;
+    }
+    gen = ix->gen;
+    MP_END_CRITICAL();
+
+    if (build) {
+        // Hashing runs Python code, so the map is built outside the
+        // critical section and kept only if nothing changed meanwhile
+        int unhashable = 0;
+        map = index_build(owner, items_fn, &unhashable);
+        if (!map && !unhashable) return -1;
+        MP_BEGIN_CRITICAL(owner);
+        if (ix->gen != gen) {
+            Py_CLEAR(map);
+        } else if (unhashable) {
+            ix->unhashable = 1;
+        } else if (!ix->map) {
+            Py_INCREF(map);
+            ix->map = map;
+        }
+        MP_END_CRITICAL();
+    }
+    if (!map) return INDEX_SCAN;
+
+    PyObject* found = mp_dict_get_ref(map, item);
+    Py_DECREF(map);
+    if (found) {
+        *pos = found;
+        return 1;
+    }
+    if (!PyErr_Occurred()) return 0;
+    // An unhashable needle can still equal an item: scan for it
+    if (!PyErr_ExceptionMatches(PyExc_TypeError)) return -1;
+    PyErr_Clear();
+    return INDEX_SCAN;
+}
+
+void index_clear(LookupIndex* ix) {
+    Py_CLEAR(ix->map);
+    ix->hits = 0;
+    ix->unhashable = 0;
+    ix->gen++;
+}
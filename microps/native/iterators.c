@@ -0,0 +1,318 @@
+// FILE: microps/native/iterators.c
+#include "native.h"
+
+// Lazy counterparts of map_func / filter_func plus izip, take and chain.
+// Each holds only its source iterator(s) and produces one item per
+// __next__, so a pipeline over a file or generator runs in constant
+// memory. Sources are dropped as soon as they are exhausted.
+//
+// One layout serves all five types:
+//   imap, ifilter   fn + it
+//   take            it + n (items left)
+//   izip            its (tuple of iterators)
+//   chain           its (tuple of iterables) + n (next source) + it (current)
+//
+// Several threads may call next() on one stream. it / its / n change only
+// inside the stream's critical section, and a source is used through a
+// strong reference taken there, so dropping it in one thread never frees
+// it under another. The source iterators themselves are called outside.
+typedef struct {
+    PyObject_HEAD
+    PyObject* fn;
+    PyObject* it;
+    PyObject* its;
+    Py_ssize_t n;
+} StreamObject;
+
+static PyObject* stream_alloc(PyTypeObject* type, PyObject* fn, PyObject* it, PyObject* its, Py_ssize_t n) {
+    StreamObject* self = (StreamObject*)type->tp_alloc(type, 0);
+    if (!self) {
+        Py_XDECREF(it);
+        Py_XDECREF(its);
+        return NULL;
+    }
+    Py_XINCREF(fn);
+    self->fn = fn;
+    self->it = it;              // stolen
+    self->its = its;            // stolen
+    self->n = n;
+    return (PyObject*)self;
+}
+
+static int Stream_traverse(StreamObject* self, visitproc visit, void* arg) {
+    Py_VISIT(self->fn);
+    Py_VISIT(self->it);
+    Py_VISIT(self->its);
+    return 0;
+}
+
+static int Stream_clear(StreamObject* self) {
+    Py_CLEAR(self->fn);
+    Py_CLEAR(self->it);
+    Py_CLEAR(self->its);
+    return 0;
+}
+
+static void Stream_dealloc(StreamObject* self) {
+    PyObject_GC_UnTrack(self);
+    Stream_clear(self);
+    Py_TYPE(self)->tp_free((PyObject*)self);
+}
+
+// New reference to *slot (self->it or self->its), or NULL once dropped.
+static PyObject* stream_ref(StreamObject* self, PyObject** slot) {
+    PyObject* r;
+    MP_BEGIN_CRITICAL(self);
+    r = *slot;
+    Py_XINCREF(r);
+    MP_END_CRITICAL();
+    return r;
+}
+
+// Releases *slot if it still holds `old`, a source that ran dry.
+static void stream_drop(StreamObject* self, PyObject** slot, PyObject* old) {
+    PyObject* dead = NULL;
+    MP_BEGIN_CRITICAL(self);
+    if (*slot == old) {
+        dead = old;
+        *slot = NULL;
+    }
+    MP_END_CRITICAL();
+    Py_XDECREF(dead);
+}
+
+// Next item of self->it; the iterator is released once it runs dry.
+static PyObject* stream_pull(StreamObject* self) {
+    PyObject* it = stream_ref(self, &self->it);
+    if (!it) return NULL;
+    PyObject* item = PyIter_Next(it);
+    if (!item) stream_drop(self, &self->it, it);
+    Py_DECREF(it);
+    return item;
+}
+
+static int no_keywords(const char* name, PyObject* kwds) {
+    if (!kwds || PyDict_GET_SIZE(kwds) == 0) return 1;
+    PyErr_Format(PyExc_TypeError, "%s() takes no keyword arguments", name);
+    return 0;
+}
+
+#define STREAM_TYPE(var, pyname, doc, new_fn, next_fn) \
+    static PyTypeObject var = { \
+        PyVarObject_HEAD_INIT(NULL, 0) \
+        .tp_name = "microps._core." pyname, \
+        .tp_basicsize = sizeof(StreamObject), \
+        .tp_flags = Py_TPFLAGS_DEFAULT | Py_TPFLAGS_HAVE_GC, \
+        .tp_doc = doc, \
+        .tp_new = new_fn, \
+        .tp_dealloc = (destructor)Stream_dealloc, \
+        .tp_traverse = (traverseproc)Stream_traverse, \
+        .tp_clear = (inquiry)Stream_clear, \
+        .tp_iter = PyObject_SelfIter, \
+        .tp_iternext = (iternextfunc)next_fn, \
+    };
+
+// --- imap(fn, iterable) ---
+
+static PyObject* IMap_new(PyTypeObject* type, PyObject* args, PyObject* kwds) {
+    PyObject *fn, *iterable;
+    if (!no_keywords("imap", kwds) || !PyArg_UnpackTuple(args, "imap", 2, 2, &fn, &iterable)) return NULL;
+    if (!PyCallable_Check(fn)) {
+        PyErr_Format(PyExc_TypeError, "imap() argument 1 must be callable, not '%.200s'", Py_TYPE(fn)->tp_name);
+        return NULL;
+    }
+    PyObject* it = PyObject_GetIter(value_unwrap(iterable));
+    if (!it) return NULL;
+    return stream_alloc(type, fn, it, NULL, 0);
+}
+
+static PyObject* IMap_next(StreamObject* self) {
+    PyObject* item = stream_pull(self);
+    if (!item) return NULL;
+    PyObject* r = PyObject_CallOneArg(self->fn, item);
+    Py_DECREF(item);
+    return r;
+}
+
+STREAM_TYPE(IMap_Type, "imap", "imap(fn, iterable)\n\nLazy map: yields fn(item) one item at a time.",
+            IMap_new, IMap_next)
+
+// --- ifilter(fn, iterable) ---
+
+static PyObject* IFilter_new(PyTypeObject* type, PyObject* args, PyObject* kwds) {
+    PyObject *fn, *iterable;
+    if (!no_keywords("ifilter", kwds) || !PyArg_UnpackTuple(args, "ifilter", 2, 2, &fn, &iterable)) return NULL;
+    if (fn != Py_None && !PyCallable_Check(fn)) {
+        PyErr_Format(PyExc_TypeError, "ifilter() argument 1 must be callable or None, not '%.200s'",
+                     Py_TYPE(fn)->tp_name);
+        return NULL;
+    }
+    PyObject* it = PyObject_GetIter(value_unwrap(iterable));
+    if (!it) return NULL;
+    return stream_alloc(type, fn == Py_None ? NULL : fn, it, NULL, 0);
+}
+
+static PyObject* IFilter_next(StreamObject* self) {
+    PyObject* item;
+    while ((item = stream_pull(self))) {
+        int keep;
+        if (self->fn) {
+            PyObject* r = PyObject_CallOneArg(self->fn, item);
+            if (!r) { Py_DECREF(item); return NULL; }
+            keep = PyObject_IsTrue(r);
+            Py_DECREF(r);
+        } else {
+            keep = PyObject_IsTrue(item);
+        }
+        if (keep > 0) return item;
+        Py_DECREF(item);
+        if (keep < 0) return NULL;
+    }
+    return NULL;
+}
+
+STREAM_TYPE(IFilter_Type, "ifilter",
+            "ifilter(fn, iterable)\n\nLazy filter: yields the items for which fn(item) is true "
+            "(the item itself when fn is None).",
+            IFilter_new, IFilter_next)
+
+// --- take(iterable, n) ---
+
+static PyObject* Take_new(PyTypeObject* type, PyObject* args, PyObject* kwds) {
+    PyObject* iterable;
+    Py_ssize_t n;
+    if (!no_keywords("take", kwds) || !PyArg_ParseTuple(args, "On:take", &iterable, &n)) return NULL;
+    if (n < 0) {
+        PyErr_SetString(PyExc_ValueError, "take() count must be non-negative");
+        return NULL;
+    }
+    PyObject* it = PyObject_GetIter(value_unwrap(iterable));
+    if (!it) return NULL;
+    return stream_alloc(type, NULL, it, NULL, n);
+}
+
+static PyObject* Take_next(StreamObject* self) {
+    PyObject* dead = NULL;
+    int more;
+    MP_BEGIN_CRITICAL(self);
+    more = self->n > 0;
+    if (more) {
+        self->n--;
+    } else {
+        // Done: release the source without consuming anything more from it
+        dead = self->it;
+        self->it = NULL;
+    }
+    MP_END_CRITICAL();
+    if (!more) {
+        Py_XDECREF(dead);
+        return NULL;
+    }
+    return stream_pull(self);
+}
+
+STREAM_TYPE(Take_Type, "take", "take(iterable, n)\n\nYields at most the first n items.", Take_new, Take_next)
+
+// --- izip(*iterables) ---
+
+static PyObject* iter_all(PyObject* args) {
+    Py_ssize_t n = PyTuple_GET_SIZE(args);
+    PyObject* its = PyTuple_New(n);
+    if (!its) return NULL;
+    for (Py_ssize_t i = 0; i < n; i++) {
+        PyObject* it = PyObject_GetIter(value_unwrap(PyTuple_GET_ITEM(args, i)));
+        if (!it) { Py_DECREF(its); return NULL; }
+        PyTuple_SET_ITEM(its, i, it);
+    }
+    return its;
+}
+
+static PyObject* IZip_new(PyTypeObject* type, PyObject* args, PyObject* kwds) {
+    if (!no_keywords("izip", kwds)) return NULL;
+    PyObject* its = iter_all(args);
+    if (!its) return NULL;
+    return stream_alloc(type, NULL, NULL, its, 0);
+}
+
+static PyObject* IZip_next(StreamObject* self) {
+    PyObject* its = stream_ref(self, &self->its);
+    if (!its) return NULL;
+    Py_ssize_t n = PyTuple_GET_SIZE(its);
+    PyObject* row = n ? PyTuple_New(n) : NULL;
+    for (Py_ssize_t i = 0; row && i < n; i++) {
+        PyObject* item = PyIter_Next(PyTuple_GET_ITEM(its, i));
+        if (!item) {
+            // Shortest input ended (or raised): drop every source
+            Py_CLEAR(row);
+            stream_drop(self, &self->its, its);
+            break;
+        }
+        PyTuple_SET_ITEM(row, i, item);
+    }
+    Py_DECREF(its);
+    return row;
+}
+
+STREAM_TYPE(IZip_Type, "izip", "izip(*iterables)\n\nLazy zip: yields tuples until the shortest input ends.",
+            IZip_new, IZip_next)
+
+// --- chain(*iterables) ---
+
+static PyObject* Chain_new(PyTypeObject* type, PyObject* args, PyObject* kwds) {
+    if (!no_keywords("chain", kwds)) return NULL;
+    Py_INCREF(args);
+    return stream_alloc(type, NULL, NULL, args, 0);
+}
+
+// Opens the next source once the current one has run dry. 1 when there
+// is a current source, 0 when every source is done, -1 on error.
+static int chain_advance(StreamObject* self) {
+    PyObject* dead = NULL;
+    int r = 1;
+    MP_BEGIN_CRITICAL(self);
+    if (!self->its) {
+        r = 0;
+    } else if (!self->it) {
+        if (self->n >= PyTuple_GET_SIZE(self->its)) {
+            dead = self->its;
+            self->its = NULL;
+            r = 0;
+        } else {
+            // Sources are opened one at a time, only when reached. Opening
+            // stays inside the critical section so no source is skipped.
+            PyObject* src = PyTuple_GET_ITEM(self->its, self->n++);
+            self->it = PyObject_GetIter(value_unwrap(src));
+            if (!self->it) r = -1;
+        }
+    }
+    MP_END_CRITICAL();
+    Py_XDECREF(dead);
+    return r;
+}
+
+static PyObject* Chain_next(StreamObject* self) {
+    while (chain_advance(self) > 0) {
+        PyObject* item = stream_pull(self);
+        if (item || PyErr_Occurred()) return item;
+    }
+    return NULL;
+}
+
+STREAM_TYPE(Chain_Type, "chain", "chain(*iterables)\n\nYields every item of each input in turn.",
+            Chain_new, Chain_next)
+
+int iterators_init(PyObject* module) {
+    struct { const char* name; PyTypeObject* type; } types[] = {
+        {"imap", &IMap_Type}, {"ifilter", &IFilter_Type}, {"take", &Take_Type},
+        {"izip", &IZip_Type}, {"chain", &Chain_Type},
+    };
+    for (size_t i = 0; i < sizeof(types) / sizeof(types[0]); i++) {
+        if (PyType_Ready(types[i].type) < 0) return -1;
+        Py_INCREF(types[i].type);
+        if (PyModule_AddObject(module, types[i].name, (PyObject*)types[i].type) < 0) {
+            Py_DECREF(types[i].type);
+            return -1;
+        }
+    }
+    return 0;
+}
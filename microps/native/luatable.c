@@ -0,0 +1,735 @@
+// FILE: microps/native/luatable.c
+#include "native.h"
+#include <math.h>
+#include <stddef.h>
+
+// LuaTable: a Lua table with an array part and a hash part.
+//
+// Integer keys 1..n live in `array` (t[k] is array[k-1]); every other key
+// lives in the `hash` dict. Two invariants keep the length operator O(1)
+// and make it a valid Lua border:
+//   - the last array item is never nil, so t[n] ~= nil;
+//   - the hash never holds the key n+1: appending at n+1 pulls n+2, n+3,
+//     ... out of the hash, so t[n+1] == nil.
+// Assigning nil removes a key, as in Lua: a hash entry is deleted, an
+// array slot becomes a hole (None), and holes at the end are trimmed.
+// Integral float keys are normalized to ints (t[2.0] is t[2]). true and
+// false are keys of their own, unlike in a dict where True == 1: the hash
+// holds them as private stand-in objects, and they are read back as bools.
+//
+// next(k) is O(1) per step: array keys locate themselves, and the hash
+// position of the key next() returned last is remembered, so a
+// `while k := next(t, k)` traversal never rescans the dict. Fields may be
+// cleared during a traversal, like in Lua; adding keys has undefined order.
+//
+// luatable_share (snapshot.c) lets tables share one array and hash, with
+// `cow` pointing at a hidden holder table that keeps them; lt_own gives a
+// table its own copies before the first change.
+typedef struct {
+    PyObject_HEAD
+    PyObject* array;                // list of values for keys 1..n; None for holes
+    PyObject* hash;                 // dict of every other key
+    PyObject* cursor_key;           // hash key next() returned last, or NULL
+    Py_ssize_t cursor_pos;          // PyDict_Next position just after it
+    PyObject* cow;                  // holder of parts shared by luatable_share
+    PyObject* weakreflist;
+} LuaTableObject;
+
+// Stand-ins for true and false in the hash part
+static PyObject* _true_key = NULL;
+static PyObject* _false_key = NULL;
+
+// Lua-normalized key as a new reference: integral floats become ints and
+// bools their stand-ins. *slot is the array index (key - 1) for integer
+// keys >= 1, else -1.
+static PyObject* lt_key(PyObject* key, Py_ssize_t* slot) {
+    *slot = -1;
+    if (PyBool_Check(key)) {
+        key = key == Py_True ? _true_key : _false_key;
+    } else if (PyFloat_Check(key)) {
+        double d = PyFloat_AS_DOUBLE(key);
+        if (isfinite(d) && d == floor(d)) {
+            PyObject* as_int = PyLong_FromDouble(d);
+            if (!as_int) return NULL;
+            PyObject* r = lt_key(as_int, slot);
+            Py_DECREF(as_int);
+            return r;
+        }
+    } else if (PyLong_Check(key)) {
+        int overflow;
+        long long v = PyLong_AsLongLongAndOverflow(key, &overflow);
+        if (v == -1 && PyErr_Occurred()) return NULL;
+        if (!overflow && v >= 1 && v <= PY_SSIZE_T_MAX) *slot = (Py_ssize_t)(v - 1);
+    }
+    Py_INCREF(key);
+    return key;
+}
+
+// Borrowed key as the caller sees it: the bool behind a stand-in
+static PyObject* lt_user_key(PyObject* key) {
+    return key == _true_key ? Py_True : key == _false_key ? Py_False : key;
+}
+
+// Keys Lua refuses to store
+static int lt_check_store_key(PyObject* key) {
+    if (key == Py_None) {
+        PyErr_SetString(PyExc_TypeError, "table index is nil");
+        return -1;
+    }
+    if (PyFloat_Check(key) && isnan(PyFloat_AS_DOUBLE(key))) {
+        PyErr_SetString(PyExc_ValueError, "table index is NaN");
+        return -1;
+    }
+    return 0;
+}
+
+// New reference to t[key] (None when absent). Caller holds the table's
+// critical section.
+static PyObject* lt_get_locked(LuaTableObject* t, PyObject* key, Py_ssize_t slot) {
+    if (slot >= 0 && slot < PyList_GET_SIZE(t->array)) {
+        PyObject* v = PyList_GET_ITEM(t->array, slot);
+        Py_INCREF(v);
+        return v;
+    }
+    PyObject* v = mp_dict_get_ref(t->hash, key);
+    if (!v && !PyErr_Occurred()) {
+        Py_INCREF(Py_None);
+        v = Py_None;
+    }
+    return v;
+}
+
+// Drops the holes at the end of the array part.
+static int lt_trim(LuaTableObject* t) {
+    Py_ssize_t n = PyList_GET_SIZE(t->array), m = n;
+    while (m > 0 && PyList_GET_ITEM(t->array, m - 1) == Py_None) m--;
+    return m == n ? 0 : PyList_SetSlice(t->array, m, n, NULL);
+}
+
+// After the array part grew: moves n+1, n+2, ... from the hash onto it.
+static int lt_migrate(LuaTableObject* t) {
+    while (PyDict_GET_SIZE(t->hash)) {
+        PyObject* key = PyLong_FromSsize_t(PyList_GET_SIZE(t->array) + 1);
+        if (!key) return -1;
+        PyObject* v = mp_dict_get_ref(t->hash, key);
+        int err = 0;
+        if (v) {
+            err = PyDict_DelItem(t->hash, key) < 0 || PyList_Append(t->array, v) < 0 ? -1 : 0;
+            Py_DECREF(v);
+        } else if (PyErr_Occurred()) {
+            err = -1;
+        }
+        Py_DECREF(key);
+        if (err < 0 || !v) return err;
+    }
+    return 0;
+}
+
+// Before a shared table changes: copies the array and hash parts, unless
+// no other table shares them any more. Caller holds the critical section.
+static int lt_own(LuaTableObject* t) {
+    if (!t->cow) return 0;
+    if (!mp_unique(t->cow)) {
+        PyObject* array = PyList_GetSlice(t->array, 0, PyList_GET_SIZE(t->array));
+        PyObject* hash = array ? PyDict_Copy(t->hash) : NULL;
+        if (!hash) {
+            Py_XDECREF(array);
+            return -1;
+        }
+        // The holder keeps the shared parts alive: nothing is freed here
+        Py_SETREF(t->array, array);
+        Py_SETREF(t->hash, hash);
+        Py_CLEAR(t->cursor_key);        // hash positions differ in the copy
+    }
+    Py_CLEAR(t->cow);
+    return 0;
+}
+
+// t[key] = value with Lua semantics. Caller holds the critical section.
+static int lt_set_locked(LuaTableObject* t, PyObject* key, Py_ssize_t slot, PyObject* value) {
+    if (lt_own(t) < 0) return -1;
+    Py_ssize_t n = PyList_GET_SIZE(t->array);
+    if (slot >= 0 && slot < n) {
+        Py_INCREF(value);
+        if (PyList_SetItem(t->array, slot, value) < 0) return -1;
+        return value == Py_None && slot == n - 1 ? lt_trim(t) : 0;
+    }
+    if (slot == n) {
+        if (value == Py_None) return 0;        // n+1 is never in the hash
+        if (PyList_Append(t->array, value) < 0) return -1;
+        return lt_migrate(t);
+    }
+    if (value != Py_None) return PyDict_SetItem(t->hash, key, value);
+    if (PyDict_DelItem(t->hash, key) == 0) return 0;
+    if (!PyErr_ExceptionMatches(PyExc_KeyError)) return -1;
+    PyErr_Clear();
+    return 0;
+}
+
+static int lt_set(LuaTableObject* t, PyObject* key, PyObject* value) {
+    if (lt_check_store_key(key) < 0) return -1;
+    Py_ssize_t slot;
+    PyObject* k = lt_key(key, &slot);
+    if (!k) return -1;
+    int err;
+    MP_BEGIN_CRITICAL(t);
+    err = lt_set_locked(t, k, slot, value);
+    MP_END_CRITICAL();
+    // A __* write into a table used as a metatable invalidates MMCaches
+    if (!err && slot < 0 && PyUnicode_Check(k)) metatables_touch(k);
+    Py_DECREF(k);
+    return err;
+}
+
+static PyObject* lt_get(LuaTableObject* t, PyObject* key) {
+    if (key == Py_None) Py_RETURN_NONE;
+    Py_ssize_t slot;
+    PyObject* k = lt_key(key, &slot);
+    if (!k) return NULL;
+    PyObject* v;
+    MP_BEGIN_CRITICAL(t);
+    v = lt_get_locked(t, k, slot);
+    MP_END_CRITICAL();
+    Py_DECREF(k);
+    return v;
+}
+
+PyObject* luatable_get_ref(PyObject* t, PyObject* key) {
+    PyObject* v = lt_get((LuaTableObject*)t, key);
+    if (v == Py_None) Py_CLEAR(v);
+    return v;
+}
+
+static int lt_fill(LuaTableObject* t, PyObject* init) {
+    if (PyDict_Check(init) || LuaTable_Check(init)) {
+        PyObject* items = PyMapping_Items(init);
+        if (!items) return -1;
+        int err = 0;
+        for (Py_ssize_t i = 0; !err && i < PyList_GET_SIZE(items); i++) {
+            PyObject* kv = PyList_GET_ITEM(items, i);
+            err = lt_set(t, PyTuple_GET_ITEM(kv, 0), PyTuple_GET_ITEM(kv, 1));
+        }
+        Py_DECREF(items);
+        return err;
+    }
+    // A sequence fills t[1], t[2], ...; None items leave those keys unset
+    PyObject* it = PyObject_GetIter(init);
+    if (!it) return -1;
+    PyObject* item;
+    Py_ssize_t k = 0;
+    int err = 0;
+    while (!err && (item = PyIter_Next(it))) {
+        PyObject* key = PyLong_FromSsize_t(++k);
+        err = key ? lt_set(t, key, item) : -1;
+        Py_XDECREF(key);
+        Py_DECREF(item);
+    }
+    Py_DECREF(it);
+    return err || PyErr_Occurred() ? -1 : 0;
+}
+
+static PyObject* LuaTable_new(PyTypeObject* type, PyObject* args, PyObject* kwds) {
+    static char* kwlist[] = {"init", NULL};
+    PyObject* init = NULL;
+    if (!PyArg_ParseTupleAndKeywords(args, kwds, "|O:LuaTable", kwlist, &init)) return NULL;
+    LuaTableObject* t = (LuaTableObject*)type->tp_alloc(type, 0);
+    if (!t) return NULL;
+    t->array = PyList_New(0);
+    t->hash = PyDict_New();
+    if (!t->array || !t->hash || (init && init != Py_None && lt_fill(t, init) < 0)) {
+        Py_DECREF(t);
+        return NULL;
+    }
+    return (PyObject*)t;
+}
+
+static int LuaTable_traverse(LuaTableObject* t, visitproc visit, void* arg) {
+    Py_VISIT(t->array);
+    Py_VISIT(t->hash);
+    Py_VISIT(t->cursor_key);
+    Py_VISIT(t->cow);
+    return 0;
+}
+
+// Empties the parts rather than dropping them, so the table stays usable
+// if a finalizer reaches it during collection. Shared parts are left to
+// the holder, which is cleared too when they are garbage.
+static int LuaTable_clear(LuaTableObject* t) {
+    if (!t->cow && t->array) PyList_SetSlice(t->array, 0, PyList_GET_SIZE(t->array), NULL);
+    if (!t->cow && t->hash) PyDict_Clear(t->hash);
+    Py_CLEAR(t->cursor_key);
+    Py_CLEAR(t->cow);
+    return 0;
+}
+
+int luatable_share(PyObject* dst, PyObject* src) {
+    LuaTableObject *d = (LuaTableObject*)dst, *s = (LuaTableObject*)src;
+    LuaTableObject* holder = (LuaTableObject*)LuaTable_Type.tp_alloc(&LuaTable_Type, 0);
+    if (!holder) return -1;
+    PyObject *array, *hash, *cursor, *cow;
+    MP_BEGIN_CRITICAL2(dst, src);
+    if (!s->cow) {
+        // First share: the holder keeps src's parts as they are now
+        Py_INCREF(s->array);
+        Py_INCREF(s->hash);
+        holder->array = s->array;
+        holder->hash = s->hash;
+        s->cow = (PyObject*)holder;
+        holder = NULL;
+    }
+    array = d->array;
+    hash = d->hash;
+    cursor = d->cursor_key;
+    cow = d->cow;
+    Py_INCREF(s->array);
+    Py_INCREF(s->hash);
+    Py_INCREF(s->cow);
+    d->array = s->array;
+    d->hash = s->hash;
+    d->cursor_key = NULL;
+    d->cow = s->cow;
+    MP_END_CRITICAL2();
+    Py_XDECREF(holder);
+    Py_XDECREF(array);
+    Py_XDECREF(hash);
+    Py_XDECREF(cursor);
+    Py_XDECREF(cow);
+    return 0;
+}
+
+static void LuaTable_dealloc(LuaTableObject* t) {
+    PyObject_GC_UnTrack(t);
+    if (t->weakreflist) PyObject_ClearWeakRefs((PyObject*)t);
+    Py_XDECREF(t->array);
+    Py_XDECREF(t->hash);
+    Py_XDECREF(t->cursor_key);
+    Py_XDECREF(t->cow);
+    Py_TYPE(t)->tp_free((PyObject*)t);
+}
+
+// ---- Mapping protocol: t[k], t[k] = v, len(t) is the border ----
+
+static Py_ssize_t LuaTable_length(LuaTableObject* t) {
+    return PyList_GET_SIZE(t->array);
+}
+
+static PyObject* LuaTable_getitem(LuaTableObject* t, PyObject* key) {
+    return lt_get(t, key);
+}
+
+static int LuaTable_setitem(LuaTableObject* t, PyObject* key, PyObject* value) {
+    return lt_set(t, key, value ? value : Py_None);     // del t[k] is t[k] = nil
+}
+
+static int LuaTable_contains(LuaTableObject* t, PyObject* key) {
+    PyObject* v = lt_get(t, key);
+    if (!v) {
+        if (!PyErr_ExceptionMatches(PyExc_TypeError)) return -1;
+        PyErr_Clear();                                  // unhashable: never a key
+        return 0;
+    }
+    int found = v != Py_None;
+    Py_DECREF(v);
+    return found;
+}
+
+// ---- next() ----
+
+static int lt_same_key(PyObject* a, PyObject* b) {
+    return a == b ? 1 : PyObject_RichCompareBool(a, b, Py_EQ);
+}
+
+// (key, value) after `key`, None at the end, NULL on error. Caller holds
+// the critical section.
+static PyObject* lt_next_locked(LuaTableObject* t, PyObject* key, Py_ssize_t slot) {
+    Py_ssize_t n = PyList_GET_SIZE(t->array), i = 0, pos = 0;
+    if (key != Py_None) {
+        if (slot >= 0 && slot < n) {
+            i = slot + 1;
+        } else {
+            i = n;
+            int same = t->cursor_key ? lt_same_key(t->cursor_key, key) : 0;
+            if (same < 0) return NULL;
+            if (same) {
+                pos = t->cursor_pos;
+            } else {
+                // Not where the last step left off: find key the slow way
+                PyObject *k, *v;
+                while (!same && PyDict_Next(t->hash, &pos, &k, &v)) {
+                    same = lt_same_key(k, key);
+                    if (same < 0) return NULL;
+                }
+                if (!same && slot < 0) {
+                    PyErr_SetString(PyExc_KeyError, "invalid key to 'next'");
+                    return NULL;
+                }
+                // An array key cleared mid-traversal and trimmed off the
+                // end: the array part is done, the hash part comes next
+                if (!same) pos = 0;
+            }
+        }
+    }
+    for (; i < n; i++) {
+        PyObject* v = PyList_GET_ITEM(t->array, i);
+        if (v != Py_None) return Py_BuildValue("(nO)", i + 1, v);
+    }
+    PyObject *k, *v;
+    if (PyDict_Next(t->hash, &pos, &k, &v)) {
+        Py_INCREF(k);
+        Py_XSETREF(t->cursor_key, k);
+        t->cursor_pos = pos;
+        return PyTuple_Pack(2, lt_user_key(k), v);
+    }
+    Py_CLEAR(t->cursor_key);
+    Py_RETURN_NONE;
+}
+
+static PyObject* LuaTable_next(LuaTableObject* t, PyObject* const* args, Py_ssize_t nargs) {
+    if (nargs > 1) {
+        PyErr_Format(PyExc_TypeError, "next() takes at most 1 argument (%zd given)", nargs);
+        return NULL;
+    }
+    PyObject* key = nargs ? args[0] : Py_None;
+    Py_ssize_t slot = -1;
+    PyObject* k = key == Py_None ? (Py_INCREF(key), key) : lt_key(key, &slot);
+    if (!k) return NULL;
+    PyObject* r;
+    MP_BEGIN_CRITICAL(t);
+    r = lt_next_locked(t, k, slot);
+    MP_END_CRITICAL();
+    Py_DECREF(k);
+    return r;
+}
+
+// ---- Iterators: pairs(), ipairs(), keys / values ----
+
+typedef enum { LT_PAIRS, LT_IPAIRS, LT_KEYS, LT_VALUES } LtIterKind;
+
+typedef struct {
+    PyObject_HEAD
+    LuaTableObject* table;
+    LtIterKind kind;
+    Py_ssize_t i;                   // next array index
+    Py_ssize_t pos;                 // PyDict_Next position in the hash
+} LuaTableIterObject;
+
+static void LuaTableIter_dealloc(LuaTableIterObject* it) {
+    PyObject_GC_UnTrack(it);
+    Py_XDECREF(it->table);
+    PyObject_GC_Del(it);
+}
+
+static int LuaTableIter_traverse(LuaTableIterObject* it, visitproc visit, void* arg) {
+    Py_VISIT(it->table);
+    return 0;
+}
+
+static PyObject* lt_yield(LtIterKind kind, PyObject* k, PyObject* v) {
+    k = lt_user_key(k);
+    if (kind == LT_KEYS) { Py_INCREF(k); return k; }
+    if (kind == LT_VALUES) { Py_INCREF(v); return v; }
+    return PyTuple_Pack(2, k, v);
+}
+
+static PyObject* lt_iter_step(LuaTableIterObject* it) {
+    LuaTableObject* t = it->table;
+    Py_ssize_t n = PyList_GET_SIZE(t->array);
+    while (it->i < n) {
+        PyObject* v = PyList_GET_ITEM(t->array, it->i++);
+        if (v == Py_None) {
+            if (it->kind == LT_IPAIRS) return NULL;     // ipairs stops at the first nil
+            continue;
+        }
+        PyObject* k = PyLong_FromSsize_t(it->i);
+        if (!k) return NULL;
+        PyObject* r = lt_yield(it->kind, k, v);
+        Py_DECREF(k);
+        return r;
+    }
+    PyObject *k, *v;
+    if (it->kind != LT_IPAIRS && PyDict_Next(t->hash, &it->pos, &k, &v)) return lt_yield(it->kind, k, v);
+    return NULL;
+}
+
+static PyObject* LuaTableIter_next(LuaTableIterObject* it) {
+    if (!it->table) return NULL;
+    PyObject* r;
+    MP_BEGIN_CRITICAL(it->table);
+    r = lt_iter_step(it);
+    MP_END_CRITICAL();
+    if (!r) Py_CLEAR(it->table);
+    return r;
+}
+
+static PyTypeObject LuaTableIter_Type = {
+    PyVarObject_HEAD_INIT(NULL, 0)
+    .tp_name = "microps._core.LuaTableIterator",
+    .tp_basicsize = sizeof(LuaTableIterObject),
+    .tp_flags = Py_TPFLAGS_DEFAULT | Py_TPFLAGS_HAVE_GC,
+    .tp_dealloc = (destructor)LuaTableIter_dealloc,
+    .tp_traverse = (traverseproc)LuaTableIter_traverse,
+    .tp_iter = PyObject_SelfIter,
+    .tp_iternext = (iternextfunc)LuaTableIter_next,
+};
+
+static PyObject* lt_iter_new(LuaTableObject* t, LtIterKind kind) {
+    LuaTableIterObject* it = PyObject_GC_New(LuaTableIterObject, &LuaTableIter_Type);
+    if (!it) return NULL;
+    Py_INCREF(t);
+    it->table = t;
+    it->kind = kind;
+    it->i = 0;
+    it->pos = 0;
+    PyObject_GC_Track(it);
+    return (PyObject*)it;
+}
+
+static PyObject* LuaTable_iter(LuaTableObject* t) { return lt_iter_new(t, LT_KEYS); }
+static PyObject* LuaTable_pairs(LuaTableObject* t, PyObject* unused) { return lt_iter_new(t, LT_PAIRS); }
+static PyObject* LuaTable_ipairs(LuaTableObject* t, PyObject* unused) { return lt_iter_new(t, LT_IPAIRS); }
+
+static PyObject* lt_collect(LuaTableObject* t, LtIterKind kind) {
+    PyObject* it = lt_iter_new(t, kind);
+    if (!it) return NULL;
+    PyObject* r = PySequence_List(it);
+    Py_DECREF(it);
+    return r;
+}
+
+static PyObject* LuaTable_keys(LuaTableObject* t, PyObject* unused) { return lt_collect(t, LT_KEYS); }
+static PyObject* LuaTable_values(LuaTableObject* t, PyObject* unused) { return lt_collect(t, LT_VALUES); }
+static PyObject* LuaTable_items(LuaTableObject* t, PyObject* unused) { return lt_collect(t, LT_PAIRS); }
+
+// ---- table library ----
+
+// insert(value) appends at #t+1; insert(pos, value) shifts t[pos..#t] up
+static PyObject* LuaTable_insert(LuaTableObject* t, PyObject* const* args, Py_ssize_t nargs) {
+    if (nargs != 1 && nargs != 2) {
+        PyErr_Format(PyExc_TypeError, "insert() takes 1 or 2 arguments (%zd given)", nargs);
+        return NULL;
+    }
+    Py_ssize_t pos = -1;
+    if (nargs == 2) {
+        pos = PyNumber_AsSsize_t(args[0], PyExc_IndexError);
+        if (pos == -1 && PyErr_Occurred()) return NULL;
+    }
+    PyObject* value = args[nargs - 1];
+    int err = 0;
+    MP_BEGIN_CRITICAL(t);
+    Py_ssize_t n = PyList_GET_SIZE(t->array);
+    if (nargs == 1) pos = n + 1;
+    if (lt_own(t) < 0) {
+        err = -1;
+    } else if (pos < 1 || pos > n + 1) {
+        PyErr_SetString(PyExc_IndexError, "insert() position out of bounds");
+        err = -1;
+    } else if (pos == n + 1) {
+        err = value == Py_None ? 0 : PyList_Append(t->array, value);
+        if (!err && value != Py_None) err = lt_migrate(t);
+    } else {
+        err = PyList_Insert(t->array, pos - 1, value);
+        if (!err) err = lt_migrate(t);
+    }
+    MP_END_CRITICAL();
+    if (err < 0) return NULL;
+    Py_RETURN_NONE;
+}
+
+// remove(pos=#t): removes and returns t[pos], shifting the rest down
+static PyObject* LuaTable_remove(LuaTableObject* t, PyObject* const* args, Py_ssize_t nargs) {
+    if (nargs > 1) {
+        PyErr_Format(PyExc_TypeError, "remove() takes at most 1 argument (%zd given)", nargs);
+        return NULL;
+    }
+    Py_ssize_t pos = -1;
+    if (nargs && args[0] != Py_None) {
+        pos = PyNumber_AsSsize_t(args[0], PyExc_IndexError);
+        if (pos == -1 && PyErr_Occurred()) return NULL;
+    }
+    PyObject* r = NULL;
+    MP_BEGIN_CRITICAL(t);
+    Py_ssize_t n = PyList_GET_SIZE(t->array);
+    if (pos == -1) pos = n;
+    if (n == 0 && (pos == 0 || pos == 1)) {
+        Py_INCREF(Py_None);
+        r = Py_None;
+    } else if (pos < 1 || pos > n + 1) {
+        PyErr_SetString(PyExc_IndexError, "remove() position out of bounds");
+    } else if (pos == n + 1) {
+        Py_INCREF(Py_None);                             // t[#t+1] is always nil
+        r = Py_None;
+    } else if (lt_own(t) == 0) {
+        r = PyList_GET_ITEM(t->array, pos - 1);
+        Py_INCREF(r);
+        if (PySequence_DelItem(t->array, pos - 1) < 0 || lt_trim(t) < 0) Py_CLEAR(r);
+    }
+    MP_END_CRITICAL();
+    return r;
+}
+
+// Parses the optional (i=1, j=#t) range shared by concat and unpack.
+static int lt_range(LuaTableObject* t, PyObject* i_obj, PyObject* j_obj, Py_ssize_t* i, Py_ssize_t* j) {
+    *i = 1;
+    *j = PyList_GET_SIZE(t->array);
+    if (i_obj && i_obj != Py_None) {
+        *i = PyNumber_AsSsize_t(i_obj, PyExc_OverflowError);
+        if (*i == -1 && PyErr_Occurred()) return -1;
+    }
+    if (j_obj && j_obj != Py_None) {
+        *j = PyNumber_AsSsize_t(j_obj, PyExc_OverflowError);
+        if (*j == -1 && PyErr_Occurred()) return -1;
+    }
+    return 0;
+}
+
+// New list of t[i..j]; hash keys are consulted past the array part.
+static PyObject* lt_slice(LuaTableObject* t, Py_ssize_t i, Py_ssize_t j) {
+    PyObject* out = PyList_New(j >= i ? j - i + 1 : 0);
+    if (!out) return NULL;
+    for (Py_ssize_t k = i; k <= j; k++) {
+        PyObject* key = PyLong_FromSsize_t(k);
+        PyObject* v = key ? lt_get(t, key) : NULL;
+        Py_XDECREF(key);
+        if (!v) { Py_DECREF(out); return NULL; }
+        PyList_SET_ITEM(out, k - i, v);
+    }
+    return out;
+}
+
+// concat(sep='', i=1, j=#t): strings and numbers only, like Lua
+static PyObject* LuaTable_concat(LuaTableObject* t, PyObject* args, PyObject* kwds) {
+    static char* kwlist[] = {"sep", "i", "j", NULL};
+    PyObject *sep = NULL, *i_obj = NULL, *j_obj = NULL;
+    Py_ssize_t i, j;
+    if (!PyArg_ParseTupleAndKeywords(args, kwds, "|UOO:concat", kwlist, &sep, &i_obj, &j_obj) ||
+        lt_range(t, i_obj, j_obj, &i, &j) < 0) return NULL;
+    PyObject* parts = lt_slice(t, i, j);
+    if (!parts) return NULL;
+    for (Py_ssize_t k = 0; k < PyList_GET_SIZE(parts); k++) {
+        PyObject* v = PyList_GET_ITEM(parts, k);
+        if (PyUnicode_Check(v)) continue;
+        if (!(PyLong_Check(v) || PyFloat_Check(v)) || PyBool_Check(v)) {
+            PyErr_Format(PyExc_TypeError, "invalid value (at index %zd) in table for 'concat'", i + k);
+            Py_DECREF(parts);
+            return NULL;
+        }
+        PyObject* s = PyObject_Str(v);
+        if (!s) { Py_DECREF(parts); return NULL; }
+        PyList_SetItem(parts, k, s);
+    }
+    PyObject* empty = sep ? NULL : PyUnicode_New(0, 0);
+    PyObject* r = (sep || empty) ? PyUnicode_Join(sep ? sep : empty, parts) : NULL;
+    Py_XDECREF(empty);
+    Py_DECREF(parts);
+    return r;
+}
+
+// unpack(i=1, j=#t) -> tuple
+static PyObject* LuaTable_unpack(LuaTableObject* t, PyObject* const* args, Py_ssize_t nargs) {
+    if (nargs > 2) {
+        PyErr_Format(PyExc_TypeError, "unpack() takes at most 2 arguments (%zd given)", nargs);
+        return NULL;
+    }
+    Py_ssize_t i, j;
+    if (lt_range(t, nargs > 0 ? args[0] : NULL, nargs > 1 ? args[1] : NULL, &i, &j) < 0) return NULL;
+    PyObject* items = lt_slice(t, i, j);
+    if (!items) return NULL;
+    PyObject* r = PyList_AsTuple(items);
+    Py_DECREF(items);
+    return r;
+}
+
+// sort(key=None, reverse=False): sorts t[1..#t] in place (list.sort rules)
+static PyObject* LuaTable_sort(LuaTableObject* t, PyObject* args, PyObject* kwds) {
+    if (PyTuple_GET_SIZE(args)) {
+        PyErr_SetString(PyExc_TypeError, "sort() takes keyword arguments only");
+        return NULL;
+    }
+    PyObject* sort = NULL;
+    MP_BEGIN_CRITICAL(t);
+    if (lt_own(t) == 0) sort = PyObject_GetAttrString(t->array, "sort");
+    MP_END_CRITICAL();
+    if (!sort) return NULL;
+    PyObject* r = PyObject_Call(sort, args, kwds);
+    Py_DECREF(sort);
+    return r;
+}
+
+static PyObject* LuaTable_repr(LuaTableObject* t) {
+    int rec = Py_ReprEnter((PyObject*)t);
+    if (rec != 0) return rec > 0 ? PyUnicode_FromString("LuaTable(...)") : NULL;
+    PyObject* items = lt_collect(t, LT_PAIRS);
+    PyObject* d = items ? PyDict_New() : NULL;
+    PyObject* r = NULL;
+    if (d && PyDict_MergeFromSeq2(d, items, 1) == 0) r = PyUnicode_FromFormat("LuaTable(%R)", d);
+    Py_XDECREF(d);
+    Py_XDECREF(items);
+    Py_ReprLeave((PyObject*)t);
+    return r;
+}
+
+static PyMappingMethods LuaTable_as_mapping = {
+    .mp_length = (lenfunc)LuaTable_length,
+    .mp_subscript = (binaryfunc)LuaTable_getitem,
+    .mp_ass_subscript = (objobjargproc)LuaTable_setitem,
+};
+
+static PySequenceMethods LuaTable_as_sequence = {
+    .sq_contains = (objobjproc)LuaTable_contains,
+};
+
+static PyMethodDef LuaTable_methods[] = {
+    {"insert", (PyCFunction)(void(*)(void))LuaTable_insert, METH_FASTCALL,
+     "insert([pos,] value): table.insert; pos defaults to #t+1."},
+    {"remove", (PyCFunction)(void(*)(void))LuaTable_remove, METH_FASTCALL,
+     "remove(pos=#t): table.remove; returns the removed value."},
+    {"concat", (PyCFunction)(void(*)(void))LuaTable_concat, METH_VARARGS | METH_KEYWORDS,
+     "concat(sep='', i=1, j=#t): table.concat."},
+    {"unpack", (PyCFunction)(void(*)(void))LuaTable_unpack, METH_FASTCALL,
+     "unpack(i=1, j=#t): t[i], ..., t[j] as a tuple."},
+    {"sort", (PyCFunction)(void(*)(void))LuaTable_sort, METH_VARARGS | METH_KEYWORDS,
+     "sort(key=None, reverse=False): sort t[1..#t] in place."},
+    {"next", (PyCFunction)(void(*)(void))LuaTable_next, METH_FASTCALL,
+     "next(key=None): (key, value) after key, or None at the end; O(1) per step."},
+    {"pairs", (PyCFunction)LuaTable_pairs, METH_NOARGS,
+     "pairs(): iterator of (key, value), array part first."},
+    {"ipairs", (PyCFunction)LuaTable_ipairs, METH_NOARGS,
+     "ipairs(): iterator of (i, t[i]) for i = 1, 2, ... up to the first nil."},
+    {"keys", (PyCFunction)LuaTable_keys, METH_NOARGS, "keys(): list of keys in pairs() order."},
+    {"values", (PyCFunction)LuaTable_values, METH_NOARGS, "values(): list of values in pairs() order."},
+    {"items", (PyCFunction)LuaTable_items, METH_NOARGS, "items(): list of (key, value) in pairs() order."},
+    {NULL, NULL, 0, NULL}
+};
+
+PyTypeObject LuaTable_Type = {
+    PyVarObject_HEAD_INIT(NULL, 0)
+    .tp_name = "microps._core.LuaTable",
+    .tp_basicsize = sizeof(LuaTableObject),
+    .tp_flags = Py_TPFLAGS_DEFAULT | Py_TPFLAGS_BASETYPE | Py_TPFLAGS_HAVE_GC,
+    .tp_doc = "LuaTable(init=None)\n\nLua table: integer keys 1..n in an array part, other keys in a "
+              "hash part. Missing keys read as None, assigning None removes a key, and len() is the "
+              "border #t. init is a dict of fields or a sequence for t[1], t[2], ...",
+    .tp_new = LuaTable_new,
+    .tp_dealloc = (destructor)LuaTable_dealloc,
+    .tp_traverse = (traverseproc)LuaTable_traverse,
+    .tp_clear = (inquiry)LuaTable_clear,
+    .tp_repr = (reprfunc)LuaTable_repr,
+    .tp_iter = (getiterfunc)LuaTable_iter,
+    .tp_weaklistoffset = offsetof(LuaTableObject, weakreflist),
+    .tp_as_mapping = &LuaTable_as_mapping,
+    .tp_as_sequence = &LuaTable_as_sequence,
+    .tp_methods = LuaTable_methods,
+};
+
+int luatable_init(PyObject* module) {
+    _true_key = PyObject_CallNoArgs((PyObject*)&PyBaseObject_Type);
+    _false_key = _true_key ? PyObject_CallNoArgs((PyObject*)&PyBaseObject_Type) : NULL;
+    if (!_false_key) return -1;
+    if (PyType_Ready(&LuaTableIter_Type) < 0 || PyType_Ready(&LuaTable_Type) < 0) return -1;
+    Py_INCREF(&LuaTable_Type);
+    if (PyModule_AddObject(module, "LuaTable", (PyObject*)&LuaTable_Type) < 0) {
+        Py_DECREF(&LuaTable_Type);
+        return -1;
+    }
+    return 0;
+}
@@ -0,0 +1,401 @@
+// FILE: microps/native/metatables.c
+#include "native.h"
+#include <stddef.h>
+
+// Metatable registry shared by every engine.
+//
+// _registry maps the object's address (as an int) to a (holder, metatable)
+// tuple. For objects that support weak references the holder is a weakref
+// whose callback drops the entry while the object is being destroyed, so a
+// recycled address never inherits a stale metatable. Lists, dicts and other
+// objects without weakref support are held strongly instead (which also
+// pins their address); those entries are swept once nothing but the
+// registry refers to the object any more.
+static PyObject* _registry = NULL;
+static Py_ssize_t _strong_count = 0;
+static Py_ssize_t _sweep_at = 64;
+
+// Bumped whenever an entry is added, replaced or dropped (_registry_epoch)
+// and whenever a __* key is written into a LuaTable (_content_epoch).
+// MMCache entries are valid only for the epochs they were filled under.
+static uint64_t _registry_epoch = 0;
+static uint64_t _content_epoch = 0;
+
+// Every read-modify-write of the registry, the counters and the epochs runs
+// in a critical section on _registry; lookups take strong references (see
+// THREADING in native.h).
+
+// Plain numbers and nil never carry a metatable.
+static inline int mt_never(PyObject* obj) {
+    return obj == Py_None || PyLong_CheckExact(obj) || PyFloat_CheckExact(obj) || PyBool_Check(obj);
+}
+
+int metatables_active(void) {
+    return _registry && PyDict_GET_SIZE(_registry) != 0;
+}
+
+// Weakref callback; `key` is bound as the function's self.
+static PyObject* mt_drop(PyObject* key, PyObject* wr) {
+    int err = 0;
+    MP_BEGIN_CRITICAL(_registry);
+    PyObject* entry = mp_dict_get_ref(_registry, key);
+    // Only drop the entry this weakref created; a later setmetatable on the
+    // same object replaces the holder.
+    if (entry && PyTuple_GET_ITEM(entry, 0) == wr) {
+        _registry_epoch++;
+        err = PyDict_DelItem(_registry, key);
+    }
+    if (!entry && PyErr_Occurred()) err = -1;
+    Py_XDECREF(entry);
+    MP_END_CRITICAL();
+    if (err < 0) return NULL;
+    Py_RETURN_NONE;
+}
+
+static PyMethodDef mt_drop_def = {"_mt_drop", (PyCFunction)mt_drop, METH_O, NULL};
+
+static int mt_is_strong(PyObject* entry) {
+    return !PyWeakref_CheckRef(PyTuple_GET_ITEM(entry, 0));
+}
+
+// Removes strongly held entries whose object is otherwise unreferenced.
+static int mt_sweep(void) {
+    PyObject* dead = PyList_New(0);
+    if (!dead) return -1;
+    Py_ssize_t pos = 0;
+    PyObject *key, *entry;
+    while (PyDict_Next(_registry, &pos, &key, &entry)) {
+        if (mt_is_strong(entry) && Py_REFCNT(PyTuple_GET_ITEM(entry, 0)) == 1) {
+            if (PyList_Append(dead, key) < 0) { Py_DECREF(dead); return -1; }
+        }
+    }
+    for (Py_ssize_t i = 0; i < PyList_GET_SIZE(dead); i++) {
+        if (PyDict_DelItem(_registry, PyList_GET_ITEM(dead, i)) < 0) { Py_DECREF(dead); return -1; }
+    }
+    _strong_count -= PyList_GET_SIZE(dead);
+    if (PyList_GET_SIZE(dead)) _registry_epoch++;
+    Py_DECREF(dead);
+    _sweep_at = _strong_count * 2 > 64 ? _strong_count * 2 : 64;
+    return 0;
+}
+
+static int mt_remove(PyObject* key) {
+    PyObject* entry = mp_dict_get_ref(_registry, key);
+    if (!entry) return PyErr_Occurred() ? -1 : 0;
+    if (mt_is_strong(entry)) _strong_count--;
+    Py_DECREF(entry);
+    _registry_epoch++;
+    return PyDict_DelItem(_registry, key);
+}
+
+static int mt_set_locked(PyObject* obj, PyObject* mt);
+
+static int mt_set(PyObject* obj, PyObject* mt) {
+    int err;
+    MP_BEGIN_CRITICAL(_registry);
+    err = mt_set_locked(obj, mt);
+    MP_END_CRITICAL();
+    return err;
+}
+
+static int mt_set_locked(PyObject* obj, PyObject* mt) {
+    PyObject* key = PyLong_FromVoidPtr(obj);
+    if (!key) return -1;
+    if (mt_remove(key) < 0) { Py_DECREF(key); return -1; }
+    if (mt == Py_None) { Py_DECREF(key); return 0; }
+
+    PyObject* holder;
+    int strong = !PyType_SUPPORTS_WEAKREFS(Py_TYPE(obj));
+    if (strong) {
+        Py_INCREF(obj);
+        holder = obj;
+    } else {
+        PyObject* callback = PyCFunction_New(&mt_drop_def, key);
+        if (!callback) { Py_DECREF(key); return -1; }
+        holder = PyWeakref_NewRef(obj, callback);
+        Py_DECREF(callback);
+        if (!holder) { Py_DECREF(key); return -1; }
+    }
+    PyObject* entry = PyTuple_Pack(2, holder, mt);
+    Py_DECREF(holder);
+    if (!entry) { Py_DECREF(key); return -1; }
+    int err = PyDict_SetItem(_registry, key, entry);
+    Py_DECREF(entry);
+    Py_DECREF(key);
+    if (err < 0) return -1;
+    _registry_epoch++;
+    if (strong && ++_strong_count > _sweep_at) return mt_sweep();
+    return 0;
+}
+
+// Returns a new reference to obj's metatable, or NULL (no exception) when
+// it has none.
+PyObject* metatable_get(PyObject* obj) {
+    if (!metatables_active() || mt_never(obj)) return NULL;
+    PyObject* key = PyLong_FromVoidPtr(obj);
+    if (!key) return NULL;
+    PyObject* entry = mp_dict_get_ref(_registry, key);
+    Py_DECREF(key);
+    if (!entry) return NULL;
+    PyObject* mt = PyTuple_GET_ITEM(entry, 1);
+    Py_INCREF(mt);
+    Py_DECREF(entry);
+    return mt;
+}
+
+void metatables_touch(PyObject* key) {
+    if (!metatables_active()) return;
+    if (key && !(PyUnicode_Check(key) && PyUnicode_GET_LENGTH(key) >= 2 &&
+                 PyUnicode_READ_CHAR(key, 0) == '_' && PyUnicode_READ_CHAR(key, 1) == '_'))
+        return;
+    MP_BEGIN_CRITICAL(_registry);
+    _content_epoch++;
+    MP_END_CRITICAL();
+}
+
+PyObject* metatables_save(void) {
+    PyObject* saved;
+    MP_BEGIN_CRITICAL(_registry);
+    saved = PyDict_Copy(_registry);
+    MP_END_CRITICAL();
+    return saved;
+}
+
+// 1 if the entry's object is still alive, 0 if its weakref has died.
+static int mt_alive(PyObject* entry) {
+    if (mt_is_strong(entry)) return 1;
+#if PY_VERSION_HEX >= 0x030D0000
+    PyObject* obj;
+    int r = PyWeakref_GetRef(PyTuple_GET_ITEM(entry, 0), &obj);
+    Py_XDECREF(obj);
+    return r;
+#else
+    return PyWeakref_GET_OBJECT(PyTuple_GET_ITEM(entry, 0)) != Py_None;
+#endif
+}
+
+// The entries keep their original weakrefs, whose callbacks still drop
+// exactly those entries when the objects die.
+int metatables_load(PyObject* saved) {
+    int err = 0;
+    MP_BEGIN_CRITICAL(_registry);
+    PyDict_Clear(_registry);
+    _strong_count = 0;
+    Py_ssize_t pos = 0;
+    PyObject *key, *entry;
+    while (!err && PyDict_Next(saved, &pos, &key, &entry)) {
+        int alive = mt_alive(entry);
+        if (alive > 0) err = PyDict_SetItem(_registry, key, entry);
+        else if (alive < 0) err = -1;
+        if (alive > 0 && mt_is_strong(entry)) _strong_count++;
+    }
+    _sweep_at = _strong_count * 2 > 64 ? _strong_count * 2 : 64;
+    _registry_epoch++;
+    _content_epoch++;
+    MP_END_CRITICAL();
+    return err;
+}
+
+// ==================== METAMETHOD CACHE ====================
+// One MMCache per operator call site. Resolving the same object again is a
+// pointer and two epoch compares; a different object that shares the last
+// metatable costs one registry probe but skips the metatable lookup.
+// Only LuaTable metatables have their metamethod cached: every write to
+// one goes through luatable.c, which bumps _content_epoch. A plain dict
+// can be written behind _core's back, so its field is read on each call.
+typedef struct {
+    PyObject_HEAD
+    vectorcallfunc vectorcall;
+    PyObject* name;                 // metamethod name, e.g. "__add"
+    void* obj;                      // last object resolved (address only)
+    PyObject* mt;                   // its metatable, or NULL
+    PyObject* fn;                   // resolved metamethod (LuaTable mt), or NULL
+    uint64_t registry_epoch;
+    uint64_t content_epoch;
+} MMCacheObject;
+
+// New reference to metatable field `name`, or NULL (no exception) when
+// absent. Metatables are dicts or LuaTables.
+static PyObject* mt_field(PyObject* mt, PyObject* name) {
+    if (PyDict_Check(mt)) return mp_dict_get_ref(mt, name);
+    if (LuaTable_Check(mt)) return luatable_get_ref(mt, name);
+    return NULL;
+}
+
+// Returns a new reference to the metamethod, or NULL (no exception) when
+// obj has none. The caller holds the cache's critical section.
+static PyObject* mmcache_lookup(MMCacheObject* c, PyObject* obj) {
+    if (!metatables_active() || mt_never(obj)) return NULL;
+    if (c->content_epoch != _content_epoch) {
+        Py_CLEAR(c->mt);
+        Py_CLEAR(c->fn);
+        c->obj = NULL;
+        c->content_epoch = _content_epoch;
+    }
+    if (obj != c->obj || c->registry_epoch != _registry_epoch) {
+        uint64_t epoch = _registry_epoch;
+        PyObject* mt = metatable_get(obj);
+        if (!mt && PyErr_Occurred()) return NULL;
+        if (mt != c->mt || !mt) {
+            PyObject* fn = mt && LuaTable_Check(mt) ? luatable_get_ref(mt, c->name) : NULL;
+            if (!fn && PyErr_Occurred()) { Py_XDECREF(mt); return NULL; }
+            Py_XSETREF(c->mt, mt);
+            Py_XSETREF(c->fn, fn);
+        } else {
+            Py_DECREF(mt);
+        }
+        c->obj = obj;
+        c->registry_epoch = epoch;
+    }
+    if (c->mt && !LuaTable_Check(c->mt)) return mt_field(c->mt, c->name);
+    Py_XINCREF(c->fn);
+    return c->fn;
+}
+
+static PyObject* MMCache_vectorcall(MMCacheObject* c, PyObject* const* args, size_t nargsf, PyObject* kwnames) {
+    Py_ssize_t nargs = PyVectorcall_NARGS(nargsf);
+    if (nargs != 1 || kwnames) {
+        PyErr_Format(PyExc_TypeError, "MMCache() takes exactly 1 argument (%zd given)", nargs);
+        return NULL;
+    }
+    PyObject* fn;
+    MP_BEGIN_CRITICAL(c);
+    fn = mmcache_lookup(c, value_unwrap(args[0]));
+    MP_END_CRITICAL();
+    if (!fn) {
+        if (PyErr_Occurred()) return NULL;
+        Py_RETURN_NONE;
+    }
+    return fn;
+}
+
+static PyObject* MMCache_new(PyTypeObject* type, PyObject* args, PyObject* kwds) {
+    PyObject* name;
+    if (!PyArg_ParseTuple(args, "U:MMCache", &name)) return NULL;
+    MMCacheObject* c = (MMCacheObject*)type->tp_alloc(type, 0);
+    if (!c) return NULL;
+    c->vectorcall = (vectorcallfunc)MMCache_vectorcall;
+    Py_INCREF(name);
+    c->name = name;
+    c->content_epoch = _content_epoch;
+    return (PyObject*)c;
+}
+
+static int MMCache_traverse(MMCacheObject* c, visitproc visit, void* arg) {
+    Py_VISIT(c->mt);
+    Py_VISIT(c->fn);
+    return 0;
+}
+
+static int MMCache_clear(MMCacheObject* c) {
+    Py_CLEAR(c->mt);
+    Py_CLEAR(c->fn);
+    c->obj = NULL;
+    return 0;
+}
+
+static void MMCache_dealloc(MMCacheObject* c) {
+    PyObject_GC_UnTrack(c);
+    MMCache_clear(c);
+    Py_XDECREF(c->name);
+    Py_TYPE(c)->tp_free((PyObject*)c);
+}
+
+static PyObject* MMCache_repr(MMCacheObject* c) {
+    return PyUnicode_FromFormat("<MMCache %R>", c->name);
+}
+
+PyTypeObject MMCache_Type = {
+    PyVarObject_HEAD_INIT(NULL, 0)
+    .tp_name = "microps._core.MMCache",
+    .tp_basicsize = sizeof(MMCacheObject),
+    .tp_flags = Py_TPFLAGS_DEFAULT | Py_TPFLAGS_HAVE_GC | Py_TPFLAGS_HAVE_VECTORCALL,
+    .tp_doc = "MMCache(name)\n\n"
+              "Call-site cache for one metamethod: cache(obj) -> metamethod or None.\n"
+              "Invalidated by setmetatable and by __* writes into a LuaTable\n"
+              "metatable; a dict metatable is read on every call.",
+    .tp_new = MMCache_new,
+    .tp_call = PyVectorcall_Call,
+    .tp_vectorcall_offset = offsetof(MMCacheObject, vectorcall),
+    .tp_dealloc = (destructor)MMCache_dealloc,
+    .tp_traverse = (traverseproc)MMCache_traverse,
+    .tp_clear = (inquiry)MMCache_clear,
+    .tp_repr = (reprfunc)MMCache_repr,
+};
+
+// --- Module-level functions ---
+
+// setmetatable(obj, mt): mt=None removes the metatable
+static PyObject* py_setmetatable(PyObject* self, PyObject* const* args, Py_ssize_t nargs) {
+    if (nargs != 2) {
+        PyErr_Format(PyExc_TypeError, "setmetatable() takes exactly 2 arguments (%zd given)", nargs);
+        return NULL;
+    }
+    PyObject* obj = value_unwrap(args[0]);
+    PyObject* mt = value_unwrap(args[1]);
+    if (mt_never(obj)) {
+        PyErr_Format(PyExc_TypeError, "cannot set a metatable on '%.200s'", Py_TYPE(obj)->tp_name);
+        return NULL;
+    }
+    if (mt_set(obj, mt) < 0) return NULL;
+    Py_RETURN_NONE;
+}
+
+static PyObject* py_getmetatable(PyObject* self, PyObject* obj) {
+    PyObject* mt = metatable_get(value_unwrap(obj));
+    if (!mt) {
+        if (PyErr_Occurred()) return NULL;
+        Py_RETURN_NONE;
+    }
+    return mt;
+}
+
+// get_mm(obj, name, engine=None) -> metamethod or None
+static PyObject* py_get_mm(PyObject* self, PyObject* const* args, Py_ssize_t nargs) {
+    if (nargs < 2 || nargs > 3) {
+        PyErr_Format(PyExc_TypeError, "get_mm() takes 2 or 3 arguments (%zd given)", nargs);
+        return NULL;
+    }
+    PyObject* mt = metatable_get(value_unwrap(args[0]));
+    if (!mt) {
+        if (PyErr_Occurred()) return NULL;
+        Py_RETURN_NONE;
+    }
+    PyObject* fn = mt_field(mt, args[1]);
+    Py_DECREF(mt);
+    if (!fn) {
+        if (PyErr_Occurred()) return NULL;
+        Py_RETURN_NONE;
+    }
+    return fn;
+}
+
+static PyObject* py_has_metatables(PyObject* self, PyObject* unused) {
+    return PyBool_FromLong(metatables_active());
+}
+
+static PyMethodDef metatables_functions[] = {
+    {"setmetatable", (PyCFunction)(void(*)(void))py_setmetatable, METH_FASTCALL,
+     "setmetatable(obj, mt): attach a Lua-style metatable to obj (None removes it)."},
+    {"getmetatable", py_getmetatable, METH_O,
+     "getmetatable(obj): the metatable attached to obj, or None."},
+    {"get_mm", (PyCFunction)(void(*)(void))py_get_mm, METH_FASTCALL,
+     "get_mm(obj, name, engine=None): metamethod `name` from obj's metatable, or None."},
+    {"has_metatables", py_has_metatables, METH_NOARGS,
+     "has_metatables(): True while any object has a metatable."},
+    {NULL, NULL, 0, NULL}
+};
+
+int metatables_init(PyObject* module) {
+    if (!_registry) {
+        _registry = PyDict_New();
+        if (!_registry) return -1;
+    }
+    if (PyType_Ready(&MMCache_Type) < 0) return -1;
+    Py_INCREF(&MMCache_Type);
+    if (PyModule_AddObject(module, "MMCache", (PyObject*)&MMCache_Type) < 0) {
+        Py_DECREF(&MMCache_Type);
+        return -1;
+    }
+    return PyModule_AddFunctions(module, metatables_functions);
+}
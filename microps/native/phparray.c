@@ -0,0 +1,1379 @@
+// FILE: microps/native/phparray.c
+#include "native.h"
+#include <stddef.h>
+
+// PHPArray: PHP's ordered array, with int and string keys.
+//
+// Entries sit in insertion order in a slot buffer, live in [head, tail),
+// with free room on both sides so push / pop / shift / unshift are O(1)
+// amortized. Two layouts share the buffer:
+//   - packed: the keys are exactly 0..used-1, in order. No key objects or
+//     index are kept; key k is slot head + k. Shifting moves head, which
+//     renumbers every key at once, as array_shift does.
+//   - hashed: every slot has its key, and `index` maps key -> ordinal
+//     (slot - base), so a lookup is one dict probe. Deleted entries leave
+//     empty slots that are compacted once they outnumber the live ones.
+// An array starts packed and becomes hashed on its first string key,
+// out-of-order int key or unset() in the middle; sort / array_values
+// style rebuilds pack it again.
+//
+// Keys are normalized like PHP: bools and floats become ints, None is "",
+// and decimal-integer strings such as "8" are the int 8. `next_free` is
+// the key the next push gets: one past the largest int key ever stored.
+// Python iteration and `in` work on the values, as for the list a PHP
+// array used to be; keys() and items() give the keys. `in` and search()
+// answer from a value -> first key index (index.c) once an array is
+// searched repeatedly; every path that changes an entry clears it.
+//
+// phparray_share (snapshot.c) lets arrays share one slot buffer and index,
+// held by a hidden holder PHPArray that `cow` points at; pa_own gives an
+// array its own copy before the first change.
+typedef struct {
+    PyObject_HEAD
+    PyObject** vals;                // slot -> value, NULL for an empty slot
+    PyObject** keys;                // slot -> key (hashed layout), else NULL
+    PyObject* index;                // hashed: dict key -> ordinal, else NULL
+    Py_ssize_t cap;                 // slots allocated in vals / keys
+    Py_ssize_t head, tail;          // entries live in slots [head, tail)
+    Py_ssize_t used;                // number of entries
+    Py_ssize_t base;                // slot = ordinal + base
+    Py_ssize_t nint;                // hashed: number of int keys
+    Py_ssize_t next_free;           // key the next push gets
+    Py_ssize_t pos;                 // internal pointer, as an ordinal
+    LookupIndex lookup;             // value -> first key, for search / in
+    PyObject* cow;                  // holder of storage shared by phparray_share
+    PyObject* weakreflist;
+} PHPArrayObject;
+
+#define PA_SLOT(a, ord) ((ord) + (a)->base)
+#define PA_MIN_CAP 8
+
+// ---- Keys ----
+
+// "0", "8", "-12" (no sign on 0, no leading zeros) are int keys in PHP
+static int pa_int_string(PyObject* s, Py_ssize_t* ikey) {
+    Py_ssize_t n = PyUnicode_GET_LENGTH(s), i = 0;
+    if (n == 0 || n > 20) return 0;
+    int kind = PyUnicode_KIND(s);
+    const void* data = PyUnicode_DATA(s);
+    int neg = PyUnicode_READ(kind, data, 0) == '-';
+    if (neg && ++i == n) return 0;
+    if (PyUnicode_READ(kind, data, i) == '0') {
+        if (n != 1) return 0;
+        *ikey = 0;
+        return 1;
+    }
+    Py_ssize_t v = 0;
+    for (; i < n; i++) {
+        Py_UCS4 c = PyUnicode_READ(kind, data, i);
+        if (c < '0' || c > '9' || v > (PY_SSIZE_T_MAX - (Py_ssize_t)(c - '0')) / 10) return 0;
+        v = v * 10 + (c - '0');
+    }
+    *ikey = neg ? -v : v;
+    return 1;
+}
+
+// PHP-normalized key as a new reference in *out: an exact int or str.
+// Returns 1 for an int key (*ikey set), 0 for a string key, -1 on error.
+static int pa_key(PyObject* key, PyObject** out, Py_ssize_t* ikey) {
+    if (PyLong_Check(key)) {
+        *ikey = PyLong_AsSsize_t(key);
+        if (*ikey == -1 && PyErr_Occurred()) return -1;
+        if (PyLong_CheckExact(key)) { Py_INCREF(key); *out = key; }
+        else *out = PyLong_FromSsize_t(*ikey);
+        return *out ? 1 : -1;
+    }
+    if (PyFloat_Check(key)) {
+        PyObject* as_int = PyLong_FromDouble(PyFloat_AS_DOUBLE(key));   // truncates
+        if (!as_int) return -1;
+        int r = pa_key(as_int, out, ikey);
+        Py_DECREF(as_int);
+        return r;
+    }
+    if (key == Py_None) {
+        *out = PyUnicode_New(0, 0);
+        return *out ? 0 : -1;
+    }
+    if (PyUnicode_Check(key)) {
+        if (pa_int_string(key, ikey)) {
+            *out = PyLong_FromSsize_t(*ikey);
+            return *out ? 1 : -1;
+        }
+        if (PyUnicode_CheckExact(key)) { Py_INCREF(key); *out = key; }
+        else *out = PyUnicode_FromObject(key);
+        return *out ? 0 : -1;
+    }
+    PyErr_Format(PyExc_TypeError, "Illegal offset type: %.200s", Py_TYPE(key)->tp_name);
+    return -1;
+}
+
+// Key of a live slot as a new reference
+static PyObject* pa_slot_key(PHPArrayObject* a, Py_ssize_t s) {
+    if (a->keys) {
+        Py_INCREF(a->keys[s]);
+        return a->keys[s];
+    }
+    return PyLong_FromSsize_t(s - a->head);
+}
+
+// ---- Storage ----
+
+// Drops the values and keys in slots [head, tail) of a detached buffer
+static void pa_free_slots(PyObject** vals, PyObject** keys, Py_ssize_t head, Py_ssize_t tail) {
+    for (Py_ssize_t s = head; s < tail; s++) {
+        Py_XDECREF(vals[s]);
+        if (keys) Py_XDECREF(keys[s]);
+    }
+    PyMem_Free(vals);
+    PyMem_Free(keys);
+}
+
+// Releases storage detached from an array: frees it, or only lets go of
+// the holder when it was shared.
+static void pa_release(PyObject** vals, PyObject** keys, PyObject* index, Py_ssize_t head,
+                       Py_ssize_t tail, PyObject* cow) {
+    if (cow) {
+        Py_DECREF(cow);
+        return;
+    }
+    pa_free_slots(vals, keys, head, tail);
+    Py_XDECREF(index);
+}
+
+// Points `to` at the storage of `from` and copies its counters
+static void pa_copy_fields(PHPArrayObject* to, PHPArrayObject* from) {
+    to->vals = from->vals;
+    to->keys = from->keys;
+    to->index = from->index;
+    to->cap = from->cap;
+    to->head = from->head;
+    to->tail = from->tail;
+    to->used = from->used;
+    to->base = from->base;
+    to->nint = from->nint;
+    to->next_free = from->next_free;
+    to->pos = from->pos;
+}
+
+// Before a shared array changes: copies the slots and index out of the
+// shared storage, or takes it back when no other array uses it any more.
+static int pa_own(PHPArrayObject* a) {
+    PHPArrayObject* holder = (PHPArrayObject*)a->cow;
+    if (!holder) return 0;
+    if (mp_unique((PyObject*)holder)) {
+        holder->vals = holder->keys = NULL;
+        holder->index = NULL;
+        holder->head = holder->tail = 0;
+    } else {
+        Py_ssize_t cap = a->cap ? a->cap : 1;
+        PyObject** vals = PyMem_Calloc(cap, sizeof(PyObject*));
+        PyObject** keys = a->keys ? PyMem_Calloc(cap, sizeof(PyObject*)) : NULL;
+        PyObject* index = a->index ? PyDict_Copy(a->index) : NULL;
+        if (!vals || (a->keys && !keys) || (a->index && !index)) {
+            PyMem_Free(vals);
+            PyMem_Free(keys);
+            Py_XDECREF(index);
+            if (!PyErr_Occurred()) PyErr_NoMemory();
+            return -1;
+        }
+        for (Py_ssize_t s = a->head; s < a->tail; s++) {
+            vals[s] = a->vals[s];
+            Py_XINCREF(vals[s]);
+            if (keys) {
+                keys[s] = a->keys[s];
+                Py_XINCREF(keys[s]);
+            }
+        }
+        a->vals = vals;
+        a->keys = keys;
+        a->index = index;
+    }
+    a->cow = NULL;
+    Py_DECREF(holder);
+    return 0;
+}
+
+// Moves the live slots to a new buffer with `front` free slots before
+// them and `back` after. Ordinals (index values, pos) are unchanged.
+static int pa_relocate(PHPArrayObject* a, Py_ssize_t front, Py_ssize_t back) {
+    Py_ssize_t live = a->tail - a->head;
+    Py_ssize_t cap = front + live + back;
+    if (cap < PA_MIN_CAP) { back += PA_MIN_CAP - cap; cap = PA_MIN_CAP; }
+    PyObject** vals = PyMem_Calloc(cap, sizeof(PyObject*));
+    PyObject** keys = a->keys ? PyMem_Calloc(cap, sizeof(PyObject*)) : NULL;
+    if (!vals || (a->keys && !keys)) {
+        PyMem_Free(vals);
+        PyMem_Free(keys);
+        PyErr_NoMemory();
+        return -1;
+    }
+    if (live) {
+        memcpy(vals + front, a->vals + a->head, live * sizeof(PyObject*));
+        if (keys) memcpy(keys + front, a->keys + a->head, live * sizeof(PyObject*));
+    }
+    PyMem_Free(a->vals);
+    PyMem_Free(a->keys);
+    a->vals = vals;
+    a->keys = keys;
+    a->base += front - a->head;
+    a->head = front;
+    a->tail = front + live;
+    a->cap = cap;
+    return 0;
+}
+
+// Room for n more slots after tail. Front room left by shifts is given
+// back when it is more than the entries themselves (queue use).
+static int pa_reserve_back(PHPArrayObject* a, Py_ssize_t n) {
+    if (a->tail + n <= a->cap) return 0;
+    Py_ssize_t live = a->tail - a->head;
+    return pa_relocate(a, a->head > live ? 0 : a->head, live + n);
+}
+
+// Room for n more slots before head
+static int pa_reserve_front(PHPArrayObject* a, Py_ssize_t n) {
+    if (a->head >= n) return 0;
+    Py_ssize_t live = a->tail - a->head;
+    return pa_relocate(a, n + (live > PA_MIN_CAP ? live : PA_MIN_CAP), a->cap - a->tail);
+}
+
+// Slot of key, -1 when absent, -2 on error
+static Py_ssize_t pa_find(PHPArrayObject* a, PyObject* key, int is_int, Py_ssize_t ikey) {
+    if (!a->keys) return is_int && ikey >= 0 && ikey < a->used ? a->head + ikey : -1;
+    PyObject* ord = mp_dict_get_ref(a->index, key);
+    if (!ord) return PyErr_Occurred() ? -2 : -1;
+    Py_ssize_t s = PA_SLOT(a, PyLong_AsSsize_t(ord));
+    Py_DECREF(ord);
+    return s;
+}
+
+static int pa_index_set(PHPArrayObject* a, PyObject* key, Py_ssize_t s) {
+    PyObject* ord = PyLong_FromSsize_t(s - a->base);
+    int err = ord ? PyDict_SetItem(a->index, key, ord) : -1;
+    Py_XDECREF(ord);
+    return err;
+}
+
+// Packed -> hashed: gives every slot its key and builds the index
+static int pa_to_hashed(PHPArrayObject* a) {
+    if (a->keys) return 0;
+    PyObject** keys = PyMem_Calloc(a->cap ? a->cap : 1, sizeof(PyObject*));
+    PyObject* index = keys ? PyDict_New() : NULL;
+    if (!index) {
+        PyMem_Free(keys);
+        if (!PyErr_Occurred()) PyErr_NoMemory();
+        return -1;
+    }
+    a->keys = keys;
+    a->index = index;
+    for (Py_ssize_t s = a->head; s < a->tail; s++) {
+        keys[s] = PyLong_FromSsize_t(s - a->head);
+        if (!keys[s] || pa_index_set(a, keys[s], s) < 0) {
+            for (Py_ssize_t t = a->head; t <= s; t++) Py_CLEAR(keys[t]);
+            PyMem_Free(keys);
+            Py_DECREF(index);
+            a->keys = NULL;
+            a->index = NULL;
+            return -1;
+        }
+    }
+    a->nint = a->used;
+    return 0;
+}
+
+// Hashed: squeezes out empty slots, then rebuilds the index
+static int pa_compact(PHPArrayObject* a) {
+    Py_ssize_t w = a->head, pos_slot = PA_SLOT(a, a->pos), new_pos = -1;
+    for (Py_ssize_t s = a->head; s < a->tail; s++) {
+        if (new_pos < 0 && s >= pos_slot) new_pos = w;
+        if (!a->vals[s]) continue;
+        a->vals[w] = a->vals[s];
+        a->keys[w] = a->keys[s];
+        w++;
+    }
+    for (Py_ssize_t s = w; s < a->tail; s++) a->vals[s] = a->keys[s] = NULL;
+    a->tail = w;
+    a->base = 0;
+    a->pos = pos_slot < a->head ? a->head - 1 : new_pos < 0 ? w : new_pos;
+    PyDict_Clear(a->index);
+    for (Py_ssize_t s = a->head; s < a->tail; s++) {
+        if (pa_index_set(a, a->keys[s], s) < 0) return -1;
+    }
+    return 0;
+}
+
+// Adds a new entry at the end. key is NULL only for a packed append.
+static int pa_append(PHPArrayObject* a, PyObject* key, int is_int, Py_ssize_t ikey, PyObject* value) {
+    if (pa_own(a) < 0) return -1;
+    if (!a->keys && !(is_int && ikey == a->used) && pa_to_hashed(a) < 0) return -1;
+    if (pa_reserve_back(a, 1) < 0) return -1;
+    index_clear(&a->lookup);
+    Py_ssize_t s = a->tail;
+    if (a->keys) {
+        PyObject* k = key ? (Py_INCREF(key), key) : PyLong_FromSsize_t(ikey);
+        if (!k || pa_index_set(a, k, s) < 0) { Py_XDECREF(k); return -1; }
+        a->keys[s] = k;
+        a->nint += is_int;
+    }
+    Py_INCREF(value);
+    a->vals[s] = value;
+    a->tail++;
+    a->used++;
+    if (is_int && ikey >= a->next_free) a->next_free = ikey < PY_SSIZE_T_MAX ? ikey + 1 : ikey;
+    return 0;
+}
+
+static int pa_set_locked(PHPArrayObject* a, PyObject* key, int is_int, Py_ssize_t ikey, PyObject* value) {
+    Py_ssize_t s = pa_find(a, key, is_int, ikey);
+    if (s == -2) return -1;
+    if (s < 0) return pa_append(a, key, is_int, ikey, value);
+    if (pa_own(a) < 0) return -1;
+    index_clear(&a->lookup);
+    Py_INCREF(value);
+    Py_SETREF(a->vals[s], value);
+    return 0;
+}
+
+static int pa_push_locked(PHPArrayObject* a, PyObject* value) {
+    if (a->used && a->next_free == PY_SSIZE_T_MAX) {
+        PyErr_SetString(PyExc_OverflowError,
+                        "Cannot add element to the array as the next element is already occupied");
+        return -1;
+    }
+    return pa_append(a, NULL, 1, a->next_free, value);
+}
+
+// Empties slot s. The value is handed to the caller through *out.
+static int pa_take_slot(PHPArrayObject* a, Py_ssize_t s, PyObject** out) {
+    if (pa_own(a) < 0) return -1;
+    if (!a->keys && s != a->tail - 1 && pa_to_hashed(a) < 0) return -1;
+    index_clear(&a->lookup);
+    if (a->keys) {
+        if (PyDict_DelItem(a->index, a->keys[s]) < 0) return -1;
+        a->nint -= PyLong_CheckExact(a->keys[s]);
+        Py_CLEAR(a->keys[s]);
+    }
+    *out = a->vals[s];
+    a->vals[s] = NULL;
+    a->used--;
+    while (a->head < a->tail && !a->vals[a->head]) a->head++;
+    while (a->tail > a->head && !a->vals[a->tail - 1]) a->tail--;
+    if (a->keys && (a->tail - a->head) - a->used > a->used + PA_MIN_CAP) return pa_compact(a);
+    return 0;
+}
+
+// Swaps in new contents: (key, value) pairs with normalized keys, or
+// plain values (packed) when keyed is 0. The old entries are released
+// last, once the array is consistent again.
+static int pa_assign(PHPArrayObject* a, PyObject* entries, int keyed) {
+    PyObject **vals = a->vals, **keys = a->keys, *index = a->index, *cow = a->cow;
+    Py_ssize_t head = a->head, tail = a->tail;
+    index_clear(&a->lookup);
+    a->vals = a->keys = NULL;
+    a->index = a->cow = NULL;
+    a->cap = a->head = a->tail = a->used = a->base = a->nint = a->next_free = a->pos = 0;
+    int err = 0;
+    Py_ssize_t n = PyList_GET_SIZE(entries);
+    if (n && pa_relocate(a, 0, n) < 0) err = -1;
+    for (Py_ssize_t i = 0; !err && i < n; i++) {
+        PyObject* e = PyList_GET_ITEM(entries, i);
+        if (!keyed) {
+            err = pa_append(a, NULL, 1, i, e);
+            continue;
+        }
+        PyObject* k = PyTuple_GET_ITEM(e, 0);
+        int is_int = PyLong_CheckExact(k);
+        Py_ssize_t ikey = is_int ? PyLong_AsSsize_t(k) : 0;
+        err = pa_append(a, k, is_int, ikey, PyTuple_GET_ITEM(e, 1));
+    }
+    pa_release(vals, keys, index, head, tail, cow);
+    return err;
+}
+
+// New list of (key, value) pairs in order
+static PyObject* pa_items_locked(PHPArrayObject* a) {
+    PyObject* out = PyList_New(a->used);
+    if (!out) return NULL;
+    Py_ssize_t i = 0;
+    for (Py_ssize_t s = a->head; s < a->tail; s++) {
+        if (!a->vals[s]) continue;
+        PyObject* k = pa_slot_key(a, s);
+        PyObject* kv = k ? PyTuple_Pack(2, k, a->vals[s]) : NULL;
+        Py_XDECREF(k);
+        if (!kv) { Py_DECREF(out); return NULL; }
+        PyList_SET_ITEM(out, i++, kv);
+    }
+    return out;
+}
+
+// Clamps PHP's (offset, length) to a [start, stop) range over n entries:
+// negative offsets count from the end, a negative length stops that many
+// entries before the end, and no length means "to the end".
+static void pa_range(Py_ssize_t n, Py_ssize_t offset, PyObject* length, Py_ssize_t len_value,
+                     Py_ssize_t* start, Py_ssize_t* stop) {
+    if (offset < 0) offset = offset + n < 0 ? 0 : offset + n;
+    if (offset > n) offset = n;
+    Py_ssize_t end = n;
+    if (length && length != Py_None) end = len_value < 0 ? n + len_value : offset + len_value;
+    if (end > n) end = n;
+    if (end < offset) end = offset;
+    *start = offset;
+    *stop = end;
+}
+
+// array_splice: replaces entries [start, stop) by the values of `repl`
+// (a list, or NULL) and renumbers int keys from 0. Returns the removed
+// entries as a new list of (key, value) pairs. O(n).
+static PyObject* pa_splice_locked(PHPArrayObject* a, Py_ssize_t start, Py_ssize_t stop, PyObject* repl) {
+    PyObject* items = pa_items_locked(a);
+    if (!items) return NULL;
+    PyObject* removed = PyList_GetSlice(items, start, stop);
+    PyObject* kept = removed ? PyList_New(0) : NULL;
+    Py_ssize_t n = PyList_GET_SIZE(items), next = 0, nrepl = repl ? PyList_GET_SIZE(repl) : 0;
+    int err = kept ? 0 : -1;
+    for (Py_ssize_t i = 0; !err && i < n - (stop - start) + nrepl; i++) {
+        PyObject *k, *v;
+        if (i < start || i >= start + nrepl) {
+            PyObject* kv = PyList_GET_ITEM(items, i < start ? i : i - nrepl + (stop - start));
+            k = PyTuple_GET_ITEM(kv, 0);
+            v = PyTuple_GET_ITEM(kv, 1);
+        } else {
+            k = NULL;
+            v = PyList_GET_ITEM(repl, i - start);
+        }
+        PyObject* key = !k || PyLong_CheckExact(k) ? PyLong_FromSsize_t(next++) : (Py_INCREF(k), k);
+        PyObject* kv = key ? PyTuple_Pack(2, key, v) : NULL;
+        Py_XDECREF(key);
+        err = kv && PyList_Append(kept, kv) == 0 ? 0 : -1;
+        Py_XDECREF(kv);
+    }
+    Py_DECREF(items);
+    if (!err) err = pa_assign(a, kept, 1);
+    Py_XDECREF(kept);
+    if (err) Py_CLEAR(removed);
+    return removed;
+}
+
+// Removes and returns the entry at position i (negative from the end):
+// array_pop for the last, array_shift for the first, array_splice for the
+// rest. None when i is out of range. Resets the internal pointer.
+static PyObject* pa_pop_at_locked(PHPArrayObject* a, Py_ssize_t i) {
+    int shift = i == 0;
+    if (i < 0) i += a->used;
+    if (i < 0 || i >= a->used) Py_RETURN_NONE;
+    if (pa_own(a) < 0) return NULL;
+    index_clear(&a->lookup);
+    PyObject* v = NULL;
+    if (shift && (!a->keys || (a->nint == PyLong_CheckExact(a->keys[a->head])))) {
+        // array_shift with nothing left to renumber, or packed: moving
+        // head renumbers every key at once
+        if (!a->keys) {
+            v = a->vals[a->head];
+            a->vals[a->head++] = NULL;
+            a->used--;
+            a->next_free = a->used;
+        } else {
+            if (pa_take_slot(a, a->head, &v) < 0) return NULL;
+            a->next_free = 0;
+        }
+    } else if (!shift && i == a->used - 1) {
+        // array_pop: the next push reuses the key if it was the last one given
+        Py_ssize_t s = a->tail - 1;
+        PyObject* k = a->keys ? a->keys[s] : NULL;
+        int was_next = k ? PyLong_CheckExact(k) && PyLong_AsSsize_t(k) == a->next_free - 1
+                         : s - a->head == a->next_free - 1;
+        if (pa_take_slot(a, s, &v) < 0) return NULL;
+        if (was_next) a->next_free--;
+    } else {
+        PyObject* removed = pa_splice_locked(a, i, i + 1, NULL);
+        if (!removed) return NULL;
+        v = PyTuple_GET_ITEM(PyList_GET_ITEM(removed, 0), 1);
+        Py_INCREF(v);
+        Py_DECREF(removed);
+    }
+    if (a->used == 0 && a->keys) {
+        // Empty again: back to packed
+        PyMem_Free(a->keys);
+        a->keys = NULL;
+        Py_CLEAR(a->index);
+        a->nint = 0;
+    }
+    a->pos = a->head - a->base;
+    return v;
+}
+
+// Inserts values (a list) before position i: array_unshift at 0, a push
+// at the end, array_splice elsewhere. Resets the internal pointer.
+static int pa_insert_locked(PHPArrayObject* a, Py_ssize_t i, PyObject* values) {
+    Py_ssize_t n = PyList_GET_SIZE(values);
+    if (i < 0) i = i + a->used < 0 ? 0 : i + a->used;
+    if (i > a->used) i = a->used;
+    if (pa_own(a) < 0) return -1;
+    index_clear(&a->lookup);
+    int err = 0;
+    if (i == a->used && a->used) {
+        for (Py_ssize_t j = 0; !err && j < n; j++) err = pa_push_locked(a, PyList_GET_ITEM(values, j));
+    } else if (i == 0 && (!a->keys || a->nint == 0)) {
+        // array_unshift: the new values take keys 0..n-1. Packed arrays
+        // renumber by moving head; string keys need no renumbering.
+        if (pa_reserve_front(a, n) < 0) return -1;
+        Py_ssize_t s0 = a->head - n, j = 0;
+        for (; a->keys && j < n; j++) {
+            PyObject* k = PyLong_FromSsize_t(j);
+            if (!k || pa_index_set(a, k, s0 + j) < 0) { Py_XDECREF(k); break; }
+            a->keys[s0 + j] = k;
+        }
+        if (a->keys && j < n) {
+            while (j-- > 0) {
+                if (PyDict_DelItem(a->index, a->keys[s0 + j]) < 0) PyErr_Clear();
+                Py_CLEAR(a->keys[s0 + j]);
+            }
+            return -1;
+        }
+        for (j = 0; j < n; j++) {
+            a->vals[s0 + j] = PyList_GET_ITEM(values, j);
+            Py_INCREF(a->vals[s0 + j]);
+        }
+        a->head = s0;
+        a->used += n;
+        if (a->keys) a->nint = n;
+        a->next_free = a->keys ? n : a->used;
+    } else {
+        PyObject* removed = pa_splice_locked(a, i, i, values);
+        err = removed ? 0 : -1;
+        Py_XDECREF(removed);
+    }
+    a->pos = a->head - a->base;
+    return err;
+}
+
+// ---- Entry points for the micro-ops ----
+
+int phparray_push(PyObject* a, PyObject* value) {
+    int err;
+    MP_BEGIN_CRITICAL(a);
+    err = pa_push_locked((PHPArrayObject*)a, value);
+    MP_END_CRITICAL();
+    return err;
+}
+
+PyObject* phparray_pop_at(PyObject* a, Py_ssize_t i) {
+    PyObject* v;
+    MP_BEGIN_CRITICAL(a);
+    v = pa_pop_at_locked((PHPArrayObject*)a, i);
+    MP_END_CRITICAL();
+    return v;
+}
+
+int phparray_insert_at(PyObject* a, Py_ssize_t i, PyObject* value) {
+    PyObject* values = PyList_New(1);
+    if (!values) return -1;
+    Py_INCREF(value);
+    PyList_SET_ITEM(values, 0, value);
+    int err;
+    MP_BEGIN_CRITICAL(a);
+    err = pa_insert_locked((PHPArrayObject*)a, i, values);
+    MP_END_CRITICAL();
+    Py_DECREF(values);
+    return err;
+}
+
+int phparray_share(PyObject* dst, PyObject* src) {
+    PHPArrayObject *d = (PHPArrayObject*)dst, *s = (PHPArrayObject*)src;
+    PHPArrayObject* holder = (PHPArrayObject*)PHPArray_Type.tp_alloc(&PHPArray_Type, 0);
+    if (!holder) return -1;
+    PyObject **vals, **keys, *index, *cow;
+    Py_ssize_t head, tail;
+    MP_BEGIN_CRITICAL2(dst, src);
+    if (!s->cow) {
+        // First share: src's storage moves to the holder, src points at it
+        pa_copy_fields(holder, s);
+        s->cow = (PyObject*)holder;
+        holder = NULL;
+    }
+    vals = d->vals;
+    keys = d->keys;
+    index = d->index;
+    cow = d->cow;
+    head = d->head;
+    tail = d->tail;
+    index_clear(&d->lookup);
+    pa_copy_fields(d, s);
+    Py_INCREF(s->cow);
+    d->cow = s->cow;
+    MP_END_CRITICAL2();
+    Py_XDECREF(holder);
+    pa_release(vals, keys, index, head, tail, cow);
+    return 0;
+}
+
+// ---- Construction and lifetime ----
+
+static int pa_update(PHPArrayObject* a, PyObject* init);
+
+static PyObject* PHPArray_new(PyTypeObject* type, PyObject* args, PyObject* kwds) {
+    static char* kwlist[] = {"init", NULL};
+    PyObject* init = NULL;
+    if (!PyArg_ParseTupleAndKeywords(args, kwds, "|O:PHPArray", kwlist, &init)) return NULL;
+    PHPArrayObject* a = (PHPArrayObject*)type->tp_alloc(type, 0);
+    if (!a) return NULL;
+    if (init && init != Py_None && pa_update(a, init) < 0) {
+        Py_DECREF(a);
+        return NULL;
+    }
+    return (PyObject*)a;
+}
+
+static PHPArrayObject* pa_new_empty(void) {
+    return (PHPArrayObject*)PHPArray_Type.tp_alloc(&PHPArray_Type, 0);
+}
+
+static int PHPArray_traverse(PHPArrayObject* a, visitproc visit, void* arg) {
+    Py_VISIT(a->cow);               // shared slots are the holder's
+    for (Py_ssize_t s = a->head; !a->cow && s < a->tail; s++) Py_VISIT(a->vals[s]);
+    Py_VISIT(a->lookup.map);
+    return 0;
+}
+
+// Empties the array rather than freeing it, so it stays usable if a
+// finalizer reaches it during collection.
+static int PHPArray_clear(PHPArrayObject* a) {
+    PyObject **vals = a->vals, **keys = a->keys, *index = a->index, *cow = a->cow;
+    Py_ssize_t head = a->head, tail = a->tail;
+    index_clear(&a->lookup);
+    a->vals = a->keys = NULL;
+    a->index = a->cow = NULL;
+    a->cap = a->head = a->tail = a->used = a->base = a->nint = a->next_free = a->pos = 0;
+    pa_release(vals, keys, index, head, tail, cow);
+    return 0;
+}
+
+static void PHPArray_dealloc(PHPArrayObject* a) {
+    PyObject_GC_UnTrack(a);
+    if (a->weakreflist) PyObject_ClearWeakRefs((PyObject*)a);
+    PHPArray_clear(a);
+    Py_TYPE(a)->tp_free((PyObject*)a);
+}
+
+// ---- Element access ----
+
+static int pa_set(PHPArrayObject* a, PyObject* key, PyObject* value) {
+    PyObject* k;
+    Py_ssize_t ikey = 0;
+    int is_int = pa_key(key, &k, &ikey);
+    if (is_int < 0) return -1;
+    int err;
+    MP_BEGIN_CRITICAL(a);
+    err = pa_set_locked(a, k, is_int, ikey, value);
+    MP_END_CRITICAL();
+    Py_DECREF(k);
+    return err;
+}
+
+// New reference to a[key]; NULL without an exception when absent
+static PyObject* pa_get(PHPArrayObject* a, PyObject* key) {
+    PyObject* k;
+    Py_ssize_t ikey = 0;
+    int is_int = pa_key(key, &k, &ikey);
+    if (is_int < 0) return NULL;
+    PyObject* v = NULL;
+    MP_BEGIN_CRITICAL(a);
+    Py_ssize_t s = pa_find(a, k, is_int, ikey);
+    if (s >= 0) {
+        v = a->vals[s];
+        Py_INCREF(v);
+    }
+    MP_END_CRITICAL();
+    Py_DECREF(k);
+    return v;
+}
+
+static int pa_update(PHPArrayObject* a, PyObject* init) {
+    if (PHPArray_Check(init) || PyDict_Check(init)) {
+        PyObject* items;
+        if (PHPArray_Check(init)) {
+            MP_BEGIN_CRITICAL(init);
+            items = pa_items_locked((PHPArrayObject*)init);
+            MP_END_CRITICAL();
+        } else {
+            items = PyDict_Items(init);
+        }
+        if (!items) return -1;
+        int err = 0;
+        for (Py_ssize_t i = 0; !err && i < PyList_GET_SIZE(items); i++) {
+            PyObject* kv = PyList_GET_ITEM(items, i);
+            err = pa_set(a, PyTuple_GET_ITEM(kv, 0), PyTuple_GET_ITEM(kv, 1));
+        }
+        Py_DECREF(items);
+        return err;
+    }
+    // Any other iterable supplies values for keys 0, 1, ...
+    PyObject* it = PyObject_GetIter(init);
+    if (!it) return -1;
+    PyObject* item;
+    int err = 0;
+    while (!err && (item = PyIter_Next(it))) {
+        err = phparray_push((PyObject*)a, item);
+        Py_DECREF(item);
+    }
+    Py_DECREF(it);
+    return err || PyErr_Occurred() ? -1 : 0;
+}
+
+static Py_ssize_t PHPArray_length(PHPArrayObject* a) { return a->used; }
+
+static PyObject* PHPArray_getitem(PHPArrayObject* a, PyObject* key) {
+    PyObject* v = pa_get(a, key);
+    if (!v && !PyErr_Occurred()) PyErr_SetObject(PyExc_KeyError, key);
+    return v;
+}
+
+static int PHPArray_setitem(PHPArrayObject* a, PyObject* key, PyObject* value) {
+    if (value) return pa_set(a, key, value);
+    // unset($a[key])
+    PyObject* k;
+    Py_ssize_t ikey = 0;
+    int is_int = pa_key(key, &k, &ikey);
+    if (is_int < 0) return -1;
+    PyObject* old = NULL;
+    int err = 0;
+    MP_BEGIN_CRITICAL(a);
+    Py_ssize_t s = pa_find(a, k, is_int, ikey);
+    if (s == -1) PyErr_SetObject(PyExc_KeyError, key);
+    err = s < 0 ? -1 : pa_take_slot(a, s, &old);
+    MP_END_CRITICAL();
+    Py_DECREF(k);
+    Py_XDECREF(old);
+    return err;
+}
+
+// Value of the next live slot at or after ordinal *ord as a new reference
+// (key too when wanted), advancing *ord past it; NULL at the end.
+static PyObject* pa_entry_from(PHPArrayObject* a, Py_ssize_t* ord, PyObject** key) {
+    PyObject* v = NULL;
+    MP_BEGIN_CRITICAL(a);
+    Py_ssize_t s = PA_SLOT(a, *ord);
+    if (s < a->head) s = a->head;
+    while (s < a->tail && !a->vals[s]) s++;
+    if (s < a->tail) {
+        v = a->vals[s];
+        Py_INCREF(v);
+        if (key && !(*key = pa_slot_key(a, s))) Py_CLEAR(v);
+        *ord = s - a->base + 1;
+    }
+    MP_END_CRITICAL();
+    return v;
+}
+
+static Py_ssize_t pa_first_ord(PHPArrayObject* a) { return a->head - a->base; }
+
+// The values and their keys, for the lookup index
+static PyObject* pa_index_items(PyObject* op, PyObject** keys) {
+    PHPArrayObject* a = (PHPArrayObject*)op;
+    PyObject* values = PyList_New(0);
+    *keys = values ? PyList_New(0) : NULL;
+    Py_ssize_t ord = pa_first_ord(a);
+    PyObject *k = NULL, *v;
+    while (*keys && (v = pa_entry_from(a, &ord, &k))) {
+        if (PyList_Append(values, v) < 0 || PyList_Append(*keys, k) < 0) Py_CLEAR(*keys);
+        Py_DECREF(v);
+        Py_DECREF(k);
+    }
+    if (!*keys || PyErr_Occurred()) {
+        Py_CLEAR(*keys);
+        Py_CLEAR(values);
+    }
+    return values;
+}
+
+// in / in_array: compares values, in order
+static int PHPArray_contains(PHPArrayObject* a, PyObject* value) {
+    PyObject* k = NULL;
+    int found = index_lookup((PyObject*)a, &a->lookup, a->used, value, pa_index_items, &k);
+    Py_XDECREF(k);
+    if (found != INDEX_SCAN) return found;
+    Py_ssize_t ord = pa_first_ord(a);
+    PyObject* v;
+    while ((v = pa_entry_from(a, &ord, NULL))) {
+        int eq = PyObject_RichCompareBool(v, value, Py_EQ);
+        Py_DECREF(v);
+        if (eq) return eq;
+    }
+    return PyErr_Occurred() ? -1 : 0;
+}
+
+// ---- Iteration ----
+
+typedef enum { PA_VALUES, PA_KEYS, PA_ITEMS } PaIterKind;
+
+typedef struct {
+    PyObject_HEAD
+    PHPArrayObject* array;
+    PaIterKind kind;
+    Py_ssize_t ord;                 // ordinal to resume from
+} PHPArrayIterObject;
+
+static void PHPArrayIter_dealloc(PHPArrayIterObject* it) {
+    PyObject_GC_UnTrack(it);
+    Py_XDECREF(it->array);
+    PyObject_GC_Del(it);
+}
+
+static int PHPArrayIter_traverse(PHPArrayIterObject* it, visitproc visit, void* arg) {
+    Py_VISIT(it->array);
+    return 0;
+}
+
+static PyObject* PHPArrayIter_next(PHPArrayIterObject* it) {
+    if (!it->array) return NULL;
+    PyObject* k = NULL;
+    PyObject* v = pa_entry_from(it->array, &it->ord, it->kind == PA_VALUES ? NULL : &k);
+    if (!v) {
+        Py_CLEAR(it->array);
+        return NULL;
+    }
+    if (it->kind == PA_VALUES) return v;
+    if (it->kind == PA_KEYS) { Py_DECREF(v); return k; }
+    PyObject* r = PyTuple_Pack(2, k, v);
+    Py_DECREF(k);
+    Py_DECREF(v);
+    return r;
+}
+
+static PyTypeObject PHPArrayIter_Type = {
+    PyVarObject_HEAD_INIT(NULL, 0)
+    .tp_name = "microps._core.PHPArrayIterator",
+    .tp_basicsize = sizeof(PHPArrayIterObject),
+    .tp_flags = Py_TPFLAGS_DEFAULT | Py_TPFLAGS_HAVE_GC,
+    .tp_dealloc = (destructor)PHPArrayIter_dealloc,
+    .tp_traverse = (traverseproc)PHPArrayIter_traverse,
+    .tp_iter = PyObject_SelfIter,
+    .tp_iternext = (iternextfunc)PHPArrayIter_next,
+};
+
+static PyObject* pa_iter_new(PHPArrayObject* a, PaIterKind kind) {
+    PHPArrayIterObject* it = PyObject_GC_New(PHPArrayIterObject, &PHPArrayIter_Type);
+    if (!it) return NULL;
+    Py_INCREF(a);
+    it->array = a;
+    it->kind = kind;
+    it->ord = pa_first_ord(a);
+    PyObject_GC_Track(it);
+    return (PyObject*)it;
+}
+
+static PyObject* PHPArray_iter(PHPArrayObject* a) { return pa_iter_new(a, PA_VALUES); }
+
+static PyObject* pa_collect(PHPArrayObject* a, PaIterKind kind) {
+    if (kind == PA_ITEMS) {
+        PyObject* r;
+        MP_BEGIN_CRITICAL(a);
+        r = pa_items_locked(a);
+        MP_END_CRITICAL();
+        return r;
+    }
+    PyObject* it = pa_iter_new(a, kind);
+    if (!it) return NULL;
+    PyObject* r = PySequence_List(it);
+    Py_DECREF(it);
+    return r;
+}
+
+// ---- Methods: stack / queue ----
+
+// push(*values) -> new count (array_push)
+static PyObject* PHPArray_push(PHPArrayObject* a, PyObject* const* args, Py_ssize_t nargs) {
+    for (Py_ssize_t i = 0; i < nargs; i++) {
+        if (phparray_push((PyObject*)a, args[i]) < 0) return NULL;
+    }
+    return PyLong_FromSsize_t(a->used);
+}
+
+static PyObject* PHPArray_pop(PHPArrayObject* a, PyObject* unused) { return phparray_pop_at((PyObject*)a, -1); }
+static PyObject* PHPArray_shift(PHPArrayObject* a, PyObject* unused) { return phparray_pop_at((PyObject*)a, 0); }
+
+// unshift(*values) -> new count (array_unshift)
+static PyObject* PHPArray_unshift(PHPArrayObject* a, PyObject* const* args, Py_ssize_t nargs) {
+    PyObject* values = PyList_New(nargs);
+    if (!values) return NULL;
+    for (Py_ssize_t i = 0; i < nargs; i++) {
+        Py_INCREF(args[i]);
+        PyList_SET_ITEM(values, i, args[i]);
+    }
+    int err;
+    MP_BEGIN_CRITICAL(a);
+    err = pa_insert_locked(a, 0, values);
+    MP_END_CRITICAL();
+    Py_DECREF(values);
+    return err < 0 ? NULL : PyLong_FromSsize_t(a->used);
+}
+
+// New array from a list of (key, value) pairs: string keys are kept, int
+// keys renumbered from 0
+static PyObject* pa_from_items(PyObject* items) {
+    PHPArrayObject* r = pa_new_empty();
+    if (!r) return NULL;
+    for (Py_ssize_t i = 0; i < PyList_GET_SIZE(items); i++) {
+        PyObject* kv = PyList_GET_ITEM(items, i);
+        PyObject *k = PyTuple_GET_ITEM(kv, 0), *v = PyTuple_GET_ITEM(kv, 1);
+        int err = PyUnicode_Check(k) ? pa_set(r, k, v) : phparray_push((PyObject*)r, v);
+        if (err < 0) { Py_DECREF(r); return NULL; }
+    }
+    return (PyObject*)r;
+}
+
+// splice(offset, length=None, replacement=()) -> removed entries
+static PyObject* PHPArray_splice(PHPArrayObject* a, PyObject* args, PyObject* kwds) {
+    static char* kwlist[] = {"offset", "length", "replacement", NULL};
+    Py_ssize_t offset, len_value = 0;
+    PyObject *length = NULL, *replacement = NULL;
+    if (!PyArg_ParseTupleAndKeywords(args, kwds, "n|OO:splice", kwlist, &offset, &length, &replacement)) return NULL;
+    if (length && length != Py_None && (len_value = PyNumber_AsSsize_t(length, PyExc_OverflowError)) == -1 && PyErr_Occurred()) return NULL;
+    PyObject* repl = replacement ? PySequence_List(replacement) : PyList_New(0);
+    if (!repl) return NULL;
+    PyObject* removed;
+    MP_BEGIN_CRITICAL(a);
+    Py_ssize_t start, stop;
+    pa_range(a->used, offset, length, len_value, &start, &stop);
+    removed = pa_splice_locked(a, start, stop, repl);
+    a->pos = pa_first_ord(a);
+    MP_END_CRITICAL();
+    Py_DECREF(repl);
+    if (!removed) return NULL;
+    PyObject* r = pa_from_items(removed);
+    Py_DECREF(removed);
+    return r;
+}
+
+// ---- Methods: keys and searching ----
+
+static PyObject* PHPArray_key_exists(PHPArrayObject* a, PyObject* key) {
+    PyObject* v = pa_get(a, key);
+    if (!v && PyErr_Occurred()) return NULL;
+    Py_XDECREF(v);
+    return PyBool_FromLong(v != NULL);
+}
+
+static PyObject* PHPArray_get(PHPArrayObject* a, PyObject* const* args, Py_ssize_t nargs) {
+    if (nargs < 1 || nargs > 2) {
+        PyErr_Format(PyExc_TypeError, "get() takes 1 or 2 arguments (%zd given)", nargs);
+        return NULL;
+    }
+    PyObject* v = pa_get(a, args[0]);
+    if (v || PyErr_Occurred()) return v;
+    v = nargs > 1 ? args[1] : Py_None;
+    Py_INCREF(v);
+    return v;
+}
+
+// search(value) -> first key holding value, or False (array_search)
+static PyObject* PHPArray_search(PHPArrayObject* a, PyObject* value) {
+    PyObject *k = NULL, *v;
+    int found = index_lookup((PyObject*)a, &a->lookup, a->used, value, pa_index_items, &k);
+    if (found > 0) return k;
+    if (found < 0 && found != INDEX_SCAN) return NULL;
+    if (found == 0) Py_RETURN_FALSE;
+    Py_ssize_t ord = pa_first_ord(a);
+    while ((v = pa_entry_from(a, &ord, &k))) {
+        int eq = PyObject_RichCompareBool(v, value, Py_EQ);
+        Py_DECREF(v);
+        if (eq > 0) return k;
+        Py_DECREF(k);
+        if (eq < 0) return NULL;
+    }
+    if (PyErr_Occurred()) return NULL;
+    Py_RETURN_FALSE;
+}
+
+static PyObject* PHPArray_keys(PHPArrayObject* a, PyObject* unused) { return pa_collect(a, PA_KEYS); }
+static PyObject* PHPArray_values(PHPArrayObject* a, PyObject* unused) { return pa_collect(a, PA_VALUES); }
+static PyObject* PHPArray_items(PHPArrayObject* a, PyObject* unused) { return pa_collect(a, PA_ITEMS); }
+
+// ---- Methods: new arrays ----
+
+static PyObject* PHPArray_copy(PHPArrayObject* a, PyObject* unused) {
+    PHPArrayObject* r = pa_new_empty();
+    if (r && pa_update(r, (PyObject*)a) < 0) Py_CLEAR(r);
+    if (r) r->next_free = a->next_free;
+    return (PyObject*)r;
+}
+
+// unique() -> first entry of each distinct value, keys kept (array_unique)
+static PyObject* PHPArray_unique(PHPArrayObject* a, PyObject* unused) {
+    PyObject* items = pa_collect(a, PA_ITEMS);
+    if (!items) return NULL;
+    PHPArrayObject* r = pa_new_empty();
+    PyObject* seen = r ? PySet_New(NULL) : NULL;
+    PyObject* unhashable = seen ? PyList_New(0) : NULL;
+    int err = unhashable ? 0 : -1;
+    for (Py_ssize_t i = 0; !err && i < PyList_GET_SIZE(items); i++) {
+        PyObject* kv = PyList_GET_ITEM(items, i);
+        PyObject* v = PyTuple_GET_ITEM(kv, 1);
+        int dup = PySet_Contains(seen, v);
+        if (dup < 0 && PyErr_ExceptionMatches(PyExc_TypeError)) {
+            // Unhashable values are compared against the others one by one
+            PyErr_Clear();
+            dup = PySequence_Contains(unhashable, v);
+            if (dup == 0) dup = PyList_Append(unhashable, v);
+        } else if (dup == 0) {
+            dup = PySet_Add(seen, v);
+        }
+        if (dup < 0) err = -1;
+        else if (dup == 0) err = pa_set(r, PyTuple_GET_ITEM(kv, 0), v);
+    }
+    Py_DECREF(items);
+    Py_XDECREF(seen);
+    Py_XDECREF(unhashable);
+    if (err) Py_CLEAR(r);
+    return (PyObject*)r;
+}
+
+// merge(*arrays) -> new array: int keys renumbered, string keys
+// overwritten by later arrays (array_merge)
+static PyObject* PHPArray_merge(PHPArrayObject* a, PyObject* const* args, Py_ssize_t nargs) {
+    PHPArrayObject* r = pa_new_empty();
+    if (!r) return NULL;
+    for (Py_ssize_t i = -1; i < nargs; i++) {
+        PyObject* src = i < 0 ? (PyObject*)a : args[i];
+        PyObject* items;
+        if (PHPArray_Check(src)) {
+            items = pa_collect((PHPArrayObject*)src, PA_ITEMS);
+        } else if (PyDict_Check(src)) {
+            items = PyDict_Items(src);
+        } else {
+            PHPArrayObject* tmp = pa_new_empty();
+            items = tmp && pa_update(tmp, src) == 0 ? pa_collect(tmp, PA_ITEMS) : NULL;
+            Py_XDECREF(tmp);
+        }
+        int err = items ? 0 : -1;
+        for (Py_ssize_t j = 0; !err && j < PyList_GET_SIZE(items); j++) {
+            PyObject* kv = PyList_GET_ITEM(items, j);
+            PyObject *k, *v = PyTuple_GET_ITEM(kv, 1);
+            Py_ssize_t ikey;
+            int is_int = pa_key(PyTuple_GET_ITEM(kv, 0), &k, &ikey);
+            if (is_int < 0) { err = -1; break; }
+            err = is_int ? phparray_push((PyObject*)r, v) : pa_set(r, k, v);
+            Py_DECREF(k);
+        }
+        Py_XDECREF(items);
+        if (err) { Py_DECREF(r); return NULL; }
+    }
+    return (PyObject*)r;
+}
+
+// slice(offset, length=None, preserve_keys=False) (array_slice)
+static PyObject* PHPArray_slice(PHPArrayObject* a, PyObject* args, PyObject* kwds) {
+    static char* kwlist[] = {"offset", "length", "preserve_keys", NULL};
+    Py_ssize_t offset, len_value = 0, start, stop;
+    PyObject* length = NULL;
+    int preserve = 0;
+    if (!PyArg_ParseTupleAndKeywords(args, kwds, "n|Op:slice", kwlist, &offset, &length, &preserve)) return NULL;
+    if (length && length != Py_None && (len_value = PyNumber_AsSsize_t(length, PyExc_OverflowError)) == -1 && PyErr_Occurred()) return NULL;
+    PyObject* part = NULL;
+    MP_BEGIN_CRITICAL(a);
+    pa_range(a->used, offset, length, len_value, &start, &stop);
+    if (!a->keys) {
+        // Packed: slots are positions
+        part = PyList_New(stop - start);
+        for (Py_ssize_t i = start; part && i < stop; i++) {
+            PyObject* k = PyLong_FromSsize_t(i);
+            PyObject* kv = k ? PyTuple_Pack(2, k, a->vals[a->head + i]) : NULL;
+            Py_XDECREF(k);
+            if (!kv) { Py_CLEAR(part); break; }
+            PyList_SET_ITEM(part, i - start, kv);
+        }
+    } else {
+        PyObject* items = pa_items_locked(a);
+        part = items ? PyList_GetSlice(items, start, stop) : NULL;
+        Py_XDECREF(items);
+    }
+    MP_END_CRITICAL();
+    if (!part) return NULL;
+    PyObject* r;
+    if (preserve) {
+        r = (PyObject*)pa_new_empty();
+        if (r) {
+            for (Py_ssize_t i = 0; i < PyList_GET_SIZE(part); i++) {
+                PyObject* kv = PyList_GET_ITEM(part, i);
+                if (pa_set((PHPArrayObject*)r, PyTuple_GET_ITEM(kv, 0), PyTuple_GET_ITEM(kv, 1)) < 0) { Py_CLEAR(r); break; }
+            }
+        }
+    } else {
+        r = pa_from_items(part);
+    }
+    Py_DECREF(part);
+    return r;
+}
+
+// reverse(preserve_keys=False) -> new array in reverse order (array_reverse)
+static PyObject* PHPArray_reverse(PHPArrayObject* a, PyObject* args, PyObject* kwds) {
+    static char* kwlist[] = {"preserve_keys", NULL};
+    int preserve = 0;
+    if (!PyArg_ParseTupleAndKeywords(args, kwds, "|p:reverse", kwlist, &preserve)) return NULL;
+    PyObject* items = pa_collect(a, PA_ITEMS);
+    if (!items || PyList_Reverse(items) < 0) { Py_XDECREF(items); return NULL; }
+    PyObject* r;
+    if (preserve) {
+        r = (PyObject*)pa_new_empty();
+        for (Py_ssize_t i = 0; r && i < PyList_GET_SIZE(items); i++) {
+            PyObject* kv = PyList_GET_ITEM(items, i);
+            if (pa_set((PHPArrayObject*)r, PyTuple_GET_ITEM(kv, 0), PyTuple_GET_ITEM(kv, 1)) < 0) Py_CLEAR(r);
+        }
+    } else {
+        r = pa_from_items(items);
+    }
+    Py_DECREF(items);
+    return r;
+}
+
+// map(fn) / filter(fn=None): keys kept, as array_map / array_filter do
+// with one array
+static PyObject* pa_map_filter(PHPArrayObject* a, PyObject* fn, int filter) {
+    PyObject* items = pa_collect(a, PA_ITEMS);
+    if (!items) return NULL;
+    PHPArrayObject* r = pa_new_empty();
+    int err = r ? 0 : -1;
+    for (Py_ssize_t i = 0; !err && i < PyList_GET_SIZE(items); i++) {
+        PyObject* kv = PyList_GET_ITEM(items, i);
+        PyObject* v = PyTuple_GET_ITEM(kv, 1);
+        PyObject* out = fn == Py_None ? (Py_INCREF(v), v) : PyObject_CallOneArg(fn, v);
+        if (!out) { err = -1; break; }
+        if (filter) {
+            int keep = PyObject_IsTrue(out);
+            err = keep < 0 ? -1 : keep ? pa_set(r, PyTuple_GET_ITEM(kv, 0), v) : 0;
+        } else {
+            err = pa_set(r, PyTuple_GET_ITEM(kv, 0), out);
+        }
+        Py_DECREF(out);
+    }
+    Py_DECREF(items);
+    if (err) Py_CLEAR(r);
+    return (PyObject*)r;
+}
+
+static PyObject* PHPArray_map(PHPArrayObject* a, PyObject* fn) { return pa_map_filter(a, fn, 0); }
+
+static PyObject* PHPArray_filter(PHPArrayObject* a, PyObject* const* args, Py_ssize_t nargs) {
+    if (nargs > 1) {
+        PyErr_Format(PyExc_TypeError, "filter() takes at most 1 argument (%zd given)", nargs);
+        return NULL;
+    }
+    return pa_map_filter(a, nargs ? args[0] : Py_None, 1);
+}
+
+// sort(key=None, reverse=False): sorts the values in place and renumbers
+// them 0..n-1, like PHP's sort() / rsort()
+static PyObject* PHPArray_sort(PHPArrayObject* a, PyObject* args, PyObject* kwds) {
+    if (PyTuple_GET_SIZE(args)) {
+        PyErr_SetString(PyExc_TypeError, "sort() takes keyword arguments only");
+        return NULL;
+    }
+    PyObject* values = pa_collect(a, PA_VALUES);
+    PyObject* sort = values ? PyObject_GetAttrString(values, "sort") : NULL;
+    PyObject* r = sort ? PyObject_Call(sort, args, kwds) : NULL;
+    Py_XDECREF(sort);
+    int err = r ? 0 : -1;
+    if (!err) {
+        MP_BEGIN_CRITICAL(a);
+        err = pa_assign(a, values, 0);
+        MP_END_CRITICAL();
+    }
+    Py_XDECREF(values);
+    if (err) Py_CLEAR(r);
+    return r;
+}
+
+// ---- Methods: internal pointer ----
+
+// Value at the internal pointer (key in *key when wanted), or NULL
+// without an exception when it is past either end
+static PyObject* pa_current(PHPArrayObject* a, PyObject** key) {
+    PyObject* v = NULL;
+    MP_BEGIN_CRITICAL(a);
+    Py_ssize_t s = PA_SLOT(a, a->pos);
+    while (s >= a->head && s < a->tail && !a->vals[s]) s++;
+    if (s >= a->head && s < a->tail) {
+        a->pos = s - a->base;
+        v = a->vals[s];
+        Py_INCREF(v);
+        if (key && !(*key = pa_slot_key(a, s))) Py_CLEAR(v);
+    }
+    MP_END_CRITICAL();
+    return v;
+}
+
+// Moves the pointer: 0 to the first entry, 1 one step on, -1 one step
+// back, 2 to the last entry
+static void pa_move(PHPArrayObject* a, int how) {
+    MP_BEGIN_CRITICAL(a);
+    Py_ssize_t s = PA_SLOT(a, a->pos);
+    if (how == 0) s = a->head;
+    else if (how == 2) s = a->tail - 1;
+    else if (s >= a->head && s < a->tail) {
+        s += how;
+        while (s >= a->head && s < a->tail && !a->vals[s]) s += how;
+    }
+    a->pos = s - a->base;
+    MP_END_CRITICAL();
+}
+
+static PyObject* pa_current_or_false(PHPArrayObject* a) {
+    PyObject* v = pa_current(a, NULL);
+    if (v || PyErr_Occurred()) return v;
+    Py_RETURN_FALSE;
+}
+
+static PyObject* PHPArray_current_m(PHPArrayObject* a, PyObject* unused) { return pa_current_or_false(a); }
+static PyObject* PHPArray_reset(PHPArrayObject* a, PyObject* unused) { pa_move(a, 0); return pa_current_or_false(a); }
+static PyObject* PHPArray_end(PHPArrayObject* a, PyObject* unused) { pa_move(a, 2); return pa_current_or_false(a); }
+static PyObject* PHPArray_next(PHPArrayObject* a, PyObject* unused) { pa_move(a, 1); return pa_current_or_false(a); }
+static PyObject* PHPArray_prev(PHPArrayObject* a, PyObject* unused) { pa_move(a, -1); return pa_current_or_false(a); }
+
+static PyObject* PHPArray_key(PHPArrayObject* a, PyObject* unused) {
+    PyObject* k = NULL;
+    PyObject* v = pa_current(a, &k);
+    if (!v) {
+        if (PyErr_Occurred()) return NULL;
+        Py_RETURN_NONE;
+    }
+    Py_DECREF(v);
+    return k;
+}
+
+// ---- Comparison and repr ----
+
+// PHP ==: the same key / value pairs, in any order
+static int pa_equal(PHPArrayObject* a, PHPArrayObject* b) {
+    if (a->used != b->used) return 0;
+    PyObject* items = pa_collect(a, PA_ITEMS);
+    if (!items) return -1;
+    int eq = 1;
+    for (Py_ssize_t i = 0; eq > 0 && i < PyList_GET_SIZE(items); i++) {
+        PyObject* kv = PyList_GET_ITEM(items, i);
+        PyObject* w = pa_get(b, PyTuple_GET_ITEM(kv, 0));
+        eq = w ? PyObject_RichCompareBool(PyTuple_GET_ITEM(kv, 1), w, Py_EQ) : PyErr_Occurred() ? -1 : 0;
+        Py_XDECREF(w);
+    }
+    Py_DECREF(items);
+    return eq;
+}
+
+static PyObject* PHPArray_richcompare(PHPArrayObject* a, PyObject* other, int op) {
+    if ((op != Py_EQ && op != Py_NE) ||
+        !(PHPArray_Check(other) || PyList_Check(other) || PyTuple_Check(other) || PyDict_Check(other)))
+        Py_RETURN_NOTIMPLEMENTED;
+    PyObject* b = other;
+    if (!PHPArray_Check(other)) {
+        b = (PyObject*)pa_new_empty();
+        if (b && pa_update((PHPArrayObject*)b, other) < 0) Py_CLEAR(b);
+        if (!b) return NULL;
+    } else {
+        Py_INCREF(b);
+    }
+    int eq = pa_equal(a, (PHPArrayObject*)b);
+    Py_DECREF(b);
+    if (eq < 0) return NULL;
+    return PyBool_FromLong(op == Py_EQ ? eq : !eq);
+}
+
+// PHPArray([...]) while packed, PHPArray({...}) once keyed
+static PyObject* PHPArray_repr(PHPArrayObject* a) {
+    int rec = Py_ReprEnter((PyObject*)a);
+    if (rec != 0) return rec > 0 ? PyUnicode_FromString("PHPArray(...)") : NULL;
+    PyObject* r = NULL;
+    if (!a->keys) {
+        PyObject* values = pa_collect(a, PA_VALUES);
+        if (values) r = PyUnicode_FromFormat("PHPArray(%R)", values);
+        Py_XDECREF(values);
+    } else {
+        PyObject* items = pa_collect(a, PA_ITEMS);
+        PyObject* d = items ? PyDict_New() : NULL;
+        if (d && PyDict_MergeFromSeq2(d, items, 1) == 0) r = PyUnicode_FromFormat("PHPArray(%R)", d);
+        Py_XDECREF(d);
+        Py_XDECREF(items);
+    }
+    Py_ReprLeave((PyObject*)a);
+    return r;
+}
+
+static PyMappingMethods PHPArray_as_mapping = {
+    .mp_length = (lenfunc)PHPArray_length,
+    .mp_subscript = (binaryfunc)PHPArray_getitem,
+    .mp_ass_subscript = (objobjargproc)PHPArray_setitem,
+};
+
+static PySequenceMethods PHPArray_as_sequence = {
+    .sq_contains = (objobjproc)PHPArray_contains,
+};
+
+static PyMethodDef PHPArray_methods[] = {
+    {"push", (PyCFunction)(void(*)(void))PHPArray_push, METH_FASTCALL,
+     "push(*values) -> count: array_push; each value gets the next free int key."},
+    {"pop", (PyCFunction)PHPArray_pop, METH_NOARGS, "pop(): array_pop; None when empty."},
+    {"shift", (PyCFunction)PHPArray_shift, METH_NOARGS,
+     "shift(): array_shift; int keys are renumbered from 0. None when empty."},
+    {"unshift", (PyCFunction)(void(*)(void))PHPArray_unshift, METH_FASTCALL,
+     "unshift(*values) -> count: array_unshift; int keys are renumbered from 0."},
+    {"splice", (PyCFunction)(void(*)(void))PHPArray_splice, METH_VARARGS | METH_KEYWORDS,
+     "splice(offset, length=None, replacement=()): array_splice; returns the removed entries."},
+    {"key_exists", (PyCFunction)PHPArray_key_exists, METH_O, "key_exists(key): array_key_exists."},
+    {"get", (PyCFunction)(void(*)(void))PHPArray_get, METH_FASTCALL, "get(key, default=None)."},
+    {"search", (PyCFunction)PHPArray_search, METH_O, "search(value): first key holding value, or False."},
+    {"keys", (PyCFunction)PHPArray_keys, METH_NOARGS, "keys(): list of keys in order."},
+    {"values", (PyCFunction)PHPArray_values, METH_NOARGS, "values(): list of values in order."},
+    {"items", (PyCFunction)PHPArray_items, METH_NOARGS, "items(): list of (key, value) in order."},
+    {"copy", (PyCFunction)PHPArray_copy, METH_NOARGS, "copy(): shallow copy."},
+    {"unique", (PyCFunction)PHPArray_unique, METH_NOARGS,
+     "unique(): array_unique; the first entry of each value, keys kept."},
+    {"merge", (PyCFunction)(void(*)(void))PHPArray_merge, METH_FASTCALL,
+     "merge(*arrays): array_merge; int keys renumbered, later string keys win."},
+    {"slice", (PyCFunction)(void(*)(void))PHPArray_slice, METH_VARARGS | METH_KEYWORDS,
+     "slice(offset, length=None, preserve_keys=False): array_slice."},
+    {"reverse", (PyCFunction)(void(*)(void))PHPArray_reverse, METH_VARARGS | METH_KEYWORDS,
+     "reverse(preserve_keys=False): array_reverse, as a new array."},
+    {"map", (PyCFunction)PHPArray_map, METH_O, "map(fn): array_map over the values, keys kept."},
+    {"filter", (PyCFunction)(void(*)(void))PHPArray_filter, METH_FASTCALL,
+     "filter(fn=None): array_filter, keys kept."},
+    {"sort", (PyCFunction)(void(*)(void))PHPArray_sort, METH_VARARGS | METH_KEYWORDS,
+     "sort(key=None, reverse=False): sort the values in place, renumbering keys from 0."},
+    {"current", (PyCFunction)PHPArray_current_m, METH_NOARGS,
+     "current(): value at the internal pointer, or False."},
+    {"key", (PyCFunction)PHPArray_key, METH_NOARGS, "key(): key at the internal pointer, or None."},
+    {"next", (PyCFunction)PHPArray_next, METH_NOARGS, "next(): advance the pointer; the new current()."},
+    {"prev", (PyCFunction)PHPArray_prev, METH_NOARGS, "prev(): step the pointer back; the new current()."},
+    {"reset", (PyCFunction)PHPArray_reset, METH_NOARGS, "reset(): pointer to the first entry; its value."},
+    {"end", (PyCFunction)PHPArray_end, METH_NOARGS, "end(): pointer to the last entry; its value."},
+    {NULL, NULL, 0, NULL}
+};
+
+PyTypeObject PHPArray_Type = {
+    PyVarObject_HEAD_INIT(NULL, 0)
+    .tp_name = "microps._core.PHPArray",
+    .tp_basicsize = sizeof(PHPArrayObject),
+    .tp_flags = Py_TPFLAGS_DEFAULT | Py_TPFLAGS_BASETYPE | Py_TPFLAGS_HAVE_GC,
+    .tp_doc = "PHPArray(init=None)\n\nPHP ordered array with int and string keys. Keys are normalized "
+              "as in PHP ('8' is 8, True is 1, None is ''), push() uses the next free int key, and "
+              "iteration yields the values. init is a dict of entries or an iterable of values.",
+    .tp_new = PHPArray_new,
+    .tp_dealloc = (destructor)PHPArray_dealloc,
+    .tp_traverse = (traverseproc)PHPArray_traverse,
+    .tp_clear = (inquiry)PHPArray_clear,
+    .tp_repr = (reprfunc)PHPArray_repr,
+    .tp_iter = (getiterfunc)PHPArray_iter,
+    .tp_richcompare = (richcmpfunc)PHPArray_richcompare,
+    .tp_hash = PyObject_HashNotImplemented,
+    .tp_weaklistoffset = offsetof(PHPArrayObject, weakreflist),
+    .tp_as_mapping = &PHPArray_as_mapping,
+    .tp_as_sequence = &PHPArray_as_sequence,
+    .tp_methods = PHPArray_methods,
+};
+
+int phparray_init(PyObject* module) {
+    if (PyType_Ready(&PHPArrayIter_Type) < 0 || PyType_Ready(&PHPArray_Type) < 0) return -1;
+    Py_INCREF(&PHPArray_Type);
+    if (PyModule_AddObject(module, "PHPArray", (PyObject*)&PHPArray_Type) < 0) {
+        Py_DECREF(&PHPArray_Type);
+        return -1;
+    }
+    return 0;
+}
@@ -0,0 +1,138 @@
+// FILE: microps/native/pipeline.c
+#include "native.h"
+
+// pipeline_run(source, stages): runs recorded map / filter / reduce stages
+// over source in a single pass. Each item goes through every stage before
+// the next item is pulled, so no intermediate list is built; only the
+// final list (or the reduce accumulator) is. The per-stage semantics are
+// those of map_func / filter_func / reduce_func.
+//
+// stages is a sequence of (kind, fn) or, for reduce, (kind, fn, initial)
+// tuples; kind is one of the PIPE_* codes below (mirrored in
+// microps/pipeline.py). A reduce stage may only come last.
+
+enum { PIPE_MAP = 0, PIPE_FILTER = 1, PIPE_REDUCE = 2 };
+
+typedef struct {
+    int kind;
+    PyObject* fn;               // borrowed from the stages tuple
+} Stage;
+
+static int parse_stages(PyObject* seq, Stage* out, Py_ssize_t n, PyObject** initial) {
+    for (Py_ssize_t i = 0; i < n; i++) {
+        PyObject* st = PyTuple_GET_ITEM(seq, i);
+        Py_ssize_t size = PyTuple_Check(st) ? PyTuple_GET_SIZE(st) : -1;
+        if (size < 2 || size > 3) {
+            PyErr_SetString(PyExc_TypeError, "pipeline stages must be (kind, fn) or (kind, fn, initial) tuples");
+            return -1;
+        }
+        long kind = PyLong_AsLong(PyTuple_GET_ITEM(st, 0));
+        if (kind == -1 && PyErr_Occurred()) return -1;
+        if (kind != PIPE_MAP && kind != PIPE_FILTER && kind != PIPE_REDUCE) {
+            PyErr_Format(PyExc_ValueError, "unknown pipeline stage kind %ld", kind);
+            return -1;
+        }
+        if ((kind == PIPE_REDUCE) != (size == 3)) {
+            PyErr_SetString(PyExc_TypeError, "only reduce stages take an initial value");
+            return -1;
+        }
+        if (kind == PIPE_REDUCE) {
+            if (i != n - 1) {
+                PyErr_SetString(PyExc_ValueError, "reduce must be the last pipeline stage");
+                return -1;
+            }
+            *initial = PyTuple_GET_ITEM(st, 2);
+        }
+        out[i].kind = (int)kind;
+        out[i].fn = PyTuple_GET_ITEM(st, 1);
+        if (!PyCallable_Check(out[i].fn)) {
+            PyErr_Format(PyExc_TypeError, "pipeline stage %zd is not callable", i);
+            return -1;
+        }
+    }
+    return 0;
+}
+
+static PyObject* run(PyObject* source, Stage* stages, Py_ssize_t n, PyObject* initial) {
+    int reducing = n > 0 && stages[n - 1].kind == PIPE_REDUCE;
+    Py_ssize_t last = reducing ? n - 1 : n;
+    PyObject* acc = reducing ? initial : PyList_New(0);
+    if (!acc) return NULL;
+    if (reducing) Py_INCREF(acc);
+
+    PyObject* it = PyObject_GetIter(source);
+    if (!it) { Py_DECREF(acc); return NULL; }
+
+    PyObject* item;
+    while ((item = PyIter_Next(it))) {
+        Py_ssize_t i = 0;
+        for (; item && i < last; i++) {
+            PyObject* r = PyObject_CallOneArg(stages[i].fn, item);
+            if (stages[i].kind == PIPE_MAP || !r) {
+                Py_DECREF(item);
+                item = r;
+                if (!r) goto error;
+                continue;
+            }
+            int keep = PyObject_IsTrue(r);
+            Py_DECREF(r);
+            if (keep <= 0) {
+                Py_CLEAR(item);
+                if (keep < 0) goto error;
+            }
+        }
+        if (!item) continue;            // filtered out
+        if (reducing) {
+            PyObject* argv[2] = {acc, item};
+            PyObject* next = PyObject_Vectorcall(stages[last].fn, argv, 2, NULL);
+            Py_DECREF(item);
+            if (!next) goto error;
+            Py_SETREF(acc, next);
+        } else {
+            int rc = PyList_Append(acc, item);
+            Py_DECREF(item);
+            if (rc < 0) goto error;
+        }
+    }
+    Py_DECREF(it);
+    if (PyErr_Occurred()) { Py_DECREF(acc); return NULL; }
+    return acc;
+
+error:
+    Py_DECREF(it);
+    Py_DECREF(acc);
+    return NULL;
+}
+
+static PyObject* py_pipeline_run(PyObject* self, PyObject* const* args, Py_ssize_t nargs) {
+    if (nargs != 2) {
+        PyErr_Format(PyExc_TypeError, "pipeline_run() takes exactly 2 arguments (%zd given)", nargs);
+        return NULL;
+    }
+    // A private tuple keeps the stage functions alive even if a stage, or
+    // another thread, mutates the caller's list mid-run. Everything else
+    // the run touches is local to this call.
+    PyObject* seq = PySequence_Tuple(args[1]);
+    if (!seq) return NULL;
+    Py_ssize_t n = PyTuple_GET_SIZE(seq);
+    Stage* stages = PyMem_Malloc((n ? n : 1) * sizeof(Stage));
+    if (!stages) { Py_DECREF(seq); return PyErr_NoMemory(); }
+    PyObject* initial = NULL;
+    PyObject* result = NULL;
+    if (parse_stages(seq, stages, n, &initial) == 0) {
+        result = run(value_unwrap(args[0]), stages, n, initial);
+    }
+    PyMem_Free(stages);
+    Py_DECREF(seq);
+    return result;
+}
+
+static PyMethodDef pipeline_functions[] = {
+    {"pipeline_run", (PyCFunction)(void(*)(void))py_pipeline_run, METH_FASTCALL,
+     "pipeline_run(source, stages): run map/filter/reduce stages over source in one pass."},
+    {NULL, NULL, 0, NULL}
+};
+
+int pipeline_init(PyObject* module) {
+    return PyModule_AddFunctions(module, pipeline_functions);
+}
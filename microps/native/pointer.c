@@ -0,0 +1,279 @@
+// FILE: microps/native/pointer.c
+#include "native.h"
+#include "microops.h"
+#include "structmember.h"
+
+// Pointer(base, offset=0): a position inside a sequence or buffer, without
+// copying it. Arithmetic moves the position; indexing reads and writes the
+// base; buffer-protocol bases are re-exported from the offset onwards, so
+// memoryview(p), memset/memcpy and struct.unpack_from all see the tail of
+// the original memory.
+
+static PyObject* pointer_make(PyTypeObject* type, PyObject* base, Py_ssize_t offset) {
+    // Pointers to pointers collapse onto the underlying base
+    if (Pointer_Check(base)) {
+        offset += ((PointerObject*)base)->offset;
+        base = ((PointerObject*)base)->base;
+    }
+    PointerObject* p = (PointerObject*)type->tp_alloc(type, 0);
+    if (!p) return NULL;
+    Py_INCREF(base);
+    p->base = base;
+    p->offset = offset;
+    return (PyObject*)p;
+}
+
+PyObject* pointer_new(PyObject* base, Py_ssize_t offset) {
+    return pointer_make(&Pointer_Type, value_unwrap(base), offset);
+}
+
+static PyObject* Pointer_new(PyTypeObject* type, PyObject* args, PyObject* kwds) {
+    static char* kwlist[] = {"base", "offset", NULL};
+    PyObject* base;
+    Py_ssize_t offset = 0;
+    if (!PyArg_ParseTupleAndKeywords(args, kwds, "O|n:Pointer", kwlist, &base, &offset)) return NULL;
+    return pointer_make(type, value_unwrap(base), offset);
+}
+
+// --- Arithmetic ---
+
+static int as_offset(PyObject* x, Py_ssize_t* out) {
+    x = value_unwrap(x);
+    if (!PyLong_Check(x)) return 0;
+    *out = PyLong_AsSsize_t(x);
+    return *out != -1 || !PyErr_Occurred() ? 1 : -1;
+}
+
+static PyObject* Pointer_add(PyObject* a, PyObject* b) {
+    PyObject* p = Pointer_Check(a) ? a : b;
+    Py_ssize_t n;
+    int ok = as_offset(p == a ? b : a, &n);
+    if (ok < 0) return NULL;
+    if (!ok) Py_RETURN_NOTIMPLEMENTED;
+    PointerObject* self = (PointerObject*)p;
+    return pointer_make(Py_TYPE(p), self->base, self->offset + n);
+}
+
+static PyObject* Pointer_sub(PyObject* a, PyObject* b) {
+    if (!Pointer_Check(a)) Py_RETURN_NOTIMPLEMENTED;
+    PointerObject* self = (PointerObject*)a;
+    Py_ssize_t n;
+    int ok = as_offset(b, &n);
+    if (ok < 0) return NULL;
+    if (ok) return pointer_make(Py_TYPE(a), self->base, self->offset - n);
+
+    // p - q: distance between two positions in the same base
+    b = value_unwrap(b);
+    PyObject* other_base = Pointer_Check(b) ? ((PointerObject*)b)->base : b;
+    Py_ssize_t other_off = Pointer_Check(b) ? ((PointerObject*)b)->offset : 0;
+    if (other_base != self->base) {
+        PyErr_SetString(PyExc_TypeError, "cannot subtract pointers into different objects");
+        return NULL;
+    }
+    return PyLong_FromSsize_t(self->offset - other_off);
+}
+
+static int Pointer_bool(PointerObject* self) {
+    return self->base != Py_None;
+}
+
+static PyNumberMethods Pointer_as_number = {
+    .nb_add = Pointer_add,
+    .nb_subtract = Pointer_sub,
+    .nb_bool = (inquiry)Pointer_bool,
+};
+
+// --- Indexing ---
+
+static PyObject* pointer_item(PointerObject* self, Py_ssize_t i) {
+    if (self->offset + i < 0) {
+        PyErr_SetString(PyExc_IndexError, "pointer index before start of object");
+        return NULL;
+    }
+    return PySequence_GetItem(self->base, self->offset + i);
+}
+
+static Py_ssize_t Pointer_length(PointerObject* self) {
+    Py_ssize_t n = PyObject_Length(self->base);
+    if (n < 0) return -1;
+    return n > self->offset ? n - self->offset : 0;
+}
+
+static PyObject* Pointer_subscript(PointerObject* self, PyObject* key) {
+    key = value_unwrap(key);
+    if (PySlice_Check(key)) {
+        Py_ssize_t start, stop, step;
+        if (PySlice_Unpack(key, &start, &stop, &step) < 0) return NULL;
+        Py_ssize_t len = Pointer_length(self);
+        if (len < 0) return NULL;
+        PySlice_AdjustIndices(len, &start, &stop, step);
+        if (step != 1) {
+            PyErr_SetString(PyExc_ValueError, "pointer slices must have step 1");
+            return NULL;
+        }
+        return micro_slice_range(self->base, self->offset + start, self->offset + stop);
+    }
+    Py_ssize_t i;
+    int ok = as_offset(key, &i);
+    if (ok < 0) return NULL;
+    if (!ok) {
+        PyErr_Format(PyExc_TypeError, "pointer index must be an int, not '%.200s'", Py_TYPE(key)->tp_name);
+        return NULL;
+    }
+    return pointer_item(self, i);
+}
+
+static int Pointer_ass_subscript(PointerObject* self, PyObject* key, PyObject* value) {
+    Py_ssize_t i;
+    int ok = as_offset(key, &i);
+    if (ok < 0) return -1;
+    if (!ok || !value) {
+        PyErr_SetString(PyExc_TypeError, "pointer assignment needs an int index and a value");
+        return -1;
+    }
+    if (self->offset + i < 0) {
+        PyErr_SetString(PyExc_IndexError, "pointer index before start of object");
+        return -1;
+    }
+    return PySequence_SetItem(self->base, self->offset + i, value_unwrap(value));
+}
+
+static PyMappingMethods Pointer_as_mapping = {
+    .mp_length = (lenfunc)Pointer_length,
+    .mp_subscript = (binaryfunc)Pointer_subscript,
+    .mp_ass_subscript = (objobjargproc)Pointer_ass_subscript,
+};
+
+// --- Buffer export: the base's memory from offset onwards ---
+
+// Per-export state: the base's own export, and the shape / stride handed
+// out, so concurrent exports from several threads share nothing.
+typedef struct {
+    Py_buffer base;
+    Py_ssize_t shape;               // items from offset on
+    Py_ssize_t stride;              // base itemsize
+} PointerExport;
+
+static int Pointer_getbuffer(PointerObject* self, Py_buffer* view, int flags) {
+    PointerExport* ex = PyMem_Malloc(sizeof(PointerExport));
+    if (!ex) { PyErr_NoMemory(); return -1; }
+    int base_flags = PyBUF_FORMAT | PyBUF_C_CONTIGUOUS | (flags & PyBUF_WRITABLE);
+    if (PyObject_GetBuffer(self->base, &ex->base, base_flags) < 0) {
+        PyMem_Free(ex);
+        return -1;
+    }
+    Py_ssize_t n = ex->base.len / ex->base.itemsize;
+    if (ex->base.ndim > 1 || self->offset < 0 || self->offset > n) {
+        PyErr_SetString(PyExc_BufferError, "pointer is outside its object's 1-D buffer");
+        PyBuffer_Release(&ex->base);
+        PyMem_Free(ex);
+        return -1;
+    }
+    ex->shape = n - self->offset;
+    ex->stride = ex->base.itemsize;
+
+    view->obj = (PyObject*)self;
+    Py_INCREF(self);
+    view->buf = (char*)ex->base.buf + self->offset * ex->base.itemsize;
+    view->len = ex->shape * ex->base.itemsize;
+    view->readonly = ex->base.readonly;
+    view->itemsize = ex->base.itemsize;
+    view->format = (flags & PyBUF_FORMAT) ? ex->base.format : NULL;
+    view->ndim = 1;
+    view->shape = (flags & PyBUF_ND) ? &ex->shape : NULL;
+    view->strides = (flags & PyBUF_STRIDES) == PyBUF_STRIDES ? &ex->stride : NULL;
+    view->suboffsets = NULL;
+    view->internal = ex;
+    return 0;
+}
+
+static void Pointer_releasebuffer(PointerObject* self, Py_buffer* view) {
+    PointerExport* ex = view->internal;
+    PyBuffer_Release(&ex->base);
+    PyMem_Free(ex);
+}
+
+static PyBufferProcs Pointer_as_buffer = {
+    .bf_getbuffer = (getbufferproc)Pointer_getbuffer,
+    .bf_releasebuffer = (releasebufferproc)Pointer_releasebuffer,
+};
+
+// --- Object protocol ---
+
+static PyObject* Pointer_richcompare(PyObject* a, PyObject* b, int op) {
+    if (!Pointer_Check(a) || !Pointer_Check(b) || (op != Py_EQ && op != Py_NE)) Py_RETURN_NOTIMPLEMENTED;
+    PointerObject *p = (PointerObject*)a, *q = (PointerObject*)b;
+    int eq = p->base == q->base && p->offset == q->offset;
+    return PyBool_FromLong(op == Py_EQ ? eq : !eq);
+}
+
+static Py_hash_t Pointer_hash(PointerObject* self) {
+    Py_hash_t h = (Py_hash_t)((uintptr_t)self->base >> 4) ^ (Py_hash_t)self->offset;
+    return h == -1 ? -2 : h;
+}
+
+static PyObject* Pointer_repr(PointerObject* self) {
+    return PyUnicode_FromFormat("<pointer to %s at %p, offset %zd>", Py_TYPE(self->base)->tp_name,
+                                (void*)self->base, self->offset);
+}
+
+static int Pointer_traverse(PointerObject* self, visitproc visit, void* arg) {
+    Py_VISIT(self->base);
+    return 0;
+}
+
+static int Pointer_clear(PointerObject* self) {
+    Py_CLEAR(self->base);
+    return 0;
+}
+
+static void Pointer_dealloc(PointerObject* self) {
+    PyObject_GC_UnTrack(self);
+    Pointer_clear(self);
+    Py_TYPE(self)->tp_free((PyObject*)self);
+}
+
+static PyObject* Pointer_deref(PointerObject* self, PyObject* unused) {
+    return pointer_item(self, 0);
+}
+
+static PyMethodDef Pointer_methods[] = {
+    {"deref", (PyCFunction)Pointer_deref, METH_NOARGS, "deref(): the item the pointer points at (*p)."},
+    {NULL, NULL, 0, NULL}
+};
+
+static PyMemberDef Pointer_members[] = {
+    {"base", T_OBJECT, offsetof(PointerObject, base), READONLY, "Object the pointer points into."},
+    {"offset", T_PYSSIZET, offsetof(PointerObject, offset), READONLY, "Position inside base, in items."},
+    {NULL}
+};
+
+PyTypeObject Pointer_Type = {
+    PyVarObject_HEAD_INIT(NULL, 0)
+    .tp_name = "microps._core.Pointer",
+    .tp_basicsize = sizeof(PointerObject),
+    .tp_flags = Py_TPFLAGS_DEFAULT | Py_TPFLAGS_HAVE_GC,
+    .tp_doc = "Pointer(base, offset=0)\n\nZero-copy position inside a sequence or buffer.",
+    .tp_new = Pointer_new,
+    .tp_dealloc = (destructor)Pointer_dealloc,
+    .tp_traverse = (traverseproc)Pointer_traverse,
+    .tp_clear = (inquiry)Pointer_clear,
+    .tp_repr = (reprfunc)Pointer_repr,
+    .tp_hash = (hashfunc)Pointer_hash,
+    .tp_richcompare = Pointer_richcompare,
+    .tp_as_number = &Pointer_as_number,
+    .tp_as_mapping = &Pointer_as_mapping,
+    .tp_as_buffer = &Pointer_as_buffer,
+    .tp_methods = Pointer_methods,
+    .tp_members = Pointer_members,
+};
+
+int pointer_init(PyObject* module) {
+    if (PyType_Ready(&Pointer_Type) < 0) return -1;
+    Py_INCREF(&Pointer_Type);
+    if (PyModule_AddObject(module, "Pointer", (PyObject*)&Pointer_Type) < 0) {
+        Py_DECREF(&Pointer_Type);
+        return -1;
+    }
+    return 0;
+}
@@ -0,0 +1,195 @@
+// FILE: microps/native/profile.c
+#include "native.h"
+#ifdef _WIN32
+#include <windows.h>
+#else
+#include <time.h>
+#endif
+
+// Opt-in per-op counters for the WRAP_* trampolines in _core.c. While
+// profiling is off every trampoline pays one branch on profile_enabled.
+// When on, each op's OpStats is linked into _stats on its first call, and
+// calls are also attributed to the current label (set by the Python side
+// around *Value methods, see microps/profiler.py). The label is context
+// local so threads do not steal each other's attribution; the per-op
+// counters themselves are approximate on free-threaded builds.
+int profile_enabled = 0;
+static OpStats* _stats = NULL;
+static PyObject* _label_var = NULL;     // ContextVar: current label
+static PyObject* _by_label = NULL;      // label -> {op: [calls, ns]}
+
+uint64_t profile_now(void) {
+#ifdef _WIN32
+    static LARGE_INTEGER freq;
+    LARGE_INTEGER t;
+    if (!freq.QuadPart) QueryPerformanceFrequency(&freq);
+    QueryPerformanceCounter(&t);
+    return (uint64_t)(t.QuadPart * 1000000000.0 / freq.QuadPart);
+#else
+    struct timespec ts;
+    clock_gettime(CLOCK_MONOTONIC, &ts);
+    return (uint64_t)ts.tv_sec * 1000000000u + (uint64_t)ts.tv_nsec;
+#endif
+}
+
+// Adds one call of `elapsed` ns to label -> op. Errors are swallowed: the
+// profiler must never change what the op returns.
+static void record_label(PyObject* label, const char* op, uint64_t elapsed) {
+    PyObject *exc_type, *exc_value, *exc_tb;
+    PyErr_Fetch(&exc_type, &exc_value, &exc_tb);
+    MP_BEGIN_CRITICAL(_by_label);
+    PyObject* ops = PyDict_GetItemWithError(_by_label, label);
+    if (!ops && !PyErr_Occurred()) {
+        ops = PyDict_New();
+        if (ops && PyDict_SetItem(_by_label, label, ops) < 0) Py_CLEAR(ops);
+        Py_XDECREF(ops);        // borrowed from _by_label from here on
+    }
+    if (ops) {
+        PyObject* cell = PyDict_GetItemString(ops, op);
+        uint64_t calls = 1, ns = elapsed;
+        if (cell) {
+            calls += PyLong_AsUnsignedLongLong(PyList_GET_ITEM(cell, 0));
+            ns += PyLong_AsUnsignedLongLong(PyList_GET_ITEM(cell, 1));
+        }
+        PyObject* fresh = Py_BuildValue("[KK]", (unsigned long long)calls, (unsigned long long)ns);
+        if (fresh) {
+            PyDict_SetItemString(ops, op, fresh);
+            Py_DECREF(fresh);
+        }
+    }
+    MP_END_CRITICAL();
+    PyErr_Clear();
+    PyErr_Restore(exc_type, exc_value, exc_tb);
+}
+
+void profile_record(OpStats* st, uint64_t start) {
+    uint64_t elapsed = profile_now() - start;
+    if (!st->registered) {
+        MP_BEGIN_CRITICAL(_by_label);
+        if (!st->registered) {
+            st->next = _stats;
+            _stats = st;
+            st->registered = 1;
+        }
+        MP_END_CRITICAL();
+    }
+    st->calls++;
+    st->ns += elapsed;
+    PyObject* label = NULL;
+    if (PyContextVar_Get(_label_var, NULL, &label) < 0) {
+        PyErr_Clear();
+    } else if (label) {
+        if (label != Py_None) record_label(label, st->name, elapsed);
+        Py_DECREF(label);
+    }
+}
+
+// --- Module-level functions ---
+
+// profile(flag=None) -> previous state; with no argument just reports it
+static PyObject* py_profile(PyObject* self, PyObject* const* args, Py_ssize_t nargs) {
+    if (nargs > 1) {
+        PyErr_Format(PyExc_TypeError, "profile() takes at most 1 argument (%zd given)", nargs);
+        return NULL;
+    }
+    int was = profile_enabled;
+    if (nargs == 1) {
+        int on = PyObject_IsTrue(args[0]);
+        if (on < 0) return NULL;
+        profile_enabled = on;
+    }
+    return PyBool_FromLong(was);
+}
+
+static PyObject* stats_dict(uint64_t calls, uint64_t ns) {
+    return Py_BuildValue("{sKsK}", "calls", (unsigned long long)calls, "ns", (unsigned long long)ns);
+}
+
+static PyObject* py_profile_snapshot(PyObject* self, PyObject* unused) {
+    PyObject* out = PyDict_New();
+    if (!out) return NULL;
+    for (OpStats* st = _stats; st; st = st->next) {
+        if (!st->calls) continue;
+        PyObject* d = stats_dict(st->calls, st->ns);
+        if (!d || PyDict_SetItemString(out, st->name, d) < 0) {
+            Py_XDECREF(d);
+            Py_DECREF(out);
+            return NULL;
+        }
+        Py_DECREF(d);
+    }
+    return out;
+}
+
+// Walked inside the same critical section record_label fills it under
+static PyObject* py_profile_labels(PyObject* self, PyObject* unused) {
+    PyObject* out = PyDict_New();
+    if (!out) return NULL;
+    int err = 0;
+    MP_BEGIN_CRITICAL(_by_label);
+    Py_ssize_t pos = 0;
+    PyObject *label, *ops;
+    while (!err && PyDict_Next(_by_label, &pos, &label, &ops)) {
+        PyObject* per_op = PyDict_New();
+        err = !per_op || PyDict_SetItem(out, label, per_op) < 0;
+        Py_ssize_t opos = 0;
+        PyObject *op, *cell;
+        while (!err && PyDict_Next(ops, &opos, &op, &cell)) {
+            PyObject* d = stats_dict(PyLong_AsUnsignedLongLong(PyList_GET_ITEM(cell, 0)),
+                                     PyLong_AsUnsignedLongLong(PyList_GET_ITEM(cell, 1)));
+            err = !d || PyDict_SetItem(per_op, op, d) < 0;
+            Py_XDECREF(d);
+        }
+        Py_XDECREF(per_op);
+    }
+    MP_END_CRITICAL();
+    if (err) Py_CLEAR(out);
+    return out;
+}
+
+static PyObject* py_profile_reset(PyObject* self, PyObject* unused) {
+    for (OpStats* st = _stats; st; st = st->next) {
+        st->calls = 0;
+        st->ns = 0;
+    }
+    MP_BEGIN_CRITICAL(_by_label);
+    PyDict_Clear(_by_label);
+    MP_END_CRITICAL();
+    Py_RETURN_NONE;
+}
+
+// profile_enter(label) -> previous label; calls are attributed to label
+// until the matching profile_exit(previous)
+static PyObject* py_profile_enter(PyObject* self, PyObject* label) {
+    PyObject* prev;
+    if (PyContextVar_Get(_label_var, Py_None, &prev) < 0) return NULL;
+    PyObject* token = PyContextVar_Set(_label_var, label);
+    if (!token) { Py_DECREF(prev); return NULL; }
+    Py_DECREF(token);
+    return prev;
+}
+
+static PyMethodDef profile_functions[] = {
+    {"profile", (PyCFunction)(void(*)(void))py_profile, METH_FASTCALL,
+     "profile(flag=None): turn per-op counters on or off; returns the previous state."},
+    {"profile_snapshot", py_profile_snapshot, METH_NOARGS,
+     "profile_snapshot(): {op: {'calls': n, 'ns': total}} for every op called while profiling."},
+    {"profile_labels", py_profile_labels, METH_NOARGS,
+     "profile_labels(): {label: {op: {'calls': n, 'ns': total}}} for labelled calls."},
+    {"profile_reset", py_profile_reset, METH_NOARGS,
+     "profile_reset(): zero all counters."},
+    {"profile_enter", py_profile_enter, METH_O,
+     "profile_enter(label): attribute following calls to label; returns the previous label."},
+    {"profile_exit", py_profile_enter, METH_O,
+     "profile_exit(previous): restore the label returned by profile_enter."},
+    {NULL, NULL, 0, NULL}
+};
+
+int profile_init(PyObject* module) {
+    if (!_by_label) {
+        _by_label = PyDict_New();
+        _label_var = PyContextVar_New("microps_profile_label", NULL);
+        if (!_by_label || !_label_var) return -1;
+    }
+    return PyModule_AddFunctions(module, profile_functions);
+}
@@ -0,0 +1,445 @@
+// FILE: microps/native/scope.c
+#include "native.h"
+#include "microops.h"
+#include "structmember.h"
+
+// name -> ScopeObject. Scope objects are never removed, so handles held by
+// engines stay valid for the life of the interpreter.
+static PyObject* _scopes = NULL;
+static PyObject* _global_name = NULL;
+static PyObject* _ghost_prefix = NULL;
+
+// Context-local overlays (microps.scope_context). While one is active in
+// the current context (thread or task), writes go to its layer for the
+// scope and reads check the overlay before the shared scope, so concurrent
+// requests never see each other's variables. _overlays_live counts
+// overlays pushed anywhere; while it is zero lookups skip the ContextVar.
+//
+// An overlay is a (layers, outer) tuple: layers maps scope name -> dict of
+// this context's writes, outer is the enclosing overlay or None. Pushing
+// one is O(1) whatever the enclosing overlays hold; reads fall through
+// layers innermost first, writes only touch the innermost (copy-on-write).
+static PyObject* _overlay_var = NULL;
+static Py_ssize_t _overlays_live = 0;
+
+#define OVERLAY_LAYERS(ov) PyTuple_GET_ITEM(ov, 0)
+#define OVERLAY_OUTER(ov) PyTuple_GET_ITEM(ov, 1)
+
+// New reference to the current overlay, or NULL with no exception set
+// when there is none.
+static PyObject* overlay_current(void) {
+    if (!_overlays_live) return NULL;
+    PyObject* ov;
+    if (PyContextVar_Get(_overlay_var, NULL, &ov) < 0) return NULL;
+    return ov;
+}
+
+// Looks `key` up in the layers for scope `name`, from overlay `ov`
+// outwards. New reference, or NULL (exception set only on error).
+static PyObject* overlay_find(PyObject* ov, PyObject* name, PyObject* key) {
+    for (; ov != Py_None; ov = OVERLAY_OUTER(ov)) {
+        // Layers are only ever added to an overlay, never removed
+        PyObject* layer = PyDict_GetItemWithError(OVERLAY_LAYERS(ov), name);
+        if (!layer && PyErr_Occurred()) return NULL;
+        PyObject* v = layer ? mp_dict_get_ref(layer, key) : NULL;
+        if (v || PyErr_Occurred()) return v;
+    }
+    return NULL;
+}
+
+// Finds `key` along the scope chain. Returns a new reference, or NULL with
+// no exception set when the name is not bound anywhere.
+static PyObject* scope_find(ScopeObject* s, PyObject* key, int use_builtins) {
+    PyObject* ov = overlay_current();
+    if (!ov && PyErr_Occurred()) return NULL;
+    PyObject* v = NULL;
+    for (; s; s = s->parent) {
+        if (ov) {
+            v = overlay_find(ov, s->name, key);
+            if (v || PyErr_Occurred()) break;
+        }
+        v = mp_dict_get_ref(s->vars, key);
+        if (v || PyErr_Occurred()) break;
+        if (use_builtins) {
+            PyObject* builtins;
+            MP_BEGIN_CRITICAL(s);
+            builtins = s->builtins;
+            Py_XINCREF(builtins);
+            MP_END_CRITICAL();
+            if (builtins) {
+                v = mp_dict_get_ref(builtins, key);
+                Py_DECREF(builtins);
+                if (v || PyErr_Occurred()) break;
+            }
+        }
+    }
+    Py_XDECREF(ov);
+    return v;
+}
+
+// The dict that writes to `s` go to: the innermost overlay's layer for s
+// (created on first write) or s->vars. Returns a borrowed reference that
+// stays valid while *ov is held; the caller releases *ov with Py_XDECREF.
+static PyObject* scope_target(ScopeObject* s, PyObject** ov) {
+    *ov = overlay_current();
+    if (!*ov) return PyErr_Occurred() ? NULL : s->vars;
+    PyObject* layers = OVERLAY_LAYERS(*ov);
+    PyObject* layer = PyDict_GetItemWithError(layers, s->name);
+    if (layer || PyErr_Occurred()) return layer;
+    PyObject* fresh = PyDict_New();
+    if (!fresh) return NULL;
+    layer = PyDict_SetDefault(layers, s->name, fresh);
+    Py_DECREF(fresh);
+    return layer;
+}
+
+static int scope_store(ScopeObject* s, PyObject* key, PyObject* value) {
+    PyObject* ov;
+    PyObject* target = scope_target(s, &ov);
+    int err = -1;
+    if (target) {
+        if (!PyUnicode_CheckExact(key)) {
+            err = PyDict_SetItem(target, key, value);
+        } else {
+            Py_INCREF(key);
+            PyUnicode_InternInPlace(&key);
+            err = PyDict_SetItem(target, key, value);
+            Py_DECREF(key);
+        }
+    }
+    Py_XDECREF(ov);
+    return err;
+}
+
+static PyObject* scope_new(PyObject* name, ScopeObject* parent) {
+    ScopeObject* s = PyObject_GC_New(ScopeObject, &Scope_Type);
+    if (!s) return NULL;
+    Py_INCREF(name); s->name = name;
+    s->builtins = NULL;
+    Py_XINCREF(parent); s->parent = parent;
+    s->vars = PyDict_New();
+    if (!s->vars) { Py_DECREF(s); return NULL; }
+    PyObject_GC_Track(s);
+    return (PyObject*)s;
+}
+
+ScopeObject* scope_for(PyObject* name) {
+    if (!PyUnicode_Check(name)) {
+        PyErr_SetString(PyExc_TypeError, "scope name must be str");
+        return NULL;
+    }
+    PyObject* s = PyDict_GetItemWithError(_scopes, name);
+    if (s || PyErr_Occurred()) return (ScopeObject*)s;
+    ScopeObject* parent = NULL;
+    if (PyUnicode_Compare(name, _global_name) != 0) {
+        if (PyErr_Occurred()) return NULL;
+        parent = scope_for(_global_name);
+        if (!parent) return NULL;
+    }
+    s = scope_new(name, parent);
+    if (!s) return NULL;
+    // Two threads may race to create the same scope; both get the winner
+    PyObject* stored = PyDict_SetDefault(_scopes, name, s);
+    Py_DECREF(s);
+    return (ScopeObject*)stored;
+}
+
+// Copies are shallow: names are rebound, values are shared with the live
+// scopes. PyDict_Copy of a compact dict is a block copy of its table.
+PyObject* scopes_save(void) {
+    PyObject* saved = PyDict_New();
+    if (!saved) return NULL;
+    int err = 0;
+    MP_BEGIN_CRITICAL(_scopes);
+    Py_ssize_t pos = 0;
+    PyObject *name, *s;
+    while (!err && PyDict_Next(_scopes, &pos, &name, &s)) {
+        PyObject* vars = PyDict_Copy(((ScopeObject*)s)->vars);
+        err = vars ? PyDict_SetItem(saved, name, vars) : -1;
+        Py_XDECREF(vars);
+    }
+    MP_END_CRITICAL();
+    if (err < 0) { Py_DECREF(saved); return NULL; }
+    return saved;
+}
+
+// The vars dicts are refilled in place rather than swapped, so lookups
+// running in other threads never see a freed dict.
+int scopes_load(PyObject* saved) {
+    PyObject* all;
+    MP_BEGIN_CRITICAL(_scopes);
+    all = PyDict_Items(_scopes);
+    MP_END_CRITICAL();
+    if (!all) return -1;
+    int err = 0;
+    for (Py_ssize_t i = 0; !err && i < PyList_GET_SIZE(all); i++) {
+        PyObject* pair = PyList_GET_ITEM(all, i);
+        PyObject* vars = ((ScopeObject*)PyTuple_GET_ITEM(pair, 1))->vars;
+        PyObject* from = mp_dict_get_ref(saved, PyTuple_GET_ITEM(pair, 0));
+        if (!from && PyErr_Occurred()) { err = -1; break; }
+        MP_BEGIN_CRITICAL(vars);
+        PyDict_Clear(vars);
+        if (from) err = PyDict_Update(vars, from);
+        MP_END_CRITICAL();
+        Py_XDECREF(from);
+    }
+    Py_DECREF(all);
+    return err;
+}
+
+// --- Scope methods ---
+
+// Read-and-increment is one atomic step per target dict. Inside an
+// overlay the counter starts from the value the enclosing overlays (or the
+// shared scope) hold and then diverges.
+static PyObject* Scope_haunted(ScopeObject* self, PyObject* key) {
+    PyObject* ov;
+    PyObject* target = scope_target(self, &ov);
+    if (!target) { Py_XDECREF(ov); return NULL; }
+    PyObject* r = NULL;
+    MP_BEGIN_CRITICAL(target);
+    int seeded = 1;
+    if (target != self->vars && (seeded = PyDict_Contains(target, key)) == 0) {
+        PyObject* shared = overlay_find(OVERLAY_OUTER(ov), self->name, key);
+        if (!shared && !PyErr_Occurred()) shared = mp_dict_get_ref(self->vars, key);
+        seeded = shared ? PyDict_SetItem(target, key, shared) : (PyErr_Occurred() ? -1 : 0);
+        Py_XDECREF(shared);
+    }
+    if (seeded >= 0) {
+        r = micro_inc_get(target, key);
+        if (r && PyErr_Occurred()) Py_CLEAR(r);
+    }
+    MP_END_CRITICAL();
+    Py_XDECREF(ov);
+    return r;
+}
+
+static PyObject* Scope_get(ScopeObject* self, PyObject* const* args, Py_ssize_t nargs) {
+    if (nargs < 1 || nargs > 2) {
+        PyErr_Format(PyExc_TypeError, "get() takes 1 or 2 arguments (%zd given)", nargs);
+        return NULL;
+    }
+    PyObject* v = scope_find(self, args[0], 0);
+    if (!v) {
+        if (PyErr_Occurred()) return NULL;
+        v = nargs == 2 ? args[1] : Py_None;
+        Py_INCREF(v);
+    }
+    return v;
+}
+
+static PyObject* Scope_lookup(ScopeObject* self, PyObject* const* args, Py_ssize_t nargs) {
+    if (nargs != 2) {
+        PyErr_Format(PyExc_TypeError, "lookup() takes exactly 2 arguments (%zd given)", nargs);
+        return NULL;
+    }
+    PyObject* key = args[0];
+    if (PyUnicode_Check(key) && PyUnicode_Tailmatch(key, _ghost_prefix, 0, 6, -1) == 1)
+        return Scope_haunted(self, key);
+    PyObject* v = scope_find(self, key, 1);
+    if (!v) {
+        if (PyErr_Occurred()) return NULL;
+        v = args[1];
+        Py_INCREF(v);
+    }
+    return v;
+}
+
+static PyObject* Scope_set(ScopeObject* self, PyObject* const* args, Py_ssize_t nargs) {
+    if (nargs != 2) {
+        PyErr_Format(PyExc_TypeError, "set() takes exactly 2 arguments (%zd given)", nargs);
+        return NULL;
+    }
+    if (scope_store(self, args[0], args[1]) < 0) return NULL;
+    Py_RETURN_NONE;
+}
+
+static PyObject* Scope_repr(ScopeObject* self) {
+    return PyUnicode_FromFormat("<scope %R (%zd names)>", self->name, PyDict_GET_SIZE(self->vars));
+}
+
+static int Scope_traverse(ScopeObject* self, visitproc visit, void* arg) {
+    Py_VISIT(self->vars);
+    Py_VISIT(self->builtins);
+    Py_VISIT(self->parent);
+    return 0;
+}
+
+static int Scope_clear(ScopeObject* self) {
+    Py_CLEAR(self->vars);
+    Py_CLEAR(self->builtins);
+    Py_CLEAR(self->parent);
+    return 0;
+}
+
+static void Scope_dealloc(ScopeObject* self) {
+    PyObject_GC_UnTrack(self);
+    Scope_clear(self);
+    Py_XDECREF(self->name);
+    PyObject_GC_Del(self);
+}
+
+static PyMethodDef Scope_methods[] = {
+    {"get", (PyCFunction)(void(*)(void))Scope_get, METH_FASTCALL,
+     "get(name, default=None): value bound in this scope or a parent scope."},
+    {"lookup", (PyCFunction)(void(*)(void))Scope_lookup, METH_FASTCALL,
+     "lookup(name, default): full engine resolution - ghost_ names, scope, builtins, then parents."},
+    {"set", (PyCFunction)(void(*)(void))Scope_set, METH_FASTCALL,
+     "set(name, value): bind name in this scope."},
+    {"haunted", (PyCFunction)Scope_haunted, METH_O,
+     "haunted(name): return the current value of a ghost variable and increment it."},
+    {NULL, NULL, 0, NULL}
+};
+
+static PyMemberDef Scope_members[] = {
+    {"name", T_OBJECT, offsetof(ScopeObject, name), READONLY, NULL},
+    {"vars", T_OBJECT, offsetof(ScopeObject, vars), READONLY, NULL},
+    {"parent", T_OBJECT, offsetof(ScopeObject, parent), READONLY, NULL},
+    {NULL}
+};
+
+PyTypeObject Scope_Type = {
+    PyVarObject_HEAD_INIT(NULL, 0)
+    .tp_name = "microps._core.Scope",
+    .tp_basicsize = sizeof(ScopeObject),
+    .tp_flags = Py_TPFLAGS_DEFAULT | Py_TPFLAGS_HAVE_GC,
+    .tp_doc = "Variable table for one engine, chained to the global scope.",
+    .tp_dealloc = (destructor)Scope_dealloc,
+    .tp_traverse = (traverseproc)Scope_traverse,
+    .tp_clear = (inquiry)Scope_clear,
+    .tp_repr = (reprfunc)Scope_repr,
+    .tp_methods = Scope_methods,
+    .tp_members = Scope_members,
+};
+
+// --- Module-level functions ---
+
+// scope(name, builtins=None) -> Scope handle for an engine
+static PyObject* py_scope(PyObject* self, PyObject* const* args, Py_ssize_t nargs) {
+    if (nargs < 1 || nargs > 2) {
+        PyErr_Format(PyExc_TypeError, "scope() takes 1 or 2 arguments (%zd given)", nargs);
+        return NULL;
+    }
+    ScopeObject* s = scope_for(args[0]);
+    if (!s) return NULL;
+    if (nargs == 2 && args[1] != Py_None) {
+        if (!PyDict_Check(args[1])) {
+            PyErr_SetString(PyExc_TypeError, "scope() builtins must be a dict");
+            return NULL;
+        }
+        MP_BEGIN_CRITICAL(s);
+        Py_INCREF(args[1]);
+        Py_XSETREF(s->builtins, args[1]);
+        MP_END_CRITICAL();
+    }
+    Py_INCREF(s);
+    return (PyObject*)s;
+}
+
+// Name-based API from before scope handles. Nothing in microps calls it
+// any more (engines and SharedBridge hold a Scope); kept for user code.
+static PyObject* set_var(PyObject* self, PyObject* const* args, Py_ssize_t nargs) {
+    if (nargs != 3) {
+        PyErr_Format(PyExc_TypeError, "set_var() takes exactly 3 arguments (%zd given)", nargs);
+        return NULL;
+    }
+    ScopeObject* s = scope_for(args[0]);
+    if (!s || scope_store(s, args[1], args[2]) < 0) return NULL;
+    Py_RETURN_NONE;
+}
+
+static PyObject* get_var(PyObject* self, PyObject* const* args, Py_ssize_t nargs) {
+    if (nargs != 2) {
+        PyErr_Format(PyExc_TypeError, "get_var() takes exactly 2 arguments (%zd given)", nargs);
+        return NULL;
+    }
+    ScopeObject* s = scope_for(args[0]);
+    if (!s) return NULL;
+    PyObject* v = scope_find(s, args[1], 0);
+    if (!v) {
+        if (PyErr_Occurred()) return NULL;
+        Py_RETURN_NONE;
+    }
+    return v;
+}
+
+static PyObject* haunted_get(PyObject* self, PyObject* const* args, Py_ssize_t nargs) {
+    if (nargs != 2) {
+        PyErr_Format(PyExc_TypeError, "haunted_get() takes exactly 2 arguments (%zd given)", nargs);
+        return NULL;
+    }
+    ScopeObject* s = scope_for(args[0]);
+    if (!s) return NULL;
+    return Scope_haunted(s, args[1]);
+}
+
+// overlay_push() -> token: start a private overlay in the current context.
+// It sits on top of the enclosing one, if any, without copying it.
+static PyObject* overlay_push(PyObject* self, PyObject* unused) {
+    PyObject* outer;
+    if (PyContextVar_Get(_overlay_var, Py_None, &outer) < 0) return NULL;
+    PyObject* layers = PyDict_New();
+    PyObject* ov = layers ? PyTuple_Pack(2, layers, outer) : NULL;
+    Py_XDECREF(layers);
+    Py_DECREF(outer);
+    if (!ov) return NULL;
+    PyObject* token = PyContextVar_Set(_overlay_var, ov);
+    Py_DECREF(ov);
+    if (token) {
+        MP_BEGIN_CRITICAL(_overlay_var);
+        _overlays_live++;
+        MP_END_CRITICAL();
+    }
+    return token;
+}
+
+// overlay_pop(token): end the overlay started by overlay_push
+static PyObject* overlay_pop(PyObject* self, PyObject* token) {
+    if (PyContextVar_Reset(_overlay_var, token) < 0) return NULL;
+    MP_BEGIN_CRITICAL(_overlay_var);
+    _overlays_live--;
+    MP_END_CRITICAL();
+    Py_RETURN_NONE;
+}
+
+// overlay() -> the innermost overlay's writes (scope name -> dict), or None
+static PyObject* overlay_get(PyObject* self, PyObject* unused) {
+    PyObject* ov;
+    if (PyContextVar_Get(_overlay_var, Py_None, &ov) < 0) return NULL;
+    if (ov == Py_None) return ov;
+    PyObject* layers = OVERLAY_LAYERS(ov);
+    Py_INCREF(layers);
+    Py_DECREF(ov);
+    return layers;
+}
+
+static PyMethodDef scope_functions[] = {
+    {"scope", (PyCFunction)(void(*)(void))py_scope, METH_FASTCALL, NULL},
+    {"set_var", (PyCFunction)(void(*)(void))set_var, METH_FASTCALL, NULL},
+    {"get_var", (PyCFunction)(void(*)(void))get_var, METH_FASTCALL, NULL},
+    {"haunted_get", (PyCFunction)(void(*)(void))haunted_get, METH_FASTCALL, NULL},
+    {"overlay_push", overlay_push, METH_NOARGS,
+     "overlay_push() -> token: route scope writes in this context to a private overlay."},
+    {"overlay_pop", overlay_pop, METH_O,
+     "overlay_pop(token): end the overlay started by overlay_push."},
+    {"overlay", overlay_get, METH_NOARGS,
+     "overlay(): the writes made in the current context's innermost overlay (scope name -> dict), or None."},
+    {NULL, NULL, 0, NULL}
+};
+
+int scope_init(PyObject* module) {
+    if (PyType_Ready(&Scope_Type) < 0) return -1;
+    if (!_scopes) {
+        _scopes = PyDict_New();
+        _global_name = PyUnicode_InternFromString("global");
+        _ghost_prefix = PyUnicode_InternFromString("ghost_");
+        _overlay_var = PyContextVar_New("microps_scope_overlay", NULL);
+        if (!_scopes || !_global_name || !_ghost_prefix || !_overlay_var) return -1;
+    }
+    Py_INCREF(&Scope_Type);
+    if (PyModule_AddObject(module, "Scope", (PyObject*)&Scope_Type) < 0) {
+        Py_DECREF(&Scope_Type);
+        return -1;
+    }
+    return PyModule_AddFunctions(module, scope_functions);
+}
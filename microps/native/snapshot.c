@@ -0,0 +1,191 @@
+// FILE: microps/native/snapshot.c
+#include "native.h"
+
+// snapshot() / restore(snap): checkpoint and roll back the shared
+// polyglot state, i.e. every scope's variables and the metatable registry.
+//
+// Every LuaTable, PHPArray and Array reachable from the scopes or from a
+// metatable, and every dict used as a metatable, is paired with a frozen
+// copy. The copies share the containers' storage (copy-on-write, see
+// array_share), so taking a snapshot costs one pass over that state but
+// no item copies. restore() rebinds the names and metatables and points
+// each container back at its frozen storage in O(1); a job that changes a
+// table pays for copying that table only, on its first write. Containers
+// keep their identity, so Python references to them see the rollback.
+// Other values (lists, dicts, instances) are shared, not copied. restore()
+// leaves the snapshot untouched, so one warmed-up snapshot can be restored
+// before every job or test. Context overlays (scope_context) and engine
+// builtins are not part of it.
+typedef struct {
+    PyObject_HEAD
+    PyObject* scopes;               // scope name -> dict of variables
+    PyObject* registry;             // copy of the metatable registry
+    PyObject* frozen;               // list of (container, frozen copy)
+} SnapshotObject;
+
+static int Snapshot_traverse(SnapshotObject* self, visitproc visit, void* arg) {
+    Py_VISIT(self->scopes);
+    Py_VISIT(self->registry);
+    Py_VISIT(self->frozen);
+    return 0;
+}
+
+static int Snapshot_clear(SnapshotObject* self) {
+    Py_CLEAR(self->scopes);
+    Py_CLEAR(self->registry);
+    Py_CLEAR(self->frozen);
+    return 0;
+}
+
+static void Snapshot_dealloc(SnapshotObject* self) {
+    PyObject_GC_UnTrack(self);
+    Snapshot_clear(self);
+    Py_TYPE(self)->tp_free((PyObject*)self);
+}
+
+static PyObject* Snapshot_repr(SnapshotObject* self) {
+    Py_ssize_t vars = 0;
+    Py_ssize_t pos = 0;
+    PyObject *name, *d;
+    while (PyDict_Next(self->scopes, &pos, &name, &d)) vars += PyDict_GET_SIZE(d);
+    return PyUnicode_FromFormat("<microps snapshot: %zd scopes, %zd variables, %zd metatables, %zd containers>",
+                                PyDict_GET_SIZE(self->scopes), vars, PyDict_GET_SIZE(self->registry),
+                                PyList_GET_SIZE(self->frozen));
+}
+
+static PyTypeObject Snapshot_Type = {
+    PyVarObject_HEAD_INIT(NULL, 0)
+    .tp_name = "microps._core.Snapshot",
+    .tp_basicsize = sizeof(SnapshotObject),
+    .tp_flags = Py_TPFLAGS_DEFAULT | Py_TPFLAGS_HAVE_GC,
+    .tp_doc = "Saved scopes and metatables; create with snapshot(), apply with restore().",
+    .tp_dealloc = (destructor)Snapshot_dealloc,
+    .tp_traverse = (traverseproc)Snapshot_traverse,
+    .tp_clear = (inquiry)Snapshot_clear,
+    .tp_repr = (reprfunc)Snapshot_repr,
+};
+
+// Points dst at src's contents: copy-on-write for the containers, a
+// plain copy for a dict metatable.
+static int snap_share(PyObject* dst, PyObject* src) {
+    if (Array_Check(dst)) return array_share(dst, src);
+    if (PHPArray_Check(dst)) return phparray_share(dst, src);
+    if (LuaTable_Check(dst)) return luatable_share(dst, src);
+    PyDict_Clear(dst);
+    return PyDict_Update(dst, src);
+}
+
+// Pairs obj with a frozen copy when it is a container not seen before,
+// queueing the values (and table keys) it holds. Dicts are taken only as
+// metatables (as_mt); elsewhere they stay shared like any other value.
+static int snap_visit(PyObject* obj, int as_mt, PyObject* seen, PyObject* todo, PyObject* frozen) {
+    PyTypeObject* type = Array_Check(obj) ? &Array_Type : PHPArray_Check(obj) ? &PHPArray_Type
+                       : LuaTable_Check(obj) ? &LuaTable_Type : as_mt && PyDict_Check(obj) ? &PyDict_Type
+                       : NULL;
+    if (!type) return 0;
+    PyObject* key = PyLong_FromVoidPtr(obj);
+    int found = key ? PySet_Contains(seen, key) : -1;
+    if (found == 0) found = PySet_Add(seen, key);
+    Py_XDECREF(key);
+    if (found) return found < 0 ? -1 : 0;
+    PyObject* copy = PyObject_CallNoArgs((PyObject*)type);
+    PyObject* pair = copy && snap_share(copy, obj) == 0 ? PyTuple_Pack(2, obj, copy) : NULL;
+    int err = pair ? PyList_Append(frozen, pair) : -1;
+    Py_XDECREF(pair);
+    // The frozen copy never changes, so it is the one walked
+    int pairs = type == &LuaTable_Type || type == &PyDict_Type;
+    PyObject* held = err ? NULL : type == &LuaTable_Type ? PyObject_CallMethod(copy, "items", NULL)
+                                : pairs ? PyDict_Items(copy) : PySequence_List(copy);
+    Py_XDECREF(copy);
+    if (!held) return -1;
+    for (Py_ssize_t i = 0; !err && i < PyList_GET_SIZE(held); i++) {
+        PyObject* item = PyList_GET_ITEM(held, i);
+        if (pairs) err = PyList_Append(todo, PyTuple_GET_ITEM(item, 0)) < 0 ||
+                         PyList_Append(todo, PyTuple_GET_ITEM(item, 1)) < 0 ? -1 : 0;
+        else err = PyList_Append(todo, item);
+    }
+    Py_DECREF(held);
+    return err;
+}
+
+// Freezes every container reachable from the saved variables and the
+// metatables in the saved registry into a new list of pairs.
+static PyObject* snap_freeze(PyObject* scopes, PyObject* registry) {
+    PyObject* frozen = PyList_New(0);
+    PyObject* seen = PySet_New(NULL);
+    PyObject* todo = PyList_New(0);
+    int err = frozen && seen && todo ? 0 : -1;
+    Py_ssize_t pos = 0, vpos;
+    PyObject *name, *vars, *value, *entry;
+    while (!err && PyDict_Next(scopes, &pos, &name, &vars)) {
+        vpos = 0;
+        while (!err && PyDict_Next(vars, &vpos, &name, &value)) err = PyList_Append(todo, value);
+    }
+    pos = 0;
+    while (!err && PyDict_Next(registry, &pos, &name, &entry)) {
+        err = snap_visit(PyTuple_GET_ITEM(entry, 1), 1, seen, todo, frozen);
+    }
+    while (!err && PyList_GET_SIZE(todo)) {
+        Py_ssize_t last = PyList_GET_SIZE(todo) - 1;
+        value = PyList_GET_ITEM(todo, last);
+        Py_INCREF(value);
+        err = PyList_SetSlice(todo, last, last + 1, NULL);
+        if (!err) err = snap_visit(value, 0, seen, todo, frozen);
+        Py_DECREF(value);
+    }
+    Py_XDECREF(seen);
+    Py_XDECREF(todo);
+    if (err) Py_CLEAR(frozen);
+    return frozen;
+}
+
+static PyObject* py_snapshot(PyObject* self, PyObject* unused) {
+    SnapshotObject* snap = PyObject_GC_New(SnapshotObject, &Snapshot_Type);
+    if (!snap) return NULL;
+    snap->scopes = scopes_save();
+    snap->registry = snap->scopes ? metatables_save() : NULL;
+    snap->frozen = snap->registry ? snap_freeze(snap->scopes, snap->registry) : NULL;
+    PyObject_GC_Track(snap);
+    if (!snap->frozen) { Py_DECREF(snap); return NULL; }
+    return (PyObject*)snap;
+}
+
+static PyObject* py_restore(PyObject* self, PyObject* arg) {
+    if (!PyObject_TypeCheck(arg, &Snapshot_Type)) {
+        PyErr_Format(PyExc_TypeError, "restore() argument must be a snapshot, not '%.200s'",
+                     Py_TYPE(arg)->tp_name);
+        return NULL;
+    }
+    SnapshotObject* snap = (SnapshotObject*)arg;
+    if (scopes_load(snap->scopes) < 0) return NULL;
+    for (Py_ssize_t i = 0; i < PyList_GET_SIZE(snap->frozen); i++) {
+        PyObject* pair = PyList_GET_ITEM(snap->frozen, i);
+        if (snap_share(PyTuple_GET_ITEM(pair, 0), PyTuple_GET_ITEM(pair, 1)) < 0) return NULL;
+    }
+    // Loaded last: it also drops the metamethods cached from changed tables
+    if (metatables_load(snap->registry) < 0) return NULL;
+    Py_RETURN_NONE;
+}
+
+static PyMethodDef snapshot_functions[] = {
+    {"snapshot", py_snapshot, METH_NOARGS,
+     "snapshot(): checkpoint every scope's variables and the metatable registry.\n\n"
+     "Tables and arrays reachable from them, and dict metatables, are saved copy-on-write:\n"
+     "no items are copied. Other values (lists, dicts, instances) are shared."},
+    {"restore", py_restore, METH_O,
+     "restore(snap): put scopes and metatables back as they were at snapshot(); snap stays reusable.\n\n"
+     "Each name gets back the object it was bound to and each object its metatable, and\n"
+     "the saved tables, arrays and dict metatables get back their entries, in O(1) each\n"
+     "(copy-on-write). Changes inside other values are not undone."},
+    {NULL, NULL, 0, NULL}
+};
+
+int snapshot_init(PyObject* module) {
+    if (PyType_Ready(&Snapshot_Type) < 0) return -1;
+    Py_INCREF(&Snapshot_Type);
+    if (PyModule_AddObject(module, "Snapshot", (PyObject*)&Snapshot_Type) < 0) {
+        Py_DECREF(&Snapshot_Type);
+        return -1;
+    }
+    return PyModule_AddFunctions(module, snapshot_functions);
+}
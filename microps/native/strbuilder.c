@@ -0,0 +1,225 @@
+// FILE: microps/native/strbuilder.c
+#include "native.h"
+
+// StrBuilder: a string being built by repeated concatenation.
+//
+// Each builder is an immutable node (earlier text, appended piece), so
+// b + "x" is O(1) and never copies what came before; the text is joined
+// only when someone asks for it, in a single pass, and cached on the node.
+// Because nodes are never mutated, two values built from the same prefix
+// stay independent, exactly like str. The engine values use this for
+// JS += and Lua ..; a Value holding a builder hands out the joined str
+// through _val and unwrap(), so ops never see the builder itself.
+typedef struct StrBuilderObject {
+    PyObject_HEAD
+    struct StrBuilderObject* left;  // text before `piece`, or NULL
+    PyObject* piece;                // str appended after left
+    PyObject* value;                // the whole text once joined, or NULL
+    Py_ssize_t length;              // total length in code points
+} StrBuilderObject;
+
+static PyObject* strbuilder_node(StrBuilderObject* left, PyObject* piece) {
+    StrBuilderObject* b = PyObject_New(StrBuilderObject, &StrBuilder_Type);
+    if (!b) return NULL;
+    Py_XINCREF(left);
+    b->left = left;
+    Py_INCREF(piece);
+    b->piece = piece;
+    b->value = NULL;
+    b->length = (left ? left->length : 0) + PyUnicode_GET_LENGTH(piece);
+    return (PyObject*)b;
+}
+
+static void StrBuilder_dealloc(StrBuilderObject* self) {
+    // Unlink the chain iteratively: a builder grown by 10^6 appends would
+    // otherwise be freed by 10^6 nested deallocs.
+    StrBuilderObject* left = self->left;
+    while (left && Py_REFCNT(left) == 1) {
+        StrBuilderObject* next = left->left;
+        left->left = NULL;
+        Py_DECREF(left);
+        left = next;
+    }
+    Py_XDECREF(left);
+    Py_XDECREF(self->piece);
+    Py_XDECREF(self->value);
+    PyObject_Free(self);
+}
+
+// Joins the text once and caches it. Returns a borrowed reference that
+// lives as long as the builder.
+PyObject* strbuilder_str(PyObject* obj) {
+    StrBuilderObject* self = (StrBuilderObject*)obj;
+    PyObject* value;
+    MP_BEGIN_CRITICAL(self);
+    value = self->value;
+    if (!value) {
+        // Pieces from this node back to the nearest already-joined one
+        Py_ssize_t n = 0;
+        StrBuilderObject* b;
+        for (b = self; b && !b->value; b = b->left) n++;
+        PyObject* parts = PyList_New(n + (b != NULL));
+        if (parts) {
+            Py_ssize_t i = PyList_GET_SIZE(parts);
+            for (b = self; b && !b->value; b = b->left) {
+                Py_INCREF(b->piece);
+                PyList_SET_ITEM(parts, --i, b->piece);
+            }
+            if (b) {
+                Py_INCREF(b->value);
+                PyList_SET_ITEM(parts, 0, b->value);
+            }
+            PyObject* empty = PyUnicode_New(0, 0);
+            value = empty ? PyUnicode_Join(empty, parts) : NULL;
+            Py_XDECREF(empty);
+            Py_DECREF(parts);
+        }
+        self->value = value;
+#ifndef Py_GIL_DISABLED
+        if (value) {
+            // The node now stands alone, so the chain behind it can be
+            // freed. Without the GIL another thread may be walking it.
+            Py_CLEAR(self->left);
+            Py_INCREF(value);
+            Py_SETREF(self->piece, value);
+        }
+#endif
+    }
+    MP_END_CRITICAL();
+    return value;
+}
+
+static PyObject* StrBuilder_new(PyTypeObject* type, PyObject* args, PyObject* kwds) {
+    static char* kwlist[] = {"text", NULL};
+    PyObject* text = NULL;
+    if (!PyArg_ParseTupleAndKeywords(args, kwds, "|O:StrBuilder", kwlist, &text)) return NULL;
+    if (text && StrBuilder_Check(text)) {
+        Py_INCREF(text);
+        return text;
+    }
+    text = text ? PyObject_Str(value_unwrap(text)) : PyUnicode_New(0, 0);
+    if (!text) return NULL;
+    PyObject* b = strbuilder_node(NULL, text);
+    Py_DECREF(text);
+    return b;
+}
+
+// The str for one operand of +, new reference; NULL without an exception
+// when the operand is neither a str nor a builder.
+static PyObject* operand_str(PyObject* x) {
+    if (StrBuilder_Check(x)) {
+        x = strbuilder_str(x);
+        Py_XINCREF(x);
+        return x;
+    }
+    if (PyUnicode_Check(x)) {
+        Py_INCREF(x);
+        return x;
+    }
+    return NULL;
+}
+
+PyObject* strbuilder_concat(PyObject* a, PyObject* b) {
+    if (StrBuilder_Check(a)) {
+        PyObject* piece = operand_str(b);
+        if (!piece) {
+            if (PyErr_Occurred()) return NULL;
+            Py_RETURN_NOTIMPLEMENTED;
+        }
+        PyObject* r;
+        if (PyUnicode_GET_LENGTH(piece)) {
+            r = strbuilder_node((StrBuilderObject*)a, piece);
+        } else {
+            Py_INCREF(a);
+            r = a;
+        }
+        Py_DECREF(piece);
+        return r;
+    }
+    // str + builder: start a new chain from the str
+    PyObject* head = operand_str(a);
+    if (!head) {
+        if (PyErr_Occurred()) return NULL;
+        Py_RETURN_NOTIMPLEMENTED;
+    }
+    PyObject* left = strbuilder_node(NULL, head);
+    Py_DECREF(head);
+    if (!left) return NULL;
+    PyObject* r = strbuilder_concat(left, b);
+    Py_DECREF(left);
+    return r;
+}
+
+static Py_ssize_t StrBuilder_length(StrBuilderObject* self) {
+    return self->length;
+}
+
+static PyObject* StrBuilder_str(PyObject* self) {
+    PyObject* s = strbuilder_str(self);
+    Py_XINCREF(s);
+    return s;
+}
+
+static PyObject* StrBuilder_repr(StrBuilderObject* self) {
+    return PyUnicode_FromFormat("<StrBuilder: %zd chars>", self->length);
+}
+
+static Py_hash_t StrBuilder_hash(PyObject* self) {
+    PyObject* s = strbuilder_str(self);
+    return s ? PyObject_Hash(s) : -1;
+}
+
+static PyObject* StrBuilder_richcompare(PyObject* a, PyObject* b, int op) {
+    PyObject* left = operand_str(a);
+    PyObject* right = left ? operand_str(b) : NULL;
+    if (!right) {
+        Py_XDECREF(left);
+        if (PyErr_Occurred()) return NULL;
+        Py_RETURN_NOTIMPLEMENTED;
+    }
+    PyObject* r = PyObject_RichCompare(left, right, op);
+    Py_DECREF(left);
+    Py_DECREF(right);
+    return r;
+}
+
+static PyNumberMethods StrBuilder_as_number = {
+    .nb_add = strbuilder_concat,
+};
+
+static PySequenceMethods StrBuilder_as_sequence = {
+    .sq_length = (lenfunc)StrBuilder_length,
+};
+
+static PyMethodDef StrBuilder_methods[] = {
+    {"getvalue", (PyCFunction)StrBuilder_str, METH_NOARGS, "getvalue(): the text built so far, as a str."},
+    {NULL, NULL, 0, NULL}
+};
+
+PyTypeObject StrBuilder_Type = {
+    PyVarObject_HEAD_INIT(NULL, 0)
+    .tp_name = "microps._core.StrBuilder",
+    .tp_basicsize = sizeof(StrBuilderObject),
+    .tp_flags = Py_TPFLAGS_DEFAULT,
+    .tp_doc = "StrBuilder(text='')\n\nString built by repeated +: each + is O(1), the text is joined "
+              "once on str() / getvalue().",
+    .tp_new = StrBuilder_new,
+    .tp_dealloc = (destructor)StrBuilder_dealloc,
+    .tp_repr = (reprfunc)StrBuilder_repr,
+    .tp_str = StrBuilder_str,
+    .tp_hash = StrBuilder_hash,
+    .tp_richcompare = StrBuilder_richcompare,
+    .tp_as_number = &StrBuilder_as_number,
+    .tp_as_sequence = &StrBuilder_as_sequence,
+    .tp_methods = StrBuilder_methods,
+};
+
+int strbuilder_init(PyObject* module) {
+    if (PyType_Ready(&StrBuilder_Type) < 0) return -1;
+    Py_INCREF(&StrBuilder_Type);
+    if (PyModule_AddObject(module, "StrBuilder", (PyObject*)&StrBuilder_Type) < 0) {
+        Py_DECREF(&StrBuilder_Type);
+        return -1;
+    }
+    return 0;
+}
@@ -0,0 +1,179 @@
+// FILE: microps/native/value.c
+#include "native.h"
+#include "structmember.h"
+
+// Recently freed Value instances, reused by Value_new. Only layouts that
+// match ValueObject exactly (no __dict__ / __weakref__ slots) are recycled,
+// which covers the engine value classes since they declare __slots__ = ().
+#ifndef Py_GIL_DISABLED
+#define VALUE_FREELIST_MAX 256
+static PyObject* value_freelist[VALUE_FREELIST_MAX];
+static int value_numfree = 0;
+#endif
+
+static inline int value_recyclable(PyTypeObject* type) {
+    if (type->tp_basicsize != sizeof(ValueObject) || type->tp_itemsize != 0) return 0;
+    if (type->tp_dictoffset != 0 || type->tp_weaklistoffset != 0) return 0;
+#ifdef Py_TPFLAGS_MANAGED_DICT
+    if (type->tp_flags & Py_TPFLAGS_MANAGED_DICT) return 0;
+#endif
+#ifdef Py_TPFLAGS_MANAGED_WEAKREF
+    if (type->tp_flags & Py_TPFLAGS_MANAGED_WEAKREF) return 0;
+#endif
+    return type->tp_alloc == PyType_GenericAlloc && type->tp_free == PyObject_GC_Del;
+}
+
+// Strips the Value layers only; a StrBuilder is returned as is.
+static inline PyObject* value_strip(PyObject* x) {
+    while (Value_Check(x)) {
+        PyObject* inner = ((ValueObject*)x)->val;
+        if (!inner) return Py_None;
+        x = inner;
+    }
+    return x;
+}
+
+PyObject* value_unwrap(PyObject* x) {
+    x = value_strip(x);
+    if (StrBuilder_Check(x)) {
+        // Callers cannot fail here; if joining runs out of memory the op
+        // gets the builder itself and reports the type mismatch.
+        PyObject* s = strbuilder_str(x);
+        if (s) return s;
+        PyErr_Clear();
+    }
+    return x;
+}
+
+static PyObject* Value_new(PyTypeObject* type, PyObject* args, PyObject* kwds) {
+    ValueObject* self;
+#ifndef Py_GIL_DISABLED
+    if (value_numfree && value_recyclable(type)) {
+        self = (ValueObject*)value_freelist[--value_numfree];
+        PyObject_Init((PyObject*)self, type);
+        self->val = NULL;
+        self->engine = NULL;
+        PyObject_GC_Track(self);
+        return (PyObject*)self;
+    }
+#endif
+    self = (ValueObject*)type->tp_alloc(type, 0);
+    return (PyObject*)self;
+}
+
+static int Value_init(ValueObject* self, PyObject* args, PyObject* kwds) {
+    PyObject *v = Py_None, *engine = Py_None;
+    if (kwds || PyTuple_GET_SIZE(args) > 2) {
+        static char* kwlist[] = {"v", "engine", NULL};
+        if (!PyArg_ParseTupleAndKeywords(args, kwds, "|OO", kwlist, &v, &engine)) return -1;
+    } else {
+        Py_ssize_t n = PyTuple_GET_SIZE(args);
+        if (n > 0) v = PyTuple_GET_ITEM(args, 0);
+        if (n > 1) engine = PyTuple_GET_ITEM(args, 1);
+    }
+    v = value_strip(v);
+    Py_INCREF(v);
+    Py_XSETREF(self->val, v);
+    Py_INCREF(engine);
+    Py_XSETREF(self->engine, engine);
+    return 0;
+}
+
+static int Value_traverse(ValueObject* self, visitproc visit, void* arg) {
+    Py_VISIT(self->val);
+    Py_VISIT(self->engine);
+    return 0;
+}
+
+static int Value_clear(ValueObject* self) {
+    Py_CLEAR(self->val);
+    Py_CLEAR(self->engine);
+    return 0;
+}
+
+static void Value_dealloc(ValueObject* self) {
+    PyTypeObject* type = Py_TYPE(self);
+    PyObject_GC_UnTrack(self);
+    Value_clear(self);
+#ifndef Py_GIL_DISABLED
+    if (value_numfree < VALUE_FREELIST_MAX && value_recyclable(type)) {
+        value_freelist[value_numfree++] = (PyObject*)self;
+        return;
+    }
+#endif
+    type->tp_free((PyObject*)self);
+}
+
+// _val hands out a StrBuilder's joined text, so engine methods written
+// against str keep working; _rope is the object exactly as stored, which
+// lets += keep extending the builder without joining it.
+static PyObject* Value_get_val(ValueObject* self, void* closure) {
+    PyObject* v = self->val ? self->val : Py_None;
+    if (StrBuilder_Check(v)) v = strbuilder_str(v);
+    Py_XINCREF(v);
+    return v;
+}
+
+static int Value_set_val(ValueObject* self, PyObject* v, void* closure) {
+    if (!v) {
+        PyErr_SetString(PyExc_AttributeError, "cannot delete _val");
+        return -1;
+    }
+    Py_INCREF(v);
+    Py_XSETREF(self->val, v);
+    return 0;
+}
+
+static PyObject* Value_get_rope(ValueObject* self, void* closure) {
+    PyObject* v = self->val ? self->val : Py_None;
+    Py_INCREF(v);
+    return v;
+}
+
+static PyGetSetDef Value_getset[] = {
+    {"_val", (getter)Value_get_val, (setter)Value_set_val, "Wrapped raw Python object.", NULL},
+    {"_rope", (getter)Value_get_rope, NULL, "Wrapped object as stored; a StrBuilder is not joined.", NULL},
+    {NULL}
+};
+
+static PyMemberDef Value_members[] = {
+    {"_engine", T_OBJECT, offsetof(ValueObject, engine), 0, "Engine that created this value."},
+    {NULL}
+};
+
+PyTypeObject Value_Type = {
+    PyVarObject_HEAD_INIT(NULL, 0)
+    .tp_name = "microps._core.Value",
+    .tp_basicsize = sizeof(ValueObject),
+    .tp_flags = Py_TPFLAGS_DEFAULT | Py_TPFLAGS_BASETYPE | Py_TPFLAGS_HAVE_GC,
+    .tp_doc = "Value(v, engine)\n\nFixed-layout base for engine values: a raw object plus its engine.",
+    .tp_new = Value_new,
+    .tp_init = (initproc)Value_init,
+    .tp_dealloc = (destructor)Value_dealloc,
+    .tp_traverse = (traverseproc)Value_traverse,
+    .tp_clear = (inquiry)Value_clear,
+    .tp_members = Value_members,
+    .tp_getset = Value_getset,
+};
+
+// unwrap(x) -> raw object behind any number of Value layers
+static PyObject* py_unwrap(PyObject* self, PyObject* x) {
+    x = value_unwrap(x);
+    Py_INCREF(x);
+    return x;
+}
+
+static PyMethodDef value_functions[] = {
+    {"unwrap", py_unwrap, METH_O, "unwrap(x): deep unwrap to get the raw Python/C object."},
+    {NULL, NULL, 0, NULL}
+};
+
+int value_init(PyObject* module) {
+    if (PyType_Ready(&Value_Type) < 0) return -1;
+    Py_INCREF(&Value_Type);
+    if (PyModule_AddObject(module, "Value", (PyObject*)&Value_Type) < 0) {
+        Py_DECREF(&Value_Type);
+        return -1;
+    }
+    return PyModule_AddFunctions(module, value_functions);
+}
@@ -0,0 +1,137 @@
+# FILE: microps/parallel.py
+"""
+Parallel map / reduce for engine collections.
+
+    from microps import parallel
+    parallel.pmap(work, items, chunksize=1000, workers=4)
+    parallel.preduce(operator.add, items, 0)
+
+The input is cut into chunks, each chunk runs through _core.map_func (or
+reduce_func) on a worker, and the chunk results are merged back in input
+order. Workers are processes, except on free-threaded builds with the GIL
+disabled, where a thread pool is used instead.
+
+Callbacks receive raw values, never *Value objects, since values and
+engines do not cross process boundaries. With a process pool the callback
+and the items must be picklable: module-level functions and builtins are,
+lambdas and closures are not. If they are not picklable, or the pool cannot
+start, the call runs serially and a RuntimeWarning says why.
+
+The engines expose this as py.pmap / py.preduce, JS Array parallelMap and
+Ruby par_map / par_each.
+"""
+import os
+import pickle
+import sys
+import warnings
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from . import _core, unwrap
+
+# Pools are reused between calls: starting worker processes costs far more
+# than a typical chunk. Keyed by (kind, workers).
+_pools = {}
+
+
+def free_threading():
+    """True when running on a free-threaded build with the GIL disabled."""
+    is_gil_enabled = getattr(sys, '_is_gil_enabled', None)
+    return is_gil_enabled is not None and not is_gil_enabled()
+
+
+def default_workers():
+    return os.cpu_count() or 1
+
+
+def _pool(workers):
+    kind = ThreadPoolExecutor if free_threading() else ProcessPoolExecutor
+    pool = _pools.get((kind, workers))
+    if pool is None:
+        pool = _pools[kind, workers] = kind(max_workers=workers)
+    return pool
+
+
+def shutdown():
+    """Stops every cached worker pool."""
+    while _pools:
+        _pools.popitem()[1].shutdown()
+
+
+def _chunks(items, chunksize):
+    return [items[i:i + chunksize] for i in range(0, len(items), chunksize)]
+
+
+def _map_chunk(fn, chunk):
+    return _core.map_func(fn, chunk)
+
+
+def _reduce_chunk(fn, chunk, initial):
+    return _core.reduce_func(fn, chunk, initial)
+
+
+def _unpicklable(objs):
+    """Reason the objects cannot be sent to a worker process, or None."""
+    if free_threading():
+        return None
+    for obj in objs:
+        try:
+            pickle.dumps(obj)
+        except Exception as e:
+            return f"{obj!r} is not picklable ({e})"
+    return None
+
+
+def _plan(items, chunksize, workers):
+    """(list of items, chunks or None for serial, workers)."""
+    items = unwrap(items)
+    if not isinstance(items, list):
+        items = list(items)
+    workers = workers or default_workers()
+    if chunksize is None:
+        # About four chunks per worker evens out uneven item costs
+        chunksize = max(1, -(-len(items) // (workers * 4)))
+    elif chunksize < 1:
+        raise ValueError("chunksize must be at least 1")
+    if workers < 2 or len(items) <= chunksize:
+        return items, None, workers
+    return items, _chunks(items, chunksize), workers
+
+
+def _run(worker, chunks, workers, args, probe):
+    """Chunk results in order, or None (after a warning) to go serial."""
+    reason = _unpicklable(probe)
+    if reason is None:
+        try:
+            pool = _pool(workers)
+            futures = [pool.submit(worker, args[0], chunk, *args[1:]) for chunk in chunks]
+            return [f.result() for f in futures]
+        except (BrokenProcessPool, pickle.PicklingError, OSError) as e:
+            shutdown()
+            reason = f"worker pool failed ({e})"
+    warnings.warn(f"microps.parallel: running serially: {reason}", RuntimeWarning, stacklevel=3)
+    return None
+
+
+def pmap(fn, items, chunksize=None, workers=None):
+    """[fn(x) for x in items], computed chunk by chunk on `workers` workers."""
+    fn = unwrap(fn)
+    items, chunks, workers = _plan(items, chunksize, workers)
+    if chunks is not None:
+        parts = _run(_map_chunk, chunks, workers, (fn,), (fn, items[0]))
+        if parts is not None:
+            return [x for part in parts for x in part]
+    return _core.map_func(fn, items)
+
+
+def preduce(fn, items, initial, chunksize=None, workers=None):
+    """Folds items with fn(acc, x). Each chunk is folded from `initial` on a
+    worker, then the chunk results are folded in order, so fn must be
+    associative and initial its identity (0 for add, 1 for mul, ...)."""
+    fn, initial = unwrap(fn), unwrap(initial)
+    items, chunks, workers = _plan(items, chunksize, workers)
+    if chunks is not None:
+        parts = _run(_reduce_chunk, chunks, workers, (fn, initial), (fn, initial, items[0]))
+        if parts is not None:
+            return _core.reduce_func(fn, parts, initial)
+    return _core.reduce_func(fn, items, initial)
@@ -0,0 +1,92 @@
+# FILE: microps/pipeline.py
+"""
+Fused pipelines for the value pipe operator.
+
+    from microps.pipeline import map, filter, reduce
+
+    total = js.Array(...) | map(f) | filter(g) | reduce(h, 0)
+
+Each stage only records itself. Stages piled onto a value run together in a
+single C pass (_core.pipeline_run) when a reduce is added, when the pipeline
+is iterated, or when .run() is called. Every item goes through all stages
+before the next one is pulled, so there are no intermediate lists and no
+per-stage wrapper objects. Stage functions receive and return raw values.
+
+Unbound pipelines compose too and can be reused:
+
+    evens_squared = filter(is_even) | map(square)
+    v | evens_squared
+"""
+from . import _core, unwrap
+
+# Stage kinds understood by _core.pipeline_run (PIPE_* in native/pipeline.c)
+MAP, FILTER, REDUCE = 0, 1, 2
+
+_UNBOUND = object()
+
+
+class Pipeline:
+    """Recorded stages, optionally bound to the value they will run over."""
+    __slots__ = ('stages', 'source')
+
+    def __init__(self, stages, source=_UNBOUND):
+        self.stages = stages
+        self.source = source
+
+    @property
+    def terminal(self):
+        return bool(self.stages) and self.stages[-1][0] == REDUCE
+
+    def __or__(self, other):
+        if not isinstance(other, Pipeline):
+            # A plain function after a bound pipeline: run, then pipe the result
+            if self.source is _UNBOUND or not callable(other):
+                return NotImplemented
+            return other(self.run())
+        if self.terminal:
+            raise ValueError("reduce must be the last pipeline stage")
+        combined = Pipeline(self.stages + other.stages, self.source)
+        return combined.run() if combined.terminal and combined.source is not _UNBOUND else combined
+
+    def __ror__(self, source):
+        """raw_iterable | pipeline binds it (BaseValue.__or__ routes here too)."""
+        if self.source is not _UNBOUND:
+            return NotImplemented
+        bound = Pipeline(self.stages, source)
+        return bound.run() if bound.terminal else bound
+
+    def run(self, source=_UNBOUND):
+        """Runs every stage in one pass; a value source gets a value back."""
+        if source is _UNBOUND:
+            source = self.source
+        if source is _UNBOUND:
+            raise TypeError("pipeline has no source; use value | pipeline")
+        result = _core.pipeline_run(unwrap(source), self.stages)
+        if isinstance(source, _core.Value):
+            return source.__class__(result, source._engine)
+        return result
+
+    def __iter__(self):
+        return iter(unwrap(self.run()))
+
+    def __repr__(self):
+        names = {MAP: 'map', FILTER: 'filter', REDUCE: 'reduce'}
+        stages = " | ".join(f"{names[s[0]]}({getattr(s[1], '__name__', s[1])!r})" for s in self.stages)
+        if self.source is _UNBOUND:
+            return f"<pipeline {stages}>"
+        return f"<pipeline {stages} over {type(unwrap(self.source)).__name__}>"
+
+
+def map(fn):
+    """Stage: replace each item with fn(item)."""
+    return Pipeline(((MAP, fn),))
+
+
+def filter(fn):
+    """Stage: keep the items for which fn(item) is true."""
+    return Pipeline(((FILTER, fn),))
+
+
+def reduce(fn, initial):
+    """Terminal stage: fold items with fn(acc, item) starting from initial."""
+    return Pipeline(((REDUCE, fn, initial),))
@@ -0,0 +1,140 @@
+# FILE: microps/profiler.py
+"""
+Per-op profiling for microps.
+
+    from microps import profiler
+
+    with profiler.profiled():
+        run_workload()
+    print(profiler.report())
+
+While profiling is on, every _core micro-op counts its calls and the wall
+time spent inside it (see _core.profile). The engine-level breakdown comes
+from labelling: enable() wraps each method of the *Value and *Engine classes
+so that the ops it runs are attributed to e.g. 'JSValue.toUpperCase'. The
+wrappers are removed again by disable(), so nothing is paid while profiling
+is off.
+"""
+from contextlib import contextmanager
+from functools import wraps
+from types import FunctionType
+
+from . import _core
+from . import JSValue, LuaValue, RubyValue, PHPValue, PyValue, CValue
+from . import JSEngine, LuaEngine, RubyEngine, PHPEngine, PyEngine, CEngine
+from .wrappers.wrapper import BaseValue
+
+LABELLED_CLASSES = (
+    JSValue, LuaValue, RubyValue, PHPValue, PyValue, CValue,
+    JSEngine, LuaEngine, RubyEngine, PHPEngine, PyEngine, CEngine,
+)
+
+# Attributes never wrapped: object construction and the lookup hooks that
+# run for every attribute access.
+_SKIP = frozenset({'__new__', '__init__', '__init_subclass__', '__getattribute__',
+                   '__setattr__', '__delattr__'})
+
+# (cls, name, original attribute or None if inherited) for every shim
+_installed = []
+
+
+def _labelled(label, fn):
+    enter = _core.profile_enter
+
+    @wraps(fn)
+    def shim(*args, **kwargs):
+        prev = enter(label)
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            enter(prev)
+    return shim
+
+
+def _methods(cls):
+    """(name, function, defined on cls) for cls and its BaseValue bases."""
+    seen = set()
+    for klass in cls.__mro__:
+        if klass is not cls and not (isinstance(klass, type) and issubclass(klass, BaseValue)):
+            continue
+        for name, attr in vars(klass).items():
+            if name in seen or name in _SKIP or not isinstance(attr, FunctionType):
+                continue
+            seen.add(name)
+            yield name, attr, klass is cls
+
+
+def _install():
+    for cls in LABELLED_CLASSES:
+        for name, fn, own in _methods(cls):
+            setattr(cls, name, _labelled(f"{cls.__name__}.{name}", fn))
+            _installed.append((cls, name, fn if own else None))
+
+
+def _uninstall():
+    while _installed:
+        cls, name, original = _installed.pop()
+        if original is None:
+            delattr(cls, name)
+        else:
+            setattr(cls, name, original)
+
+
+def enable():
+    """Turns per-op counters and method labelling on."""
+    if not _installed:
+        _install()
+    _core.profile(True)
+
+
+def disable():
+    """Turns profiling off and restores the original methods. Counters are kept."""
+    _core.profile(False)
+    _uninstall()
+
+
+def reset():
+    """Zeroes all counters."""
+    _core.profile_reset()
+
+
+def snapshot():
+    """{op: {'calls': n, 'ns': total}} for every op called while profiling."""
+    return _core.profile_snapshot()
+
+
+def breakdown():
+    """{'JSValue.method': {op: {'calls': n, 'ns': total}}} for labelled calls."""
+    return _core.profile_labels()
+
+
+@contextmanager
+def profiled(fresh=True):
+    """Profiles the body of a with-block; fresh=True resets the counters first."""
+    if fresh:
+        reset()
+    enable()
+    try:
+        yield
+    finally:
+        disable()
+
+
+def report(limit=20):
+    """Text table of the busiest ops, then the ops each labelled method ran."""
+    ops = sorted(snapshot().items(), key=lambda kv: kv[1]['ns'], reverse=True)
+    lines = [f"{'op':<24}{'calls':>10}{'ns':>14}{'ns/call':>10}"]
+    for name, s in ops[:limit]:
+        lines.append(f"{name:<24}{s['calls']:>10}{s['ns']:>14}{s['ns'] // s['calls']:>10}")
+
+    by_label = sorted(breakdown().items(), key=lambda kv: sum(s['ns'] for s in kv[1].values()),
+                      reverse=True)
+    if by_label:
+        lines.append("")
+        lines.append(f"{'method':<32}{'calls':>10}{'ns':>14}  ops")
+        for label, per_op in by_label[:limit]:
+            calls = sum(s['calls'] for s in per_op.values())
+            ns = sum(s['ns'] for s in per_op.values())
+            names = ", ".join(sorted(per_op, key=lambda n: per_op[n]['ns'], reverse=True))
+            lines.append(f"{label:<32}{calls:>10}{ns:>14}  {names}")
+    return "\n".join(lines)
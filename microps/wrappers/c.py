@@ -1,6 +1,7 @@
 # FILE: microps/wrappers/c.py
+from array import array
 from .. import _core
-from .wrapper import unwrap, get_mm, create_decorator, BaseValue
+from .wrapper import unwrap, get_mm, create_decorator, bind_methods, BaseValue
 
 class CValue(BaseValue):
     """
@@ -8,45 +9,57 @@ class CValue(BaseValue):
     Reassembles C micro-ops into C's explicit, pointer-oriented style.
     Everything is explicit, nothing is hidden.
     """
+    __slots__ = ()
     
     def __bool__(self):
         """C truthiness: 0 is false, everything else is true."""
         return unwrap(self._val) != 0
 
     def __getattr__(self, n):
-        """Maps C-style operations to micro-operations."""
+        """Fallback for names missing from C_METHODS: C obj_get."""
         if n.startswith('_'): raise AttributeError(n)
-        
-        # No method syntax in C - everything is a function or operator
-        # But we'll provide some helpers for array/string manipulation
-        
-        # Array-like access helpers
-        if n == 'at': return lambda i: CValue(_core.obj_get(self._val, unwrap(i)), self._engine)
-        if n == 'set_at': return lambda i, v: _core.obj_set(self._val, unwrap(i), unwrap(v))
-        
-        # String manipulation (C-style)
-        if n == 'chr_at': return lambda i: CValue(ord(str(self._val)[unwrap(i)]), self._engine)
-        if n == 'str_len': return lambda: CValue(_core.len(self._val), self._engine)
-        
-        # Bitwise helpers (these are operators in C, but we expose as methods)
-        if n == 'band': return lambda other: CValue(_core.bit_and(self._val, unwrap(other)), self._engine)
-        if n == 'bor': return lambda other: CValue(_core.bit_or(self._val, unwrap(other)), self._engine)
-        if n == 'bxor': return lambda other: CValue(_core.bit_xor(self._val, unwrap(other)), self._engine)
-        if n == 'bnot': return lambda: CValue(_core.bit_not(self._val), self._engine)
-        if n == 'lshift': return lambda other: CValue(_core.lshift(self._val, unwrap(other)), self._engine)
-        if n == 'rshift': return lambda other: CValue(_core.rshift(self._val, unwrap(other)), self._engine)
-
-        # Default to C structure member access
         return CValue(_core.obj_get(self._val, n), self._engine)
     
     # Override arithmetic to be more explicit (C-style)
     def __add__(self, o):
-        """C addition - explicit numeric promotion."""
-        return CValue(_core.add(self._val, unwrap(o)), self._engine)
+        """C addition - numbers promote, arrays/buffers/pointers offset."""
+        v, n = self._val, unwrap(o)
+        if _offsets(v, n):
+            # arr + n: a zero-copy pointer n items into arr
+            return CValue(_core.Pointer(v) + n, self._engine)
+        return CValue(_core.add(v, n), self._engine)
     
     def __sub__(self, o):
-        """C subtraction - can simulate pointer arithmetic."""
-        return CValue(_core.sub(self._val, unwrap(o)), self._engine)
+        """C subtraction - p - n moves a pointer back, p - q is their distance."""
+        v, n = self._val, unwrap(o)
+        if _offsets(v, n):
+            return CValue(_core.Pointer(v) - n, self._engine)
+        return CValue(_core.sub(v, n), self._engine)
+
+# Sequences and buffers that + / - with an int turn into a Pointer
+_POINTABLE = (list, tuple, bytes, bytearray, memoryview, array, _core.Array)
+
+def _offsets(v, n):
+    """True when v +/- n is pointer arithmetic rather than a plain add/sub."""
+    if isinstance(v, _core.Pointer): return True
+    return isinstance(v, _POINTABLE) and isinstance(n, (int, _core.Pointer)) and not isinstance(n, bool)
+
+# Method table: resolved by normal attribute lookup, so every name costs the
+# same regardless of its position here.
+C_METHODS = {
+    'at': lambda self, i: CValue(_core.obj_get(self._val, unwrap(i)), self._engine),
+    'set_at': lambda self, i, v: _core.obj_set(self._val, unwrap(i), unwrap(v)),
+    'chr_at': lambda self, i: CValue(ord(str(self._val)[unwrap(i)]), self._engine),
+    'str_len': lambda self: CValue(_core.len(self._val), self._engine),
+    'band': lambda self, other: CValue(_core.bit_and(self._val, unwrap(other)), self._engine),
+    'bor': lambda self, other: CValue(_core.bit_or(self._val, unwrap(other)), self._engine),
+    'bxor': lambda self, other: CValue(_core.bit_xor(self._val, unwrap(other)), self._engine),
+    'bnot': lambda self: CValue(_core.bit_not(self._val), self._engine),
+    'lshift': lambda self, other: CValue(_core.lshift(self._val, unwrap(other)), self._engine),
+    'rshift': lambda self, other: CValue(_core.rshift(self._val, unwrap(other)), self._engine),
+    'popcount': lambda self: CValue(_core.popcount(self._val), self._engine),
+}
+bind_methods(CValue, C_METHODS)
 
 class CEngine:
     def __init__(self):
@@ -60,7 +73,7 @@ class CEngine:
             'double_cast': lambda x: CValue(_core.to_float(unwrap(x)), self),
             
             # --- Array Operations ---
-            'array_new': lambda size: CValue([0] * unwrap(size), self),
+            'array_new': lambda size: CValue(array('q', [0]) * unwrap(size), self),  # long[size]
             'array_get': lambda arr, idx: CValue(_core.obj_get(unwrap(arr), unwrap(idx)), self),
             'array_set': lambda arr, idx, val: _core.obj_set(unwrap(arr), unwrap(idx), unwrap(val)),
             
@@ -87,6 +100,20 @@ class CEngine:
             'bit_not': lambda a: CValue(_core.bit_not(unwrap(a)), self),
             'left_shift': lambda a, b: CValue(_core.lshift(unwrap(a), unwrap(b)), self),
             'right_shift': lambda a, b: CValue(_core.rshift(unwrap(a), unwrap(b)), self),
+            'rotl': lambda a, n: CValue(_core.rotl(unwrap(a), unwrap(n)), self),
+            'rotr': lambda a, n: CValue(_core.rotr(unwrap(a), unwrap(n)), self),
+            'popcount': lambda a: CValue(_core.popcount(unwrap(a)), self),
+
+            # --- Bitsets (_core.Bitset: bits packed into 64-bit words) ---
+            # band / bor / bxor work on them too, word by word
+            'bitset_new': lambda nbits: CValue(_core.Bitset(unwrap(nbits)), self),
+            'bitset_set': lambda b, i: unwrap(b).set(unwrap(i)),
+            'bitset_clear': lambda b, i: unwrap(b).clear(unwrap(i)),
+            'bitset_test': lambda b, i: CValue(unwrap(b).test(unwrap(i)), self),
+            'bitset_count': lambda b: CValue(_core.popcount(unwrap(b)), self),
+            'bitset_rank': lambda b, i: CValue(unwrap(b).rank(unwrap(i)), self),
+            'bitset_select': lambda b, k: CValue(unwrap(b).select(unwrap(k)), self),
+            'bitset_andnot': lambda a, b: CValue(unwrap(a).andnot(unwrap(b)), self),
             
             # --- Comparison Operations ---
             'eq': lambda a, b: CValue(_core.eq(unwrap(a), unwrap(b)), self),
@@ -100,12 +127,15 @@ class CEngine:
             'not_op': lambda a: CValue(_core.not_op(unwrap(a)), self),
             'truthy': lambda a: CValue(_core.truthy(unwrap(a)), self),
             
-            # --- Memory Operations (simulated) ---
-            'malloc': lambda size: CValue([0] * unwrap(size), self),  # Returns "pointer" (list)
-            'calloc': lambda num, size: CValue([0] * (unwrap(num) * unwrap(size)), self),
+            # --- Memory Operations (contiguous buffers) ---
+            'malloc': lambda size: CValue(bytearray(unwrap(size)), self),  # Returns "pointer" (bytearray)
+            'calloc': lambda num, size: CValue(bytearray(unwrap(num) * unwrap(size)), self),
             'free': lambda ptr: None,  # No-op in Python (GC handles it)
-            'memset': lambda ptr, val, size: [_core.obj_set(unwrap(ptr), i, unwrap(val)) for i in range(unwrap(size))],
-            'memcpy': lambda dest, src, size: [_core.obj_set(unwrap(dest), i, _core.obj_get(unwrap(src), i)) for i in range(unwrap(size))],
+            'ptr': lambda base, offset=0: CValue(_core.Pointer(unwrap(base), unwrap(offset)), self),
+            'deref': lambda p: CValue(_core.obj_get(unwrap(p), 0), self),
+            'memset': lambda ptr, val, size: CValue(_core.memset(unwrap(ptr), unwrap(val), unwrap(size)), self),
+            'memcpy': lambda dest, src, size: CValue(_core.memcpy(unwrap(dest), unwrap(src), unwrap(size)), self),
+            'memmove': lambda dest, src, size: CValue(_core.memmove(unwrap(dest), unwrap(src), unwrap(size)), self),
             
             # --- Struct Operations (using dicts) ---
             'struct_new': lambda: CValue(_core.obj_new(), self),
@@ -135,6 +165,7 @@ class CEngine:
             'LONG_MAX': 9223372036854775807,
             'LONG_MIN': -9223372036854775808,
         }
+        self.__dict__['_vars'] = _core.scope(self._scope, self._builtins)
         self.__dict__['decorator'] = create_decorator(self, CValue)
 
     def __getattr__(self, n):
@@ -142,6 +173,6 @@ class CEngine:
         return CValue(lie_lookup(self, None, n), self)
     
     def __setattr__(self, n, v):
-        _core.set_var(self._scope, n, unwrap(v))
+        self._vars.set(n, unwrap(v))
 
 c = CEngine()
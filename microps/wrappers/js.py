@@ -1,70 +1,27 @@
 # FILE: microps/wrappers/js.py
-from .. import _core
-from .wrapper import unwrap, get_mm, create_decorator, BaseValue
+from .. import _core, parallel
+from .wrapper import unwrap, get_mm, create_decorator, bind_methods, BaseValue, js_str
 
 class JSValue(BaseValue):
     """
     The JavaScript Pretender.
     Maps JS-nouns to C micro-operations.
     """
+    __slots__ = ()
 
     @property
     def length(self):
         """JS uses .length as a property, not a method."""
         return JSValue(_core.len(self._val), self._engine)
 
+    def __iadd__(self, o):
+        """s += x on a string extends a StrBuilder instead of copying s."""
+        r = self._extend(o, js_str)
+        return self + o if r is None else r
+
     def __getattr__(self, n):
+        """Fallback for names missing from JS_METHODS: C obj_get."""
         if n.startswith('_'): raise AttributeError(n)
-        
-        # --- String Methods ---
-        if n == 'toUpperCase': return lambda: JSValue(_core.str_upper(self._val), self._engine)
-        if n == 'toLowerCase': return lambda: JSValue(_core.str_lower(self._val), self._engine)
-        if n == 'split': return lambda sep="": JSValue(_core.str_split(self._val, unwrap(sep)), self._engine)
-        if n == 'replace': return lambda old, new: JSValue(_core.str_replace(self._val, unwrap(old), unwrap(new)), self._engine)
-        if n == 'charAt': return lambda i: JSValue(_core.obj_get(self._val, unwrap(i)), self._engine)
-        if n == 'charCodeAt': return lambda i: JSValue(ord(_core.to_str(_core.obj_get(self._val, unwrap(i)))), self._engine)
-        if n == 'concat': return lambda *args: JSValue(_core.str_join("", [self._val] + [unwrap(a) for a in args]), self._engine)
-        if n == 'startsWith': return lambda prefix: JSValue(_core.eq(_core.slice(self._val, 0, _core.len(unwrap(prefix))), unwrap(prefix)), self._engine)
-        if n == 'endsWith': return lambda suffix: JSValue(_core.eq(_core.slice(self._val, _core.sub(_core.len(self._val), _core.len(unwrap(suffix))), _core.len(self._val)), unwrap(suffix)), self._engine)
-        if n == 'trim': return lambda: JSValue(_core.str_replace(_core.str_replace(self._val, " ", ""), "\t", ""), self._engine)
-        if n == 'repeat': return lambda times: JSValue(_core.str_join("", [self._val] * unwrap(times)), self._engine)
-        if n == 'padStart': return lambda length, fill=" ": JSValue(_core.str_join("", [unwrap(fill)] * (unwrap(length) - _core.len(self._val)) + [self._val]) if _core.len(self._val) < unwrap(length) else self._val, self._engine)
-        if n == 'padEnd': return lambda length, fill=" ": JSValue(_core.str_join("", [self._val] + [unwrap(fill)] * (unwrap(length) - _core.len(self._val))) if _core.len(self._val) < unwrap(length) else self._val, self._engine)
-        
-        # --- Array Methods ---
-        if n == 'push': return lambda v: (_core.append(self._val, unwrap(v)), JSValue(_core.len(self._val), self._engine))[1]  # Returns new length
-        if n == 'pop': return lambda: JSValue(_core.pop(self._val, JSValue(-1, self._engine)), self._engine)
-        if n == 'shift': return lambda: JSValue(_core.pop(self._val, JSValue(0, self._engine)), self._engine)
-        if n == 'unshift': return lambda v: (_core.obj_set(self._val, 0, unwrap(v)), JSValue(_core.len(self._val), self._engine))[1]
-        if n == 'reverse': return lambda: (_core.reverse(self._val), self)[1]  # Mutates
-        if n == 'slice': return lambda start=0, end=None: JSValue(_core.slice(self._val, unwrap(start), unwrap(end) if end is not None else _core.len(self._val)), self._engine)
-        if n == 'concat': return lambda *args: JSValue(_core.concat(self._val, _core.concat(*[unwrap(a) for a in args])) if args else self._val, self._engine)
-        if n == 'includes': return lambda v: JSValue(_core.contains(self._val, unwrap(v)), self._engine)
-        if n == 'indexOf': 
-            def find_index(v):
-                for i in range(int(unwrap(_core.len(self._val)))):
-                    if unwrap(_core.eq(_core.obj_get(self._val, i), unwrap(v))):
-                        return JSValue(i, self._engine)
-                return JSValue(-1, self._engine)
-            return find_index
-        if n == 'join': return lambda sep=",": JSValue(_core.str_join(unwrap(sep), self._val), self._engine)
-        if n == 'fill': return lambda value, start=0, end=None: self._fill_array(unwrap(value), unwrap(start), unwrap(end))
-        if n == 'every': return lambda fn: JSValue(all(unwrap(fn(JSValue(item, self._engine))) for item in self._val), self._engine)
-        if n == 'some': return lambda fn: JSValue(any(unwrap(fn(JSValue(item, self._engine))) for item in self._val), self._engine)
-        
-        # --- Object Methods (JS Object.* exposed as methods) ---
-        if n == 'toString': return lambda: JSValue(_core.to_str(self._val), self._engine)
-        if n == 'valueOf': return lambda: self  # Returns itself
-        
-        # --- Number Methods ---
-        if n == 'toFixed': return lambda decimals=0: JSValue(f"{unwrap(_core.to_float(self._val)):.{unwrap(decimals)}f}", self._engine)
-        if n == 'toPrecision': return lambda precision: JSValue(f"{unwrap(_core.to_float(self._val)):.{unwrap(precision)-1}e}", self._engine)
-        if n == 'toExponential': return lambda decimals=2: JSValue(f"{unwrap(_core.to_float(self._val)):.{unwrap(decimals)}e}", self._engine)
-        
-        # --- Boolean/Type Checks ---
-        if n == 'isNaN': return lambda: JSValue(_core.ne(self._val, self._val), self._engine)  # NaN != NaN in JS
-        if n == 'isFinite': return lambda: JSValue(not (self._val == float('inf') or self._val == float('-inf')), self._engine)
-
         return JSValue(_core.obj_get(self._val, n), self._engine)
     
     def _fill_array(self, value, start, end):
@@ -74,6 +31,67 @@ class JSValue(BaseValue):
             _core.obj_set(self._val, i, value)
         return self
 
+    def _unshift(self, *values):
+        """Helper for Array.unshift(): inserts the values at the front, in
+        order, and returns the new length. O(1) per value on an Array."""
+        for v in reversed(values):
+            _core.insert(self._val, 0, unwrap(v))
+        return JSValue(_core.len(self._val), self._engine)
+
+    def _index_of(self, v):
+        """Helper for Array.indexOf(): one C call, hash-indexed when repeated."""
+        return JSValue(_core.find(self._val, unwrap(v)), self._engine)
+
+# Method table: resolved by normal attribute lookup, so every name costs the
+# same regardless of its position here.
+JS_METHODS = {
+    # --- String Methods ---
+    'toUpperCase': lambda self: JSValue(_core.str_upper(self._val), self._engine),
+    'toLowerCase': lambda self: JSValue(_core.str_lower(self._val), self._engine),
+    'split': lambda self, sep="": JSValue(_core.str_split(self._val, unwrap(sep)), self._engine),
+    'replace': lambda self, old, new: JSValue(_core.str_replace(self._val, unwrap(old), unwrap(new)), self._engine),
+    'charAt': lambda self, i: JSValue(_core.obj_get(self._val, unwrap(i)), self._engine),
+    'charCodeAt': lambda self, i: JSValue(ord(_core.to_str(_core.obj_get(self._val, unwrap(i)))), self._engine),
+    'concat': lambda self, *args: JSValue(_core.str_join("", [self._val] + [unwrap(a) for a in args]), self._engine),
+    'startsWith': lambda self, prefix: JSValue(_core.eq(_core.slice(self._val, 0, _core.len(unwrap(prefix))), unwrap(prefix)), self._engine),
+    'endsWith': lambda self, suffix: JSValue(_core.eq(_core.slice(self._val, _core.sub(_core.len(self._val), _core.len(unwrap(suffix))), _core.len(self._val)), unwrap(suffix)), self._engine),
+    'trim': lambda self: JSValue(_core.str_strip(self._val), self._engine),
+    'trimStart': lambda self: JSValue(_core.str_lstrip(self._val), self._engine),
+    'trimEnd': lambda self: JSValue(_core.str_rstrip(self._val), self._engine),
+    'repeat': lambda self, times: JSValue(_core.str_join("", [self._val] * unwrap(times)), self._engine),
+    'padStart': lambda self, length, fill=" ": JSValue(_core.str_join("", [unwrap(fill)] * (unwrap(length) - _core.len(self._val)) + [self._val]) if _core.len(self._val) < unwrap(length) else self._val, self._engine),
+    'padEnd': lambda self, length, fill=" ": JSValue(_core.str_join("", [self._val] + [unwrap(fill)] * (unwrap(length) - _core.len(self._val))) if _core.len(self._val) < unwrap(length) else self._val, self._engine),
+
+    # --- Array Methods ---
+    'push': lambda self, v: (_core.append(self._val, unwrap(v)), JSValue(_core.len(self._val), self._engine))[1],  # Returns new length
+    'pop': lambda self: JSValue(_core.pop(self._val, JSValue(-1, self._engine)), self._engine),
+    'shift': lambda self: JSValue(_core.pop(self._val, JSValue(0, self._engine)), self._engine),
+    'unshift': JSValue._unshift,
+    'reverse': lambda self: (_core.reverse(self._val), self)[1],  # Mutates
+    'slice': lambda self, start=0, end=None: JSValue(_core.slice(self._val, unwrap(start), unwrap(end) if end is not None else _core.len(self._val)), self._engine),
+    'includes': lambda self, v: JSValue(_core.contains(self._val, unwrap(v)), self._engine),
+    'indexOf': JSValue._index_of,
+    'join': lambda self, sep=",": JSValue(_core.str_join(unwrap(sep), self._val), self._engine),
+    'fill': lambda self, value, start=0, end=None: self._fill_array(unwrap(value), unwrap(start), unwrap(end)),
+    'every': lambda self, fn: JSValue(all(unwrap(fn(JSValue(item, self._engine))) for item in self._val), self._engine),
+    'some': lambda self, fn: JSValue(any(unwrap(fn(JSValue(item, self._engine))) for item in self._val), self._engine),
+    'parallelMap': lambda self, fn, chunksize=None, workers=None: JSValue(parallel.pmap(fn, self._val, chunksize, workers), self._engine),
+
+    # --- Object Methods (JS Object.* exposed as methods) ---
+    'toString': lambda self: JSValue(_core.to_str(self._val), self._engine),
+    'valueOf': lambda self: self,  # Returns itself
+
+    # --- Number Methods ---
+    'toFixed': lambda self, decimals=0: JSValue(f"{unwrap(_core.to_float(self._val)):.{unwrap(decimals)}f}", self._engine),
+    'toPrecision': lambda self, precision: JSValue(f"{unwrap(_core.to_float(self._val)):.{unwrap(precision)-1}e}", self._engine),
+    'toExponential': lambda self, decimals=2: JSValue(f"{unwrap(_core.to_float(self._val)):.{unwrap(decimals)}e}", self._engine),
+
+    # --- Boolean/Type Checks ---
+    'isNaN': lambda self: JSValue(_core.ne(self._val, self._val), self._engine),  # NaN != NaN in JS
+    'isFinite': lambda self: JSValue(not (self._val == float('inf') or self._val == float('-inf')), self._engine),
+}
+bind_methods(JSValue, JS_METHODS)
+
 class JSEngine:
     def __init__(self):
         self.__dict__['_scope'] = "js"
@@ -83,7 +101,7 @@ class JSEngine:
                 'values': lambda o: JSValue(_core.values(unwrap(o)), self),
                 'create': lambda: JSValue(_core.obj_new(), self),
             },
-            'Array': lambda *items: JSValue(list(unwrap(i) for i in items) if items else _core.list_new(), self),
+            'Array': lambda *items: JSValue(_core.Array(unwrap(i) for i in items), self),
             'String': lambda x: JSValue(_core.to_str(unwrap(x)), self),
             'Number': lambda x: JSValue(_core.to_float(unwrap(x)), self),
             'Boolean': lambda x: JSValue(_core.to_bool(unwrap(x)), self),
@@ -112,10 +130,14 @@ class JSEngine:
             'NaN': float('nan'),
             'Infinity': float('inf'),
         }
+        self.__dict__['_vars'] = _core.scope(self._scope, self._builtins)
         self.__dict__['decorator'] = create_decorator(self, JSValue)
 
     def __getattr__(self, n):
         from .wrapper import lie_lookup
         return JSValue(lie_lookup(self, None, n), self)
 
+    def __setattr__(self, n, v):
+        self._vars.set(n, unwrap(v))
+
 js = JSEngine()
@@ -1,12 +1,29 @@
 # FILE: microps/wrappers/lua.py
+from functools import cmp_to_key
+from itertools import takewhile
 from .. import _core
-from .wrapper import unwrap, get_mm, create_decorator, BaseValue, _GLOBAL_METATABLES
+from .wrapper import unwrap, create_decorator, BaseValue, _NUMBERS
+
+# One metamethod cache per operator: repeated resolution against the same
+# table (or tables sharing a metatable) skips the registry lookup until
+# setmetatable changes it. Metamethods of a LuaTable metatable are cached
+# too; a dict metatable is read on every call, so plain writes are seen.
+_MM = {name: _core.MMCache(name) for name in (
+    '__add', '__sub', '__mul', '__div', '__mod', '__pow', '__unm',
+    '__eq', '__lt', '__le', '__concat', '__index', '__newindex', '__len', '__call',
+)}
+
+# Sequences from other engines that Lua indexing treats as 1-based arrays,
+# and the ones among them that t[k] = v can write to
+_ARRAYS = (list, tuple, _core.Array)
+_LISTS = (list, _core.Array)
 
 class LuaValue(BaseValue):
     """
     The Lua Pretender.
     Reassembles C micro-ops into Lua's table-based semantics with metatables.
     """
+    __slots__ = ()
     
     def __bool__(self):
         """Lua truthiness: Only nil and false are falsy."""
@@ -14,7 +31,8 @@ class LuaValue(BaseValue):
 
     def _call_mm(self, name, other=None):
         """Helper to call metamethod if it exists."""
-        mm = get_mm(self._val, name, self._engine)
+        if type(self._val) in _NUMBERS: return None
+        mm = _MM[name](self._val)
         if mm:
             res = mm(self, other) if other is not None else mm(self)
             return LuaValue(res, self._engine)
@@ -64,21 +82,39 @@ class LuaValue(BaseValue):
         return bool(unwrap(mm_result)) if mm_result else bool(unwrap(_core.le(self._val, unwrap(o))))
     
     def __concat__(self, o):
-        """Lua concatenation with __concat metamethod support."""
-        return self._call_mm('__concat', o) or LuaValue(_core.str_join("", [_core.to_str(self._val), _core.to_str(unwrap(o))]), self._engine)
+        """Lua concatenation with __concat metamethod support. Strings are
+        extended through a StrBuilder, so a .. loop does not copy the text."""
+        if type(self._rope) is not _core.StrBuilder:
+            mm = self._call_mm('__concat', o)
+            if mm: return mm
+        r = self._extend(o, _core.to_str)
+        if r is not None: return r
+        return LuaValue(_core.str_join("", [_core.to_str(self._val), _core.to_str(unwrap(o))]), self._engine)
+
+    def __getattr__(self, n):
+        """Field access on a LuaTable: t.name is t['name'] (so
+        lua.table.insert works). A nil field raises AttributeError, so
+        hasattr() tells fields apart; other values have no fields."""
+        if n.startswith('_') or type(self._val) is not _core.LuaTable: raise AttributeError(n)
+        v = self[n]
+        if v._val is None: raise AttributeError(n)
+        return v
+
+    def __setattr__(self, n, v):
+        """t.name = v is t['name'] = v on a LuaTable."""
+        if n.startswith('_') or type(self._val) is not _core.LuaTable: return super().__setattr__(n, v)
+        self[n] = v
 
     def __getitem__(self, k):
-        """Lua table indexing with __index metamethod and 1-based indexing."""
-        raw_k = unwrap(k)
-        
-        # Try direct access first
-        val = _core.obj_get(self._val, raw_k)
-        
-        # Lua 1-based indexing pretension: If it's a numeric key and not found, try k-1
-        if val is None and isinstance(raw_k, (int, float)):
-            val = _core.obj_get(self._val, raw_k - 1)
-        
-        # Try __index metamethod if still not found
+        """Lua table indexing with __index metamethod support. A LuaTable
+        answers natively; a list from another engine is read 1-based."""
+        t, raw_k = self._val, unwrap(k)
+        if type(t) in _ARRAYS and type(raw_k) is int:
+            val = t[raw_k - 1] if 0 < raw_k <= len(t) else None
+        else:
+            val = _core.obj_get(t, raw_k)
+
+        # Try __index metamethod if not found
         if val is None:
             mm = self._call_mm('__index', k)
             if mm:
@@ -88,11 +124,19 @@ class LuaValue(BaseValue):
 
     def __setitem__(self, k, v):
         """Lua table assignment with __newindex metamethod support."""
-        mm = get_mm(self._val, '__newindex')
+        mm = _MM['__newindex'](self._val)
         if mm:
             mm(self, k, v)
+            return
+        t, raw_k = self._val, unwrap(k)
+        if type(t) in _LISTS and type(raw_k) is int and 0 < raw_k <= len(t) + 1:
+            # 1-based view of a list: t[#t+1] = v appends
+            if raw_k > len(t):
+                _core.append(t, unwrap(v))
+            else:
+                _core.obj_set(t, raw_k - 1, unwrap(v))
         else:
-            _core.obj_set(self._val, unwrap(k), unwrap(v))
+            _core.obj_set(t, raw_k, unwrap(v))
     
     def __len__(self):
         """Lua length operator with __len metamethod support."""
@@ -101,7 +145,7 @@ class LuaValue(BaseValue):
     
     def __call__(self, *args, **kwargs):
         """Lua call with __call metamethod support."""
-        mm = get_mm(self._val, '__call', self._engine)
+        mm = _MM['__call'](self._val)
         if mm:
             return LuaValue(mm(self, *args), self._engine)
         
@@ -115,7 +159,7 @@ class LuaEngine:
         self.__dict__['_scope'] = "lua"
         self.__dict__['_builtins'] = {
             # --- Core Lua Functions ---
-            'Table': lambda: LuaValue(_core.obj_new(), self),
+            'Table': lambda init=None: LuaValue(_core.LuaTable(unwrap(init)), self),
             'Number': lambda x: LuaValue(_core.to_float(unwrap(x)), self),
             'String': lambda x: LuaValue(_core.to_str(unwrap(x)), self),
             
@@ -129,27 +173,18 @@ class LuaEngine:
             'tostring': lambda x: LuaValue(_core.to_str(unwrap(x)), self),
             
             # --- Table Library ---
-            'table': {
-                'insert': lambda t, pos_or_val, val=None: (
-                    _core.append(unwrap(t), unwrap(pos_or_val)) if val is None 
-                    else _core.obj_set(unwrap(t), unwrap(pos_or_val), unwrap(val))
-                ),
-                'remove': lambda t, pos=None: LuaValue(
-                    _core.pop(unwrap(t), LuaValue(-1 if pos is None else unwrap(pos) - 1, self)), 
-                    self
-                ),
-                'concat': lambda t, sep="", i=1, j=None: LuaValue(
-                    _core.str_join(unwrap(sep), _core.slice(unwrap(t), unwrap(i) - 1, unwrap(j) if j else _core.len(unwrap(t)))),
-                    self
-                ),
-                'sort': lambda t, comp=None: unwrap(t).sort(key=comp) if comp else unwrap(t).sort(),
-                'unpack': lambda t, i=1, j=None: [LuaValue(v, self) for v in _core.slice(unwrap(t), unwrap(i) - 1, unwrap(j) if j else _core.len(unwrap(t)))],
-                'pack': lambda *args: LuaValue(list(unwrap(a) for a in args), self),
-                'maxn': lambda t: LuaValue(max((k for k in unwrap(t).keys() if isinstance(k, (int, float))), default=0), self),
-            },
+            'table': _core.LuaTable({
+                'insert': self._insert,
+                'remove': self._remove,
+                'concat': self._concat,
+                'sort': self._sort,
+                'unpack': self._unpack,
+                'pack': lambda *args: LuaValue(self._pack(args), self),
+                'maxn': lambda t: LuaValue(self._maxn(unwrap(t)), self),
+            }),
             
             # --- String Library ---
-            'string': {
+            'string': _core.LuaTable({
                 'upper': lambda s: LuaValue(_core.str_upper(unwrap(s)), self),
                 'lower': lambda s: LuaValue(_core.str_lower(unwrap(s)), self),
                 'len': lambda s: LuaValue(_core.len(unwrap(s)), self),
@@ -163,10 +198,10 @@ class LuaEngine:
                 'gmatch': lambda s, pattern: iter(str(unwrap(s)).split(str(unwrap(pattern)))),
                 'match': lambda s, pattern, init=1: LuaValue(str(unwrap(s))[unwrap(init) - 1:].split(str(unwrap(pattern)))[0] if unwrap(pattern) in str(unwrap(s)) else None, self),
                 'format': lambda fmt, *args: LuaValue(str(unwrap(fmt)) % tuple(unwrap(a) for a in args), self),
-            },
+            }),
             
             # --- Math Library ---
-            'math': {
+            'math': _core.LuaTable({
                 'abs': lambda x: LuaValue(_core.abs(unwrap(x)), self),
                 'floor': lambda x: LuaValue(_core.to_int(unwrap(x)), self),
                 'ceil': lambda x: LuaValue(_core.to_int(_core.add(unwrap(x), 0.999999)), self),
@@ -178,15 +213,20 @@ class LuaEngine:
                 'fmod': lambda x, y: LuaValue(_core.mod(unwrap(x), unwrap(y)), self),
                 'huge': float('inf'),
                 'pi': 3.141592653589793,
-            },
+            }),
+            
+            # --- IO Library ---
+            'io': _core.LuaTable({
+                'lines': self._lines,
+            }),
             
             # --- Basic Functions ---
             'assert': lambda cond, msg=None: None if unwrap(cond) else (_ for _ in ()).throw(AssertionError(unwrap(msg) if msg else "assertion failed")),
             'error': lambda msg: (_ for _ in ()).throw(RuntimeError(unwrap(msg))),
             'print': lambda *args: print(*(str(unwrap(a)) for a in args)),
-            'ipairs': lambda t: enumerate(unwrap(t), start=1),
-            'pairs': lambda t: iter(unwrap(t).items()),
-            'next': lambda t, k=None: next(iter(unwrap(t).items())),
+            'ipairs': self._ipairs,
+            'pairs': lambda t: self._table(t).pairs(),
+            'next': self._next,
             'rawget': lambda t, k: LuaValue(_core.obj_get(unwrap(t), unwrap(k)), self),
             'rawset': lambda t, k, v: _core.obj_set(unwrap(t), unwrap(k), unwrap(v)),
             'rawlen': lambda t: LuaValue(_core.len(unwrap(t)), self),
@@ -198,38 +238,125 @@ class LuaEngine:
             'false': False,
             '_VERSION': "Microps Lua 5.4",
         }
+        self.__dict__['_next_state'] = (None, (), 0)
+        self.__dict__['_vars'] = _core.scope(self._scope, self._builtins)
         self.__dict__['decorator'] = create_decorator(self, LuaValue)
     
-    def _setmetatable(self, t, m):
-        """Set metatable - handles both dicts and lists using global registry."""
-        obj = unwrap(t)
-        mt = unwrap(m)
-        
-        if isinstance(obj, dict):
-            # Dicts can store metatables directly
-            _core.obj_set(obj, '_mt', mt)
+    @staticmethod
+    def _table(t):
+        """The LuaTable behind t; a dict or list from another engine is
+        copied into one (lists become t[1], t[2], ...)."""
+        t = unwrap(t)
+        return t if type(t) is _core.LuaTable else _core.LuaTable(t)
+
+    @staticmethod
+    def _ipairs(t):
+        """ipairs(t): (1, t[1]), (2, t[2]), ... up to the first nil. Lists
+        from other engines are read in place."""
+        t = unwrap(t)
+        if type(t) in _ARRAYS:
+            return takewhile(lambda kv: kv[1] is not None, enumerate(t, 1))
+        return LuaEngine._table(t).ipairs()
+
+    def _next(self, t, k=None):
+        """next(t, k): the (key, value) after k, or None at the end. Lists
+        from other engines are stepped in place. For a dict the key order of
+        the last call is kept, so a next() loop over it is O(n) overall."""
+        t, k = unwrap(t), unwrap(k)
+        if type(t) is _core.LuaTable:
+            return t.next(k)
+        if type(t) in _ARRAYS:
+            i = 0 if k is None else k
+            while i < len(t) and t[i] is None:
+                i += 1
+            return (i + 1, t[i]) if i < len(t) else None
+        if not isinstance(t, dict):
+            return self._table(t).next(k)
+        d, keys, i = self._next_state
+        if d is not t or k is None or not 0 < i <= len(keys) or keys[i - 1] != k:
+            keys = list(t)
+            i = 0 if k is None else keys.index(k) + 1
+        while i < len(keys) and keys[i] not in t:        # set to nil meanwhile
+            i += 1
+        if i == len(keys):
+            self.__dict__['_next_state'] = (None, (), 0)
+            return None
+        self.__dict__['_next_state'] = (t, keys, i + 1)
+        return keys[i], t[keys[i]]
+
+    @staticmethod
+    def _maxn(t):
+        """table.maxn(t): the largest positive numeric key, 0 if none."""
+        if type(t) in _ARRAYS:
+            return next((i for i in range(len(t), 0, -1) if t[i - 1] is not None), 0)
+        keys = t.keys() if isinstance(t, (dict, _core.LuaTable)) else ()
+        return max((k for k in keys if type(k) in _NUMBERS and k > 0), default=0)
+
+    @staticmethod
+    def _pack(args):
+        t = _core.LuaTable([unwrap(a) for a in args])
+        t['n'] = len(args)
+        return t
+
+    def _insert(self, t, *args):
+        """table.insert(t, [pos,] value)"""
+        t, args = unwrap(t), [unwrap(a) for a in args]
+        if type(t) is _core.LuaTable:
+            t.insert(*args)
+        elif len(args) == 1:
+            _core.append(t, args[0])
         else:
-            # Lists and other objects: store in global metatable registry
-            obj_id = id(obj)
-            _GLOBAL_METATABLES[obj_id] = mt
-        
+            _core.insert(t, args[0] - 1, args[1])
+
+    def _remove(self, t, pos=None):
+        """table.remove(t, pos=#t)"""
+        t, pos = unwrap(t), unwrap(pos)
+        if type(t) is _core.LuaTable:
+            return LuaValue(t.remove(pos), self)
+        return LuaValue(_core.pop(t, len(t) - 1 if pos is None else pos - 1), self)
+
+    def _concat(self, t, sep="", i=1, j=None):
+        """table.concat(t, sep, i, j)"""
+        t, sep, i, j = unwrap(t), unwrap(sep), unwrap(i), unwrap(j)
+        if type(t) is _core.LuaTable:
+            return LuaValue(t.concat(sep, i, j), self)
+        return LuaValue(_core.str_join(sep, _core.slice(t, i - 1, j if j else _core.len(t))), self)
+
+    def _sort(self, t, comp=None):
+        """table.sort(t, comp): comp(a, b) is Lua's "a comes before b"."""
+        key = None
+        if comp is not None:
+            before = lambda a, b: bool(unwrap(comp(a, b)))
+            key = cmp_to_key(lambda a, b: -1 if before(a, b) else 1 if before(b, a) else 0)
+        t = unwrap(t)
+        t.sort(key=key)
+
+    def _unpack(self, t, i=1, j=None):
+        """table.unpack(t, i, j)"""
+        t, i, j = unwrap(t), unwrap(i), unwrap(j)
+        if type(t) is not _core.LuaTable:
+            return [LuaValue(v, self) for v in _core.slice(t, i - 1, j if j else _core.len(t))]
+        return [LuaValue(v, self) for v in t.unpack(i, j)]
+
+    def _setmetatable(self, t, m):
+        """Set metatable in the shared C registry (tables and lists alike)."""
+        _core.setmetatable(unwrap(t), unwrap(m))
         return t
     
     def _getmetatable(self, t):
-        """Get metatable - handles both dicts and lists using global registry."""
-        obj = unwrap(t)
-        
-        if isinstance(obj, dict):
-            return LuaValue(_core.obj_get(obj, '_mt'), self)
-        else:
-            obj_id = id(obj)
-            return LuaValue(_GLOBAL_METATABLES.get(obj_id), self)
+        """Get metatable from the shared C registry."""
+        return LuaValue(_core.getmetatable(unwrap(t)), self)
+
+    def _lines(self, path):
+        """io.lines: streams a file one line at a time, closing it at EOF."""
+        with open(unwrap(path)) as f:
+            yield from _core.imap(lambda line: LuaValue(line.rstrip("\n"), self), f)
 
     def __getattr__(self, n):
         from .wrapper import lie_lookup
         return LuaValue(lie_lookup(self, None, n), self)
     
     def __setattr__(self, n, v):
-        _core.set_var(self._scope, n, unwrap(v))
+        self._vars.set(n, unwrap(v))
 
 lua = LuaEngine()
@@ -1,12 +1,22 @@
 # FILE: microps/wrappers/php.py
+import builtins
+
 from .. import _core
-from .wrapper import unwrap, get_mm, create_decorator, BaseValue
+from .wrapper import unwrap, get_mm, create_decorator, bind_methods, value_callback, BaseValue, _NUMBERS
+
+_ARRAY = _core.PHPArray
+
+def _array(v):
+    """v as a PHPArray: itself, or a new one from a list's values or a
+    dict's entries, for the array_* functions that read their argument."""
+    return v if type(v) is _ARRAY else _ARRAY(v)
 
 class PHPValue(BaseValue):
     """
     The PHP Pretender.
     Reassembles C micro-ops to enforce PHP Type Juggling and Array nouns.
     """
+    __slots__ = ()
 
     def __bool__(self):
         """PHP Truthiness: 0, 0.0, "", "0", empty array, and null are falsy."""
@@ -20,8 +30,8 @@ class PHPValue(BaseValue):
 
     def __add__(self, o):
         """PHP Addition: Check for Lua metatable first, then force numeric context."""
-        # Check if object has Lua __add metamethod
-        mm = get_mm(self._val, '__add', self._engine)
+        # Numbers never have a metatable; anything else may carry a Lua __add
+        mm = None if type(self._val) in _NUMBERS else get_mm(self._val, '__add', self._engine)
         if mm:
             # Metatable functions expect objects with _val attribute
             # PHPValue already has this, so we can pass self directly
@@ -34,82 +44,8 @@ class PHPValue(BaseValue):
         return PHPValue(_core.add(v1, v2), self._engine)
 
     def __getattr__(self, n):
-        """Maps PHP-style nouns/functions as if they were methods."""
+        """Fallback for names missing from PHP_METHODS: C obj_get."""
         if n.startswith('_'): raise AttributeError(n)
-
-        # --- String Functions (as methods) ---
-        if n == 'strtoupper': return lambda: PHPValue(_core.str_upper(self._val), self._engine)
-        if n == 'strtolower': return lambda: PHPValue(_core.str_lower(self._val), self._engine)
-        if n == 'strlen': return lambda: PHPValue(_core.len(self._val), self._engine)
-        if n == 'str_replace': return lambda old, new: PHPValue(_core.str_replace(self._val, unwrap(old), unwrap(new)), self._engine)
-        if n == 'str_repeat': return lambda times: PHPValue(_core.str_join("", [self._val] * unwrap(times)), self._engine)
-        if n == 'strrev': return lambda: PHPValue(_core.str_join("", _core.reverse(_core.str_split(self._val, ""))), self._engine)
-        if n == 'trim': return lambda: PHPValue(_core.str_replace(_core.str_replace(self._val, " ", ""), "\t", ""), self._engine)
-        if n == 'ltrim': return lambda: PHPValue(self._val.lstrip(), self._engine)
-        if n == 'rtrim': return lambda: PHPValue(self._val.rstrip(), self._engine)
-        if n == 'substr': return lambda start, length=None: PHPValue(_core.slice(self._val, unwrap(start), unwrap(start) + unwrap(length) if length else _core.len(self._val)), self._engine)
-        if n == 'str_split_fn': return lambda length=1: PHPValue([self._val[i:i+unwrap(length)] for i in range(0, len(self._val), unwrap(length))], self._engine)
-        if n == 'ucfirst': return lambda: PHPValue(_core.str_upper(_core.slice(self._val, 0, 1)) + _core.slice(self._val, 1, _core.len(self._val)), self._engine)
-        if n == 'lcfirst': return lambda: PHPValue(_core.str_lower(_core.slice(self._val, 0, 1)) + _core.slice(self._val, 1, _core.len(self._val)), self._engine)
-        if n == 'str_pad': return lambda length, pad=" ", type="right": self._str_pad(unwrap(length), unwrap(pad), type)
-        
-        # --- Array Functions (as methods) ---
-        if n == 'count': return lambda: PHPValue(_core.len(self._val), self._engine)
-        if n == 'array_push': return lambda v: (_core.append(self._val, unwrap(v)), PHPValue(_core.len(self._val), self._engine))[1]
-        if n == 'array_pop': return lambda: PHPValue(_core.pop(self._val, PHPValue(-1, self._engine)), self._engine)
-        if n == 'array_shift': return lambda: PHPValue(_core.pop(self._val, PHPValue(0, self._engine)), self._engine)
-        if n == 'array_unshift': return lambda v: (_core.obj_set(self._val, 0, unwrap(v)), self)[1]
-        if n == 'array_reverse': return lambda: PHPValue(_core.reverse(self._val.copy()), self._engine)
-        if n == 'array_slice': return lambda start, length=None: PHPValue(_core.slice(self._val, unwrap(start), unwrap(start) + unwrap(length) if length else _core.len(self._val)), self._engine)
-        if n == 'array_merge': return lambda *arrays: PHPValue(_core.concat(self._val, *[unwrap(a) for a in arrays]), self._engine)
-        if n == 'in_array': return lambda needle: PHPValue(_core.contains(self._val, unwrap(needle)), self._engine)
-        if n == 'array_search': 
-            def search(needle):
-                for i in range(int(unwrap(_core.len(self._val)))):
-                    if unwrap(_core.eq(_core.obj_get(self._val, i), unwrap(needle))):
-                        return PHPValue(i, self._engine)
-                return PHPValue(False, self._engine)
-            return search
-        if n == 'array_keys': return lambda: PHPValue(_core.keys(self._val), self._engine)
-        if n == 'array_values': return lambda: PHPValue(_core.values(self._val), self._engine)
-        if n == 'array_key_exists': return lambda key: PHPValue(_core.ne(_core.obj_get(self._val, unwrap(key)), None), self._engine)
-        if n == 'array_sum': return lambda: PHPValue(sum(unwrap(v) for v in self._val), self._engine)
-        if n == 'array_product': return lambda: PHPValue(_core.mul(*self._val) if self._val else 1, self._engine)
-        if n == 'array_unique': return lambda: PHPValue(list(set(self._val)), self._engine)
-        if n == 'array_filter': return lambda fn: PHPValue([v for v in self._val if unwrap(fn(PHPValue(v, self._engine)))], self._engine)
-        if n == 'array_map': return lambda fn: PHPValue([unwrap(fn(PHPValue(v, self._engine))) for v in self._val], self._engine)
-        if n == 'sort': return lambda: (_core.reverse(self._val) if False else sorted(self._val), self)[1]  # Simplified
-        if n == 'rsort': return lambda: (sorted(self._val, reverse=True), self)[1]
-        if n == 'is_array': return lambda: PHPValue(isinstance(self._val, (list, dict)), self._engine)
-        if n == 'empty': return lambda: PHPValue(_core.eq(_core.len(self._val), 0), self._engine)
-        if n == 'isset': return lambda: PHPValue(self._val is not None, self._engine)
-        
-        # --- Type Conversion Functions ---
-        if n == 'intval': return lambda: PHPValue(_core.to_int(self._val), self._engine)
-        if n == 'floatval': return lambda: PHPValue(_core.to_float(self._val), self._engine)
-        if n == 'strval': return lambda: PHPValue(_core.to_str(self._val), self._engine)
-        if n == 'boolval': return lambda: PHPValue(_core.to_bool(self._val), self._engine)
-        
-        # --- Math Functions ---
-        if n == 'abs': return lambda: PHPValue(_core.abs(self._val), self._engine)
-        if n == 'floor': return lambda: PHPValue(_core.to_int(self._val), self._engine)
-        if n == 'ceil': return lambda: PHPValue(_core.to_int(_core.add(self._val, 0.999999)), self._engine)
-        if n == 'round': return lambda precision=0: PHPValue(round(unwrap(_core.to_float(self._val)), unwrap(precision)), self._engine)
-        if n == 'pow': return lambda exp: PHPValue(_core.pow(self._val, unwrap(exp)), self._engine)
-        if n == 'sqrt': return lambda: PHPValue(_core.pow(self._val, 0.5), self._engine)
-        if n == 'max': return lambda *args: PHPValue(max(self._val, *[unwrap(a) for a in args]), self._engine)
-        if n == 'min': return lambda *args: PHPValue(min(self._val, *[unwrap(a) for a in args]), self._engine)
-        
-        # --- Type Checking ---
-        if n == 'is_numeric': return lambda: PHPValue(isinstance(self._val, (int, float)), self._engine)
-        if n == 'is_string': return lambda: PHPValue(isinstance(self._val, str), self._engine)
-        if n == 'is_int': return lambda: PHPValue(isinstance(self._val, int), self._engine)
-        if n == 'is_float': return lambda: PHPValue(isinstance(self._val, float), self._engine)
-        if n == 'is_bool': return lambda: PHPValue(isinstance(self._val, bool), self._engine)
-        if n == 'is_null': return lambda: PHPValue(self._val is None, self._engine)
-        if n == 'gettype': return lambda: PHPValue(_core.type(self._val), self._engine)
-
-        # Default: C obj_get
         return PHPValue(_core.obj_get(self._val, n), self._engine)
     
     def _str_pad(self, length, pad, pad_type):
@@ -131,12 +67,120 @@ class PHPValue(BaseValue):
         else:  # right
             return PHPValue(self._val + padding, self._engine)
 
+    def _array_search(self, needle):
+        """Helper for array_search: one C call. Returns the key; PHPArrays
+        are hash-indexed when searched repeatedly."""
+        if type(self._val) is _ARRAY:
+            return PHPValue(self._val.search(unwrap(needle)), self._engine)
+        i = _core.find(self._val, unwrap(needle))
+        return PHPValue(False if i < 0 else i, self._engine)
+
+    def _array_splice(self, offset, length=None, replacement=()):
+        """Helper for array_splice: changes the array in place and returns the
+        removed values. Lists, Arrays and dicts from other engines are spliced
+        as a PHPArray and written back."""
+        v = self._val
+        a = _array(v)
+        removed = a.splice(unwrap(offset), unwrap(length), unwrap(replacement))
+        if a is not v:
+            if isinstance(v, dict):
+                v.clear()
+                v.update(a.items())
+            else:
+                v[:] = a.values()
+        return PHPValue(removed, self._engine)
+
+    def _array_unshift(self, *values):
+        """Helper for array_unshift: prepends, returns the new count."""
+        if type(self._val) is _ARRAY:
+            return PHPValue(self._val.unshift(*[unwrap(v) for v in values]), self._engine)
+        for v in reversed(values):
+            _core.insert(self._val, 0, unwrap(v))
+        return PHPValue(_core.len(self._val), self._engine)
+
+    def _sort(self, reverse=False):
+        """Helper for sort / rsort: sorts in place; PHPArrays are renumbered."""
+        self._val.sort(reverse=reverse)
+        return self
+
+# Method table: resolved by normal attribute lookup, so every name costs the
+# same regardless of its position here.
+PHP_METHODS = {
+    # --- String Functions (as methods) ---
+    'strtoupper': lambda self: PHPValue(_core.str_upper(self._val), self._engine),
+    'strtolower': lambda self: PHPValue(_core.str_lower(self._val), self._engine),
+    'strlen': lambda self: PHPValue(_core.len(self._val), self._engine),
+    'str_replace': lambda self, old, new: PHPValue(_core.str_replace(self._val, unwrap(old), unwrap(new)), self._engine),
+    'str_repeat': lambda self, times: PHPValue(_core.str_join("", [self._val] * unwrap(times)), self._engine),
+    'strrev': lambda self: PHPValue(_core.str_join("", _core.reverse(_core.str_split(self._val, ""))), self._engine),
+    'trim': lambda self: PHPValue(_core.str_strip(self._val), self._engine),
+    'ltrim': lambda self: PHPValue(_core.str_lstrip(self._val), self._engine),
+    'rtrim': lambda self: PHPValue(_core.str_rstrip(self._val), self._engine),
+    'substr': lambda self, start, length=None: PHPValue(_core.slice(self._val, unwrap(start), unwrap(start) + unwrap(length) if length else _core.len(self._val)), self._engine),
+    'str_split_fn': lambda self, length=1: PHPValue([self._val[i:i+unwrap(length)] for i in range(0, len(self._val), unwrap(length))], self._engine),
+    'ucfirst': lambda self: PHPValue(_core.str_upper(_core.slice(self._val, 0, 1)) + _core.slice(self._val, 1, _core.len(self._val)), self._engine),
+    'lcfirst': lambda self: PHPValue(_core.str_lower(_core.slice(self._val, 0, 1)) + _core.slice(self._val, 1, _core.len(self._val)), self._engine),
+    'str_pad': lambda self, length, pad=" ", type="right": self._str_pad(unwrap(length), unwrap(pad), type),
+
+    # --- Array Functions (as methods) ---
+    'count': lambda self: PHPValue(_core.len(self._val), self._engine),
+    'array_push': lambda self, v: (_core.append(self._val, unwrap(v)), PHPValue(_core.len(self._val), self._engine))[1],
+    'array_pop': lambda self: PHPValue(_core.pop(self._val, PHPValue(-1, self._engine)), self._engine),
+    'array_shift': lambda self: PHPValue(_core.pop(self._val, PHPValue(0, self._engine)), self._engine),
+    'array_unshift': PHPValue._array_unshift,
+    'array_reverse': lambda self, preserve_keys=False: PHPValue(_array(self._val).reverse(unwrap(preserve_keys)), self._engine),
+    'array_slice': lambda self, start, length=None, preserve_keys=False: PHPValue(_array(self._val).slice(unwrap(start), unwrap(length), unwrap(preserve_keys)), self._engine),
+    'array_splice': PHPValue._array_splice,
+    'array_merge': lambda self, *arrays: PHPValue(_array(self._val).merge(*[unwrap(a) for a in arrays]), self._engine),
+    'in_array': lambda self, needle: PHPValue(_core.contains(self._val, unwrap(needle)), self._engine),
+    'array_search': PHPValue._array_search,
+    'array_keys': lambda self: PHPValue(_ARRAY(_array(self._val).keys()), self._engine),
+    'array_values': lambda self: PHPValue(_ARRAY(_array(self._val).values()), self._engine),
+    'array_key_exists': lambda self, key: PHPValue(_array(self._val).key_exists(unwrap(key)), self._engine),
+    'array_sum': lambda self: PHPValue(sum(self._val), self._engine),
+    'array_product': lambda self: PHPValue(_core.reduce_func(_core.mul, self._val, 1), self._engine),
+    'array_unique': lambda self: PHPValue(_array(self._val).unique(), self._engine),
+    'array_filter': lambda self, fn=None: PHPValue(_array(self._val).filter(fn and value_callback(fn, PHPValue, self._engine)), self._engine),
+    'array_map': lambda self, fn: PHPValue(_array(self._val).map(value_callback(fn, PHPValue, self._engine)), self._engine),
+    'sort': PHPValue._sort,
+    'rsort': lambda self: self._sort(reverse=True),
+    'is_array': lambda self: PHPValue(isinstance(self._val, (list, dict, _ARRAY, _core.Array)), self._engine),
+    'empty': lambda self: PHPValue(_core.eq(_core.len(self._val), 0), self._engine),
+    'isset': lambda self: PHPValue(self._val is not None, self._engine),
+
+    # --- Type Conversion Functions ---
+    'intval': lambda self: PHPValue(_core.to_int(self._val), self._engine),
+    'floatval': lambda self: PHPValue(_core.to_float(self._val), self._engine),
+    'strval': lambda self: PHPValue(_core.to_str(self._val), self._engine),
+    'boolval': lambda self: PHPValue(_core.to_bool(self._val), self._engine),
+
+    # --- Math Functions ---
+    'abs': lambda self: PHPValue(_core.abs(self._val), self._engine),
+    'floor': lambda self: PHPValue(_core.to_int(self._val), self._engine),
+    'ceil': lambda self: PHPValue(_core.to_int(_core.add(self._val, 0.999999)), self._engine),
+    'round': lambda self, precision=0: PHPValue(round(unwrap(_core.to_float(self._val)), unwrap(precision)), self._engine),
+    'pow': lambda self, exp: PHPValue(_core.pow(self._val, unwrap(exp)), self._engine),
+    'sqrt': lambda self: PHPValue(_core.pow(self._val, 0.5), self._engine),
+    'max': lambda self, *args: PHPValue(max(self._val, *[unwrap(a) for a in args]), self._engine),
+    'min': lambda self, *args: PHPValue(min(self._val, *[unwrap(a) for a in args]), self._engine),
+
+    # --- Type Checking ---
+    'is_numeric': lambda self: PHPValue(isinstance(self._val, (int, float)), self._engine),
+    'is_string': lambda self: PHPValue(isinstance(self._val, str), self._engine),
+    'is_int': lambda self: PHPValue(isinstance(self._val, int), self._engine),
+    'is_float': lambda self: PHPValue(isinstance(self._val, float), self._engine),
+    'is_bool': lambda self: PHPValue(isinstance(self._val, bool), self._engine),
+    'is_null': lambda self: PHPValue(self._val is None, self._engine),
+    'gettype': lambda self: PHPValue(_core.type(self._val), self._engine),
+}
+bind_methods(PHPValue, PHP_METHODS)
+
 class PHPEngine:
     def __init__(self):
         self.__dict__['_scope'] = "php"
         self.__dict__['_builtins'] = {
             # --- Global PHP Functions (reassembled from C Verbs) ---
-            'array': lambda *items: PHPValue(list(unwrap(i) for i in items) if items else _core.list_new(), self),
+            'array': lambda *items: PHPValue(_ARRAY([unwrap(i) for i in items]), self),
             
             # String functions
             'strtoupper': lambda x: PHPValue(_core.str_upper(unwrap(x)), self),
@@ -147,7 +191,9 @@ class PHPEngine:
             'strlen': lambda x: PHPValue(_core.len(unwrap(x)), self),
             'str_replace': lambda old, new, subj: PHPValue(_core.str_replace(unwrap(subj), unwrap(old), unwrap(new)), self),
             'substr': lambda s, start, length=None: PHPValue(_core.slice(unwrap(s), unwrap(start), unwrap(start) + unwrap(length) if length else _core.len(unwrap(s))), self),
-            'trim': lambda x: PHPValue(_core.str_replace(_core.str_replace(unwrap(x), " ", ""), "\t", ""), self),
+            'trim': lambda x: PHPValue(_core.str_strip(unwrap(x)), self),
+            'ltrim': lambda x: PHPValue(_core.str_lstrip(unwrap(x)), self),
+            'rtrim': lambda x: PHPValue(_core.str_rstrip(unwrap(x)), self),
             
             # Numeric functions
             'intval': lambda x: PHPValue(_core.to_int(unwrap(x)), self),
@@ -165,19 +211,32 @@ class PHPEngine:
             'array_push': lambda arr, *items: [_core.append(unwrap(arr), unwrap(i)) for i in items] and PHPValue(_core.len(unwrap(arr)), self),
             'array_pop': lambda arr: PHPValue(_core.pop(unwrap(arr), PHPValue(-1, self)), self),
             'array_shift': lambda arr: PHPValue(_core.pop(unwrap(arr), PHPValue(0, self)), self),
-            'array_reverse': lambda arr: PHPValue(_core.reverse(unwrap(arr).copy()), self),
-            'array_slice': lambda arr, start, length=None: PHPValue(_core.slice(unwrap(arr), unwrap(start), unwrap(start) + unwrap(length) if length else _core.len(unwrap(arr))), self),
-            'array_merge': lambda *arrays: PHPValue(_core.concat(*[unwrap(a) for a in arrays]), self) if arrays else PHPValue(_core.list_new(), self),
+            'array_unshift': lambda arr, *items: PHPValue(unwrap(arr), self).array_unshift(*items),
+            'array_reverse': lambda arr, preserve_keys=False: PHPValue(_array(unwrap(arr)).reverse(unwrap(preserve_keys)), self),
+            'array_slice': lambda arr, start, length=None, preserve_keys=False: PHPValue(_array(unwrap(arr)).slice(unwrap(start), unwrap(length), unwrap(preserve_keys)), self),
+            'array_splice': lambda arr, offset, length=None, replacement=(): PHPValue(unwrap(arr), self).array_splice(offset, length, replacement),
+            'array_merge': lambda *arrays: PHPValue(_array(unwrap(arrays[0])).merge(*[unwrap(a) for a in arrays[1:]]) if arrays else _ARRAY(), self),
             'count': lambda x: PHPValue(_core.len(unwrap(x)), self),
             'in_array': lambda needle, haystack: PHPValue(_core.contains(unwrap(haystack), unwrap(needle)), self),
-            'array_keys': lambda arr: PHPValue(_core.keys(unwrap(arr)), self),
-            'array_values': lambda arr: PHPValue(_core.values(unwrap(arr)), self),
+            'array_search': lambda needle, haystack: PHPValue(unwrap(haystack), self).array_search(needle),
+            'array_key_exists': lambda key, arr: PHPValue(_array(unwrap(arr)).key_exists(unwrap(key)), self),
+            'array_keys': lambda arr: PHPValue(_ARRAY(_array(unwrap(arr)).keys()), self),
+            'array_values': lambda arr: PHPValue(_ARRAY(_array(unwrap(arr)).values()), self),
+            'array_unique': lambda arr: PHPValue(_array(unwrap(arr)).unique(), self),
             'array_sum': lambda arr: PHPValue(sum(unwrap(arr)), self),
             'empty': lambda x: PHPValue(_core.eq(_core.len(unwrap(x)), 0), self),
             'isset': lambda x: PHPValue(unwrap(x) is not None, self),
+
+            # Internal array pointer; next() on anything else is Python's
+            'current': lambda arr: PHPValue(unwrap(arr).current(), self),
+            'key': lambda arr: PHPValue(unwrap(arr).key(), self),
+            'next': lambda arr, *default: PHPValue(unwrap(arr).next() if type(unwrap(arr)) is _ARRAY else builtins.next(unwrap(arr), *default), self),
+            'prev': lambda arr: PHPValue(unwrap(arr).prev(), self),
+            'reset': lambda arr: PHPValue(unwrap(arr).reset(), self),
+            'end': lambda arr: PHPValue(unwrap(arr).end(), self),
             
             # Type checking
-            'is_array': lambda x: PHPValue(isinstance(unwrap(x), (list, dict)), self),
+            'is_array': lambda x: PHPValue(isinstance(unwrap(x), (list, dict, _ARRAY, _core.Array)), self),
             'is_numeric': lambda x: PHPValue(isinstance(unwrap(x), (int, float)), self),
             'is_string': lambda x: PHPValue(isinstance(unwrap(x), str), self),
             'is_int': lambda x: PHPValue(isinstance(unwrap(x), int), self),
@@ -200,6 +259,7 @@ class PHPEngine:
             'print_r': lambda x: print(f"Array\n(\n{unwrap(x)}\n)"),
             'var_dump': lambda *args: [print(f"{type(unwrap(a)).__name__}({unwrap(a)})") for a in args],
         }
+        self.__dict__['_vars'] = _core.scope(self._scope, self._builtins)
         self.__dict__['decorator'] = create_decorator(self, PHPValue)
 
     def __getattr__(self, n):
@@ -207,6 +267,6 @@ class PHPEngine:
         return PHPValue(lie_lookup(self, None, n), self)
     
     def __setattr__(self, n, v):
-        _core.set_var(self._scope, n, unwrap(v))
+        self._vars.set(n, unwrap(v))
 
 php = PHPEngine()
@@ -1,87 +1,103 @@
 # FILE: microps/wrappers/py.py
-from .. import _core
-from .wrapper import unwrap, get_mm, create_decorator, BaseValue
+from types import MethodType
+from .. import _core, parallel
+from .wrapper import unwrap, get_mm, create_decorator, bind_methods, value_callback, BaseValue
 
 class PyValue(BaseValue):
     """
     The Python Pretender.
     Maps standard Python method names to C micro-operations.
     """
+    __slots__ = ()
 
     def __bool__(self):
         """Python truthiness: Uses C to_bool/truthy logic."""
         return bool(unwrap(_core.truthy(self._val)))
 
     def __getattr__(self, n):
-        """Maps standard Python attributes/methods to C micro-ops."""
+        """Fallback for names missing from PY_METHODS: C obj_get."""
         if n.startswith('_'): raise AttributeError(n)
+        return PyValue(_core.obj_get(self._val, n), self._engine)
 
-        # --- String Methods ---
-        if n == 'upper': return lambda: PyValue(_core.str_upper(self._val), self._engine)
-        if n == 'lower': return lambda: PyValue(_core.str_lower(self._val), self._engine)
-        if n == 'split': return lambda sep=None: PyValue(_core.str_split(self._val, unwrap(sep)), self._engine)
-        if n == 'join': return lambda it: PyValue(_core.str_join(self._val, unwrap(it)), self._engine)
-        if n == 'replace': return lambda o, r: PyValue(_core.str_replace(self._val, unwrap(o), unwrap(r)), self._engine)
-        if n == 'strip': return lambda: PyValue(_core.str_replace(_core.str_replace(self._val, " ", ""), "\t", ""), self._engine)
-        if n == 'lstrip': return lambda: PyValue(self._val.lstrip(), self._engine)
-        if n == 'rstrip': return lambda: PyValue(self._val.rstrip(), self._engine)
-        if n == 'startswith': return lambda prefix: PyValue(_core.eq(_core.slice(self._val, 0, _core.len(unwrap(prefix))), unwrap(prefix)), self._engine)
-        if n == 'endswith': return lambda suffix: PyValue(_core.eq(_core.slice(self._val, _core.sub(_core.len(self._val), _core.len(unwrap(suffix))), _core.len(self._val)), unwrap(suffix)), self._engine)
-        if n == 'capitalize': return lambda: PyValue(_core.str_upper(_core.slice(self._val, 0, 1)) + _core.str_lower(_core.slice(self._val, 1, _core.len(self._val))), self._engine)
-        if n == 'title': return lambda: PyValue(" ".join(word[0].upper() + word[1:].lower() for word in str(self._val).split()), self._engine)
-        if n == 'swapcase': return lambda: PyValue("".join(c.upper() if c.islower() else c.lower() for c in str(self._val)), self._engine)
-        if n == 'count': return lambda sub: PyValue(str(self._val).count(str(unwrap(sub))), self._engine)
-        if n == 'find': return lambda sub: PyValue(str(self._val).find(str(unwrap(sub))), self._engine)
-        if n == 'rfind': return lambda sub: PyValue(str(self._val).rfind(str(unwrap(sub))), self._engine)
-        if n == 'index': return lambda sub: PyValue(str(self._val).index(str(unwrap(sub))), self._engine)
-        if n == 'isalpha': return lambda: PyValue(str(self._val).isalpha(), self._engine)
-        if n == 'isdigit': return lambda: PyValue(str(self._val).isdigit(), self._engine)
-        if n == 'isalnum': return lambda: PyValue(str(self._val).isalnum(), self._engine)
-        if n == 'isspace': return lambda: PyValue(str(self._val).isspace(), self._engine)
-        if n == 'isupper': return lambda: PyValue(str(self._val).isupper(), self._engine)
-        if n == 'islower': return lambda: PyValue(str(self._val).islower(), self._engine)
-        if n == 'center': return lambda width, fill=" ": PyValue(str(self._val).center(unwrap(width), unwrap(fill)), self._engine)
-        if n == 'ljust': return lambda width, fill=" ": PyValue(str(self._val).ljust(unwrap(width), unwrap(fill)), self._engine)
-        if n == 'rjust': return lambda width, fill=" ": PyValue(str(self._val).rjust(unwrap(width), unwrap(fill)), self._engine)
-        if n == 'zfill': return lambda width: PyValue(str(self._val).zfill(unwrap(width)), self._engine)
-        
-        # --- List Methods ---
-        if n == 'append': return lambda v: _core.append(self._val, unwrap(v))
-        if n == 'pop': return lambda i=-1: PyValue(_core.pop(self._val, PyValue(i, self._engine)), self._engine)
-        if n == 'reverse': return lambda: _core.reverse(self._val)
-        if n == 'extend': return lambda it: [_core.append(self._val, unwrap(i)) for i in unwrap(it)]
-        if n == 'insert': return lambda i, v: _core.obj_set(self._val, unwrap(i), unwrap(v))
-        if n == 'remove': return lambda v: self._val.remove(unwrap(v))
-        if n == 'clear': return lambda: self._val.clear()
-        if n == 'index': return lambda v: PyValue(self._val.index(unwrap(v)), self._engine)
-        if n == 'count': return lambda v: PyValue(self._val.count(unwrap(v)), self._engine)
-        if n == 'sort': return lambda key=None, reverse=False: self._val.sort(key=key, reverse=unwrap(reverse))
-        if n == 'copy': return lambda: PyValue(self._val.copy(), self._engine)
-        
-        # --- Dict Methods ---
-        if n == 'keys': return lambda: PyValue(_core.keys(self._val), self._engine)
-        if n == 'values': return lambda: PyValue(_core.values(self._val), self._engine)
-        if n == 'items': return lambda: PyValue(list(self._val.items()), self._engine)
-        if n == 'get': return lambda k, d=None: PyValue(_core.obj_get(self._val, unwrap(k)) or d, self._engine)
-        if n == 'pop': return lambda k, d=None: PyValue(_core.del_op(self._val, unwrap(k)) or d, self._engine)
-        if n == 'popitem': return lambda: PyValue(self._val.popitem(), self._engine)
-        if n == 'clear': return lambda: self._val.clear()
-        if n == 'update': return lambda other: self._val.update(unwrap(other))
-        if n == 'setdefault': return lambda k, d=None: PyValue(self._val.setdefault(unwrap(k), unwrap(d)), self._engine)
-        
-        # --- Set Methods (if dict-like) ---
-        if n == 'add': return lambda v: self._val.add(unwrap(v)) if hasattr(self._val, 'add') else None
-        if n == 'discard': return lambda v: self._val.discard(unwrap(v)) if hasattr(self._val, 'discard') else None
-        if n == 'union': return lambda other: PyValue(self._val.union(unwrap(other)), self._engine)
-        if n == 'intersection': return lambda other: PyValue(self._val.intersection(unwrap(other)), self._engine)
-        if n == 'difference': return lambda other: PyValue(self._val.difference(unwrap(other)), self._engine)
-        if n == 'symmetric_difference': return lambda other: PyValue(self._val.symmetric_difference(unwrap(other)), self._engine)
-        if n == 'issubset': return lambda other: PyValue(self._val.issubset(unwrap(other)), self._engine)
-        if n == 'issuperset': return lambda other: PyValue(self._val.issuperset(unwrap(other)), self._engine)
-        if n == 'isdisjoint': return lambda other: PyValue(self._val.isdisjoint(unwrap(other)), self._engine)
+def _bits_only(name, fn):
+    """A PY_METHODS entry that is a method on Bitsets and ints only. On any
+    other value the name falls through to obj_get like a missing one, so
+    PyValue({'test': 5}).test is the field."""
+    def get(self):
+        if isinstance(self._val, (_core.Bitset, int)): return MethodType(fn, self)
+        return PyValue.__getattr__(self, name)
+    return property(get)
 
-        # Default: C obj_get
-        return PyValue(_core.obj_get(self._val, n), self._engine)
+# Method table: resolved by normal attribute lookup, so every name costs the
+# same regardless of its position here.
+PY_METHODS = {
+    # --- String Methods ---
+    'upper': lambda self: PyValue(_core.str_upper(self._val), self._engine),
+    'lower': lambda self: PyValue(_core.str_lower(self._val), self._engine),
+    'split': lambda self, sep=None: PyValue(_core.str_split(self._val, unwrap(sep)), self._engine),
+    'join': lambda self, it: PyValue(_core.str_join(self._val, unwrap(it)), self._engine),
+    'replace': lambda self, o, r: PyValue(_core.str_replace(self._val, unwrap(o), unwrap(r)), self._engine),
+    'strip': lambda self: PyValue(_core.str_strip(self._val), self._engine),
+    'lstrip': lambda self: PyValue(_core.str_lstrip(self._val), self._engine),
+    'rstrip': lambda self: PyValue(_core.str_rstrip(self._val), self._engine),
+    'startswith': lambda self, prefix: PyValue(_core.eq(_core.slice(self._val, 0, _core.len(unwrap(prefix))), unwrap(prefix)), self._engine),
+    'endswith': lambda self, suffix: PyValue(_core.eq(_core.slice(self._val, _core.sub(_core.len(self._val), _core.len(unwrap(suffix))), _core.len(self._val)), unwrap(suffix)), self._engine),
+    'capitalize': lambda self: PyValue(_core.str_upper(_core.slice(self._val, 0, 1)) + _core.str_lower(_core.slice(self._val, 1, _core.len(self._val))), self._engine),
+    'title': lambda self: PyValue(" ".join(word[0].upper() + word[1:].lower() for word in str(self._val).split()), self._engine),
+    'swapcase': lambda self: PyValue("".join(c.upper() if c.islower() else c.lower() for c in str(self._val)), self._engine),
+    'count': lambda self, sub: PyValue(str(self._val).count(str(unwrap(sub))), self._engine),
+    'find': lambda self, sub: PyValue(str(self._val).find(str(unwrap(sub))), self._engine),
+    'rfind': lambda self, sub: PyValue(str(self._val).rfind(str(unwrap(sub))), self._engine),
+    'index': lambda self, sub: PyValue(str(self._val).index(str(unwrap(sub))), self._engine),
+    'isalpha': lambda self: PyValue(str(self._val).isalpha(), self._engine),
+    'isdigit': lambda self: PyValue(str(self._val).isdigit(), self._engine),
+    'isalnum': lambda self: PyValue(str(self._val).isalnum(), self._engine),
+    'isspace': lambda self: PyValue(str(self._val).isspace(), self._engine),
+    'isupper': lambda self: PyValue(str(self._val).isupper(), self._engine),
+    'islower': lambda self: PyValue(str(self._val).islower(), self._engine),
+    'center': lambda self, width, fill=" ": PyValue(str(self._val).center(unwrap(width), unwrap(fill)), self._engine),
+    'ljust': lambda self, width, fill=" ": PyValue(str(self._val).ljust(unwrap(width), unwrap(fill)), self._engine),
+    'rjust': lambda self, width, fill=" ": PyValue(str(self._val).rjust(unwrap(width), unwrap(fill)), self._engine),
+    'zfill': lambda self, width: PyValue(str(self._val).zfill(unwrap(width)), self._engine),
+
+    # --- List Methods ---
+    'append': lambda self, v: _core.append(self._val, unwrap(v)),
+    'pop': lambda self, i=-1: PyValue(_core.pop(self._val, PyValue(i, self._engine)), self._engine),
+    'reverse': lambda self: _core.reverse(self._val),
+    'extend': lambda self, it: [_core.append(self._val, unwrap(i)) for i in unwrap(it)],
+    'insert': lambda self, i, v: _core.obj_set(self._val, unwrap(i), unwrap(v)),
+    'remove': lambda self, v: self._val.remove(unwrap(v)),
+    'clear': lambda self: self._val.clear(),
+    'sort': lambda self, key=None, reverse=False: self._val.sort(key=key, reverse=unwrap(reverse)),
+    'copy': lambda self: PyValue(self._val.copy(), self._engine),
+
+    # --- Dict Methods ---
+    'keys': lambda self: PyValue(_core.keys(self._val), self._engine),
+    'values': lambda self: PyValue(_core.values(self._val), self._engine),
+    'items': lambda self: PyValue(list(self._val.items()), self._engine),
+    'get': lambda self, k, d=None: PyValue(_core.obj_get(self._val, unwrap(k)) or d, self._engine),
+    'popitem': lambda self: PyValue(self._val.popitem(), self._engine),
+    'update': lambda self, other: self._val.update(unwrap(other)),
+    'setdefault': lambda self, k, d=None: PyValue(self._val.setdefault(unwrap(k), unwrap(d)), self._engine),
+
+    # --- Set Methods (if dict-like) ---
+    'add': lambda self, v: self._val.add(unwrap(v)) if hasattr(self._val, 'add') else None,
+    'discard': lambda self, v: self._val.discard(unwrap(v)) if hasattr(self._val, 'discard') else None,
+    'union': lambda self, other: PyValue(self._val.union(unwrap(other)), self._engine),
+    'intersection': lambda self, other: PyValue(self._val.intersection(unwrap(other)), self._engine),
+    'difference': lambda self, other: PyValue(self._val.difference(unwrap(other)), self._engine),
+    'symmetric_difference': lambda self, other: PyValue(self._val.symmetric_difference(unwrap(other)), self._engine),
+    'issubset': lambda self, other: PyValue(self._val.issubset(unwrap(other)), self._engine),
+    'issuperset': lambda self, other: PyValue(self._val.issuperset(unwrap(other)), self._engine),
+    'isdisjoint': lambda self, other: PyValue(self._val.isdisjoint(unwrap(other)), self._engine),
+
+    # --- Int / Bitset bit methods ---
+    'bit_count': _bits_only('bit_count', lambda self: PyValue(_core.popcount(self._val), self._engine)),
+    'test': _bits_only('test', lambda self, i: PyValue(self._val.test(unwrap(i)), self._engine)),
+    'rank': _bits_only('rank', lambda self, i: PyValue(self._val.rank(unwrap(i)), self._engine)),
+    'select': _bits_only('select', lambda self, k: PyValue(self._val.select(unwrap(k)), self._engine)),
+}
+bind_methods(PyValue, PY_METHODS)
 
 class PyEngine:
     def __init__(self):
@@ -107,14 +123,22 @@ class PyEngine:
             'set': lambda iterable=None: PyValue(set() if iterable is None else set(unwrap(i) for i in unwrap(iterable)), self),
             'tuple': lambda iterable=None: PyValue(tuple() if iterable is None else tuple(unwrap(i) for i in unwrap(iterable)), self),
             'range': lambda *args: PyValue(list(range(*[unwrap(a) for a in args])), self),
+            'bitset': lambda nbits, positions=(): PyValue(_core.Bitset(unwrap(nbits), unwrap(positions)), self),
             
             # Logic
             'any': lambda x: any(unwrap(i) for i in unwrap(x)),
             'all': lambda x: all(unwrap(i) for i in unwrap(x)),
             'enumerate': lambda it: PyValue(list(enumerate(unwrap(it))), self),
-            'zip': lambda *its: PyValue(list(zip(*[unwrap(i) for i in its])), self),
-            'map': lambda fn, it: PyValue(list(map(lambda x: unwrap(fn(PyValue(x, self))), unwrap(it))), self),
-            'filter': lambda fn, it: PyValue(list(filter(lambda x: unwrap(fn(PyValue(x, self))), unwrap(it))), self),
+            # map/filter/zip are lazy like Python 3's: C iterators that pull
+            # one item at a time, so they can stream from files and generators
+            'zip': lambda *its: PyValue(_core.izip(*its), self),
+            'map': lambda fn, it: PyValue(_core.imap(value_callback(fn, PyValue, self), it), self),
+            'filter': lambda fn, it: PyValue(_core.ifilter(value_callback(fn, PyValue, self), it), self),
+            'iter': lambda it: PyValue(iter(unwrap(it)), self),
+            'next': lambda it, *default: PyValue(next(unwrap(it), *(unwrap(d) for d in default)), self),
+            # Parallel variants (microps.parallel): callbacks get raw values
+            'pmap': lambda fn, it, chunksize=None, workers=None: PyValue(parallel.pmap(fn, it, chunksize, workers), self),
+            'preduce': lambda fn, it, initial, chunksize=None, workers=None: PyValue(parallel.preduce(fn, it, initial, chunksize, workers), self),
             'sorted': lambda it, key=None, reverse=False: PyValue(sorted(unwrap(it), key=key, reverse=unwrap(reverse)), self),
             'reversed': lambda it: PyValue(list(reversed(unwrap(it))), self),
             
@@ -137,6 +161,7 @@ class PyEngine:
             # Print (uses C to_str for consistency)
             'print': lambda *args: print(*(str(unwrap(a)) for a in args))
         }
+        self.__dict__['_vars'] = _core.scope(self._scope, self._builtins)
         self.__dict__['decorator'] = create_decorator(self, PyValue)
 
     def __getattr__(self, n):
@@ -144,6 +169,6 @@ class PyEngine:
         return PyValue(lie_lookup(self, None, n), self)
     
     def __setattr__(self, n, v):
-        _core.set_var(self._scope, n, unwrap(v))
+        self._vars.set(n, unwrap(v))
 
 py = PyEngine()
@@ -1,90 +1,146 @@
 # FILE: microps/wrappers/ruby.py
-from .. import _core
-from .wrapper import unwrap, get_mm, create_decorator, BaseValue
+from .. import _core, parallel
+from .wrapper import unwrap, get_mm, create_decorator, bind_methods, value_callback, is_raw, BaseValue
+from collections.abc import Iterator
 
 class RubyValue(BaseValue):
     """
     The Ruby Pretender.
     Reassembles C micro-ops into Ruby's 'Everything is an Object' style.
     """
+    __slots__ = ()
     
     def __bool__(self):
         """Ruby truthiness: Only nil and false are falsy."""
         return not (self._val is None or self._val is False)
 
     def __getattr__(self, n):
-        """Maps Ruby nouns to C micro-operations."""
+        """Fallback for names missing from RUBY_METHODS: C obj_get."""
         if n.startswith('_'): raise AttributeError(n)
-        
-        # --- Type/Meta Nouns ---
-        if n == 'klass': return lambda: RubyValue(_core.type(self._val), self._engine)
-        if n == 'inspect': return lambda: RubyValue(_core.to_str(self._val), self._engine)
-        
-        # --- Array Nouns (using list micro-ops) ---
-        if n in ('length', 'size', 'count'): return lambda: RubyValue(_core.len(self._val), self._engine)
-        if n == 'push': return lambda v: (_core.append(self._val, unwrap(v)), self)[1]  # Returns self
-        if n == 'pop': return lambda: RubyValue(_core.pop(self._val, RubyValue(-1, self._engine)), self._engine)
-        if n == 'shift': return lambda: RubyValue(_core.pop(self._val, RubyValue(0, self._engine)), self._engine)
-        if n == 'unshift': return lambda v: (_core.obj_set(self._val, 0, unwrap(v)), self)[1]  # Add to front
-        if n == 'reverse': return lambda: (_core.reverse(self._val), self)[1]  # Mutates and returns self
-        if n == 'reverse!': return lambda: (_core.reverse(self._val), self)[1]  # Ruby bang method
-        if n == 'include?': return lambda v: RubyValue(_core.contains(self._val, unwrap(v)), self._engine)
-        if n == 'empty?': return lambda: RubyValue(_core.eq(_core.len(self._val), 0), self._engine)
-        if n == 'first': return lambda: RubyValue(_core.obj_get(self._val, 0), self._engine)
-        if n == 'last': return lambda: RubyValue(_core.obj_get(self._val, _core.sub(_core.len(self._val), 1)), self._engine)
-        if n == 'concat': return lambda other: RubyValue(_core.concat(self._val, unwrap(other)), self._engine)
-        if n == 'slice': return lambda start, length: RubyValue(_core.slice(self._val, unwrap(start), _core.add(unwrap(start), unwrap(length))), self._engine)
-        
-        # --- String Nouns ---
-        if n == 'upcase': return lambda: RubyValue(_core.str_upper(self._val), self._engine)
-        if n == 'upcase!': return lambda: RubyValue(_core.str_upper(self._val), self._engine)
-        if n == 'downcase': return lambda: RubyValue(_core.str_lower(self._val), self._engine)
-        if n == 'downcase!': return lambda: RubyValue(_core.str_lower(self._val), self._engine)
-        if n == 'split': return lambda sep=" ": RubyValue(_core.str_split(self._val, unwrap(sep)), self._engine)
-        if n == 'gsub': return lambda old, new: RubyValue(_core.str_replace(self._val, unwrap(old), unwrap(new)), self._engine)
-        if n == 'strip': return lambda: RubyValue(_core.str_replace(_core.str_replace(self._val, " ", ""), "\t", ""), self._engine)
-        if n == 'chars': return lambda: RubyValue(_core.str_split(self._val, ""), self._engine)
-        if n == 'reverse': return lambda: RubyValue(_core.str_join("", _core.reverse(_core.str_split(self._val, ""))), self._engine)
-        if n == 'start_with?': return lambda prefix: RubyValue(_core.eq(_core.slice(self._val, 0, _core.len(unwrap(prefix))), unwrap(prefix)), self._engine)
-        if n == 'end_with?': return lambda suffix: RubyValue(_core.eq(_core.slice(self._val, _core.sub(_core.len(self._val), _core.len(unwrap(suffix))), _core.len(self._val)), unwrap(suffix)), self._engine)
-        
-        # --- Numeric Nouns ---
-        if n == 'abs': return lambda: RubyValue(_core.abs(self._val), self._engine)
-        if n == 'to_i': return lambda: RubyValue(_core.to_int(self._val), self._engine)
-        if n == 'to_f': return lambda: RubyValue(_core.to_float(self._val), self._engine)
-        if n == 'to_s': return lambda: RubyValue(_core.to_str(self._val), self._engine)
-        if n == 'negative?': return lambda: RubyValue(_core.lt(self._val, 0), self._engine)
-        if n == 'positive?': return lambda: RubyValue(_core.gt(self._val, 0), self._engine)
-        if n == 'zero?': return lambda: RubyValue(_core.eq(self._val, 0), self._engine)
-        if n == 'even?': return lambda: RubyValue(_core.eq(_core.mod(self._val, 2), 0), self._engine)
-        if n == 'odd?': return lambda: RubyValue(_core.ne(_core.mod(self._val, 2), 0), self._engine)
-        if n == 'floor': return lambda: RubyValue(_core.to_int(self._val), self._engine)
-        if n == 'ceil': return lambda: RubyValue(_core.to_int(_core.add(self._val, 0.999999)), self._engine)
-        if n == 'round': return lambda: RubyValue(_core.to_int(_core.add(self._val, 0.5)), self._engine)
-        
-        # --- Hash/Object Nouns ---
-        if n == 'keys': return lambda: RubyValue(_core.keys(self._val), self._engine)
-        if n == 'values': return lambda: RubyValue(_core.values(self._val), self._engine)
-        if n == 'delete': return lambda k: RubyValue(_core.del_op(self._val, unwrap(k)), self._engine)
-        if n == 'has_key?': return lambda k: RubyValue(_core.ne(_core.obj_get(self._val, unwrap(k)), None), self._engine)
-        if n == 'has_value?': return lambda v: RubyValue(_core.contains(_core.values(self._val), unwrap(v)), self._engine)
-        if n == 'merge': return lambda other: RubyValue({**self._val, **unwrap(other)}, self._engine)
-        
-        # --- Comparison Nouns (Ruby style) ---
-        if n == 'eql?': return lambda other: RubyValue(_core.eq(self._val, unwrap(other)), self._engine)
-        if n == 'equal?': return lambda other: RubyValue(self._val is unwrap(other), self._engine)
-        
-        # --- Boolean/Logic Nouns ---
-        if n == 'nil?': return lambda: RubyValue(self._val is None, self._engine)
-
-        # Default to C dictionary lookup
         return RubyValue(_core.obj_get(self._val, n), self._engine)
 
+# --- Enumerable helpers ---
+# After .lazy the value holds a _core iterator and map/select/... chain more
+# iterators onto it; nothing runs until force/to_a/first/each pulls items.
+# On a plain Array the same methods return Arrays, as in Ruby.
+def _enum(self, it):
+    return RubyValue(it if isinstance(self._val, Iterator) else _core.Array(it), self._engine)
+
+def _block(self, fn):
+    return value_callback(fn, RubyValue, self._engine)
+
+def _test(self, fn, want=True):
+    """Block used as a predicate with Ruby truthiness (only nil/false fail).
+    Raw callbacks keep Python truthiness."""
+    if is_raw(fn):
+        return fn if want else (lambda x: not fn(x))
+    engine = self._engine
+    def test(x):
+        r = unwrap(fn(RubyValue(x, engine)))
+        return (r is not None and r is not False) is want
+    return test
+
+def _each(self, fn):
+    for _ in _core.imap(_block(self, fn), self._val):
+        pass
+    return self
+
+def _first(self, n=None):
+    if n is None:
+        if isinstance(self._val, Iterator):
+            return RubyValue(next(self._val, None), self._engine)
+        return RubyValue(_core.obj_get(self._val, 0), self._engine)
+    return RubyValue(_core.Array(_core.take(self._val, unwrap(n))), self._engine)
+
+# Method table: resolved by normal attribute lookup, so every name costs the
+# same regardless of its position here.
+RUBY_METHODS = {
+    # --- Type/Meta Nouns ---
+    'klass': lambda self: RubyValue(_core.type(self._val), self._engine),
+    'inspect': lambda self: RubyValue(_core.to_str(self._val), self._engine),
+
+    # --- Array Nouns (using list micro-ops) ---
+    'length': lambda self: RubyValue(_core.len(self._val), self._engine),
+    'size': lambda self: RubyValue(_core.len(self._val), self._engine),
+    'count': lambda self: RubyValue(_core.len(self._val), self._engine),
+    'push': lambda self, v: (_core.append(self._val, unwrap(v)), self)[1],  # Returns self
+    'pop': lambda self: RubyValue(_core.pop(self._val, RubyValue(-1, self._engine)), self._engine),
+    'shift': lambda self: RubyValue(_core.pop(self._val, RubyValue(0, self._engine)), self._engine),
+    'unshift': lambda self, v: (_core.insert(self._val, 0, unwrap(v)), self)[1],  # Add to front
+    'reverse': lambda self: (_core.reverse(self._val), self)[1],  # Mutates and returns self
+    'reverse!': lambda self: (_core.reverse(self._val), self)[1],  # Ruby bang method
+    'include?': lambda self, v: RubyValue(_core.contains(self._val, unwrap(v)), self._engine),
+    'empty?': lambda self: RubyValue(_core.eq(_core.len(self._val), 0), self._engine),
+    'first': _first,
+    'last': lambda self: RubyValue(_core.obj_get(self._val, _core.sub(_core.len(self._val), 1)), self._engine),
+    'concat': lambda self, other: RubyValue(_core.concat(self._val, unwrap(other)), self._engine),
+    'slice': lambda self, start, length: RubyValue(_core.slice(self._val, unwrap(start), _core.add(unwrap(start), unwrap(length))), self._engine),
+
+    # --- Enumerable Nouns (lazy after .lazy) ---
+    'lazy': lambda self: RubyValue(iter(self._val), self._engine),
+    'map': lambda self, fn: _enum(self, _core.imap(_block(self, fn), self._val)),
+    'collect': lambda self, fn: _enum(self, _core.imap(_block(self, fn), self._val)),
+    'select': lambda self, fn: _enum(self, _core.ifilter(_test(self, fn), self._val)),
+    'filter': lambda self, fn: _enum(self, _core.ifilter(_test(self, fn), self._val)),
+    'reject': lambda self, fn: _enum(self, _core.ifilter(_test(self, fn, False), self._val)),
+    'take': lambda self, n: _enum(self, _core.take(self._val, unwrap(n))),
+    'zip': lambda self, *others: _enum(self, _core.izip(self._val, *others)),
+    'each': _each,
+    'par_map': lambda self, fn, chunksize=None, workers=None: RubyValue(parallel.pmap(fn, self._val, chunksize, workers), self._engine),
+    'par_each': lambda self, fn, chunksize=None, workers=None: (parallel.pmap(fn, self._val, chunksize, workers), self)[1],
+    'force': lambda self: RubyValue(_core.Array(self._val), self._engine),
+    'to_a': lambda self: RubyValue(_core.Array(self._val), self._engine),
+
+    # --- String Nouns ---
+    'upcase': lambda self: RubyValue(_core.str_upper(self._val), self._engine),
+    'upcase!': lambda self: RubyValue(_core.str_upper(self._val), self._engine),
+    'downcase': lambda self: RubyValue(_core.str_lower(self._val), self._engine),
+    'downcase!': lambda self: RubyValue(_core.str_lower(self._val), self._engine),
+    'split': lambda self, sep=" ": RubyValue(_core.str_split(self._val, unwrap(sep)), self._engine),
+    'gsub': lambda self, old, new: RubyValue(_core.str_replace(self._val, unwrap(old), unwrap(new)), self._engine),
+    'strip': lambda self: RubyValue(_core.str_strip(self._val), self._engine),
+    'lstrip': lambda self: RubyValue(_core.str_lstrip(self._val), self._engine),
+    'rstrip': lambda self: RubyValue(_core.str_rstrip(self._val), self._engine),
+    'chars': lambda self: RubyValue(_core.str_split(self._val, ""), self._engine),
+    'start_with?': lambda self, prefix: RubyValue(_core.eq(_core.slice(self._val, 0, _core.len(unwrap(prefix))), unwrap(prefix)), self._engine),
+    'end_with?': lambda self, suffix: RubyValue(_core.eq(_core.slice(self._val, _core.sub(_core.len(self._val), _core.len(unwrap(suffix))), _core.len(self._val)), unwrap(suffix)), self._engine),
+
+    # --- Numeric Nouns ---
+    'abs': lambda self: RubyValue(_core.abs(self._val), self._engine),
+    'to_i': lambda self: RubyValue(_core.to_int(self._val), self._engine),
+    'to_f': lambda self: RubyValue(_core.to_float(self._val), self._engine),
+    'to_s': lambda self: RubyValue(_core.to_str(self._val), self._engine),
+    'negative?': lambda self: RubyValue(_core.lt(self._val, 0), self._engine),
+    'positive?': lambda self: RubyValue(_core.gt(self._val, 0), self._engine),
+    'zero?': lambda self: RubyValue(_core.eq(self._val, 0), self._engine),
+    'even?': lambda self: RubyValue(_core.eq(_core.mod(self._val, 2), 0), self._engine),
+    'odd?': lambda self: RubyValue(_core.ne(_core.mod(self._val, 2), 0), self._engine),
+    'floor': lambda self: RubyValue(_core.to_int(self._val), self._engine),
+    'ceil': lambda self: RubyValue(_core.to_int(_core.add(self._val, 0.999999)), self._engine),
+    'round': lambda self: RubyValue(_core.to_int(_core.add(self._val, 0.5)), self._engine),
+
+    # --- Hash/Object Nouns ---
+    'keys': lambda self: RubyValue(_core.keys(self._val), self._engine),
+    'values': lambda self: RubyValue(_core.values(self._val), self._engine),
+    'delete': lambda self, k: RubyValue(_core.del_op(self._val, unwrap(k)), self._engine),
+    'has_key?': lambda self, k: RubyValue(_core.ne(_core.obj_get(self._val, unwrap(k)), None), self._engine),
+    'has_value?': lambda self, v: RubyValue(_core.contains(_core.values(self._val), unwrap(v)), self._engine),
+    'merge': lambda self, other: RubyValue({**self._val, **unwrap(other)}, self._engine),
+
+    # --- Comparison Nouns (Ruby style) ---
+    'eql?': lambda self, other: RubyValue(_core.eq(self._val, unwrap(other)), self._engine),
+    'equal?': lambda self, other: RubyValue(self._val is unwrap(other), self._engine),
+
+    # --- Boolean/Logic Nouns ---
+    'nil?': lambda self: RubyValue(self._val is None, self._engine),
+}
+bind_methods(RubyValue, RUBY_METHODS)
+
 class RubyEngine:
     def __init__(self):
         self.__dict__['_scope'] = "ruby"
         self.__dict__['_builtins'] = {
-            'Array': lambda: RubyValue(_core.list_new(), self),
+            'Array': lambda *items: RubyValue(_core.Array(unwrap(i) for i in items), self),
             'Hash': lambda: RubyValue(_core.obj_new(), self),
             'String': lambda x: RubyValue(_core.to_str(unwrap(x)), self),
             'Integer': lambda x: RubyValue(_core.to_int(unwrap(x)), self),
@@ -96,6 +152,7 @@ class RubyEngine:
             'true': True,
             'false': False,
         }
+        self.__dict__['_vars'] = _core.scope(self._scope, self._builtins)
         self.__dict__['decorator'] = create_decorator(self, RubyValue)
 
     def __getattr__(self, n):
@@ -103,6 +160,6 @@ class RubyEngine:
         return RubyValue(lie_lookup(self, None, n), self)
     
     def __setattr__(self, n, v):
-        _core.set_var(self._scope, n, unwrap(v))
+        self._vars.set(n, unwrap(v))
 
 ruby = RubyEngine()
@@ -1,26 +1,61 @@
 # FILE: microps/wrappers/wrapper.py
 from .. import _core, unwrap
-from types import FunctionType
+from ..pipeline import Pipeline
+from types import (FunctionType, BuiltinFunctionType, MethodWrapperType,
+                   WrapperDescriptorType, MethodDescriptorType)
 import builtins
+import functools
 
-# Global metatable registry shared across all engines
-_GLOBAL_METATABLES = {}
+# Metatables live in a C registry shared across all engines: weakly keyed
+# where the object allows it, and answering None without a lookup while no
+# metatable is set or for plain numbers.
+get_mm = _core.get_mm
 
-def get_mm(obj_raw, name, engine=None):
-    """Finds Lua-style metamethods in raw C-dictionaries or global registry."""
-    # First try: object is a dict with _mt key
-    if isinstance(obj_raw, dict):
-        mt = obj_raw.get('_mt')
-        if mt and isinstance(mt, dict):
-            return mt.get(name)
-    
-    # Second try: check global metatable registry (for lists, etc.)
-    obj_id = id(obj_raw)
-    mt = _GLOBAL_METATABLES.get(obj_id)
-    if mt and isinstance(mt, dict):
-        return mt.get(name)
-    
-    return None
+# Types that never carry a metatable; their arithmetic skips get_mm.
+_NUMBERS = (int, float, bool)
+
+# Raw string values; a StrBuilder is a string still being concatenated.
+_STRINGS = (str, _core.StrBuilder)
+
+def bind_methods(cls, table):
+    """Installs a name -> function(self, ...) table as methods of cls.
+
+    Names that are not identifiers (Ruby's 'empty?', 'reverse!') work too and
+    are reached through getattr(). Lookups go through the type's attribute
+    cache, so __getattr__ only runs for names missing from the table.
+    """
+    for name, fn in table.items():
+        setattr(cls, name, fn)
+
+# Callables implemented in C that take and return plain objects: builtins,
+# _core ops, slot wrappers such as (1).__add__ and str.upper.
+_NATIVE_CALLABLES = (BuiltinFunctionType, MethodWrapperType, WrapperDescriptorType, MethodDescriptorType)
+
+def raw(fn):
+    """Marks fn as working on raw values.
+
+    map/filter-style engine methods then pass it the plain objects directly
+    instead of wrapping each element in a *Value and unwrapping the result.
+    """
+    try:
+        fn.__microps_raw__ = True
+    except AttributeError:
+        fn = functools.partial(fn)
+        fn.__microps_raw__ = True
+    return fn
+
+def is_raw(fn):
+    """True for callbacks that can skip value wrapping: C callables, builtin
+    types and anything marked with raw()."""
+    if isinstance(fn, _NATIVE_CALLABLES): return True
+    if isinstance(fn, type): return fn.__module__ == 'builtins'
+    return getattr(fn, '__microps_raw__', False)
+
+def value_callback(fn, value_class, engine):
+    """fn as a raw-value callable: fn itself when is_raw(fn), otherwise a
+    shim that wraps the argument in value_class and unwraps the result."""
+    if is_raw(fn): return fn
+    return lambda x: unwrap(fn(value_class(x, engine)))
 
 def js_str(val):
     """Formats numbers like JS: 5.0 -> '5', 5.5 -> '5.5'"""
@@ -28,38 +63,51 @@ def js_str(val):
         return str(int(val))
     return str(val)
 
-class BaseValue:
-    def __init__(self, v, engine):
-        self.__dict__['_val'] = unwrap(v)
-        self.__dict__['_engine'] = engine
+class BaseValue(_core.Value):
+    # _val / _engine are fixed C slots on _core.Value; subclasses declare
+    # empty __slots__ too so instances stay dict-free and recyclable.
+    __slots__ = ()
 
     # --- Reassembling Arithmetic from C ---
     def __add__(self, o):
-            left = self._val
-            right = unwrap(o)
-        
-            # 1) Check for metamethod on left operand (e.g. Lua/PHP metatable __add)
-            mm = get_mm(left, '__add', self._engine)
-            if mm:
-                mm_func = unwrap(mm) if mm is not None else mm
-                if callable(mm_func):
-                    return self.__class__(mm_func(left, right), self._engine)
-        
-            # 2) Check for metamethod on right operand (swapped operands)
-            mm = get_mm(right, '__add', self._engine)
-            if mm:
-                mm_func = unwrap(mm) if mm is not None else mm
-                if callable(mm_func):
-                    return self.__class__(mm_func(right, left), self._engine)
-        
-            # 3) JS-like string concatenation if either operand is a string
-            if isinstance(left, str) or isinstance(right, str):
-                result = js_str(left) + js_str(right)
-                return self.__class__(result, self._engine)
-
-            # 4) Numeric Add
-            if isinstance(left, (int, float)) and isinstance(right, (int, float)):
-                return self.__class(_core.add(left, right), self._engine)
+        left = self._val
+        right = unwrap(o)
+
+        # 0) Plain numbers: no metatable can apply
+        if type(left) in _NUMBERS and type(right) in _NUMBERS:
+            return self.__class__(_core.add(left, right), self._engine)
+
+        # 1) Check for metamethod on left operand (e.g. Lua/PHP metatable __add)
+        mm = get_mm(left, '__add', self._engine)
+        if mm:
+            mm_func = unwrap(mm)
+            if callable(mm_func):
+                return self.__class__(mm_func(left, right), self._engine)
+
+        # 2) Check for metamethod on right operand (swapped operands)
+        mm = get_mm(right, '__add', self._engine)
+        if mm:
+            mm_func = unwrap(mm)
+            if callable(mm_func):
+                return self.__class__(mm_func(right, left), self._engine)
+
+        # 3) JS-like string concatenation if either operand is a string
+        if isinstance(left, str) or isinstance(right, str):
+            result = js_str(left) + js_str(right)
+            return self.__class__(result, self._engine)
+
+        # 4) Numeric Add
+        if isinstance(left, (int, float)) and isinstance(right, (int, float)):
+            return self.__class__(_core.add(left, right), self._engine)
+
+    def _extend(self, o, to_str):
+        """String concatenation through a StrBuilder, for += / .. in loops:
+        each step is O(1) and the text is joined once, when it is read.
+        None unless self is a string and o a string or number."""
+        left, right = self._rope, unwrap(o)
+        if type(left) in _STRINGS and (type(right) is str or type(right) in _NUMBERS):
+            return self.__class__(_core.StrBuilder(left) + to_str(right), self._engine)
+        return None
 
     def __sub__(self, o): return self.__class__(_core.sub(self._val, unwrap(o)), self._engine)
     def __mul__(self, o): return self.__class__(_core.mul(self._val, unwrap(o)), self._engine)
@@ -69,9 +117,11 @@ class BaseValue:
     
     # --- Reassembling Bitwise/Logic ---
     def __or__(self, o):
+        if isinstance(o, Pipeline): return o.__ror__(self) # Fused pipeline
         if callable(o): return o(self) # Pipe
         return self.__class__(_core.bit_or(self._val, unwrap(o)), self._engine)
     def __and__(self, o): return self.__class__(_core.bit_and(self._val, unwrap(o)), self._engine)
+    def __xor__(self, o): return self.__class__(_core.bit_xor(self._val, unwrap(o)), self._engine)
 
     # --- Reassembling Container Ops ---
     def __getitem__(self, k): 
@@ -81,6 +131,12 @@ class BaseValue:
     def __len__(self): 
         return int(unwrap(_core.len(self._val)))
 
+    def __iter__(self):
+        # Streams the wrapped iterable one item at a time (files, generators
+        # and _core.imap chains included); items come back wrapped.
+        cls, engine = self.__class__, self._engine
+        return _core.imap(lambda item: cls(item, engine), self._val)
+
     def __call__(self, *args, **kwargs):
         if callable(self._val):
             u_args = [unwrap(a) for a in args]
@@ -93,15 +149,15 @@ class BaseValue:
     def __str__(self):
         return str(self._val)
 
+# Sentinel for "name not bound in any C scope"
+_MISSING = object()
+
 def lie_lookup(engine, func, key):
     if key.startswith('_'): raise AttributeError(key)
-    if key.startswith('ghost_'): return _core.haunted_get(engine._scope, key)
-    
-    v = _core.get_var(engine._scope, key)
-    if v is not None: return v
-    if key in engine._builtins: return engine._builtins[key]
-    v = _core.get_var("global", key)
-    if v is not None: return v
+
+    # ghost_ counters, engine scope, engine builtins, then global - one C call
+    v = engine._vars.lookup(key, _MISSING)
+    if v is not _MISSING: return v
 
     if func and key in func.__globals__: return func.__globals__[key]
     if hasattr(builtins, key): return getattr(builtins, key)
@@ -109,20 +165,26 @@ def lie_lookup(engine, func, key):
 
 def create_decorator(engine, value_class):
     def decorator(func):
+        # Local import to break circularity
+        from .. import SharedBridge
+        bridge = SharedBridge(engine, value_class)
+
+        # Built once per decorated function; every call reuses it.
+        class Scope(dict):
+            __slots__ = ()
+            def __getitem__(self, k):
+                if k == 'shared': return bridge
+                val = lie_lookup(engine, func, k)
+                if hasattr(val, '_scope'): return val
+                return val if callable(val) else value_class(val, engine)
+            def __setitem__(self, k, v): engine._vars.set(k, unwrap(v))
+            def __contains__(self, k): return True
+
+        new_func = FunctionType(func.__code__, Scope(), func.__name__,
+                                func.__defaults__, func.__closure__)
+        new_func.__kwdefaults__ = func.__kwdefaults__
+
         def wrapper(*args, **kwargs):
-            # Local import to break circularity
-            from .. import SharedBridge
-            class Scope(dict):
-                def __getitem__(self, k):
-                    if k == 'shared': return SharedBridge(engine, value_class)
-                    val = lie_lookup(engine, func, k)
-                    if hasattr(val, '_scope'): return val
-                    return val if callable(val) else value_class(val, engine)
-                def __setitem__(self, k, v): _core.set_var(engine._scope, k, unwrap(v))
-                def __contains__(self, k): return True
-            
-            new_func = FunctionType(func.__code__, Scope(), func.__name__, 
-                                    func.__defaults__, func.__closure__)
             w_args = [value_class(a, engine) for a in args]
             return value_class(new_func(*w_args, **kwargs), engine)
         return wrapper
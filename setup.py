@@ -18,10 +18,21 @@ if os.path.exists(microops_dir):
 else:
     print(f"WARNING: {microops_dir} not found!")
 
+# Native runtime types (scopes, values, ...) live next to the micro-ops
+native_dir = os.path.join('microps', 'native')
+native_sources = []
+
+if os.path.exists(native_dir):
+    native_sources = [
+        os.path.join(native_dir, f)
+        for f in sorted(os.listdir(native_dir))
+        if f.endswith('.c')
+    ]
+
 # Main extension module
 core_extension = Extension(
     'microps._core',
-    sources=['microps/_core.c'] + microops_sources,
+    sources=['microps/_core.c'] + microops_sources + native_sources,
     include_dirs=['microps/include'],
     extra_compile_args=['-O3', '-Wall'] if os.name != 'nt' else ['/O2'],
 )
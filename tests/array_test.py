@@ -0,0 +1,63 @@
+from microps import js, lua, ruby, unwrap, _core
+
+# Run from the repository root: python -m pytest tests/array_test.py
+
+
+def test_queue_and_stack_ends():
+    a = _core.Array([1, 2, 3])
+    assert a.shift() == 1 and a.pop() == 3
+    assert a.unshift("x", "y") == 3 and a == ["x", "y", 2]   # order kept
+    q = _core.Array()
+    for i in range(50000):
+        q.push(i)
+    while len(q) > 1:
+        q.shift()
+    assert q == [49999] and q.pop() == 49999
+    try:
+        q.shift()
+        assert False, "shift from an empty Array"
+    except IndexError:
+        pass
+    assert _core.pop(q, 0) is None                  # the micro-op gives None
+
+
+def test_list_behaviour():
+    a = _core.Array(range(10))
+    assert a[-1] == 9 and a[2:5] == [2, 3, 4] and a[::-3] == [9, 6, 3, 0]
+    assert type(a[1:]) is _core.Array
+    a[1:3] = ["a", "b", "c"]
+    del a[::2]
+    assert a == ["a", "c", 4, 6, 8]
+    a.insert(-1, "i")
+    a.remove("c")
+    assert list(a) == ["a", 4, 6, "i", 8] and "i" in a and a.index(8) == 4
+    assert str(_core.Array([1, 2])) == "[1, 2]" and repr(_core.Array()) == "Array([])"
+    b = a.copy()
+    b.sort(key=str)
+    assert a != b and b == [4, 6, 8, "a", "i"]
+
+
+def test_engine_arrays():
+    arr = js.Array(1, 2, 3)
+    assert type(unwrap(arr)) is _core.Array
+    assert unwrap(arr.shift()) == 1 and unwrap(arr.pop()) == 3
+    assert unwrap(arr.unshift(-1, 0)) == 3          # inserts, new length
+    assert unwrap(arr) == [-1, 0, 2] and unwrap(arr.slice(1)) == [0, 2]
+    rows = ruby.Array(1, 2)
+    rows.unshift(0).push(3)
+    assert unwrap(rows) == [0, 1, 2, 3] and unwrap(rows.shift()) == 0
+    assert type(unwrap(rows.map(lambda x: x * 2))) is _core.Array
+    lua.table.insert(rows, 4)                       # other engines see an array
+    assert unwrap(rows) == [1, 2, 3, 4]
+    assert unwrap(lua.table.concat(js.Array("a", "b", "c"), ",", 2)) == "b,c"
+
+    # Plain lists from other engines pop from the end too
+    assert _core.pop([1, 2, 3], -1) == 3
+
+
+def test_lookups_follow_shifts():
+    arr = js.Array(*range(40))
+    for _ in range(3):
+        assert unwrap(arr.indexOf(20)) == 20
+    arr.shift()
+    assert unwrap(arr.indexOf(20)) == 19
@@ -0,0 +1,74 @@
+from microps import c, py, unwrap, _core, PyValue
+
+# Run from the repository root: python -m pytest tests/bitset_test.py
+
+
+def test_bits_rank_select_and_iteration():
+    b = _core.Bitset(1000, [3, 64, 65, 999])
+    b.set(500)
+    b[7] = True
+    b.clear(65)
+    assert list(b) == [3, 7, 64, 500, 999]
+    assert b.count() == 5 and b.test(64) and not b.test(65)
+    assert 999 in b and 1000 not in b and b[-1]
+    assert b.rank(0) == 0 and b.rank(64) == 2 and b.rank(1000) == 5
+    assert [b.select(k) for k in range(5)] == list(b)
+    for bad in (lambda: b.select(5), lambda: b.set(1000)):
+        try:
+            bad()
+        except IndexError:
+            pass
+        else:
+            raise AssertionError("expected IndexError")
+
+
+def test_bulk_ops_match_python_ints():
+    x, y = (1 << 300) - 1, int("10" * 150, 2)
+    a, b = _core.Bitset.from_int(x, 300), _core.Bitset.from_int(y, 300)
+    assert (a & b).to_int() == x & y
+    assert (a | b).to_int() == x | y
+    assert (a ^ b).to_int() == x ^ y
+    assert (a - b).to_int() == a.andnot(b).to_int() == x & ~y
+    assert (~b).to_int() == ~y & ((1 << 300) - 1)
+    a ^= b
+    assert a.to_int() == x ^ y and a == _core.Bitset.from_int(x ^ y, 300)
+    try:
+        a & _core.Bitset(10)
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("sizes differ")
+
+
+def test_word_ops_on_large_ints():
+    assert _core.popcount(2**200 - 1) == 200
+    assert _core.popcount(-7) == 3
+    assert _core.rotl(1, 63) == 2**63 and _core.rotr(1, 1) == 2**63
+    assert _core.rotl(1, 64) == 1 and _core.rotr(16, 2) == 4
+    assert _core.rotl(2**64 + 1, 1) == 2**65 + 2            # 128-bit word
+    assert _core.rotr(1, 1 - 128) == _core.rotl(1, 127)
+
+
+def test_engines():
+    bits = c.bitset_new(128)
+    c.bitset_set(bits, 100)
+    c.bitset_set(bits, 5)
+    assert unwrap(c.bitset_count(bits)) == 2 == unwrap(bits.popcount())
+    assert unwrap(c.bitset_select(bits, 1)) == 100
+    mask = c.bitset_new(128)
+    c.bitset_set(mask, 5)
+    assert list(unwrap(bits.band(mask))) == [5]
+    assert list(unwrap(c.bitset_andnot(bits, mask))) == [100]
+
+    s = py.bitset(64, [1, 2, 40])
+    assert unwrap(s.bit_count()) == 3 and unwrap(s.rank(40)) == 2
+    assert [unwrap(i) for i in s] == [1, 2, 40]
+    assert unwrap(py.int(255).bit_count()) == 8
+
+
+def test_bit_method_names_are_fields_elsewhere():
+    fields = PyValue({'test': 5, 'rank': 'r', 'select': [1], 'bit_count': 0}, py)
+    assert unwrap(fields.test) == 5 and unwrap(fields.rank) == 'r'
+    assert unwrap(fields.select) == [1] and unwrap(fields.bit_count) == 0
+    assert unwrap(PyValue(12, py).bit_count()) == 2
+    assert unwrap(py.bitset(8, [3]).test(3)) is True
@@ -0,0 +1,74 @@
+from array import array
+
+from microps import _core
+from microps.wrappers.py import PyValue
+
+# Run from the repository root: python -m pytest tests/bulk_test.py
+
+BIG = 2 ** 62
+
+
+def test_typed_buffers_stay_typed():
+    a, b = array("q", [1, 2, 3]), array("q", [10, 20, 30])
+    assert _core.add_many(a, b) == array("q", [11, 22, 33])
+    assert _core.mul_many(array("d", [1.5, 2.0]), 2) == array("d", [3.0, 4.0])
+    assert _core.sub_many(10, array("i", [1, 2])) == array("i", [9, 8])   # broadcast left
+    assert _core.eq_many(a, array("q", [1, 0, 3])) == [True, False, True]
+    assert _core.add_many(PyValue(a), 1) == array("q", [2, 3, 4])
+
+
+def test_overflow_raises_instead_of_wrapping():
+    big = array("q", [BIG, 1])
+    for fn, args in [(_core.add_many, (big, big)), (_core.mul_many, (big, 4)),
+                     (_core.sub_many, (array("q", [-BIG - 1]), BIG)),
+                     (_core.add_many, (array("i", [2 ** 31 - 1]), 1))]:
+        try:
+            fn(*args)
+            assert False, "typed overflow must raise"
+        except OverflowError:
+            pass
+
+
+def test_everything_else_falls_back_to_lists():
+    assert _core.add_many([1, 2], (3, 4)) == [4, 6]
+    assert _core.add_many(array("q", [1, 2]), array("d", [0.5, 0.5])) == [1.5, 2.5]   # mixed codes
+    assert _core.add_many(array("q", [1]), 2 ** 70) == [2 ** 70 + 1]                # scalar too big
+    assert _core.add_many(array("q", [1]), 0.5) == [1.5]
+    assert _core.add_many(["a", "b"], "!") == ["a!", "b!"]
+    assert _core.eq_many([1, "x"], [1.0, "y"]) == [True, False]
+    try:
+        _core.add_many([1, 2], [1])
+        assert False, "length mismatch"
+    except ValueError:
+        pass
+
+
+def test_reduce_add():
+    assert _core.reduce_add(array("q", [1, 2, 3])) == 6
+    assert _core.reduce_add(array("d", [0.5, 0.25]), 1) == 1.75
+    assert _core.reduce_add(array("q", [BIG] * 4)) == 4 * BIG     # exact past long long
+    assert _core.reduce_add(array("q", [1]), 2 ** 70) == 2 ** 70 + 1
+    assert _core.reduce_add(array("q"), "start") == "start"
+    assert _core.reduce_add([[1], [2]], []) == [1, 2]
+
+
+def test_operands_changed_mid_loop():
+    class Clears:
+        def __add__(self, other):
+            lst.clear()                             # shrinks the operand being read
+            return "cleared"
+
+        def __eq__(self, other):
+            lst.clear()
+            return True
+
+    lst = [Clears()] + [object()] * 1000
+    try:
+        _core.add_many(lst, [1] * 1001)
+        assert False, "object() + 1"
+    except TypeError:
+        pass
+    lst = [Clears()] + [1] * 1000
+    assert _core.add_many(lst, 0)[:2] == ["cleared", 1]
+    lst = [Clears()] + [2] * 10
+    assert _core.eq_many(lst, [2] * 11) == [True] * 11
@@ -0,0 +1,71 @@
+import threading
+from itertools import count
+
+from microps import py, unwrap, _core
+
+# Run from the repository root: python -m pytest tests/iterators_test.py
+
+
+def test_imap_and_ifilter_are_lazy():
+    calls = []
+
+    def double(x):
+        calls.append(x)
+        return x * 2
+
+    m = _core.imap(double, count())                 # infinite source
+    assert calls == []
+    assert next(m) == 0 and next(m) == 2 and calls == [0, 1]
+    evens = _core.ifilter(lambda x: x % 2 == 0, _core.imap(double, count(1)))
+    assert list(_core.take(evens, 3)) == [2, 4, 6]
+    assert list(_core.ifilter(None, [0, 1, "", "a"])) == [1, "a"]
+
+
+def test_izip_stops_at_the_shortest_input():
+    pulled = []
+
+    def source():
+        for i in count():
+            pulled.append(i)
+            yield i
+
+    z = _core.izip("abc", source())
+    assert list(z) == [("a", 0), ("b", 1), ("c", 2)]
+    assert pulled == [0, 1, 2]                      # the long side is not drained
+    assert list(_core.izip()) == [] and list(_core.izip([1], [])) == []
+
+
+def test_sources_are_released_when_exhausted():
+    it = iter([1, 2])
+    m = _core.imap(str, it)
+    assert list(m) == ["1", "2"] and list(m) == []
+    assert list(_core.chain([1], (), "ab")) == [1, "a", "b"]
+    try:
+        _core.imap(5, [])
+        assert False, "imap needs a callable"
+    except TypeError:
+        pass
+
+
+def test_engine_map_filter_zip_stay_lazy():
+    seen = []
+    squares = py.map(lambda x: seen.append(unwrap(x)) or x * x, count())
+    assert seen == []
+    assert list(_core.take(unwrap(py.filter(lambda x: unwrap(x) > 10, squares)), 2)) == [16, 25]
+    assert seen == [0, 1, 2, 3, 4, 5]
+    assert list(unwrap(py.zip([1, 2], count()))) == [(1, 0), (2, 1)]
+
+
+def test_streams_shared_between_threads():
+    cases = [(_core.imap(abs, range(-20000, 0)), list(range(1, 20001))),
+             (_core.izip(range(20000), range(20000)), [(i, i) for i in range(20000)]),
+             (_core.chain(*[range(i, i + 100) for i in range(0, 20000, 100)]), list(range(20000))),
+             (_core.take(range(30000), 20000), list(range(20000)))]
+    for stream, expected in cases:
+        got = [[] for _ in range(4)]
+        threads = [threading.Thread(target=out.extend, args=(stream,)) for out in got]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        assert sorted(x for out in got for x in out) == expected   # each item exactly once
@@ -0,0 +1,56 @@
+from microps import js, php, ruby, unwrap, _core
+
+# Run from the repository root: python -m pytest tests/lookups_test.py
+
+
+def test_repeated_lookups_match_a_scan():
+    arr = js.Array(*range(100), 5)
+    for _ in range(3):
+        assert unwrap(arr.indexOf(5)) == 5          # first occurrence
+        assert unwrap(arr.indexOf(1000)) == -1
+        assert unwrap(arr.includes(99))
+
+
+def test_mutation_through_engines_invalidates():
+    arr = php.array(*range(50))
+    assert unwrap(arr.array_search(10)) == 10
+    assert unwrap(arr.array_search(10)) == 10
+    arr[10] = "x"                           # same length: the array drops its index
+    assert unwrap(arr.array_search(10)) is False
+    assert unwrap(arr.array_search("x")) == 10
+    arr.array_push(10)
+    assert unwrap(arr.array_search(10)) == 50
+    arr.array_shift()                       # renumbers the keys
+    assert unwrap(arr.array_search("x")) == 9
+
+    a = _core.Array(range(40, 0, -1))
+    assert _core.find(a, 1) == _core.find(a, 1) == 39
+    a.sort()
+    assert _core.find(a, 1) == 0
+    a[0] = 99
+    assert _core.find(a, 1) == -1 and 99 in a
+
+
+def test_raw_lists_are_never_stale():
+    raw = list(range(20))
+    assert not _core.contains(raw, 100) and not _core.contains(raw, 100)
+    raw[3] = 100                            # in place, behind _core's back
+    assert _core.contains(raw, 100) and _core.find(raw, 100) == 3
+    raw2 = list(range(20))
+    assert _core.find(raw2, 5) == _core.find(raw2, 5) == 5
+    raw2[0] = 5
+    assert _core.find(raw2, 5) == 0
+    raw2.insert(0, "new")
+    assert _core.find(raw2, 3) == 4
+
+
+def test_unhashable_items():
+    rows = ruby.Array()
+    for i in range(20):
+        rows.push([i])
+    for _ in range(3):
+        assert unwrap(getattr(rows, 'include?')([7]))
+        assert _core.find(rows._val, [7]) == 7
+    nums = _core.Array(range(20))
+    for _ in range(3):
+        assert [5] not in nums and _core.find(nums, [5]) == -1
@@ -0,0 +1,119 @@
+from microps import lua, ruby, unwrap, LuaValue, _core
+
+# Run from the repository root: python -m pytest tests/lua_table_test.py
+
+
+def test_array_part_hash_part_and_border():
+    t = _core.LuaTable(["a", "b", "c"])
+    t[5] = "e"                               # beyond #t+1: hash part
+    assert len(t) == 3 and t[5] == "e"
+    t[4] = "d"                               # fills the gap, pulls 5 over
+    assert len(t) == 5 and t[5] == "e"
+    t[5] = None                              # nil removes, #t shrinks
+    assert len(t) == 4 and 5 not in t
+    t[2.0] = "B"                             # integral float keys are ints
+    assert t[2] == "B" and t[9] is None and t["missing"] is None
+    t[2] = None                              # a hole keeps the border
+    assert len(t) == 4 and t[1] == "a" and t[2] is None
+
+
+def test_nil_slots_are_not_misread():
+    t = lua.Table()
+    t[1], t[2] = "first", "second"
+    t[2] = None
+    assert unwrap(t[2]) is None              # no fallback to t[1]
+    assert unwrap(t[1]) == "first" and len(t) == 1
+
+
+def test_bool_keys_are_not_numbers():
+    t = _core.LuaTable()
+    t[True] = "yes"
+    assert t[1] is None and t[1.0] is None and len(t) == 0
+    t[1] = "one"
+    t[0] = "zero"
+    assert t[True] == "yes" and t[1] == "one" and t[False] is None
+    t[False] = "no"
+    assert t[0] == "zero" and t[False] == "no"
+    assert sorted(map(repr, t.keys())) == ['0', '1', 'False', 'True']
+    assert t.next(True) is not None and (True, "yes") in list(t.pairs())
+    t[True] = None
+    assert True not in t and t[1] == "one"
+
+
+def test_next_pairs_and_ipairs():
+    t = _core.LuaTable({1: "x", 2: "y", "k": "v", 10: "z"})
+    seen, k = [], None
+    while (step := unwrap(lua.next(t, k))) is not None:
+        k = step[0]
+        seen.append(step)
+    assert seen == list(unwrap(lua.pairs(t))) == [(1, "x"), (2, "y"), ("k", "v"), (10, "z")]
+    assert list(unwrap(lua.ipairs(t))) == [(1, "x"), (2, "y")]
+    # Clearing fields during a traversal is allowed, as in Lua
+    k = None
+    while (step := t.next(k)) is not None:
+        k = step[0]
+        t[k] = None
+    assert t.items() == []
+
+
+def test_next_over_other_engines_tables():
+    rows, d = [1, None, 3], {"a": 1, "b": 2, "c": 3}
+    for t, expected in ((rows, [(1, 1), (3, 3)]), (d, [("a", 1), ("c", 3)])):
+        seen, k = [], None
+        while (step := unwrap(lua.next(t, k))) is not None:
+            k = step[0]
+            seen.append(step)
+            d.pop("b", None)                # nil'ed during the traversal
+        assert seen == expected
+    assert unwrap(lua.table.maxn(rows)) == 3 and unwrap(lua.table.maxn({1: 1, 5: 2, "x": 3})) == 5
+    assert list(unwrap(lua.ipairs([1, 2, None, 4]))) == [(1, 1), (2, 2)]
+
+
+def test_table_library():
+    t = lua.Table()
+    for word in ("b", "d"):
+        lua.table.insert(t, word)
+    lua.table.insert(t, 1, "a")
+    lua.table.insert(t, 3, "c")
+    assert unwrap(lua.table.concat(t, ",")) == "a,b,c,d"
+    assert unwrap(lua.table.remove(t, 1)) == "a" and unwrap(lua.table.remove(t)) == "d"
+    assert [unwrap(v) for v in lua.table.unpack(t)] == ["b", "c"]
+    lua.table.sort(t, lambda a, b: a > b)
+    assert unwrap(lua.table.concat(t, ",")) == "c,b"
+    packed = unwrap(lua.table.pack(1, None, 3))
+    assert packed["n"] == 3 and packed[3] == 3
+
+
+def test_metatables_and_other_engines():
+    mt = lua.Table()
+    mt['__add'] = lambda a, b: 42
+    t = lua.setmetatable(lua.Table(), mt)
+    assert unwrap(t + t) == 42
+    mt['__add'] = lambda a, b: 7             # LuaTable writes invalidate MMCaches
+    assert unwrap(t + t) == 7
+    t.name = "field"
+    assert unwrap(t["name"]) == "field"
+    assert hasattr(t, "name") and not hasattr(t, "missing")
+    assert not hasattr(LuaValue({"name": 1}, lua), "name")    # only LuaTables have fields
+
+    arr = ruby.Array()
+    arr.push("zero-based")
+    lua.lua_arr = arr
+    assert unwrap(lua.lua_arr[1]) == "zero-based"       # read 1-based from Lua
+    assert unwrap(lua.lua_arr[2]) is None
+    assert list(unwrap(lua.ipairs(arr))) == [(1, "zero-based")]
+
+
+def test_dict_metatable_written_after_dispatch():
+    t, mt = lua.Table(), {}
+    lua.setmetatable(t, mt)
+    mt['__add'] = lambda a, b: 1             # plain dict writes, no _core op
+    assert unwrap(t + 1) == 1
+    mt['__add'] = lambda a, b: 2
+    assert unwrap(t + 1) == 2
+    del mt['__add']
+    try:
+        t + 1
+        assert False, "__add was removed"
+    except TypeError:
+        pass
@@ -0,0 +1,57 @@
+import gc
+import weakref
+
+from microps import _core
+
+# Run from the repository root: python -m pytest tests/metatables_test.py
+
+
+class Obj:
+    pass
+
+
+def test_entry_dies_with_its_object():
+    was_active = _core.has_metatables()
+    o = Obj()
+    mt = {"__index": {"k": 1}}
+    _core.setmetatable(o, mt)
+    assert _core.getmetatable(o) is mt and _core.has_metatables()
+    del o
+    # Objects that reuse the freed memory never inherit the metatable
+    fresh = [Obj() for _ in range(100)]
+    assert all(_core.getmetatable(f) is None for f in fresh)
+    if not was_active:
+        assert not _core.has_metatables()
+
+
+def test_replaced_and_removed_metatables():
+    o = Obj()
+    _core.setmetatable(o, {"a": 1})
+    second = {"b": 2}
+    _core.setmetatable(o, second)           # the old weakref's callback must not
+    assert _core.getmetatable(o) is second  # drop the new entry
+    _core.setmetatable(o, None)
+    assert _core.getmetatable(o) is None
+    assert _core.getmetatable(5) is None and _core.getmetatable(None) is None
+
+
+def test_strong_entries_are_swept():
+    # Lists cannot be weakly referenced: the registry holds them, and
+    # drops the ones nothing else refers to once enough pile up
+    alive = []
+    mt = {"__len": len}
+    for _ in range(500):
+        marker = Obj()
+        alive.append(weakref.ref(marker))
+        lst = [marker]
+        assert _core.getmetatable(lst) is None
+        _core.setmetatable(lst, mt)
+    del marker, lst
+    gc.collect()
+    assert sum(r() is not None for r in alive) < 200
+    kept = [1, 2]
+    _core.setmetatable(kept, mt)
+    for _ in range(200):
+        _core.setmetatable([], mt)
+    assert _core.getmetatable(kept) is mt
+    _core.setmetatable(kept, None)
@@ -0,0 +1,44 @@
+import operator
+import warnings
+
+from microps import parallel, py, unwrap
+
+# Run from the repository root: python -m pytest tests/parallel_test.py
+
+
+def test_results_keep_input_order():
+    try:
+        with warnings.catch_warnings():
+            warnings.simplefilter("error")          # a serial fallback would warn
+            assert parallel.pmap(str, range(50), chunksize=7, workers=2) == [str(i) for i in range(50)]
+            # list + list is associative but not commutative: chunks must fold in order
+            rows = [[i] for i in range(30)]
+            assert parallel.preduce(operator.add, rows, [], chunksize=4, workers=2) == list(range(30))
+            assert parallel.preduce(operator.mul, range(1, 11), 1, chunksize=3, workers=2) == 3628800
+            assert unwrap(py.pmap(abs, [-3, 2, -1], chunksize=1, workers=2)) == [3, 2, 1]
+    finally:
+        parallel.shutdown()
+
+
+def test_unpicklable_callbacks_run_serially():
+    if parallel.free_threading():
+        return                                      # threads need no pickling
+    with warnings.catch_warnings(record=True) as caught:
+        warnings.simplefilter("always")
+        assert parallel.pmap(lambda x: x + 1, range(10), chunksize=2, workers=2) == list(range(1, 11))
+        assert parallel.preduce(lambda a, b: a + b, range(10), 0, chunksize=2, workers=2) == 45
+    assert [w.category for w in caught] == [RuntimeWarning, RuntimeWarning]
+    assert "not picklable" in str(caught[0].message)
+
+
+def test_small_inputs_skip_the_pool():
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")              # no pool, so no pickling warning
+        assert parallel.pmap(lambda x: -x, [1, 2], workers=1) == [-1, -2]
+        assert parallel.pmap(lambda x: -x, [1, 2], chunksize=5, workers=4) == [-1, -2]
+        assert parallel.preduce(operator.add, [], 7, workers=4) == 7
+    try:
+        parallel.pmap(str, [1, 2], chunksize=0)
+        assert False, "chunksize must be positive"
+    except ValueError:
+        pass
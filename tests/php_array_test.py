@@ -0,0 +1,76 @@
+from microps import js, php, unwrap, _core
+
+# Run from the repository root: python -m pytest tests/php_array_test.py
+
+
+def test_keys_are_normalized_and_ordered():
+    a = _core.PHPArray()
+    a["b"], a[5], a["8"], a[True], a[None] = "B", "five", "eight", "one", "empty"
+    assert a.keys() == ["b", 5, 8, 1, ""]            # insertion order, PHP keys
+    assert a[8.9] == "eight" and a["1"] == "one"
+    a.push("next")                                  # one past the largest int key
+    assert a.items()[-1] == (9, "next")
+    a["b"] = "B2"                                   # overwrite keeps the position
+    assert a.keys()[0] == "b" and len(a) == 6
+    del a[5]
+    assert not a.key_exists(5) and 5 not in a.keys()
+
+
+def test_push_pop_shift_unshift():
+    a = _core.PHPArray(["x", "y", "z"])
+    assert a.shift() == "x" and a.items() == [(0, "y"), (1, "z")]
+    assert a.unshift("v", "w") == 4 and list(a) == ["v", "w", "y", "z"]
+    assert a.pop() == "z" and a.push("again") == 4
+    assert a.items()[-1] == (3, "again")            # array_pop gives the key back
+    mixed = _core.PHPArray({"id": 7, 3: "a", 9: "b"})
+    assert mixed.shift() == 7                       # int keys renumbered, strings kept
+    assert mixed.items() == [(0, "a"), (1, "b")]
+    q = _core.PHPArray()
+    for i in range(50000):
+        q.push(i)
+    while len(q) > 1:
+        q.shift()
+    assert q.items() == [(0, 49999)]
+    assert q.pop() == 49999 and q.pop() is None and q.shift() is None
+
+
+def test_internal_pointer():
+    a = _core.PHPArray({"a": 1, "b": 2, "c": 3})
+    assert a.current() == 1 and a.next() == 2 and a.key() == "b"
+    del a["b"]                                      # pointer moves on to the next entry
+    assert a.current() == 3 and a.next() is False and a.key() is None
+    assert a.reset() == 1 and a.end() == 3 and a.prev() == 1
+
+
+def test_engine_array_functions():
+    arr = php.array(3, 1, 3, None)
+    assert unwrap(arr.array_key_exists(3))          # a null value still has its key
+    assert not unwrap(arr.array_key_exists(4))
+    assert unwrap(arr.array_unshift(0)) == 5 and unwrap(arr[0]) == 0
+    assert unwrap(arr.array_unique()).items() == [(0, 0), (1, 3), (2, 1), (4, None)]
+    assert unwrap(arr.array_search(1)) == 2 and unwrap(php.array_search(7, arr)) is False
+    assert list(unwrap(arr.array_splice(1, 2, ["s"]))) == [3, 1]
+    assert list(unwrap(arr)) == [0, "s", 3, None]
+    nums = php.array(3, 1, 2)
+    del unwrap(nums)[0]
+    nums.sort()                                     # renumbered 0..n-1
+    assert unwrap(nums).items() == [(0, 1), (1, 2)]
+    assert unwrap(nums.rsort()) == [2, 1]
+    merged = unwrap(php.array_merge(php.array(1), {"k": "v", 5: 2}))
+    assert merged.items() == [(0, 1), ("k", "v"), (1, 2)]
+    assert unwrap(php.current(merged)) == 1 and unwrap(php.next(merged)) == "v"
+
+    # Lists from other engines still work with the read-only functions
+    lst = js.Array("a", "b")
+    assert unwrap(php.array_keys(lst)) == [0, 1]
+    assert unwrap(php.array_key_exists(1, lst)) and unwrap(php.in_array("b", lst))
+
+
+def test_splice_and_product_on_other_engines_arrays():
+    lst = js.Array(1, 2, 3, 4)
+    assert list(unwrap(php.array_splice(lst, 1, 2, ["x"]))) == [2, 3]
+    assert unwrap(lst) == [1, "x", 4]               # changed in place
+    raw = [5, 6, 7]
+    assert list(unwrap(php.array_splice(raw, 0, 1))) == [5] and raw == [6, 7]
+    assert unwrap(php.array(2, 3, 4).array_product()) == 24
+    assert unwrap(php.array().array_product()) == 1
@@ -0,0 +1,60 @@
+from microps import js, unwrap, _core
+from microps.pipeline import map, filter, reduce, MAP, FILTER, REDUCE
+
+# Run from the repository root: python -m pytest tests/pipeline_test.py
+
+
+def square(x): return x * x
+def is_even(x): return x % 2 == 0
+def add(acc, x): return acc + x
+
+
+def test_fused_matches_staged_ops():
+    data = list(range(20))
+    staged = _core.reduce_func(add, _core.map_func(square, _core.filter_func(is_even, data)), 0)
+    assert list(range(20)) | filter(is_even) | map(square) | reduce(add, 0) == staged
+    assert _core.pipeline_run(data, [(FILTER, is_even), (MAP, square)]) == [x * x for x in data if x % 2 == 0]
+    assert _core.pipeline_run(data, []) == data
+
+
+def test_items_pass_every_stage_in_turn():
+    order = []
+
+    def seen_map(x):
+        order.append(("map", x))
+        return x
+
+    def seen_filter(x):
+        order.append(("filter", x))
+        return True
+
+    [1, 2] | map(seen_map) | filter(seen_filter) | reduce(add, 0)
+    assert order == [("map", 1), ("filter", 1), ("map", 2), ("filter", 2)]
+
+
+def test_values_and_unbound_pipelines():
+    arr = js.Array(1, 2, 3, 4)
+    total = arr | map(square) | reduce(add, 0)
+    assert type(total) is type(arr) and unwrap(total) == 30
+    evens_squared = filter(is_even) | map(square)   # unbound: reusable
+    assert list(arr | evens_squared) == [4, 16] and list([6] | evens_squared) == [36]
+    assert unwrap((arr | evens_squared).run()) == [4, 16]
+    assert (arr | map(square)) | (lambda v: sum(unwrap(v))) == 30   # plain function after
+
+
+def test_reduce_must_be_last():
+    try:
+        reduce(add, 0) | map(square)
+        assert False, "stage after an unbound reduce"
+    except ValueError:
+        pass
+    try:
+        _core.pipeline_run([1], [(REDUCE, add, 0), (MAP, square)])
+        assert False, "reduce stage in the middle"
+    except ValueError:
+        pass
+    try:
+        map(square).run()
+        assert False, "pipeline without a source"
+    except TypeError:
+        pass
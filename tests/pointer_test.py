@@ -0,0 +1,84 @@
+import struct
+from decimal import Decimal
+from enum import IntEnum
+
+from microps import c, unwrap, _core
+
+# Run from the repository root: python -m pytest tests/pointer_test.py
+
+
+def test_pointer_arithmetic_and_indexing():
+    data = [10, 20, 30, 40, 50]
+    p = _core.Pointer(data)
+    q = p + 2
+    assert q.base is data and q.offset == 2 and (1 + q).offset == 3
+    assert q.deref() == 30 and q[1] == 40 and q[-2] == 10 and len(q) == 3
+    assert q - p == 2 and (q - 1).deref() == 20 and q - data == 2
+    assert q[0:2] == [30, 40]
+    q[1] = 99
+    assert data[3] == 99
+    assert _core.Pointer(q, 1) == p + 3             # pointers to pointers collapse
+    assert hash(p + 3) == hash(_core.Pointer(data, 3))
+    try:
+        q[-3]
+        assert False, "index before the start"
+    except IndexError:
+        pass
+    try:
+        p - _core.Pointer([1])
+        assert False, "different bases"
+    except TypeError:
+        pass
+
+
+def test_pointer_buffers_are_zero_copy():
+    buf = bytearray(b"\x00" * 4 + struct.pack("<i", 7))
+    p = _core.Pointer(buf, 4)
+    assert struct.unpack_from("<i", p)[0] == 7
+    memoryview(p)[0] = 1
+    assert buf[4] == 1
+    tail = c.ptr(buf, 4) + 2
+    assert unwrap(tail).offset == 6
+
+
+def test_slices_of_buffers_are_views():
+    buf = bytearray(b"hello world")
+    part = _core.slice(buf, 0, 5)
+    assert type(part) is memoryview and bytes(part) == b"hello"
+    buf[0] = ord("j")
+    assert bytes(part) == b"jello"                  # shares the memory
+    try:
+        buf.extend(b"!")                            # exported: cannot resize
+        assert False, "a sliced bytearray must not resize"
+    except BufferError:
+        pass
+    part.release()
+    buf.extend(b"!")
+    assert buf == bytearray(b"jello world!")
+    assert _core.slice([1, 2, 3], 1, 3) == [2, 3]   # other sequences copy
+
+
+def test_c_arithmetic_only_offsets_sequences_by_ints():
+    class E(IntEnum):
+        A = 1
+
+    assert unwrap(c.ptr([1, 2]) + 0 + 1).offset == 1
+    assert unwrap(c.malloc(8) + 3).offset == 3
+    base = [1, 2, 3]
+    p = c.ptr(base, 2)
+    assert unwrap(p - 2).offset == 0 and unwrap(p - c.ptr(base)) == 2
+    c.e = E.A
+    assert unwrap(c.e + 1) == 2 and type(unwrap(c.e + 1)) is int
+    assert unwrap(c.e - 1) == 0
+    c.d = Decimal("1.5")
+    assert unwrap(c.d + 1) == Decimal("2.5")
+    c.b = b"ab"
+    assert unwrap(c.b + b"cd") == b"abcd"
+    c.l = [1]
+    assert unwrap(c.l + [2]) == [1, 2]
+    c.n = None
+    try:
+        c.n + 1
+        assert False, "None + 1 is not a pointer"
+    except TypeError:
+        pass
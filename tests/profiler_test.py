@@ -0,0 +1,54 @@
+from microps import js, profiler, JSValue, _core
+
+# Run from the repository root: python -m pytest tests/profiler_test.py
+
+
+def test_ops_are_counted_only_while_profiling():
+    _core.profile_reset()
+    _core.add(1, 2)
+    assert "add" not in _core.profile_snapshot()
+    assert _core.profile(True) is False
+    try:
+        for _ in range(3):
+            _core.add(1, 2)
+        _core.mul(2, 3)
+    finally:
+        assert _core.profile(False) is True
+    stats = _core.profile_snapshot()
+    assert stats["add"]["calls"] == 3 and stats["mul"]["calls"] == 1
+    assert stats["add"]["ns"] >= 0
+    _core.profile_reset()
+    assert _core.profile_snapshot() == {}
+
+
+def test_labels_attribute_ops():
+    _core.profile_reset()
+    _core.profile(True)
+    prev = _core.profile_enter("outer")
+    try:
+        _core.add(1, 2)
+        inner = _core.profile_enter("inner")
+        _core.mul(2, 3)
+        _core.profile_exit(inner)
+        _core.sub(3, 1)
+    finally:
+        _core.profile_exit(prev)
+        _core.profile(False)
+    labels = _core.profile_labels()
+    assert set(labels["outer"]) == {"add", "sub"} and set(labels["inner"]) == {"mul"}
+    _core.profile_reset()
+
+
+def test_profiler_labels_engine_methods():
+    original = JSValue.toUpperCase
+    js.s = "ab"
+    with profiler.profiled():
+        assert JSValue.toUpperCase is not original
+        js.s.toUpperCase()
+    assert JSValue.toUpperCase is original          # shims removed again
+    assert profiler.snapshot()["str_upper"]["calls"] == 1
+    assert "str_upper" in profiler.breakdown()["JSValue.toUpperCase"]
+    assert "str_upper" in profiler.report()
+    with profiler.profiled():                       # fresh=True resets
+        pass
+    assert profiler.snapshot() == {}
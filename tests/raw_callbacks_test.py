@@ -0,0 +1,42 @@
+from microps import ruby, raw, unwrap, _core, PyValue, RubyValue
+from microps.wrappers.wrapper import is_raw, value_callback
+
+# Run from the repository root: python -m pytest tests/raw_callbacks_test.py
+
+
+class Point:
+    pass
+
+
+def test_native_callables_are_raw():
+    for fn in (len, abs, _core.add, (1).__add__, str.upper, int.__add__, "x".join, str, int):
+        assert is_raw(fn), fn
+    assert not is_raw(Point)                        # user types may expect values
+    assert not is_raw(lambda x: x)
+
+
+def test_raw_marks_python_callables():
+    def double(x):
+        return x * 2
+
+    assert raw(double) is double and is_raw(double)
+    bound = raw(Point().__init__)                   # cannot take attributes
+    assert is_raw(bound) and bound() is None        # wrapped in a partial
+    assert value_callback(len, PyValue, "py") is len
+
+
+def test_callbacks_see_values_unless_raw():
+    seen = []
+
+    def record(x):
+        seen.append(type(x))
+        return x
+
+    ruby.Array(1, 2).map(record)
+    assert seen == [RubyValue, RubyValue]
+    seen.clear()
+    ruby.Array(1, 2).map(raw(record))
+    assert seen == [int, int]
+    assert unwrap(ruby.Array("a", "b").map(str.upper)) == ["A", "B"]
+    wrapped = value_callback(lambda v: v, PyValue, "py")
+    assert wrapped(3) == 3                          # shim unwraps the result
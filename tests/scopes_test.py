@@ -0,0 +1,35 @@
+from microps import _core, js, lua, unwrap
+
+# Run from the repository root: python -m pytest tests/scopes_test.py
+
+
+def test_resolution_order():
+    glob = _core.scope("global")
+    s = _core.scope("scopes_test", {"b": "builtin", "shadow": "builtin"})
+    assert s.parent is glob and s.name == "scopes_test"
+    glob.set("only_global", "global")
+    glob.set("shadow", "global")
+    # scope, then engine builtins, then the global scope
+    assert s.lookup("only_global", None) == "global"
+    assert s.lookup("shadow", None) == "builtin"
+    s.set("shadow", "local")
+    assert s.lookup("shadow", None) == "local"
+    assert s.lookup("missing", "default") == "default"
+    assert s.get("only_global") == "global" and s.get("b") is None   # get skips builtins
+
+
+def test_ghost_counters():
+    s = _core.scope("scopes_test_ghosts")
+    assert [s.lookup("ghost_n", None) for _ in range(3)] == [0, 1, 2]
+    assert s.haunted("ghost_m") == 0 and s.haunted("ghost_m") == 1
+
+
+def test_names_bound_to_none_resolve_to_none():
+    _core.scope("global").set("maybe", "global")
+    s = _core.scope("scopes_test_none", {"maybe": "builtin"})
+    s.set("maybe", None)
+    assert s.lookup("maybe", "missing") is None         # no fall-through
+    js.nothing = None
+    assert unwrap(js.nothing) is None
+    lua.only_lua = 1                                    # engines keep their own scope
+    assert _core.scope("js").get("only_lua") is None
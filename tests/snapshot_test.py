@@ -0,0 +1,104 @@
+import gc
+
+from microps import _core, js, lua, unwrap
+
+# Run from the repository root: python -m pytest tests/snapshot_test.py
+
+
+def test_restore_rolls_back_variables_and_metatables():
+    table = lua.Table()
+    mt = {'__add': lambda a, b: 1000}
+    lua.setmetatable(table, mt)
+    js.warm = "loaded"
+    snap = _core.snapshot()
+
+    js.warm = "changed"
+    js.job_only = 1
+    lua.setmetatable(table, None)
+
+    _core.restore(snap)
+    assert unwrap(js.warm) == "loaded"
+    assert _core.scope("js").get("job_only", "gone") == "gone"
+    assert _core.getmetatable(unwrap(table)) is mt
+    assert unwrap(table + 1) == 1000
+
+
+def test_snapshot_is_reusable():
+    js.counter = 0
+    snap = _core.snapshot()
+    for _ in range(3):
+        _core.restore(snap)
+        js.counter = unwrap(js.counter) + 1
+        assert unwrap(js.counter) == 1
+
+
+def test_tables_roll_back_in_place():
+    table = lua.Table()
+    table.x = 1
+    nested = _core.Array([1, 2])
+    table.items = nested
+    js.tbl = table
+    shared = []                             # plain lists are shared, not saved
+    js.log = shared
+    snap = _core.snapshot()
+    for _ in range(2):
+        table.x = 2
+        table.y = 3
+        nested.append(3)
+        shared.append("kept")
+        _core.restore(snap)
+        assert unwrap(js.tbl) is unwrap(table)      # same object, old entries
+        assert unwrap(table.x) == 1 and not hasattr(table, "y")
+        assert list(nested) == [1, 2]
+    assert shared == ["kept", "kept"]
+
+
+def test_restore_shares_storage_until_written():
+    arr = _core.Array(range(5))
+    php_arr = _core.PHPArray({"a": 1})
+    js.arr = arr
+    js.php_arr = php_arr
+    snap = _core.snapshot()
+    arr.reverse()
+    php_arr["b"] = 2
+    _core.restore(snap)
+    assert list(arr) == [0, 1, 2, 3, 4] and php_arr.items() == [("a", 1)]
+    arr.pop()
+    _core.restore(snap)
+    assert list(arr) == [0, 1, 2, 3, 4]
+    del snap
+    gc.collect()
+    arr.append(5)                           # storage is its own again
+    assert list(arr) == [0, 1, 2, 3, 4, 5]
+
+
+def test_metatable_fields_roll_back():
+    table = _core.LuaTable()
+    index = _core.LuaTable({"default": 1})
+    mt = {"__index": index}
+    _core.setmetatable(table, mt)
+    js.obj = table
+    snap = _core.snapshot()
+    mt["__add"] = lambda a, b: 0
+    index["default"] = 2
+    _core.restore(snap)
+    assert "__add" not in mt and index["default"] == 1
+    assert _core.getmetatable(table) is mt
+
+
+def test_dead_objects_are_not_restored():
+    class Obj:
+        pass
+
+    obj = Obj()
+    address = id(obj)
+    _core.setmetatable(obj, {'__add': None})
+    snap = _core.snapshot()
+    del obj
+    gc.collect()
+    _core.restore(snap)
+    # A new object at the dead one's address must not inherit its metatable
+    fresh = []
+    while len(fresh) < 1000 and (not fresh or id(fresh[-1]) != address):
+        fresh.append(Obj())
+        assert _core.getmetatable(fresh[-1]) is None
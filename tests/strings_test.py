@@ -0,0 +1,43 @@
+from microps import js, lua, php, py, ruby, unwrap, _core
+
+# Run from the repository root: python -m pytest tests/strings_test.py
+
+
+def test_trim_keeps_interior_whitespace():
+    assert unwrap(js.String("  a b\t\n").trim()) == "a b"
+    assert unwrap(js.String("  a b ").trimStart()) == "a b "
+    assert unwrap(js.String("  a b ").trimEnd()) == "  a b"
+    assert unwrap(php.trim("\t x  y \n")) == "x  y"
+    assert unwrap(ruby.String(" p q ").strip()) == "p q"
+    assert unwrap(py.str(" r s ").strip()) == "r s"
+
+
+def test_plus_equals_builds_without_aliasing():
+    s = js.String("a")
+    alias = s
+    for i in range(3):
+        s += i
+    fork = s
+    s += "x"
+    assert type(s._rope) is _core.StrBuilder
+    assert unwrap(s) == "a012x"
+    assert unwrap(fork) == "a012"
+    assert unwrap(alias) == "a"
+    assert unwrap(s.toUpperCase()) == "A012X"
+
+
+def test_lua_concat_uses_builder():
+    s = lua.String("")
+    for piece in ("x", 1, "y"):
+        s = s.__concat__(piece)
+    assert type(s._rope) is _core.StrBuilder
+    assert unwrap(s) == "x1y"
+
+
+def test_strbuilder_behaves_like_str():
+    b = _core.StrBuilder("ab")
+    c = b + "cd"
+    assert str(c) == "abcd" and c.getvalue() == "abcd"
+    assert len(c) == 4 and c == "abcd" and hash(c) == hash("abcd")
+    assert str("z" + c) == "zabcd"
+    assert str(b) == "ab"
@@ -0,0 +1,116 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from microps import js, lua, php, shared, unwrap, scope_context, _core
+
+# Run from the repository root: python -m pytest tests/threaded_scopes_test.py
+
+THREADS = 8
+REQUESTS = 400
+
+
+def handle_request(i):
+    # Each request writes its own js.x / lua.x, yields, then reads them back
+    with scope_context():
+        js.x = i
+        lua.x = i * 2
+        time.sleep(0)
+        return unwrap(js.x), unwrap(lua.x)
+
+
+def test_scope_context_requests_do_not_crosstalk():
+    with ThreadPoolExecutor(THREADS) as pool:
+        results = list(pool.map(handle_request, range(REQUESTS)))
+    assert results == [(i, i * 2) for i in range(REQUESTS)]
+
+
+def test_scope_context_writes_stay_private():
+    js.y = "shared"
+    with scope_context():
+        js.y = "private"
+        assert unwrap(js.y) == "private"
+    assert unwrap(js.y) == "shared"
+
+
+def test_scope_context_nests():
+    with scope_context():
+        lua.z = 1
+        with scope_context():
+            assert unwrap(lua.z) == 1       # inner layer starts from the outer one
+            lua.z = 2
+        assert unwrap(lua.z) == 1
+
+
+def test_scope_context_async_tasks():
+    @scope_context()
+    async def handler(i):
+        php.req = i
+        await asyncio.sleep(0)          # let the other handlers run in between
+        async with scope_context():
+            php.req = -i                # nested layer: outer value untouched
+            await asyncio.sleep(0)
+            inner = unwrap(php.req)
+        return unwrap(php.req), inner
+
+    async def serve():
+        return await asyncio.gather(*(handler(i) for i in range(1000)))
+
+    assert asyncio.run(serve()) == [(i, -i) for i in range(1000)]
+    assert _core.overlay() is None
+
+
+def test_nested_ghost_counter_continues_from_outer():
+    with scope_context():
+        start = unwrap(lua.ghost_depth)
+        with scope_context():
+            assert unwrap(lua.ghost_depth) == start + 1
+        assert unwrap(lua.ghost_depth) == start + 1
+
+
+def test_ghost_counters_are_per_context():
+    def count(_):
+        with scope_context():
+            return [unwrap(js.ghost_hits) for _ in range(5)]
+
+    with ThreadPoolExecutor(THREADS) as pool:
+        runs = list(pool.map(count, range(50)))
+    first = runs[0][0]
+    assert all(run == list(range(first, first + 5)) for run in runs)
+
+
+def test_shared_scope_writes_are_atomic():
+    barrier = threading.Barrier(THREADS)
+
+    def writer(t):
+        barrier.wait()
+        for i in range(500):
+            setattr(shared, f"k{t}_{i}", i)
+
+    threads = [threading.Thread(target=writer, args=(t,)) for t in range(THREADS)]
+    for th in threads:
+        th.start()
+    for th in threads:
+        th.join()
+    assert all(unwrap(getattr(shared, f"k{t}_499")) == 499 for t in range(THREADS))
+
+
+def test_metatable_registry_under_threads():
+    def register(i):
+        t = _core.obj_new()
+        mt = {'__add': lambda a, b: i}
+        _core.setmetatable(t, mt)
+        return _core.getmetatable(t) is mt
+
+    with ThreadPoolExecutor(THREADS) as pool:
+        assert all(pool.map(register, range(REQUESTS)))
+
+
+if __name__ == "__main__":
+    # Throughput only; the tests run under pytest
+    start = time.perf_counter()
+    with ThreadPoolExecutor(THREADS) as pool:
+        list(pool.map(handle_request, range(20000)))
+    elapsed = time.perf_counter() - start
+    print(f"{20000 / elapsed:,.0f} isolated requests/s on {THREADS} threads")
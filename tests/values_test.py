@@ -0,0 +1,52 @@
+import gc
+import weakref
+
+from microps import _core
+from microps.wrappers.js import JSValue
+from microps.wrappers.py import PyValue
+
+# Run from the repository root: python -m pytest tests/values_test.py
+
+
+def test_freed_values_are_reused():
+    v = PyValue(5, "py")
+    addr = id(v)
+    del v
+    w = JSValue("s", "js")                      # same layout: off the freelist
+    assert id(w) == addr
+    assert type(w) is JSValue and w._val == "s" and w._engine == "js"
+    assert not hasattr(w, "__dict__")
+    assert JSValue()._val is None and JSValue()._engine is None
+
+
+def test_recycled_values_start_clean():
+    values = [PyValue(i, "py") for i in range(300)]   # more than the freelist holds
+    del values
+    fresh = [JSValue(n, "js") for n in range(300)]
+    assert [v._val for v in fresh] == list(range(300))
+    assert all(v._engine == "js" for v in fresh)
+    assert PyValue(PyValue([1, 2]))._val == [1, 2]  # Value layers stripped
+
+
+def test_values_with_a_dict_still_work():
+    class Tagged(_core.Value):
+        pass
+
+    t = Tagged(1, "py")
+    t.tag = "kept"
+    assert t._val == 1 and t.tag == "kept"
+    del t
+    u = Tagged(2)
+    assert u._val == 2 and not hasattr(u, "tag")
+
+
+def test_cycles_through_values_are_collected():
+    class Box(list):
+        pass
+
+    box = Box()
+    box.append(PyValue(box, "py"))
+    ref = weakref.ref(box)
+    del box
+    gc.collect()
+    assert ref() is None